@@ -0,0 +1,43 @@
+-- Migration: Create hourly/daily reading rollups
+-- Description: Per-sensor min/max/sum/count aggregates maintained incrementally
+-- by python/RollupReadings.py from a high-water mark on readings.id.
+-- Averages are sum_value / reading_count so buckets can be merged incrementally.
+
+CREATE TABLE IF NOT EXISTS readings_hourly (
+    sensor_id INT(6) UNSIGNED NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    min_value DECIMAL(10,2) NOT NULL,
+    max_value DECIMAL(10,2) NOT NULL,
+    sum_value DECIMAL(20,2) NOT NULL,
+    reading_count INT UNSIGNED NOT NULL,
+    PRIMARY KEY (sensor_id, bucket_start),
+    CONSTRAINT fk_readings_hourly_sensor
+        FOREIGN KEY (sensor_id)
+        REFERENCES sensors(id)
+        ON DELETE CASCADE,
+    INDEX idx_bucket_start (bucket_start)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS readings_daily (
+    sensor_id INT(6) UNSIGNED NOT NULL,
+    bucket_start DATE NOT NULL,
+    min_value DECIMAL(10,2) NOT NULL,
+    max_value DECIMAL(10,2) NOT NULL,
+    sum_value DECIMAL(20,2) NOT NULL,
+    reading_count INT UNSIGNED NOT NULL,
+    PRIMARY KEY (sensor_id, bucket_start),
+    CONSTRAINT fk_readings_daily_sensor
+        FOREIGN KEY (sensor_id)
+        REFERENCES sensors(id)
+        ON DELETE CASCADE,
+    INDEX idx_bucket_start (bucket_start)
+) ENGINE=InnoDB;
+
+-- High-water marks for incremental jobs (last readings.id already folded in)
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    last_reading_id INT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+INSERT IGNORE INTO rollup_state (name, last_reading_id) VALUES ('readings', 0);
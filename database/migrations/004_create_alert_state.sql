@@ -0,0 +1,33 @@
+-- Migration: Create incremental alert state
+-- Description: Per-sensor watermark (last evaluated readings.id) and
+-- hysteresis/debounce state maintained by python/AlertEngine.py, plus the
+-- notifications table it writes to.
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    user_id INT(6) UNSIGNED NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    message TEXT NOT NULL,
+    data JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    read_at TIMESTAMP NULL,
+    CONSTRAINT fk_notification_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE,
+    INDEX idx_user_read (user_id, read_at),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS alert_state (
+    sensor_id INT(6) UNSIGNED NOT NULL PRIMARY KEY,
+    last_reading_id INT UNSIGNED NOT NULL DEFAULT 0,
+    state ENUM('ok', 'low', 'high') NOT NULL DEFAULT 'ok',
+    candidate ENUM('ok', 'low', 'high') NOT NULL DEFAULT 'ok',
+    candidate_count INT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT fk_alert_state_sensor
+        FOREIGN KEY (sensor_id)
+        REFERENCES sensors(id)
+        ON DELETE CASCADE
+) ENGINE=InnoDB;
@@ -0,0 +1,60 @@
+-- Migration: Partition readings by month
+-- Description: Convert readings to monthly RANGE partitions on created_at
+-- (pYYYYMM from the oldest reading to three months ahead, plus p_future), so
+-- python/ReadingPartitions.py can create future months and drop or archive
+-- expired ones without DELETE. Equivalent to
+-- `python python/ReadingPartitions.py --migrate`; does nothing if readings is
+-- already partitioned.
+--
+-- MySQL requires the partitioning column in every unique key and does not
+-- support foreign keys on partitioned tables: the primary key becomes
+-- (id, created_at) and fk_sensor is dropped. The table is rebuilt once, so
+-- run this during a quiet period.
+
+DROP PROCEDURE IF EXISTS partition_readings;
+
+DELIMITER //
+CREATE PROCEDURE partition_readings()
+BEGIN
+    DECLARE month_start DATE;
+    DECLARE last_month DATE;
+    DECLARE definitions TEXT DEFAULT '';
+
+    IF (SELECT COUNT(*) FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'readings'
+        AND PARTITION_NAME IS NOT NULL) = 0 THEN
+
+        IF (SELECT COUNT(*) FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'readings'
+            AND CONSTRAINT_NAME = 'fk_sensor') > 0 THEN
+            ALTER TABLE readings DROP FOREIGN KEY fk_sensor;
+        END IF;
+
+        ALTER TABLE readings
+            MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (id, created_at);
+
+        SET month_start = DATE_FORMAT(COALESCE((SELECT MIN(created_at) FROM readings), NOW()), '%Y-%m-01');
+        SET last_month = DATE_FORMAT(NOW() + INTERVAL 3 MONTH, '%Y-%m-01');
+        WHILE month_start <= last_month DO
+            SET definitions = CONCAT(definitions,
+                'PARTITION p', DATE_FORMAT(month_start, '%Y%m'),
+                ' VALUES LESS THAN (UNIX_TIMESTAMP(''', month_start + INTERVAL 1 MONTH, ' 00:00:00'')), ');
+            SET month_start = month_start + INTERVAL 1 MONTH;
+        END WHILE;
+
+        SET @partition_sql = CONCAT(
+            'ALTER TABLE readings PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (',
+            definitions, 'PARTITION p_future VALUES LESS THAN MAXVALUE)');
+        PREPARE stmt FROM @partition_sql;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+DELIMITER ;
+
+CALL partition_readings();
+DROP PROCEDURE partition_readings;
@@ -0,0 +1,33 @@
+-- Migration: Covering index for plot and summary reads
+-- Description: Replace idx_sensor_time (sensor_id, created_at) on readings
+-- with idx_sensor_time_value (sensor_id, created_at, value). Plot queries
+-- look up each sensor's time range and read only sensor_id, created_at and
+-- value (plus id, which InnoDB stores in every secondary index), so they are
+-- answered from the index without touching the clustered rows. The old index
+-- is a prefix of the new one and is dropped. Does nothing if the new index
+-- already exists. `python python/QueryPlans.py --check` confirms the plans.
+
+DROP PROCEDURE IF EXISTS add_covering_reading_index;
+
+DELIMITER //
+CREATE PROCEDURE add_covering_reading_index()
+BEGIN
+    IF (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'readings'
+        AND INDEX_NAME = 'idx_sensor_time_value') = 0 THEN
+
+        ALTER TABLE readings ADD INDEX idx_sensor_time_value (sensor_id, created_at, value);
+
+        IF (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'readings'
+            AND INDEX_NAME = 'idx_sensor_time') > 0 THEN
+            ALTER TABLE readings DROP INDEX idx_sensor_time;
+        END IF;
+    END IF;
+END //
+DELIMITER ;
+
+CALL add_covering_reading_index();
+DROP PROCEDURE add_covering_reading_index;
@@ -0,0 +1,24 @@
+-- Migration: Index for the latest reading id of each sensor
+-- Description: Add idx_sensor_id (sensor_id, id) on readings. Plot caches
+-- and snapshots check freshness with each sensor's highest reading id;
+-- idx_sensor_time_value is ordered by created_at within a sensor, so
+-- finding that id walked the sensor's whole history. With this index it is
+-- one backward dive per partition. Does nothing if the index already exists.
+
+DROP PROCEDURE IF EXISTS add_sensor_id_reading_index;
+
+DELIMITER //
+CREATE PROCEDURE add_sensor_id_reading_index()
+BEGIN
+    IF (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'readings'
+        AND INDEX_NAME = 'idx_sensor_id') = 0 THEN
+
+        ALTER TABLE readings ADD INDEX idx_sensor_id (sensor_id, id);
+    END IF;
+END //
+DELIMITER ;
+
+CALL add_sensor_id_reading_index();
+DROP PROCEDURE add_sensor_id_reading_index;
@@ -0,0 +1,23 @@
+-- Dashboard summary averages, shared by public/api/summary.php and
+-- python/QueryPlans.py. Averages over the daily rollups for whole days, the
+-- hourly rollups for the first partial day, plus readings not yet rolled up
+-- (maintained by python/RollupReadings.py) rather than every raw reading.
+-- Callers append an optional plant filter on ps.plant_id and GROUP BY s.type.
+SELECT s.type AS sensor_type, SUM(r.sum_value) / SUM(r.reading_count) AS avg_value
+FROM (
+    SELECT sensor_id, sum_value, reading_count
+    FROM readings_daily
+    WHERE bucket_start >= DATE(DATE_SUB(NOW(), INTERVAL :daily_days DAY)) + INTERVAL 1 DAY
+    UNION ALL
+    SELECT sensor_id, sum_value, reading_count
+    FROM readings_hourly
+    WHERE bucket_start >= DATE_FORMAT(DATE_SUB(NOW(), INTERVAL :days DAY), '%Y-%m-%d %H:00:00')
+      AND bucket_start < DATE(DATE_SUB(NOW(), INTERVAL :hourly_days DAY)) + INTERVAL 1 DAY
+    UNION ALL
+    SELECT sensor_id, value, 1
+    FROM readings
+    WHERE id > (SELECT COALESCE(MAX(last_reading_id), 0) FROM rollup_state WHERE name = 'readings')
+      AND created_at >= DATE_SUB(NOW(), INTERVAL :tail_days DAY)
+) r
+JOIN sensors s ON s.id = r.sensor_id
+LEFT JOIN plant_sensors ps ON ps.sensor_id = s.id
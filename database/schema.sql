@@ -68,21 +68,93 @@ CREATE TABLE IF NOT EXISTS sensors (
     INDEX idx_plot_type (plot_type)
 ) ENGINE=InnoDB;
 
--- Create Readings table
+-- Create Readings table, partitioned by month on created_at.
+-- python/ReadingPartitions.py splits monthly partitions (pYYYYMM) off
+-- p_future ahead of time and drops expired ones. Partitioned tables cannot
+-- have foreign keys, so sensor_id is not constrained.
 CREATE TABLE IF NOT EXISTS readings (
-    id INT(6) UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    id INT(6) UNSIGNED AUTO_INCREMENT,
     sensor_id INT(6) UNSIGNED NOT NULL,
     value DECIMAL(10,2) NOT NULL,
     unit VARCHAR(20) NOT NULL,
     temperature DECIMAL(4,1),
     humidity DECIMAL(4,1),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
+    INDEX idx_sensor_time_value (sensor_id, created_at, value),
+    INDEX idx_sensor_id (sensor_id, id),
+    INDEX idx_reading_time (created_at)
+) ENGINE=InnoDB
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Create reading rollup tables (maintained by python/RollupReadings.py)
+CREATE TABLE IF NOT EXISTS readings_hourly (
+    sensor_id INT(6) UNSIGNED NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    min_value DECIMAL(10,2) NOT NULL,
+    max_value DECIMAL(10,2) NOT NULL,
+    sum_value DECIMAL(20,2) NOT NULL,
+    reading_count INT UNSIGNED NOT NULL,
+    PRIMARY KEY (sensor_id, bucket_start),
+    CONSTRAINT fk_readings_hourly_sensor
+        FOREIGN KEY (sensor_id)
+        REFERENCES sensors(id)
+        ON DELETE CASCADE,
+    INDEX idx_bucket_start (bucket_start)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS readings_daily (
+    sensor_id INT(6) UNSIGNED NOT NULL,
+    bucket_start DATE NOT NULL,
+    min_value DECIMAL(10,2) NOT NULL,
+    max_value DECIMAL(10,2) NOT NULL,
+    sum_value DECIMAL(20,2) NOT NULL,
+    reading_count INT UNSIGNED NOT NULL,
+    PRIMARY KEY (sensor_id, bucket_start),
+    CONSTRAINT fk_readings_daily_sensor
+        FOREIGN KEY (sensor_id)
+        REFERENCES sensors(id)
+        ON DELETE CASCADE,
+    INDEX idx_bucket_start (bucket_start)
+) ENGINE=InnoDB;
+
+-- High-water marks for incremental jobs (last readings.id already folded in)
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    last_reading_id INT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- Notifications and incremental alert state (maintained by python/AlertEngine.py)
+CREATE TABLE IF NOT EXISTS notifications (
+    id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    user_id INT(6) UNSIGNED NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    message TEXT NOT NULL,
+    data JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT fk_sensor
-        FOREIGN KEY (sensor_id) 
-        REFERENCES sensors(id) 
+    read_at TIMESTAMP NULL,
+    CONSTRAINT fk_notification_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
         ON DELETE CASCADE,
-    INDEX idx_sensor_time (sensor_id, created_at),
-    INDEX idx_reading_time (created_at)
+    INDEX idx_user_read (user_id, read_at),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS alert_state (
+    sensor_id INT(6) UNSIGNED NOT NULL PRIMARY KEY,
+    last_reading_id INT UNSIGNED NOT NULL DEFAULT 0,
+    state ENUM('ok', 'low', 'high') NOT NULL DEFAULT 'ok',
+    candidate ENUM('ok', 'low', 'high') NOT NULL DEFAULT 'ok',
+    candidate_count INT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT fk_alert_state_sensor
+        FOREIGN KEY (sensor_id)
+        REFERENCES sensors(id)
+        ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
 -- Create Plants table
@@ -219,6 +291,11 @@ GRANT SELECT ON garden_sensors.plant_sensors TO 'garden_user'@'localhost';
 GRANT SELECT ON garden_sensors.pins TO 'garden_user'@'localhost';
 GRANT SELECT, INSERT ON garden_sensors.system_log TO 'garden_user'@'localhost';
 GRANT SELECT, INSERT, UPDATE ON garden_sensors.settings TO 'garden_user'@'localhost';
+GRANT SELECT, INSERT, UPDATE ON garden_sensors.readings_hourly TO 'garden_user'@'localhost';
+GRANT SELECT, INSERT, UPDATE ON garden_sensors.readings_daily TO 'garden_user'@'localhost';
+GRANT SELECT, INSERT, UPDATE ON garden_sensors.rollup_state TO 'garden_user'@'localhost';
+GRANT SELECT, INSERT, UPDATE ON garden_sensors.notifications TO 'garden_user'@'localhost';
+GRANT SELECT, INSERT, UPDATE ON garden_sensors.alert_state TO 'garden_user'@'localhost';
 
 FLUSH PRIVILEGES;
 
@@ -226,6 +303,9 @@ FLUSH PRIVILEGES;
 INSERT INTO users (username, password_hash, email) VALUES 
 ('admin', '$2y$10$92IXUNpkjO0rOQ5byMi.Ye4oKoEa3Ro9llC/.og/at2.uheWG/igi', 'admin@example.com');
 
+-- Initialise rollup high-water mark
+INSERT INTO rollup_state (name, last_reading_id) VALUES ('readings', 0);
+
 -- Insert default settings
 INSERT INTO settings (name, value) VALUES
 ('update_interval', '300'),
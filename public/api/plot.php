@@ -46,6 +46,74 @@ function decodeJsonFromOutput(array $outputLines): ?array {
     return null;
 }
 
+/**
+ * Ask the long-lived plot server (python/plot_server.py) to render the plot.
+ * $plantIds (a list of IDs or 'all') asks for one plot per plant instead.
+ * Returns the encoded response body ('json', 'gzip' or 'msgpack'), passed
+ * through without decoding, or null when the server is not running so the
+ * caller can fall back.
+ */
+function requestPlotFromServer(
+    ?int $plantId,
+    int $days,
+    string $format,
+    string $encoding = 'json',
+    $plantIds = null
+): ?string {
+    $socketPath = getenv('PLOT_SERVER_SOCKET') ?: '/tmp/garden-sensors-plot.sock';
+    if (!file_exists($socketPath)) {
+        return null;
+    }
+
+    $timeout = (float)(getenv('PLOT_SERVER_TIMEOUT') ?: 30);
+    $client = @stream_socket_client('unix://' . $socketPath, $errno, $errstr, $timeout);
+    if ($client === false) {
+        return null;
+    }
+
+    stream_set_timeout($client, (int)ceil($timeout));
+    $request = [
+        'plant_id' => $plantId,
+        'days' => $days,
+        'format' => $format,
+        'encoding' => $encoding
+    ];
+    if ($plantIds !== null) {
+        $request['plant_ids'] = $plantIds;
+    }
+    fwrite($client, json_encode($request) . "\n");
+    // The server closes the connection after the response
+    $body = stream_get_contents($client);
+    fclose($client);
+
+    if ($body === false || $body === '') {
+        return null;
+    }
+    return $body;
+}
+
+/**
+ * Path of the published snapshot (python/PlotSnapshots.py) of a standard
+ * view, or null when there is none or the publisher has stopped refreshing
+ * its manifest, so the caller renders live instead.
+ */
+function findPlotSnapshot(?int $plantId, int $days, string $format): ?string {
+    $dir = getenv('PLOT_SNAPSHOT_DIR');
+    if (!$dir) {
+        return null;
+    }
+
+    $maxAge = (int)(getenv('PLOT_SNAPSHOT_MAX_AGE') ?: 900);
+    $manifestTime = @filemtime($dir . '/manifest.json');
+    if ($manifestTime === false || time() - $manifestTime > $maxAge) {
+        return null;
+    }
+
+    $view = ($plantId !== null ? 'plant-' . $plantId : 'all') . '-' . $days . 'd';
+    $path = $dir . '/' . $view . '.' . ($format === 'json' ? 'data' : 'components') . '.json';
+    return is_file($path) ? $path : null;
+}
+
 // Clear any output that might have been generated
 ob_clean();
 
@@ -67,11 +135,59 @@ if (isset($_GET['plant_id']) && $_GET['plant_id'] !== '' && $_GET['plant_id'] !=
 $days = isset($_GET['days']) ? intval($_GET['days']) : 7;
 $format = isset($_GET['format']) ? $_GET['format'] : 'components'; // 'components' or 'json'
 
+// plant_ids=all or plant_ids=1,2,3 returns one plot per plant, keyed by plant ID, from one query
+$plant_ids = null;
+if (isset($_GET['plant_ids']) && $_GET['plant_ids'] !== '') {
+    if (strtolower($_GET['plant_ids']) === 'all') {
+        $plant_ids = 'all';
+    } else {
+        $plant_ids = array_values(array_filter(array_map('intval', explode(',', $_GET['plant_ids']))));
+    }
+}
+
 // Validate days
 if ($days < 1 || $days > 365) {
     $days = 7;
 }
 
+// Response encoding: MessagePack on request, otherwise gzip when the client accepts it
+$encoding = 'json';
+if (isset($_GET['encoding']) && $_GET['encoding'] === 'msgpack') {
+    $encoding = 'msgpack';
+} elseif (isset($_SERVER['HTTP_ACCEPT_ENCODING']) && strpos($_SERVER['HTTP_ACCEPT_ENCODING'], 'gzip') !== false
+          && !ini_get('zlib.output_compression')) {
+    $encoding = 'gzip';
+}
+
+// Standard views (e.g. 7/30/90 days) are served from the published snapshot files;
+// custom ranges and batches fall through to live rendering
+if ($plant_ids === null && $encoding !== 'msgpack' && in_array($format, ['components', 'json'], true)) {
+    $snapshot = findPlotSnapshot($plant_id, $days, $format);
+    if ($snapshot !== null) {
+        if ($encoding === 'gzip' && is_file($snapshot . '.gz')) {
+            header('Content-Encoding: gzip');
+            header('Vary: Accept-Encoding');
+            $snapshot .= '.gz';
+        }
+        readfile($snapshot);
+        exit;
+    }
+}
+
+// Prefer the warm plot server; only spawn a Python process if it is unavailable
+$serverBody = requestPlotFromServer($plant_id, $days, $format, $encoding, $plant_ids);
+if ($serverBody !== null) {
+    // Pass the server's bytes through as-is instead of decoding and re-encoding
+    if ($encoding === 'gzip' && substr($serverBody, 0, 2) === "\x1f\x8b") {
+        header('Content-Encoding: gzip');
+        header('Vary: Accept-Encoding');
+    } elseif ($encoding === 'msgpack' && $serverBody[0] !== '{') {
+        header('Content-Type: application/msgpack');
+    }
+    echo $serverBody;
+    exit;
+}
+
 // Get Python path - use deployment directory
 // Try to detect deployment directory from current file location.
 // __DIR__ is public/api, so project root is two levels up.
@@ -93,7 +209,11 @@ $command .= ' --days ' . escapeshellarg($days);
 if ($plant_id !== null && $plant_id > 0) {
     $command .= ' --plant-id ' . escapeshellarg($plant_id);
 }
+if ($plant_ids !== null) {
+    $command .= ' --plant-ids ' . escapeshellarg($plant_ids === 'all' ? 'all' : implode(',', $plant_ids));
+}
 $command .= ' --format ' . escapeshellarg($format);
+$command .= ' --no-server';
 
 // Execute Python script (capture stderr for diagnostics)
 $output = [];
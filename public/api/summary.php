@@ -37,17 +37,16 @@ try {
         [PDO::ATTR_ERRMODE => PDO::ERRMODE_EXCEPTION]
     );
 
-    $sql = "
-        SELECT s.type AS sensor_type, AVG(r.value) AS avg_value
-        FROM readings r
-        JOIN sensors s ON s.id = r.sensor_id
-        LEFT JOIN plant_sensors ps ON ps.sensor_id = s.id
-        WHERE r.created_at >= DATE_SUB(NOW(), INTERVAL :days DAY)
-    ";
-    $params = [':days' => $days];
+    // Shared with python/QueryPlans.py, which checks its plan in CI.
+    // __DIR__ is public/api, so project root is two levels up.
+    $sql = file_get_contents(dirname(dirname(__DIR__)) . '/database/queries/summary.sql');
+    if ($sql === false) {
+        throw new RuntimeException('Summary query not found');
+    }
+    $params = [':daily_days' => $days, ':days' => $days, ':hourly_days' => $days, ':tail_days' => $days];
 
     if ($plantId !== null && $plantId > 0) {
-        $sql .= " AND ps.plant_id = :plant_id ";
+        $sql .= " WHERE ps.plant_id = :plant_id ";
         $params[':plant_id'] = $plantId;
     }
 
@@ -33,12 +33,10 @@ try {
             continue;
         }
 
-        // Initialize notification system for user
+        // Alerts are created incrementally by python/AlertEngine.py;
+        // this script only sends the email digests
         $notification = new Notification($user['id']);
         
-        // Check for alerts
-        $notification->checkAlerts();
-        
         // Get unread notifications
         $unreadCount = $notification->getUnreadCount();
         
@@ -13,12 +13,8 @@ try {
     // Begin transaction
     $db->beginTransaction();
     
-    // Clean up old readings (keep last 30 days)
-    $sql = "DELETE FROM readings 
-            WHERE timestamp < DATE_SUB(NOW(), INTERVAL 30 DAY)";
-    $stmt = $db->prepare($sql);
-    $stmt->execute();
-    $readingsDeleted = $stmt->rowCount();
+    // Old readings are expired by python/ReadingPartitions.py, which drops
+    // whole monthly partitions instead of deleting rows
     
     // Clean up old notifications (keep last 90 days)
     $sql = "DELETE FROM notifications 
@@ -80,7 +76,6 @@ try {
     
     // Log cleanup results
     $logger->info("Cleanup completed", [
-        'readings_deleted' => $readingsDeleted,
         'notifications_deleted' => $notificationsDeleted,
         'logs_deleted' => $logsDeleted,
         'rate_limits_deleted' => $rateLimitsDeleted,
@@ -89,7 +84,6 @@ try {
     ]);
     
     echo "Cleanup completed successfully:\n";
-    echo "- {$readingsDeleted} old readings deleted\n";
     echo "- {$notificationsDeleted} old notifications deleted\n";
     echo "- {$logsDeleted} old system logs deleted\n";
     echo "- {$rateLimitsDeleted} old rate limit records deleted\n";
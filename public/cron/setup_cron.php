@@ -11,12 +11,29 @@ try {
     
     // Get the absolute path to the cron directory
     $cronDir = __DIR__;
+    $projectRoot = dirname(dirname(__DIR__));
+    $python = $projectRoot . '/venv/bin/python3';
     
     // Define cron jobs
     $cronJobs = [
-        // Check alerts every 5 minutes
+        // Evaluate new readings against sensor thresholds every minute
+        "* * * * * {$python} {$projectRoot}/python/AlertEngine.py >> {$cronDir}/logs/alert_engine.log 2>&1",
+        
+        // Email alert digests every 5 minutes
         "*/5 * * * * php {$cronDir}/check_alerts.php >> {$cronDir}/logs/check_alerts.log 2>&1",
         
+        // Fold new readings into the hourly/daily rollups every 5 minutes
+        "*/5 * * * * {$python} {$projectRoot}/python/RollupReadings.py >> {$cronDir}/logs/rollup_readings.log 2>&1",
+        
+        // Re-render plot snapshots whose readings changed every 5 minutes
+        "*/5 * * * * {$python} {$projectRoot}/python/PlotSnapshots.py >> {$cronDir}/logs/plot_snapshots.log 2>&1",
+        
+        // Move months past READINGS_RETENTION_MONTHS to FTP cold storage daily, ahead of the partition expiry
+        "15 0 * * * {$python} {$projectRoot}/python/ReadingArchiver.py >> {$cronDir}/logs/reading_archiver.log 2>&1",
+        
+        // Create upcoming monthly readings partitions and drop expired, archived ones daily
+        "30 0 * * * {$python} {$projectRoot}/python/ReadingPartitions.py >> {$cronDir}/logs/reading_partitions.log 2>&1",
+        
         // Clean up old data daily at midnight
         "0 0 * * * php {$cronDir}/cleanup.php >> {$cronDir}/logs/cleanup.log 2>&1",
         
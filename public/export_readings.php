@@ -28,7 +28,11 @@ try {
         "mysql:host=" . DB_HOST . ";dbname=" . DB_NAME,
         DB_USER,
         DB_PASS,
-        array(PDO::ATTR_ERRMODE => PDO::ERRMODE_EXCEPTION)
+        array(
+            PDO::ATTR_ERRMODE => PDO::ERRMODE_EXCEPTION,
+            // Stream rows from the server instead of buffering the whole export
+            PDO::MYSQL_ATTR_USE_BUFFERED_QUERY => false
+        )
     );
 
     // Get filter parameters
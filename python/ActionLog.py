@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Background writer for hardware action logs (system_logs).
+
+log() only timestamps the action and puts it on a bounded in-memory queue,
+so callers on the GPIO control path never wait for the database. A writer
+thread appends queued actions to a local append-only spool file and then
+inserts everything past the spool's committed offset in multi-row batches.
+Actions that were spooled but not yet inserted (database down, process
+killed) are replayed from the spool on the next start. Delivery is
+at-least-once: a crash between an insert and its offset update replays
+that batch.
+"""
+
+import os
+import sys
+import json
+import queue
+import argparse
+import threading
+from time import monotonic
+from datetime import datetime, UTC
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+
+load_dotenv()
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows development machines): only one process may use a spool
+    fcntl = None
+
+DEFAULT_SPOOL_PATH = os.getenv('ACTION_LOG_SPOOL') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'action_log.spool'
+)
+
+INSERT_SQL = "INSERT INTO system_logs (component, action, timestamp) VALUES "
+
+
+def build_log_insert(entries):
+    """Build one multi-row INSERT for (component, action, timestamp) entries
+
+    Returns (query, params).
+    """
+    query = INSERT_SQL + ", ".join(["(%s, %s, %s)"] * len(entries))
+    params = []
+    for entry in entries:
+        params.extend((entry['component'], entry['action'], datetime.fromisoformat(entry['timestamp'])))
+    return query, params
+
+
+class ActionLogWriter:
+    """Non-blocking, spool-backed batch writer for system_logs"""
+
+    def __init__(self, db=None, spool_path=DEFAULT_SPOOL_PATH, max_queue=1000, batch_size=100,
+                 flush_interval=1.0, retry_interval=10.0, start=True):
+        """Initialize the writer
+
+        Args:
+            db: DBConnect to write through (defaults to a pooled connection)
+            spool_path: Append-only spool file; '<spool_path>.offset' records
+                how much of it has been inserted
+            max_queue: Actions held in memory before log() starts dropping
+            batch_size: Maximum rows per INSERT
+            flush_interval: Seconds the writer waits to collect a batch
+            retry_interval: Seconds to wait after a failed insert
+            start: Start the writer thread now (replaying any unsent spool)
+        """
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+        self.spool_path = spool_path
+        self.offset_path = spool_path + '.offset'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = None
+        os.makedirs(os.path.dirname(os.path.abspath(spool_path)), exist_ok=True)
+        if start:
+            self.start()
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='action-log', daemon=True)
+            self._thread.start()
+
+    def log(self, component, action, timestamp=None):
+        """Record an action without blocking
+
+        The timestamp is taken now, not when the row is written.
+
+        Returns:
+            False if the queue was full and the action was dropped
+        """
+        entry = {
+            'component': component,
+            'action': action,
+            'timestamp': (timestamp or datetime.now(UTC)).isoformat()
+        }
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _drain(self, timeout):
+        """Take queued entries, waiting up to timeout for the first one"""
+        entries = []
+        try:
+            entries.append(self._queue.get(timeout=timeout))
+            while True:
+                entries.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return entries
+
+    def _spool(self, entries):
+        """Append entries to the spool file and sync it to disk"""
+        with open(self.spool_path, 'a', encoding='utf-8') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_offset(self):
+        try:
+            with open(self.offset_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, offset):
+        tmp_path = self.offset_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def flush_spool(self):
+        """Insert every spooled entry past the committed offset
+
+        Holds an exclusive lock on the spool, where flock is available, so
+        several processes can share one file. Once everything is inserted
+        the spool is truncated.
+
+        Returns:
+            Number of rows inserted
+        """
+        if not os.path.exists(self.spool_path):
+            return 0
+        inserted = 0
+        with open(self.spool_path, 'r+b') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            offset = self._read_offset()
+            size = f.seek(0, os.SEEK_END)
+            if offset > size:
+                # Spool was truncated after the offset was last written
+                offset = 0
+            f.seek(offset)
+            while True:
+                entries = []
+                consumed = offset
+                for _ in range(self.batch_size):
+                    position = f.tell()
+                    line = f.readline()
+                    if not line:
+                        break
+                    if not line.endswith(b'\n'):
+                        # Torn final write from a crash; cut it off so later appends start clean
+                        f.truncate(position)
+                        break
+                    consumed = f.tell()
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # Skip a corrupt line rather than blocking the spool
+                        continue
+                if consumed == offset:
+                    break
+                if entries:
+                    query, params = build_log_insert(entries)
+                    self.db.execute_query(query, params)
+                    inserted += len(entries)
+                offset = consumed
+                self._write_offset(offset)
+            if offset >= f.seek(0, os.SEEK_END):
+                f.truncate(0)
+                self._write_offset(0)
+        return inserted
+
+    def _run(self):
+        retry_at = 0.0
+        while True:
+            stopping = self._stopping.is_set()
+            entries = self._drain(0 if stopping else self.flush_interval)
+            if entries:
+                try:
+                    self._spool(entries)
+                except OSError as e:
+                    # No spool (disk full, read-only): insert directly instead
+                    print(f"Action log spool error: {e}")
+                    try:
+                        self.db.execute_query(*build_log_insert(entries))
+                    except Exception as e:
+                        print(f"Action log write error: {e}")
+            if stopping or monotonic() >= retry_at:
+                try:
+                    self.flush_spool()
+                except Exception as e:
+                    # Entries stay in the spool; try again later
+                    print(f"Action log write error: {e}")
+                    retry_at = monotonic() + self.retry_interval
+            if stopping and self._queue.empty():
+                return
+
+    @property
+    def pending(self):
+        """Entries queued in memory, not yet spooled"""
+        return self._queue.qsize()
+
+    def close(self, timeout=10.0):
+        """Spool and insert everything queued, then stop the writer thread"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        else:
+            entries = self._drain(0)
+            if entries:
+                self._spool(entries)
+            self.flush_spool()
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay spooled action logs into system_logs')
+    parser.add_argument('--spool', default=DEFAULT_SPOOL_PATH,
+                        help=f'Spool file (default: {DEFAULT_SPOOL_PATH})')
+    args = parser.parse_args()
+
+    writer = ActionLogWriter(spool_path=args.spool, start=False)
+    try:
+        inserted = writer.flush_spool()
+        print(f"Replayed {inserted} actions")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        writer.db.disconnect()
+
+if __name__ == '__main__':
+    main()
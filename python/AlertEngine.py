@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Incremental sensor threshold alerts.
+
+Each run reads only the readings above every sensor's own watermark
+(alert_state.last_reading_id), which advances past every scanned id even
+for sensors with no new readings, scanning the readings primary key in id
+batches, and evaluates them against sensors.min_threshold/max_threshold for
+all sensors at once. Per-sensor state makes alerts fire on transitions
+rather than on every bad reading:
+
+- hysteresis: an alert clears only once the value is back inside the
+  thresholds by a margin (ALERT_HYSTERESIS, a fraction of the
+  min..max band); readings in the margin repeat the previous candidate
+  state, like a Schmitt trigger
+- debounce: a candidate state must hold for ALERT_DEBOUNCE consecutive
+  readings before it is confirmed
+
+Entering 'low' or 'high' creates one notification for the sensor's owner.
+Notifications and state for a batch are written together in one
+transaction with multi-row inserts, so the cost of a run is proportional to
+the new readings, not to users x sensors x history.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+from python.ReadingSeries import ReadingSeries
+
+load_dotenv()
+
+# State codes used in the evaluation arrays; alert_state stores the names
+STATES = ('ok', 'low', 'high')
+OK, LOW, HIGH = 0, 1, 2
+
+SENSORS_SQL = """
+SELECT s.id, s.name, s.type, s.user_id, s.min_threshold, s.max_threshold,
+       a.last_reading_id, a.state, a.candidate, a.candidate_count
+FROM sensors s
+LEFT JOIN alert_state a ON a.sensor_id = s.id
+WHERE s.status = 'active'
+"""
+
+NEW_READINGS_SQL = """
+SELECT id, sensor_id, value, created_at
+FROM readings
+WHERE id > %s AND id <= %s
+ORDER BY id
+"""
+
+STATE_UPSERT_SQL = """
+INSERT INTO alert_state (sensor_id, last_reading_id, state, candidate, candidate_count)
+VALUES {rows}
+ON DUPLICATE KEY UPDATE
+    last_reading_id = VALUES(last_reading_id),
+    state = VALUES(state),
+    candidate = VALUES(candidate),
+    candidate_count = VALUES(candidate_count)
+"""
+
+NOTIFICATION_INSERT_SQL = """
+INSERT INTO notifications (user_id, type, message, data, created_at, read_at)
+VALUES {rows}
+"""
+
+
+def classify(values, min_threshold, max_threshold, hysteresis):
+    """Raw state suggested by each reading
+
+    Returns:
+        Float array of LOW/HIGH/OK codes, NaN inside the hysteresis margin
+        (the reading neither raises nor clears an alert)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    low = np.asarray(min_threshold, dtype=np.float64)
+    high = np.asarray(max_threshold, dtype=np.float64)
+    margin = (high - low) * hysteresis
+    raw = np.full(values.shape, np.nan)
+    raw[(values >= low + margin) & (values <= high - margin)] = OK
+    raw[values < low] = LOW
+    raw[values > high] = HIGH
+    return raw
+
+
+def evaluate(readings, initial, debounce=1):
+    """Run the per-sensor debounce state machine over a batch of readings
+
+    Args:
+        readings: DataFrame with sensor_id and raw (from classify()), sorted
+            by sensor_id then reading id
+        initial: DataFrame indexed by sensor_id with the stored state,
+            candidate and candidate_count codes
+        debounce: Consecutive readings needed to confirm a new state
+
+    Returns:
+        (state, candidate, run_length): arrays aligned with readings giving
+        the confirmed state, the latest candidate and how long it has held
+    """
+    sensor = readings['sensor_id']
+    start_state = sensor.map(initial['state']).to_numpy()
+    start_candidate = sensor.map(initial['candidate'])
+    start_count = sensor.map(initial['candidate_count']).to_numpy()
+
+    # Readings in the hysteresis margin repeat the previous candidate
+    candidate = readings['raw'].groupby(sensor).ffill().fillna(start_candidate)
+    previous = candidate.groupby(sensor).shift(1).fillna(start_candidate)
+    run_id = (candidate != previous).groupby(sensor).cumsum()
+    run_length = candidate.groupby([sensor, run_id]).cumcount().to_numpy() + 1
+    # The first run continues the candidate carried over from the last batch
+    run_length = np.where(run_id.to_numpy() == 0, run_length + start_count, run_length)
+
+    candidate = candidate.to_numpy()
+    confirmed = pd.Series(np.where(run_length == debounce, candidate, np.nan), index=readings.index)
+    state = confirmed.groupby(sensor).ffill().fillna(pd.Series(start_state, index=readings.index))
+    return state.to_numpy().astype(np.int64), candidate.astype(np.int64), run_length.astype(np.int64)
+
+
+class AlertEngine:
+    """Incrementally evaluate sensor thresholds and create notifications"""
+
+    def __init__(self, db=None, batch_size=50000, hysteresis=None, debounce=None, settle_seconds=60):
+        """Initialize the engine
+
+        Args:
+            db: DBConnect to use (defaults to a pooled connection)
+            batch_size: Maximum range of readings.id evaluated per transaction
+            hysteresis: Clear margin as a fraction of the threshold band
+                (default ALERT_HYSTERESIS or 0.05)
+            debounce: Consecutive readings to confirm a state change
+                (default ALERT_DEBOUNCE or 2)
+            settle_seconds: Leave readings younger than this for the next run,
+                so rows from still-open insert transactions are not stepped over
+        """
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+        self.batch_size = batch_size
+        self.hysteresis = hysteresis if hysteresis is not None else float(os.getenv('ALERT_HYSTERESIS', '0.05'))
+        self.debounce = max(1, debounce if debounce is not None else int(os.getenv('ALERT_DEBOUNCE', '2')))
+        self.settle_seconds = settle_seconds
+
+    def load_sensors(self):
+        """Active sensors with their thresholds and stored alert state
+
+        Sensors seen for the first time start at the newest reading, so old
+        history does not raise a burst of alerts.
+        """
+        rows = self.db.execute_query(SENSORS_SQL)
+        sensors = pd.DataFrame(rows, columns=[
+            'sensor_id', 'name', 'type', 'user_id', 'min_threshold', 'max_threshold',
+            'last_reading_id', 'state', 'candidate', 'candidate_count'
+        ]).set_index('sensor_id')
+        codes = {name: code for code, name in enumerate(STATES)}
+        sensors['new'] = sensors['last_reading_id'].isna()
+        if sensors['new'].any():
+            known = sensors['last_reading_id'].dropna()
+            sensors.loc[sensors['new'], 'last_reading_id'] = self.get_target_id(int(known.min()) if len(known) else 0)
+        sensors['last_reading_id'] = sensors['last_reading_id'].fillna(0).astype(np.int64)
+        for column in ('state', 'candidate'):
+            sensors[column] = sensors[column].map(codes).fillna(OK).astype(np.int64)
+        sensors['candidate_count'] = sensors['candidate_count'].fillna(0).astype(np.int64)
+        return sensors
+
+    def get_target_id(self, watermark=0):
+        """Highest settled readings.id above the watermark, as in RollupReadings
+
+        A transaction still open when the run starts can commit readings
+        with lower ids than rows already visible; stopping at readings older
+        than settle_seconds keeps the watermarks from passing them.
+        """
+        rows = self.db.execute_query(
+            """
+            SELECT COALESCE(MAX(id), 0) FROM readings
+            WHERE id > %s AND created_at <= NOW() - INTERVAL %s SECOND
+            """,
+            (watermark, self.settle_seconds)
+        )
+        return int(rows[0][0]) if rows and rows[0][0] else watermark
+
+    def build_notifications(self, events, sensors):
+        """Turn confirmed low/high transitions into notification rows"""
+        rows = []
+        for event in events.itertuples(index=False):
+            sensor = sensors.loc[event.sensor_id]
+            if pd.isna(sensor['user_id']):
+                continue
+            state = STATES[event.state]
+            # Readings are stored to 2 decimal places; undo the float32 rounding
+            value = round(float(event.value), 2)
+            message = (f"{str(sensor['type']).capitalize()} {state} alert for sensor {sensor['name']}: "
+                       f"{value:g} (thresholds {float(sensor['min_threshold']):g}-"
+                       f"{float(sensor['max_threshold']):g})")
+            data = {
+                'sensor_id': int(event.sensor_id),
+                'reading_id': int(event.id),
+                'reading': value,
+                'min': float(sensor['min_threshold']),
+                'max': float(sensor['max_threshold']),
+                'state': state
+            }
+            rows.append((int(sensor['user_id']), sensor['type'], message, json.dumps(data),
+                         pd.Timestamp(event.created_at).to_pydatetime()))
+        return rows
+
+    def process(self, readings, sensors):
+        """Evaluate one batch of readings
+
+        Args:
+            readings: DataFrame of id, sensor_id, value, created_at
+            sensors: Output of load_sensors(); updated in place
+
+        Returns:
+            (notification rows, state rows, readings evaluated)
+        """
+        # Only active sensors, and only readings past each sensor's own watermark
+        readings = readings[readings['sensor_id'].isin(sensors.index)]
+        watermark = readings['sensor_id'].map(sensors['last_reading_id'])
+        readings = readings[readings['id'] > watermark]
+        if readings.empty:
+            return [], [], 0
+        readings = readings.sort_values(['sensor_id', 'id'], kind='stable').reset_index(drop=True)
+        sensor = readings['sensor_id']
+
+        # Thresholds are rounded to float32 like the readings, so a reading
+        # equal to its threshold still compares equal
+        readings['raw'] = classify(
+            readings['value'].to_numpy(dtype=np.float32),
+            sensor.map(sensors['min_threshold']).to_numpy(dtype=np.float32),
+            sensor.map(sensors['max_threshold']).to_numpy(dtype=np.float32),
+            self.hysteresis
+        )
+        state, candidate, run_length = evaluate(readings, sensors, self.debounce)
+        readings['state'] = state
+        previous = readings['state'].groupby(sensor).shift(1).fillna(sensor.map(sensors['state']))
+        changed = readings['state'].to_numpy() != previous.to_numpy()
+        events = readings[changed & (readings['state'] != OK).to_numpy()]
+        notifications = self.build_notifications(events, sensors)
+
+        last = readings.assign(candidate=candidate, run_length=run_length).groupby('sensor_id').tail(1)
+        sensors.loc[last['sensor_id'], ['last_reading_id', 'state', 'candidate', 'candidate_count']] = (
+            last[['id', 'state', 'candidate', 'run_length']].to_numpy()
+        )
+        state_rows = [(int(row.sensor_id), int(row.id), STATES[row.state], STATES[row.candidate], int(row.run_length))
+                      for row in last.itertuples(index=False)]
+        return notifications, state_rows, len(readings)
+
+    def write(self, notifications, state_rows):
+        """Insert notifications and advance state in one transaction"""
+        with self.db.transaction() as cursor:
+            if notifications:
+                query = NOTIFICATION_INSERT_SQL.format(rows=", ".join(["(%s, %s, %s, %s, %s, NULL)"] * len(notifications)))
+                cursor.execute(query, [value for row in notifications for value in row])
+            if state_rows:
+                query = STATE_UPSERT_SQL.format(rows=", ".join(["(%s, %s, %s, %s, %s)"] * len(state_rows)))
+                cursor.execute(query, [value for row in state_rows for value in row])
+
+    def run(self):
+        """Evaluate every reading past the watermarks
+
+        Returns:
+            (readings evaluated, notifications created)
+        """
+        sensors = self.load_sensors()
+        if sensors.empty:
+            return 0, 0
+        lower = int(sensors['last_reading_id'].min())
+        target = self.get_target_id(lower)
+        evaluated = created = 0
+
+        # Register new sensors at their starting watermark
+        new = sensors[sensors['new']]
+        if not new.empty:
+            self.write([], [(int(sensor_id), int(row.last_reading_id), 'ok', 'ok', 0)
+                            for sensor_id, row in new.iterrows()])
+
+        while lower < target:
+            upper = min(lower + self.batch_size, target)
+            rows = self.db.execute_query(NEW_READINGS_SQL, (lower, upper))
+            before = sensors['last_reading_id'].copy()
+            notifications = []
+            if rows:
+                # float32 values and int64 times instead of Decimal/datetime objects
+                readings = ReadingSeries.from_rows(rows, ('id', 'sensor_id', 'value', 'created_at')).to_frame()
+                notifications, _, count = self.process(readings, sensors)
+                evaluated += count
+                created += len(notifications)
+            # Every sensor has now seen the whole range, so idle sensors move
+            # up too and the next run starts from here rather than from the
+            # last reading of a sensor that stopped reporting
+            sensors['last_reading_id'] = sensors['last_reading_id'].clip(lower=upper)
+            moved = sensors[sensors['last_reading_id'] != before]
+            if not moved.empty:
+                self.write(notifications, [
+                    (int(sensor_id), upper, STATES[row.state], STATES[row.candidate], int(row.candidate_count))
+                    for sensor_id, row in moved.iterrows()
+                ])
+            lower = upper
+        return evaluated, created
+
+    def cleanup(self):
+        """Clean up resources"""
+        if self.db:
+            self.db.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser(description='Create notifications for sensor threshold alerts')
+    parser.add_argument('--batch-size', type=int, default=50000,
+                        help='Readings ids evaluated per transaction (default: 50000)')
+    parser.add_argument('--debounce', type=int, default=None,
+                        help='Consecutive readings to confirm a change (default: ALERT_DEBOUNCE or 2)')
+    parser.add_argument('--settle-seconds', type=int, default=60,
+                        help='Leave readings younger than this for the next run (default: 60)')
+    args = parser.parse_args()
+
+    engine = AlertEngine(batch_size=args.batch_size, debounce=args.debounce, settle_seconds=args.settle_seconds)
+    try:
+        evaluated, created = engine.run()
+        print(f"{datetime.now().isoformat()} Evaluated {evaluated} readings, created {created} notifications")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        engine.cleanup()
+
+if __name__ == '__main__':
+    main()
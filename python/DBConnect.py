@@ -2,18 +2,301 @@
 # coding: utf-8
 
 import mysql.connector
-import pandas as pd
-from time import sleep
+from decimal import Decimal
+from time import sleep, monotonic
+from contextlib import contextmanager
+from collections import OrderedDict
 import sys
+import threading
 from dotenv import load_dotenv
 import os
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 load_dotenv()
 
+# pandas and numpy are imported inside the DataFrame methods below so that
+# callers which only run statements (pump control, action logs) start
+# without loading them.
+
+# Rows fetched per round trip by DBConnect.iter_dataframes
+DEFAULT_CHUNK_SIZE = int(os.getenv('DB_CHUNK_SIZE', '10000'))
+
+# Prepared statements kept open per pooled connection
+PREPARED_CACHE_SIZE = int(os.getenv('DB_PREPARED_CACHE_SIZE', '16'))
+
+# Errors after which a connection is not trusted again (lost link, broken protocol state)
+CONNECTION_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within the checkout timeout"""
+
+
+class PooledConnection:
+    """A pooled MySQL connection plus its reusable cursors"""
+
+    def __init__(self, connection, prepared_statements=True, max_prepared=PREPARED_CACHE_SIZE):
+        self.connection = connection
+        self.prepared_statements = prepared_statements
+        self.max_prepared = max_prepared
+        self.last_used = monotonic()
+        self._prepared = OrderedDict()
+
+    def cursor(self, prepared=False, query=None):
+        """Return a cursor for a query.
+
+        Prepared (parameterised) statements get one cursor per SQL text, kept
+        for the lifetime of the connection in an LRU of max_prepared entries.
+        A prepared cursor re-prepares whenever its statement changes, so
+        callers alternating between queries (plot and alert queries) still
+        reuse each statement. Prepared cursors must not be closed by the
+        caller.
+        """
+        if prepared and self.prepared_statements:
+            cursor = self._prepared.get(query)
+            if cursor is None:
+                cursor = self.connection.cursor(prepared=True)
+                self._prepared[query] = cursor
+                while len(self._prepared) > self.max_prepared:
+                    _, evicted = self._prepared.popitem(last=False)
+                    self._close_cursor(evicted)
+            else:
+                self._prepared.move_to_end(query)
+            return cursor
+        return self.connection.cursor()
+
+    @staticmethod
+    def _close_cursor(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def ping(self):
+        """Check the connection is alive, reconnecting once if it dropped"""
+        self.connection.ping(reconnect=True, attempts=1, delay=0)
+
+    def close(self):
+        """Close cursors and the underlying connection"""
+        for cursor in self._prepared.values():
+            self._close_cursor(cursor)
+        self._prepared.clear()
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of MySQL connections
+
+    Connections are created lazily up to max_size, pinged on checkout and
+    closed once they have been idle longer than idle_timeout (never dropping
+    below min_size).
+    """
+
+    def __init__(self, host, user, password, database, min_size=1, max_size=5,
+                 idle_timeout=300, checkout_timeout=10, prepared_statements=True):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.prepared_statements = prepared_statements
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._filled = False
+        self._lock = threading.Condition()
+
+    @property
+    def size(self):
+        """Number of open connections (idle and checked out)"""
+        return self._size
+
+    @property
+    def idle(self):
+        """Number of idle connections waiting in the pool"""
+        return len(self._idle)
+
+    def _create(self):
+        """Open a new connection"""
+        connection = mysql.connector.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=self.database
+        )
+        return PooledConnection(connection, self.prepared_statements)
+
+    def _reap_idle(self):
+        """Close connections idle past the timeout, keeping min_size open (lock held)"""
+        now = monotonic()
+        keep = []
+        # Oldest connections sit at the front of the list
+        for pooled in self._idle:
+            if self._size > self.min_size and now - pooled.last_used > self.idle_timeout:
+                pooled.close()
+                self._size -= 1
+            else:
+                keep.append(pooled)
+        self._idle = keep
+
+    def fill(self):
+        """Open connections until min_size are available"""
+        with self._lock:
+            while self._size < self.min_size:
+                self._idle.append(self._create())
+                self._size += 1
+            self._filled = True
+
+    def acquire(self):
+        """Check out a live connection, waiting up to checkout_timeout"""
+        if not self._filled:
+            self.fill()
+        deadline = monotonic() + self.checkout_timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                self._reap_idle()
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    pooled = None
+                    break
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.checkout_timeout}s"
+                    )
+                self._lock.wait(remaining)
+
+        try:
+            if pooled is None:
+                pooled = self._create()
+            else:
+                pooled.ping()
+        except Exception:
+            if pooled is not None:
+                pooled.close()
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        return pooled
+
+    def release(self, pooled, discard=False):
+        """Return a connection to the pool, or close it if discard is set"""
+        with self._lock:
+            if discard or self._closed:
+                pooled.close()
+                self._size -= 1
+            else:
+                pooled.last_used = monotonic()
+                self._idle.append(pooled)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection
+
+        A connection whose block fails with a connection-level error
+        (OperationalError, InterfaceError) or that no longer reports itself
+        connected is closed instead of going back to the pool.
+        """
+        pooled = self.acquire()
+        try:
+            yield pooled
+        except Exception as e:
+            healthy = not isinstance(e, CONNECTION_ERRORS)
+            try:
+                pooled.connection.rollback()
+                healthy = healthy and pooled.connection.is_connected()
+            except Exception:
+                healthy = False
+            self.release(pooled, discard=not healthy)
+            raise
+        else:
+            self.release(pooled)
+
+    def close(self):
+        """Close all idle connections; checked-out ones close on release"""
+        with self._lock:
+            self._closed = True
+            for pooled in self._idle:
+                pooled.close()
+                self._size -= 1
+            self._idle = []
+            self._lock.notify_all()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def compact_frame(df, categorical=()):
+    """Shrink a result chunk to compact dtypes in place
+
+    DECIMAL and floating columns become float32, DATETIME columns become
+    int64 milliseconds since the epoch and the named text columns become
+    categoricals. Returns the frame.
+    """
+    import numpy as np
+    import pandas as pd
+    for name in df.columns:
+        column = df[name]
+        if name in categorical:
+            df[name] = column.astype('category')
+        elif pd.api.types.is_datetime64_any_dtype(column):
+            df[name] = column.to_numpy().astype('datetime64[ms]').astype(np.int64)
+        elif pd.api.types.is_float_dtype(column):
+            df[name] = column.astype(np.float32)
+        elif column.dtype == object:
+            first = column.first_valid_index()
+            if first is not None and isinstance(column[first], Decimal):
+                df[name] = column.astype(np.float32)
+    return df
+
+
+def get_pool(host=None, user=None, password=None, database=None):
+    """Return the process-wide pool for a database, creating it on first use
+
+    Pool sizing is read from DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE and
+    DB_POOL_IDLE_TIMEOUT.
+    """
+    host = host or os.getenv('DB_HOST', 'localhost')
+    user = user or os.getenv('DB_USER', 'garden_user')
+    password = password if password is not None else os.getenv('DB_PASS', '')
+    database = database or os.getenv('DB_NAME', 'garden_sensors')
+    key = (host, user, database)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(
+                host, user, password, database,
+                min_size=int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+                max_size=int(os.getenv('DB_POOL_MAX_SIZE', '5')),
+                idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300'))
+            )
+            _pools[key] = pool
+        return pool
+
+
 class DBConnect:
-    """Database connection manager"""
-    def __init__(self):
+    """Database connection manager
+
+    With pooled=True every operation checks a connection out of the shared
+    ConnectionPool for the duration of the call instead of holding a single
+    dedicated connection.
+    """
+    def __init__(self, pooled=False):
         self.conn = None
         self.cursor = None
         self.host = os.getenv('DB_HOST', 'localhost')
@@ -21,11 +304,16 @@ class DBConnect:
         self.password = os.getenv('DB_PASS', '')
         # Use garden_sensors database for both production and testing
         self.database = os.getenv('DB_NAME', 'garden_sensors')
+        self.pool = get_pool(self.host, self.user, self.password, self.database) if pooled else None
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def connect(self):
         """Establish database connection"""
         try:
+            if self.pool:
+                # Connections are checked out per operation
+                self.pool.fill()
+                return True
             self.conn = mysql.connector.connect(
                 host=self.host,
                 user=self.user,
@@ -39,7 +327,10 @@ class DBConnect:
             raise
 
     def disconnect(self):
-        """Close database connection"""
+        """Close database connection
+
+        In pooled mode the shared pool stays open for other users.
+        """
         if self.cursor:
             self.cursor.close()
             self.cursor = None
@@ -51,6 +342,22 @@ class DBConnect:
     def execute_query(self, query, params=None):
         """Execute a query and return results"""
         try:
+            if self.pool:
+                with self.pool.connection() as pooled:
+                    prepared = bool(params) and pooled.prepared_statements
+                    cursor = pooled.cursor(prepared=prepared, query=query)
+                    try:
+                        if params:
+                            cursor.execute(query, params)
+                        else:
+                            cursor.execute(query)
+                        results = cursor.fetchall() if cursor.with_rows else []
+                        pooled.connection.commit()
+                        return results
+                    finally:
+                        if not prepared:
+                            cursor.close()
+
             if not self.conn or not self.cursor:
                 self.connect()
             
@@ -69,6 +376,17 @@ class DBConnect:
     def execute_many(self, query, params):
         """Execute a batch query"""
         try:
+            if self.pool:
+                with self.pool.connection() as pooled:
+                    # A plain cursor lets mysql.connector rewrite INSERTs into one multi-row statement
+                    cursor = pooled.cursor()
+                    try:
+                        cursor.executemany(query, params)
+                        pooled.connection.commit()
+                    finally:
+                        cursor.close()
+                return
+
             if not self.conn or not self.cursor:
                 self.connect()
             
@@ -78,6 +396,32 @@ class DBConnect:
             print(f"Batch query error: {str(e)}")
             raise
 
+    @contextmanager
+    def transaction(self):
+        """Run several statements on one connection as a single transaction
+
+        Yields a cursor; commits when the block exits cleanly and rolls back
+        if it raises.
+        """
+        if self.pool:
+            with self.pool.connection() as pooled:
+                cursor = pooled.cursor()
+                try:
+                    yield cursor
+                    pooled.connection.commit()
+                finally:
+                    cursor.close()
+            return
+
+        if not self.conn or not self.cursor:
+            self.connect()
+        try:
+            yield self.cursor
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
     def rollback(self):
         """Rollback current transaction"""
         if self.conn:
@@ -95,7 +439,11 @@ class DBConnect:
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def query_to_dataframe(self, query, params=None):
         """Execute a query and return results as pandas DataFrame"""
+        import pandas as pd
         try:
+            if self.pool:
+                with self.pool.connection() as pooled:
+                    return pd.read_sql(query, pooled.connection, params=params)
             if not self.conn:
                 self.connect()
             return pd.read_sql(query, self.conn, params=params)
@@ -103,12 +451,79 @@ class DBConnect:
             print(f"DataFrame query error: {str(e)}")
             raise
 
+    def iter_dataframes(self, query, params=None, chunk_size=None, compact=True,
+                        categorical=(), as_records=False):
+        """Stream a query as a sequence of DataFrame chunks
+
+        Rows are read through an unbuffered (server-side streaming) cursor,
+        chunk_size at a time, so memory stays bounded by one chunk however
+        large the result is. Stop iterating at any point; the connection is
+        cleaned up when the generator is closed.
+
+        Args:
+            query: SQL query
+            params: Query parameters
+            chunk_size: Rows per chunk (default DB_CHUNK_SIZE, 10000)
+            compact: Convert chunks with compact_frame
+            categorical: Columns to store as categoricals when compact
+            as_records: Yield NumPy record arrays instead of DataFrames
+        """
+        import pandas as pd
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        pooled = None
+        if self.pool:
+            pooled = self.pool.acquire()
+            connection = pooled.connection
+        else:
+            # A dedicated connection so an abandoned stream cannot leave
+            # unread rows on the shared one
+            connection = mysql.connector.connect(
+                host=self.host,
+                user=self.user,
+                password=self.password,
+                database=self.database
+            )
+        cursor = None
+        finished = False
+        try:
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(query, params or ())
+            columns = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                df = pd.DataFrame.from_records(rows, columns=columns)
+                if compact:
+                    compact_frame(df, categorical)
+                yield df.to_records(index=False) if as_records else df
+            finished = True
+        except Exception as e:
+            print(f"Streaming query error: {str(e)}")
+            raise
+        finally:
+            try:
+                if cursor is not None:
+                    cursor.close()
+            except Exception:
+                finished = False
+            if pooled is not None:
+                # A partially read result cannot be reused; drop that connection
+                self.pool.release(pooled, discard=not finished)
+            else:
+                connection.close()
+
     def queryMySQL(self, query):
         """initiate connection and execute query"""
+        import pandas as pd
         errorCount=0
         errorLog={}
         for x in range(0, 10):
           try:
+            if self.pool:
+              with self.pool.connection() as pooled:
+                df=pd.read_sql(query, pooled.connection)
+              break
             cnxn=mysql.connector.connect(user=self.user,password=self.password,\
                                          host=self.host,database=self.database)
             df=pd.read_sql(query, cnxn)
@@ -133,6 +548,13 @@ class DBConnect:
         errorLog={}
         for x in range(0, 10):
           try:
+            if self.pool:
+              with self.pool.connection() as pooled:
+                cursor=pooled.cursor()
+                cursor.execute(query)
+                pooled.connection.commit()
+                cursor.close()
+              break
             cnxn=mysql.connector.connect(user=self.user,password=self.password,\
                                          host=self.host,database=self.database)
             cursor=cnxn.cursor()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Export or summarise sensor readings over arbitrarily long ranges.
+
+Readings are streamed from the database in chunks (DBConnect.iter_dataframes)
+and written or aggregated one chunk at a time, so memory use does not grow
+with the size of the range.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+from python.ReadingSeries import ReadingSeries
+
+load_dotenv()
+
+FORMATS = ('csv', 'ndjson')
+
+
+def build_query(start, end, plant_id=None):
+    """Return (query, params) selecting readings in a time range"""
+    query = """
+        SELECT
+            p.name as plant_name,
+            s.name as sensor_name,
+            s.type as sensor_type,
+            r.sensor_id,
+            r.value,
+            r.unit,
+            r.created_at
+        FROM readings r
+        JOIN sensors s ON s.id = r.sensor_id
+        LEFT JOIN plant_sensors ps ON ps.sensor_id = s.id
+        LEFT JOIN plants p ON p.id = ps.plant_id
+        WHERE r.created_at BETWEEN %s AND %s
+        """
+    params = (start, end)
+    if plant_id:
+        query += "  AND p.id = %s\n"
+        params = params + (plant_id,)
+    query += "ORDER BY r.created_at"
+    return query, params
+
+
+def write_chunks(chunks, output, fmt='csv'):
+    """Write DataFrame chunks to a text stream
+
+    created_at is expected as epoch milliseconds (compact dtypes) and is
+    written as an ISO timestamp.
+
+    Returns:
+        Number of rows written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    rows = 0
+    for chunk in chunks:
+        if 'created_at' in chunk.columns:
+            chunk = chunk.assign(created_at=pd.to_datetime(chunk['created_at'], unit='ms').dt.strftime('%Y-%m-%d %H:%M:%S'))
+        if fmt == 'csv':
+            chunk.to_csv(output, header=(rows == 0), index=False)
+        else:
+            text = chunk.to_json(orient='records', lines=True)
+            # pandas >= 1.5 already ends the last record with a newline
+            output.write(text if text.endswith('\n') else text + '\n')
+        rows += len(chunk)
+    return rows
+
+
+def summarize_chunks(chunks, by='sensor_id'):
+    """Aggregate count/min/max/mean of value per group across chunks
+
+    Each chunk is folded through a ReadingSeries (by must be an integer id
+    column) and only one running row per group is kept, so any number of
+    chunks can be summarised in constant memory.
+    """
+    totals = None
+    for chunk in chunks:
+        partial = ReadingSeries.from_frame(chunk, sensor=by).aggregate()
+        if totals is None:
+            totals = partial
+            continue
+        ids = np.union1d(totals['id'], partial['id'])
+        merged = {
+            'id': ids,
+            'count': np.zeros(len(ids), dtype=np.int64),
+            'sum': np.zeros(len(ids)),
+            'min': np.full(len(ids), np.inf),
+            'max': np.full(len(ids), -np.inf),
+        }
+        for part in (totals, partial):
+            index = np.searchsorted(ids, part['id'])
+            merged['count'][index] += part['count']
+            merged['sum'][index] += part['sum']
+            merged['min'][index] = np.fmin(merged['min'][index], part['min'])
+            merged['max'][index] = np.fmax(merged['max'][index], part['max'])
+        totals = merged
+    if totals is None:
+        return pd.DataFrame(columns=['count', 'min', 'max', 'mean'])
+    return pd.DataFrame({
+        'count': totals['count'],
+        'min': totals['min'],
+        'max': totals['max'],
+        'mean': totals['sum'] / totals['count'],
+    }, index=pd.Index(totals['id'], name=by))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream sensor readings to CSV/NDJSON or summarise them')
+    parser.add_argument('--days', type=int, default=7, help='Number of days to include (default: 7)')
+    parser.add_argument('--plant-id', type=int, default=None, help='Plant ID to filter by (optional)')
+    parser.add_argument('--format', choices=FORMATS, default='csv', help='Output format (default: csv)')
+    parser.add_argument('--output', default='-', help='Output file (default: stdout)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Rows fetched per chunk (default: DB_CHUNK_SIZE)')
+    parser.add_argument('--summary', action='store_true',
+                        help='Print per-sensor count/min/max/mean as JSON instead of exporting rows')
+    args = parser.parse_args()
+
+    end = datetime.now()
+    query, params = build_query(end - timedelta(days=args.days), end, args.plant_id)
+    db = DBConnect()
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        chunks = db.iter_dataframes(query, params, chunk_size=args.chunk_size,
+                                    categorical=('plant_name', 'sensor_name', 'sensor_type', 'unit'))
+        if args.summary:
+            summary = summarize_chunks(chunks)
+            output.write(summary.reset_index().to_json(orient='records') + '\n')
+        else:
+            rows = write_chunks(chunks, output, args.format)
+            print(f"Exported {rows} readings", file=sys.stderr)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        db.disconnect()
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,179 @@
 import os
 import ftplib
 import io
+import bz2
+import lzma
+import zlib
+import queue
+import hashlib
+import threading
 from dotenv import load_dotenv
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 load_dotenv()
 
+DECOMPRESSORS = {
+    # wbits | 32 accepts gzip and zlib headers
+    'gzip': lambda: zlib.decompressobj(zlib.MAX_WBITS | 32),
+    'bz2': bz2.BZ2Decompressor,
+    'xz': lzma.LZMADecompressor,
+}
+
+SUFFIXES = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+_END = object()
+
+class _Cancelled(Exception):
+    """Raised inside retrbinary to stop a stream the reader closed"""
+
+class FTPStream(io.RawIOBase):
+    """Read-only file object over a remote file as it downloads
+
+    A background thread runs retrbinary and puts each block on a queue of
+    at most max_buffer blocks. When the reader falls behind the callback
+    blocks, so the thread stops reading the data socket and TCP flow
+    control slows the server down: memory stays at max_buffer blocks
+    whatever the file size. Blocks are decompressed as they are read. A
+    dropped connection reconnects and resumes with REST from the bytes
+    already received.
+
+    The FTPConnect session is busy until the stream is exhausted or
+    closed; closing early aborts the transfer and drops the session.
+    """
+
+    def __init__(self, connection, filename, block_size=65536, max_buffer=16, decompress=None, retries=3):
+        """Start streaming
+
+        Args:
+            connection: Connected FTPConnect to read through
+            filename: Remote file
+            block_size: Bytes per retrbinary block
+            max_buffer: Blocks held before the download waits for the reader
+            decompress: 'gzip', 'bz2', 'xz', 'auto' (from the file suffix) or None
+            retries: Reconnect attempts after a dropped transfer
+        """
+        super().__init__()
+        if decompress == 'auto':
+            decompress = SUFFIXES.get(os.path.splitext(filename)[1].lower())
+        if decompress is not None and decompress not in DECOMPRESSORS:
+            raise ValueError(f"Unknown compression: {decompress}")
+        self.connection = connection
+        self.filename = filename
+        self.block_size = block_size
+        self.decompress = decompress
+        self.retries = retries
+        self.received = 0
+        self._decompressor = DECOMPRESSORS[decompress]() if decompress else None
+        self._pending = False
+        self._queue = queue.Queue(maxsize=max_buffer)
+        self._cancel = threading.Event()
+        self._error = None
+        self._completed = False
+        self._done = False
+        self._chunk = memoryview(b'')
+        self._thread = threading.Thread(target=self._retrieve, name='ftp-stream', daemon=True)
+        self._thread.start()
+
+    def _put(self, data):
+        while not self._cancel.is_set():
+            try:
+                self._queue.put(data, timeout=0.1)
+                self.received += len(data)
+                return
+            except queue.Full:
+                continue
+        raise _Cancelled()
+
+    def _retrieve(self):
+        attempts = 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    self.connection.ftp.retrbinary(f'RETR {self.filename}', self._put, self.block_size,
+                                                   rest=self.received or None)
+                    self._completed = True
+                    break
+                except (_Cancelled, ftplib.error_perm):
+                    raise
+                except ftplib.all_errors as e:
+                    if attempts > self.retries:
+                        raise
+                    print(f"File stream interrupted at {self.received} bytes ({e}), resuming")
+                    self.connection.disconnect()
+                    self.connection.connect()
+        except _Cancelled:
+            pass
+        except Exception as e:
+            self._error = e
+        finally:
+            while True:
+                try:
+                    self._queue.put(_END, timeout=0.1)
+                    break
+                except queue.Full:
+                    if self._cancel.is_set():
+                        break
+
+    def _inflate(self, data):
+        """Decompress a block, starting a new decompressor for each concatenated stream"""
+        out = []
+        while data:
+            out.append(self._decompressor.decompress(data))
+            self._pending = not self._decompressor.eof
+            if self._pending:
+                break
+            data = self._decompressor.unused_data
+            self._decompressor = DECOMPRESSORS[self.decompress]()
+        return b''.join(out)
+
+    def _fill(self):
+        """Load the next non-empty block; False at the end of the file"""
+        while not self._done:
+            item = self._queue.get()
+            if item is _END:
+                self._done = True
+                self._thread.join()
+                if self._error is not None:
+                    raise self._error
+                if self._pending:
+                    raise EOFError(f"Compressed stream {self.filename} ended early")
+                return False
+            data = self._inflate(item) if self._decompressor else item
+            if data:
+                self._chunk = memoryview(data)
+                return True
+        return False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._chunk and not self._fill():
+            return 0
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+    def iter_chunks(self):
+        """Yield the file as it arrives, one (decompressed) block at a time"""
+        while self._chunk or self._fill():
+            chunk, self._chunk = self._chunk, memoryview(b'')
+            yield bytes(chunk)
+
+    def close(self):
+        """Stop the transfer if it is still running"""
+        if not self.closed:
+            if not self._done:
+                self._cancel.set()
+                self._thread.join()
+                if not self._completed:
+                    # The control connection still expects the aborted transfer's reply
+                    self.connection.disconnect()
+            self._chunk = memoryview(b'')
+        super().close()
+
 class FTPConnect:
     """Class to handle FTP connections and operations."""
     
@@ -102,6 +270,44 @@ class FTPConnect:
             print(f"File deletion error: {e}")
             raise
             
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def rename_file(self, from_path, to_path):
+        """Rename a file on the FTP server, replacing to_path where the server allows it."""
+        try:
+            if not self.ftp:
+                self.connect()
+            self.ftp.rename(from_path, to_path)
+            return True
+        except Exception as e:
+            print(f"File rename error: {e}")
+            raise
+            
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def file_size(self, path):
+        """Get the size in bytes of a file on the FTP server."""
+        try:
+            if not self.ftp:
+                self.connect()
+            # SIZE is only defined for binary transfers
+            self.ftp.voidcmd('TYPE I')
+            return self.ftp.size(path)
+        except Exception as e:
+            print(f"File size error: {e}")
+            raise
+            
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def file_checksum(self, path, algorithm='sha256'):
+        """Hash a file on the FTP server as it streams, without holding it in memory."""
+        try:
+            if not self.ftp:
+                self.connect()
+            digest = hashlib.new(algorithm)
+            self.ftp.retrbinary(f'RETR {path}', digest.update)
+            return digest.hexdigest()
+        except Exception as e:
+            print(f"File checksum error: {e}")
+            raise
+            
     def __enter__(self):
         """Enter context manager."""
         self.connect()
@@ -140,4 +346,21 @@ class FTPConnect:
             return download_file
         except Exception as e:
             print(f"File retrieval error: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def stream_file(self, filename, block_size=65536, max_buffer=16, decompress=None):
+        """Stream a file instead of holding it in memory
+
+        Args:
+            filename: Remote file
+            block_size: Bytes per transfer block
+            max_buffer: Blocks buffered ahead of the reader
+            decompress: 'gzip', 'bz2', 'xz', 'auto' (from the suffix) or None
+
+        Returns:
+            FTPStream; read it like a binary file, iterate lines, or call
+            iter_chunks(). Wrap in io.TextIOWrapper for text.
+        """
+        if not self.ftp:
+            self.connect()
+        return FTPStream(self, filename, block_size, max_buffer, decompress)
\ No newline at end of file
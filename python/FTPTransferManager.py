@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Parallel FTP transfers over a pool of persistent sessions.
+
+FTPConnect opens one control connection, moves one file at a time and
+rebuilds the session whenever a call is retried. FTPTransferManager keeps
+a few logged-in sessions open, each owned by a worker thread that takes
+uploads and downloads from a shared queue, and sends NOOP while idle so
+the server does not drop the session between batches. An interrupted
+transfer reconnects only its own session and resumes with REST from the
+bytes already on the other side. A copy left by an earlier run is only
+continued when asked (resume=True), as its size alone cannot show it is a
+prefix of the file being sent. Every transfer returns a TransferStats
+with its byte count, time and throughput.
+"""
+
+import os
+import sys
+import queue
+import ftplib
+import argparse
+import threading
+from time import monotonic, sleep
+from collections import namedtuple
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+load_dotenv()
+
+UPLOAD = 'upload'
+DOWNLOAD = 'download'
+
+# Failures worth reconnecting for; error_perm (missing file, no permission) is not
+RETRY_ERRORS = (OSError, EOFError, ftplib.error_temp, ftplib.error_reply, ftplib.error_proto)
+
+
+class TransferStats(namedtuple('TransferStats', ['direction', 'local_path', 'remote_path', 'bytes',
+                                                 'resumed_from', 'seconds', 'attempts'])):
+    """Outcome of one transfer; bytes counts only what was sent this time"""
+    __slots__ = ()
+
+    @property
+    def throughput(self):
+        """Bytes per second"""
+        return self.bytes / self.seconds if self.seconds > 0 else float(self.bytes)
+
+
+class FTPSession:
+    """One logged-in FTP control connection, reconnected on demand"""
+
+    def __init__(self, host, port, username, password, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.ftp = None
+
+    def connect(self):
+        """Open and log in the session if it is not already"""
+        if self.ftp is None:
+            ftp = ftplib.FTP(timeout=self.timeout)
+            try:
+                ftp.connect(self.host, self.port)
+                ftp.login(self.username, self.password)
+                # Binary mode for SIZE and REST offsets
+                ftp.voidcmd('TYPE I')
+            except Exception:
+                ftp.close()
+                raise
+            self.ftp = ftp
+        return self.ftp
+
+    def keepalive(self):
+        """Send NOOP; a dead session is closed and reopened by the next transfer"""
+        if self.ftp is None:
+            return False
+        try:
+            self.ftp.voidcmd('NOOP')
+            return True
+        except ftplib.all_errors:
+            self.close()
+            return False
+
+    def remote_size(self, path):
+        """Size of a remote file, or None if it does not exist"""
+        try:
+            return self.connect().size(path)
+        except ftplib.error_perm:
+            return None
+
+    def close(self):
+        """Close the session"""
+        if self.ftp is not None:
+            try:
+                self.ftp.quit()
+            except ftplib.all_errors:
+                self.ftp.close()
+            self.ftp = None
+
+
+class FTPTransferManager:
+    """Queue of uploads and downloads spread across persistent FTP sessions"""
+
+    def __init__(self, sessions=None, block_size=None, keepalive=None, retries=3, retry_wait=1.0,
+                 host=None, port=None, username=None, password=None, timeout=30, start=True):
+        """Initialize the manager
+
+        Args:
+            sessions: Sessions (and worker threads) to open (default FTP_SESSIONS or 3)
+            block_size: Bytes per read/write block (default FTP_BLOCK_SIZE or 65536)
+            keepalive: Idle seconds between NOOPs on each session (default FTP_KEEPALIVE or 30)
+            retries: Attempts per transfer before it fails
+            retry_wait: Seconds to wait before reconnecting, multiplied by the attempt
+            host, port, username, password: Server (default FTP_HOST, FTP_PORT or 21,
+                FTP_USERNAME, FTP_PASSWORD)
+            timeout: Socket timeout in seconds
+            start: Open the sessions and start the workers now
+        """
+        if sessions is None:
+            sessions = int(os.getenv('FTP_SESSIONS', '3'))
+        if sessions < 1:
+            raise ValueError("sessions must be at least 1")
+        self.block_size = block_size or int(os.getenv('FTP_BLOCK_SIZE', '65536'))
+        self.keepalive = keepalive or float(os.getenv('FTP_KEEPALIVE', '30'))
+        self.retries = retries
+        self.retry_wait = retry_wait
+        self.sessions = [
+            FTPSession(host or os.getenv('FTP_HOST'), int(port or os.getenv('FTP_PORT', '21')),
+                       username or os.getenv('FTP_USERNAME'), password or os.getenv('FTP_PASSWORD'),
+                       timeout)
+            for _ in range(sessions)
+        ]
+        self.stats = []
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._threads = []
+        if start:
+            self.start()
+
+    def start(self):
+        """Log in every session and start one worker per session"""
+        if self._threads:
+            return
+        for session in self.sessions:
+            session.connect()
+        for number, session in enumerate(self.sessions):
+            thread = threading.Thread(target=self._worker, args=(session,), name=f'ftp-transfer-{number}',
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def upload(self, local_path, remote_path, resume=False):
+        """Queue an upload
+
+        Args:
+            resume: Continue from the size of an existing remote file, which
+                must be a partial copy of this one; otherwise it is replaced.
+                Retries after an interruption always continue.
+
+        Returns:
+            Future resolving to TransferStats
+        """
+        return self._submit(UPLOAD, local_path, remote_path, resume)
+
+    def download(self, remote_path, local_path, resume=False):
+        """Queue a download
+
+        Args:
+            resume: Continue from the size of an existing local file, which
+                must be a partial copy of this one; otherwise it is replaced.
+                Retries after an interruption always continue.
+
+        Returns:
+            Future resolving to TransferStats
+        """
+        return self._submit(DOWNLOAD, local_path, remote_path, resume)
+
+    def upload_many(self, pairs, resume=False):
+        """Upload (local_path, remote_path) pairs in parallel and wait for all of them
+
+        Returns:
+            TransferStats per pair, in order; raises the first failure
+        """
+        return self._wait([self.upload(local, remote, resume) for local, remote in pairs])
+
+    def download_many(self, pairs, resume=False):
+        """Download (remote_path, local_path) pairs in parallel and wait for all of them
+
+        Returns:
+            TransferStats per pair, in order; raises the first failure
+        """
+        return self._wait([self.download(remote, local, resume) for remote, local in pairs])
+
+    def summary(self):
+        """Totals over every finished transfer: count, bytes, seconds, throughput"""
+        with self._stats_lock:
+            stats = list(self.stats)
+        total_bytes = sum(s.bytes for s in stats)
+        busy = sum(s.seconds for s in stats)
+        return {
+            'transfers': len(stats),
+            'bytes': total_bytes,
+            'seconds': busy,
+            'throughput': total_bytes / busy if busy > 0 else 0.0,
+        }
+
+    def _submit(self, direction, local_path, remote_path, resume):
+        if not self._threads:
+            raise RuntimeError("Transfer manager is not running")
+        future = Future()
+        self._queue.put((future, direction, local_path, remote_path, resume))
+        return future
+
+    def _wait(self, futures):
+        errors = [f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [f.result() for f in futures]
+
+    def _worker(self, session):
+        while True:
+            try:
+                job = self._queue.get(timeout=self.keepalive)
+            except queue.Empty:
+                session.keepalive()
+                continue
+            if job is None:
+                break
+            future, direction, local_path, remote_path, resume = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                stats = self._transfer(session, direction, local_path, remote_path, resume)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                with self._stats_lock:
+                    self.stats.append(stats)
+                future.set_result(stats)
+
+    def _transfer(self, session, direction, local_path, remote_path, resume):
+        """Run one transfer on session, reconnecting and resuming on failure"""
+        started = monotonic()
+        resumed_from = None
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                session.connect()
+                offset, total = self._offsets(session, direction, local_path, remote_path,
+                                              resume or attempts > 1)
+                if resumed_from is None:
+                    resumed_from = offset
+                if offset < total or total == 0:
+                    self._send(session, direction, local_path, remote_path, offset)
+                break
+            except RETRY_ERRORS as e:
+                session.close()
+                if attempts >= self.retries:
+                    raise
+                print(f"FTP {direction} of {remote_path} interrupted ({e}), resuming")
+                sleep(self.retry_wait * attempts)
+        return TransferStats(direction, local_path, remote_path, total - resumed_from, resumed_from,
+                             monotonic() - started, attempts)
+
+    def _offsets(self, session, direction, local_path, remote_path, resume):
+        """Where to start and the full size of the file being sent
+
+        Uploads resume from the remote file's size, downloads from the local
+        file's. A partial copy larger than the source is started over.
+
+        Returns (offset, total size).
+        """
+        if direction == UPLOAD:
+            total = os.path.getsize(local_path)
+            partial = (session.remote_size(remote_path) or 0) if resume else 0
+        else:
+            total = session.remote_size(remote_path)
+            if total is None:
+                raise ftplib.error_perm(f"550 {remote_path}: No such file")
+            partial = os.path.getsize(local_path) if resume and os.path.exists(local_path) else 0
+        return (partial if partial <= total else 0), total
+
+    def _send(self, session, direction, local_path, remote_path, offset):
+        """Move the file from offset, with REST when resuming"""
+        rest = offset or None
+        if direction == UPLOAD:
+            with open(local_path, 'rb') as f:
+                f.seek(offset)
+                session.ftp.storbinary(f'STOR {remote_path}', f, self.block_size, rest=rest)
+        else:
+            with open(local_path, 'ab' if offset else 'wb') as f:
+                session.ftp.retrbinary(f'RETR {remote_path}', f.write, self.block_size, rest=rest)
+
+    def close(self):
+        """Finish queued transfers, stop the workers and log out every session"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for session in self.sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upload or download files over parallel FTP sessions')
+    parser.add_argument('direction', choices=[UPLOAD, DOWNLOAD])
+    parser.add_argument('files', nargs='+', help='Local files to upload, or remote files to download')
+    parser.add_argument('--remote-dir', default='.', help='Remote directory for uploads')
+    parser.add_argument('--local-dir', default='.', help='Local directory for downloads')
+    parser.add_argument('--sessions', type=int, default=None, help='Parallel sessions (default FTP_SESSIONS or 3)')
+    parser.add_argument('--block-size', type=int, default=None,
+                        help='Transfer block size in bytes (default FTP_BLOCK_SIZE or 65536)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue partial files left by an interrupted earlier run')
+    args = parser.parse_args()
+
+    manager = None
+    try:
+        manager = FTPTransferManager(sessions=args.sessions, block_size=args.block_size)
+        if args.direction == UPLOAD:
+            pairs = [(path, f"{args.remote_dir.rstrip('/')}/{os.path.basename(path)}") for path in args.files]
+            results = manager.upload_many(pairs, resume=args.resume)
+        else:
+            pairs = [(path, os.path.join(args.local_dir, os.path.basename(path))) for path in args.files]
+            results = manager.download_many(pairs, resume=args.resume)
+        for stats in results:
+            resumed = f" (resumed at {stats.resumed_from})" if stats.resumed_from else ""
+            print(f"{stats.remote_path}: {stats.bytes} bytes in {stats.seconds:.2f}s, "
+                  f"{stats.throughput / 1024:.1f} KiB/s{resumed}")
+        summary = manager.summary()
+        print(f"{summary['transfers']} transfers, {summary['bytes']} bytes, "
+              f"{summary['throughput'] / 1024:.1f} KiB/s per session")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        if manager:
+            manager.close()
+
+if __name__ == '__main__':
+    main()
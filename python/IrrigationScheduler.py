@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Irrigation scheduler service.
+
+Keeps an in-memory priority queue of upcoming waterings keyed on
+plant_sensors.next_watering, loaded in one range query over the
+idx_next_watering index. Due waterings run on their zone's pump (the
+'pump' pin assigned to the plant's sensor) through a MultiPumpController,
+concurrently across zones, and the resulting last_watered/next_watering
+values are written back in batched updates. One long-running loop replaces a cron-spawned process per
+watering.
+"""
+
+import os
+import sys
+import heapq
+import signal
+import argparse
+import threading
+from time import monotonic
+from datetime import datetime, timedelta
+from collections import namedtuple
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+
+load_dotenv()
+
+Watering = namedtuple('Watering', ['due', 'plant_sensor_id', 'plant_id', 'sensor_id', 'pin',
+                                   'water_amount', 'frequency_hours'])
+
+DUE_WATERINGS_SQL = """
+SELECT ps.next_watering, ps.id, ps.plant_id, ps.sensor_id, pin.pin_number,
+       ps.water_amount, p.watering_frequency
+FROM plant_sensors ps FORCE INDEX (idx_next_watering)
+JOIN plants p ON p.id = ps.plant_id
+JOIN pins pin ON pin.sensor_id = ps.sensor_id
+    AND pin.pin_type = 'pump'
+    AND pin.status = 'active'
+WHERE ps.next_watering <= %s
+  AND p.status = 'active'
+ORDER BY ps.next_watering
+"""
+
+UPDATE_WATERED_SQL = """
+UPDATE plant_sensors ps
+JOIN ({rows}) w ON w.id = ps.id
+SET ps.last_watered = w.last_watered,
+    ps.next_watering = w.next_watering
+"""
+
+
+def build_watered_update(updates):
+    """Build one UPDATE for a batch of (plant_sensor_id, last_watered, next_watering)
+
+    Returns (query, params).
+    """
+    rows = " UNION ALL ".join(
+        ["SELECT %s AS id, %s AS last_watered, %s AS next_watering"]
+        + ["SELECT %s, %s, %s"] * (len(updates) - 1)
+    )
+    params = []
+    for update in updates:
+        params.extend(update)
+    return UPDATE_WATERED_SQL.format(rows=rows), params
+
+
+class IrrigationScheduler:
+    """Run due waterings from a next_watering priority queue"""
+
+    def __init__(self, db=None, controller=None, max_concurrent=None, flow_rate=10.0,
+                 refresh_interval=60.0, horizon=300.0, flush_size=20, flush_interval=5.0):
+        """Initialize the scheduler
+
+        Args:
+            db: DBConnect to use (defaults to a pooled connection)
+            controller: MultiPumpController driving the zones (created on
+                demand; zones are added as waterings reference them)
+            max_concurrent: Maximum zones watering at the same time when
+                creating the controller
+            flow_rate: Pump flow in ml/s, used to turn water_amount into a runtime
+            refresh_interval: Seconds between reloads of the queue from the database
+            horizon: Seconds ahead of now to load into the queue on each reload
+            flush_size: Write back completed waterings once this many are pending
+            flush_interval: ...or once the oldest has waited this many seconds
+        """
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+        if controller is None:
+            from python.RunPump import MultiPumpController
+            controller = MultiPumpController(pins=(), max_concurrent=max_concurrent, db=db)
+        self.controller = controller
+        self.flow_rate = flow_rate
+        self.refresh_interval = refresh_interval
+        self.horizon = horizon
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._heap = []
+        # plant_sensor_id -> Watering for everything queued, running or awaiting write-back
+        self._tracked = {}
+        self._pending_updates = []
+        self._oldest_update = None
+        self._last_refresh = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    @property
+    def queued(self):
+        """Number of waterings waiting in the queue"""
+        with self._lock:
+            return len(self._heap)
+
+    def runtime_for(self, watering):
+        """Seconds to run the pump to deliver the watering's water_amount"""
+        return max(1.0, watering.water_amount / self.flow_rate)
+
+    def refresh(self, now=None):
+        """Load waterings due within the horizon into the queue
+
+        Returns:
+            Number of waterings added
+        """
+        now = now or datetime.now()
+        rows = self.db.execute_query(DUE_WATERINGS_SQL, (now + timedelta(seconds=self.horizon),))
+        added = 0
+        with self._lock:
+            for row in rows:
+                watering = Watering(*row)
+                if watering.plant_sensor_id in self._tracked:
+                    continue
+                self._tracked[watering.plant_sensor_id] = watering
+                heapq.heappush(self._heap, (watering.due, watering.plant_sensor_id, watering))
+                added += 1
+        self._last_refresh = monotonic()
+        return added
+
+    def dispatch_due(self, now=None):
+        """Hand every due watering to the pump controller
+
+        The controller runs zones in parallel up to its concurrency limit and
+        queues the rest, one run at a time per pump.
+
+        Returns:
+            List of waterings dispatched
+        """
+        now = now or datetime.now()
+        started = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                started.append(heapq.heappop(self._heap)[2])
+        for watering in started:
+            self.controller.run_zone(
+                watering.pin,
+                self.runtime_for(watering),
+                callback=lambda run, watering=watering: self._watered(watering, run)
+            )
+        return started
+
+    def _watered(self, watering, run):
+        """Controller callback: queue the write-back for a finished watering"""
+        with self._lock:
+            if run.cancelled:
+                # Forget it so the next refresh picks it up again from the database
+                self._tracked.pop(watering.plant_sensor_id, None)
+            else:
+                watered_at = datetime.now()
+                next_watering = watered_at + timedelta(hours=watering.frequency_hours)
+                if not self._pending_updates:
+                    self._oldest_update = monotonic()
+                self._pending_updates.append((watering.plant_sensor_id, watered_at, next_watering))
+        self._wake.set()
+
+    def flush(self, force=False):
+        """Write completed waterings back to plant_sensors in one statement
+
+        Returns:
+            Number of rows written
+        """
+        with self._lock:
+            due = self._pending_updates and (
+                force
+                or len(self._pending_updates) >= self.flush_size
+                or monotonic() - self._oldest_update >= self.flush_interval
+            )
+            if not due:
+                return 0
+            batch, self._pending_updates = self._pending_updates, []
+        try:
+            query, params = build_watered_update(batch)
+            self.db.execute_query(query, params)
+        except Exception:
+            with self._lock:
+                self._pending_updates = batch + self._pending_updates
+            raise
+        with self._lock:
+            for plant_sensor_id, _, _ in batch:
+                self._tracked.pop(plant_sensor_id, None)
+        return len(batch)
+
+    def _next_wakeup(self):
+        """Seconds until the loop has something to do"""
+        timeout = self.refresh_interval
+        if self._last_refresh is not None:
+            timeout = max(0.0, self.refresh_interval - (monotonic() - self._last_refresh))
+        with self._lock:
+            if self._heap:
+                until_due = (self._heap[0][0] - datetime.now()).total_seconds()
+                timeout = min(timeout, max(0.0, until_due))
+            if self._pending_updates:
+                timeout = min(timeout, self.flush_interval)
+        return timeout
+
+    def run(self):
+        """Run the scheduling loop until stop() is called"""
+        while not self._stopping.is_set():
+            try:
+                if self._last_refresh is None or monotonic() - self._last_refresh >= self.refresh_interval:
+                    self.refresh()
+                self.dispatch_due()
+                self.flush()
+            except Exception as e:
+                # Keep running; the database may come back
+                print(f"Scheduler error: {e}")
+                self._last_refresh = monotonic()
+            self._wake.wait(self._next_wakeup())
+            self._wake.clear()
+
+    def run_once(self):
+        """Water everything due now, wait for it to finish and write it back
+
+        Returns:
+            Number of waterings completed
+        """
+        self.refresh()
+        self.dispatch_due()
+        self.controller.wait_all()
+        with self._lock:
+            completed = len(self._pending_updates)
+        self.flush(force=True)
+        return completed
+
+    def stop(self):
+        """Ask the loop to exit"""
+        self._stopping.set()
+        self._wake.set()
+
+    def close(self):
+        """Stop the pumps, write back finished waterings and release resources"""
+        try:
+            # Cancelled runs are left for the next start to pick up again
+            self.controller.cancel_all()
+            self.flush(force=True)
+        finally:
+            self.controller.cleanup()
+            self.db.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the irrigation scheduler')
+    parser.add_argument('--max-concurrent', type=int, default=None,
+                        help='Maximum zones watering at once (default: PUMP_MAX_CONCURRENT or 2)')
+    parser.add_argument('--flow-rate', type=float, default=float(os.getenv('PUMP_FLOW_RATE', '10')),
+                        help='Pump flow rate in ml/s (default: PUMP_FLOW_RATE or 10)')
+    parser.add_argument('--refresh-interval', type=float, default=60.0,
+                        help='Seconds between schedule reloads (default: 60)')
+    parser.add_argument('--once', action='store_true',
+                        help='Water everything currently due and exit')
+    args = parser.parse_args()
+
+    scheduler = IrrigationScheduler(
+        max_concurrent=args.max_concurrent,
+        flow_rate=args.flow_rate,
+        refresh_interval=args.refresh_interval
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    try:
+        if args.once:
+            completed = scheduler.run_once()
+            print(f"Completed {completed} waterings")
+        else:
+            print("Irrigation scheduler running")
+            scheduler.run()
+    except KeyboardInterrupt:
+        print("\nIrrigation scheduler stopped")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        scheduler.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Moisture-driven closed-loop watering.
+
+Each control tick reads the latest moisture reading of every active zone
+(sensors.last_reading, one query) and compares them with the plants'
+min_soil_moisture/max_soil_moisture as NumPy arrays. Zones below their
+minimum are watered for a runtime proportional to the deficit to the middle
+of their band, divided by the zone's learned response (moisture points
+gained per second of pumping). The response starts from the plant's
+configured water_amount and is refined from the readings observed after
+each watering.
+"""
+
+import os
+import sys
+import json
+import signal
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+
+load_dotenv()
+
+DEFAULT_STATE_PATH = os.getenv('MOISTURE_STATE_FILE') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'moisture_response.json'
+)
+
+ZONES_SQL = """
+SELECT ps.id AS plant_sensor_id,
+       ps.plant_id,
+       ps.sensor_id,
+       pin.pin_number AS pin,
+       s.last_reading,
+       s.last_reading_time,
+       p.min_soil_moisture,
+       p.max_soil_moisture,
+       ps.water_amount,
+       ps.last_watered
+FROM plant_sensors ps
+JOIN plants p ON p.id = ps.plant_id
+JOIN sensors s ON s.id = ps.sensor_id
+JOIN pins pin ON pin.sensor_id = ps.sensor_id
+    AND pin.pin_type = 'pump'
+    AND pin.status = 'active'
+WHERE p.status = 'active'
+  AND s.status = 'active'
+  AND s.type = 'moisture'
+"""
+
+UPDATE_LAST_WATERED_SQL = """
+UPDATE plant_sensors ps
+JOIN ({rows}) w ON w.id = ps.id
+SET ps.last_watered = w.last_watered
+"""
+
+
+def build_last_watered_update(plant_sensor_ids, watered_at):
+    """Build one UPDATE setting last_watered for a batch of plant_sensors rows
+
+    Returns (query, params).
+    """
+    rows = " UNION ALL ".join(
+        ["SELECT %s AS id, %s AS last_watered"] + ["SELECT %s, %s"] * (len(plant_sensor_ids) - 1)
+    )
+    params = []
+    for plant_sensor_id in plant_sensor_ids:
+        params.extend((plant_sensor_id, watered_at))
+    return UPDATE_LAST_WATERED_SQL.format(rows=rows), params
+
+
+def plan_watering(moisture, min_moisture, max_moisture, response, fresh, resting,
+                  min_runtime=2.0, max_runtime=300.0):
+    """Decide which zones to water and for how long
+
+    All arguments are equal-length arrays, one element per zone, except the
+    runtime limits.
+
+    Args:
+        moisture: Latest reading (NaN if none)
+        min_moisture, max_moisture: The plant's moisture band
+        response: Learned moisture points gained per second of pumping
+        fresh: Whether the reading is recent enough to act on
+        resting: Whether the zone is still soaking from its last watering
+
+    Returns:
+        (water, runtime): boolean mask and runtime in seconds (0 where not watered)
+    """
+    moisture = np.asarray(moisture, dtype=np.float64)
+    min_moisture = np.asarray(min_moisture, dtype=np.float64)
+    max_moisture = np.asarray(max_moisture, dtype=np.float64)
+    response = np.asarray(response, dtype=np.float64)
+
+    target = (min_moisture + max_moisture) / 2
+    # Start below the minimum, aim for the middle of the band (hysteresis)
+    water = (np.asarray(fresh, dtype=bool) & ~np.asarray(resting, dtype=bool)
+             & ~np.isnan(moisture) & (moisture < min_moisture) & (response > 0))
+    deficit = np.where(water, target - moisture, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        runtime = np.where(water, deficit / response, 0.0)
+    runtime = np.where(water, np.clip(runtime, min_runtime, max_runtime), 0.0)
+    return water, runtime
+
+
+class MoistureController:
+    """Closed-loop watering from soil moisture readings"""
+
+    def __init__(self, db=None, controller=None, flow_rate=10.0, soak_seconds=1800,
+                 max_reading_age=3600, min_runtime=2.0, max_runtime=300.0,
+                 learning_rate=0.3, state_path=DEFAULT_STATE_PATH):
+        """Initialize the control loop
+
+        Args:
+            db: DBConnect to use (defaults to a pooled connection)
+            controller: MultiPumpController driving the zones
+            flow_rate: Pump flow in ml/s, used for the initial response estimate
+            soak_seconds: Wait after watering before acting on or learning
+                from a zone's readings again
+            max_reading_age: Ignore readings older than this many seconds
+            min_runtime, max_runtime: Runtime limits in seconds
+            learning_rate: Weight of each new response observation
+            state_path: JSON file holding learned responses between runs
+        """
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+        if controller is None:
+            from python.RunPump import MultiPumpController
+            controller = MultiPumpController(pins=(), db=db)
+        self.controller = controller
+        self.flow_rate = flow_rate
+        self.soak_seconds = soak_seconds
+        self.max_reading_age = max_reading_age
+        self.min_runtime = min_runtime
+        self.max_runtime = max_runtime
+        self.learning_rate = learning_rate
+        self.state_path = state_path
+        self.responses = self._load_responses()
+        # plant_sensor_id -> (watered_at, moisture before, runtime); watered_at
+        # stays None while the run is queued behind the controller's limits
+        self.pending = {}
+        self._stopping = threading.Event()
+
+    def _load_responses(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return {int(key): float(value) for key, value in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save_responses(self):
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({str(key): value for key, value in self.responses.items()}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def load_zones(self):
+        """Latest reading and moisture band of every active moisture zone"""
+        return self.db.query_to_dataframe(ZONES_SQL)
+
+    def initial_response(self, zones):
+        """Response implied by the configured dose: water_amount lifts min to the band middle"""
+        dose_seconds = zones['water_amount'].to_numpy(dtype=np.float64) / self.flow_rate
+        band = (zones['max_soil_moisture'].to_numpy(dtype=np.float64)
+                - zones['min_soil_moisture'].to_numpy(dtype=np.float64)) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(dose_seconds > 0, band / dose_seconds, 0.0)
+
+    def learn(self, zones, now):
+        """Update learned responses from zones whose soak period has ended
+
+        Returns:
+            Number of zones updated
+        """
+        if not self.pending:
+            return 0
+        # A sensor wired to several pump pins appears once per pin
+        by_id = zones.drop_duplicates('plant_sensor_id').set_index('plant_sensor_id')
+        updated = 0
+        for plant_sensor_id, (watered_at, before, runtime) in list(self.pending.items()):
+            if watered_at is None or (now - watered_at).total_seconds() < self.soak_seconds:
+                continue
+            del self.pending[plant_sensor_id]
+            if plant_sensor_id not in by_id.index:
+                continue
+            zone = by_id.loc[plant_sensor_id]
+            reading_time = zone['last_reading_time']
+            if pd.isna(zone['last_reading']) or pd.isna(reading_time) or reading_time <= watered_at:
+                continue
+            observed = (float(zone['last_reading']) - before) / runtime
+            if observed <= 0:
+                # No measurable rise (sensor lag, drainage); keep the old estimate
+                continue
+            current = self.responses.get(plant_sensor_id, observed)
+            self.responses[plant_sensor_id] = (1 - self.learning_rate) * current + self.learning_rate * observed
+            updated += 1
+        if updated:
+            self._save_responses()
+        return updated
+
+    def plan(self, zones, now):
+        """Vectorised watering decision for all zones
+
+        Returns:
+            DataFrame of zones to water with a runtime column
+        """
+        if zones.empty:
+            return zones.assign(runtime=pd.Series(dtype=np.float64))
+        moisture = pd.to_numeric(zones['last_reading'], errors='coerce').to_numpy(dtype=np.float64)
+        reading_time = pd.to_datetime(zones['last_reading_time'])
+        fresh = (reading_time >= now - timedelta(seconds=self.max_reading_age)).to_numpy()
+        last_watered = pd.to_datetime(zones['last_watered'])
+        resting = ((last_watered > now - timedelta(seconds=self.soak_seconds))
+                   | zones['plant_sensor_id'].isin(list(self.pending))).to_numpy()
+
+        learned = zones['plant_sensor_id'].map(self.responses).to_numpy(dtype=np.float64)
+        response = np.where(np.isnan(learned), self.initial_response(zones), learned)
+
+        water, runtime = plan_watering(
+            moisture,
+            zones['min_soil_moisture'].to_numpy(),
+            zones['max_soil_moisture'].to_numpy(),
+            response, fresh, resting,
+            min_runtime=self.min_runtime,
+            max_runtime=self.max_runtime
+        )
+        return zones.assign(runtime=runtime, moisture=moisture)[water]
+
+    def tick(self, now=None, dry_run=False):
+        """Run one control step
+
+        Returns:
+            DataFrame of the zones watered (one row per pin)
+        """
+        now = now or datetime.now()
+        zones = self.load_zones()
+        self.learn(zones, now)
+        decisions = self.plan(zones, now)
+        if decisions.empty:
+            return decisions
+        # Zones sharing a pump get one run, long enough for the driest
+        decisions = decisions.assign(runtime=decisions.groupby('pin')['runtime'].transform('max'))
+        runs = decisions.drop_duplicates('pin')
+        if dry_run:
+            return runs
+
+        for row in decisions.itertuples(index=False):
+            self.pending[int(row.plant_sensor_id)] = (None, float(row.moisture), float(row.runtime))
+        for row in runs.itertuples(index=False):
+            ids = decisions.loc[decisions['pin'] == row.pin, 'plant_sensor_id'].astype(int).tolist()
+            self.controller.run_zone(int(row.pin), float(row.runtime),
+                                     callback=lambda run, ids=ids: self._watered(ids, run),
+                                     on_start=lambda run, ids=ids: self._started(ids, run))
+        return runs
+
+    def _started(self, plant_sensor_ids, run):
+        """Controller callback: the pump is on, so the zones count as watered from now
+
+        A queued run may start well after the tick, so last_watered and the
+        soak period both use the controller's start time.
+        """
+        started_at = run.on_at.astimezone().replace(tzinfo=None)
+        for plant_sensor_id in plant_sensor_ids:
+            if plant_sensor_id in self.pending:
+                _, before, runtime = self.pending[plant_sensor_id]
+                self.pending[plant_sensor_id] = (started_at, before, runtime)
+        query, params = build_last_watered_update(plant_sensor_ids, started_at)
+        self.db.execute_query(query, params)
+
+    def _watered(self, plant_sensor_ids, run):
+        """Controller callback: a cancelled run teaches nothing about the zone"""
+        if run.cancelled:
+            for plant_sensor_id in plant_sensor_ids:
+                self.pending.pop(plant_sensor_id, None)
+
+    def run(self, interval=300.0):
+        """Run control ticks every interval seconds until stop() is called"""
+        while not self._stopping.is_set():
+            try:
+                runs = self.tick()
+                if not runs.empty:
+                    print(f"{datetime.now().isoformat()} Watering pins {runs['pin'].astype(int).tolist()}")
+            except Exception as e:
+                print(f"Control loop error: {e}")
+            self._stopping.wait(interval)
+
+    def stop(self):
+        """Ask the loop to exit"""
+        self._stopping.set()
+
+    def close(self):
+        """Stop the pumps and release resources"""
+        try:
+            self.controller.cleanup()
+        finally:
+            self.db.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser(description='Water plants from soil moisture readings')
+    parser.add_argument('--interval', type=float, default=300.0,
+                        help='Seconds between control ticks (default: 300)')
+    parser.add_argument('--flow-rate', type=float, default=float(os.getenv('PUMP_FLOW_RATE', '10')),
+                        help='Pump flow rate in ml/s (default: PUMP_FLOW_RATE or 10)')
+    parser.add_argument('--once', action='store_true',
+                        help='Run a single tick, wait for the pumps and exit')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print the zones that would be watered without running pumps')
+    args = parser.parse_args()
+
+    control = MoistureController(flow_rate=args.flow_rate)
+    signal.signal(signal.SIGTERM, lambda signum, frame: control.stop())
+    try:
+        if args.once or args.dry_run:
+            runs = control.tick(dry_run=args.dry_run)
+            print(runs[['plant_id', 'pin', 'moisture', 'runtime']].to_string(index=False)
+                  if not runs.empty else "No zones need water")
+            control.controller.wait_all()
+        else:
+            control.run(args.interval)
+    except KeyboardInterrupt:
+        print("\nMoisture control stopped")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        control.close()
+
+if __name__ == '__main__':
+    main()
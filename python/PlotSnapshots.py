@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Static plot snapshots for the common dashboard views.
+
+Each window in PLOT_SNAPSHOT_DAYS (7, 30 and 90 days by default) is
+rendered for all plants and for each active plant, in both plot.php
+formats, into PLOT_SNAPSHOT_DIR. A snapshot holds the response body
+plot.php would send (all-7d.components.json, plant-3-30d.data.json) and
+a gzipped copy next to it. A view is re-rendered only when the highest
+reading id of its sensors has moved since the last run, or when its
+snapshot is older than PLOT_SNAPSHOT_MAX_AGE so the window keeps
+sliding. The changed per-plant views of a window are rendered together
+from one query.
+
+Files are written to a temporary name and renamed into place, and with
+--upload are copied to the FTP server the same way, so readers never see
+a partial snapshot. manifest.json records each view's watermark and is
+rewritten on every run; plot.php only serves snapshots while it is
+fresh, and renders custom ranges live.
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import ftplib
+import argparse
+import tempfile
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+DEFAULT_OUTPUT_DIR = os.getenv('PLOT_SNAPSHOT_DIR') or 'plots/snapshots'
+DEFAULT_DAYS = tuple(int(days) for days in os.getenv('PLOT_SNAPSHOT_DAYS', '7,30,90').split(','))
+DEFAULT_MAX_AGE = int(os.getenv('PLOT_SNAPSHOT_MAX_AGE', '900'))
+DEFAULT_REMOTE_DIR = os.getenv('PLOT_SNAPSHOT_FTP_DIR', 'plot_snapshots')
+
+# plot.php format: snapshot file suffix
+FORMATS = {'components': 'components', 'json': 'data'}
+MANIFEST = 'manifest.json'
+VIEW_PATTERN = re.compile(r'^(all|plant-\d+)-\d+d\.')
+NO_DATA = {'success': False, 'error': 'No data available for plotting'}
+
+HTML_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+{resources}
+</head>
+<body>
+{div}
+{script}
+</body>
+</html>
+"""
+
+
+def view_name(days, plant_id=None):
+    """Snapshot name of a view: all-7d, or plant-3-7d for one plant"""
+    return f"{'all' if plant_id is None else f'plant-{plant_id}'}-{days}d"
+
+
+def snapshot_files(view):
+    """Files every published view has: one JSON body per format and its gzipped copy"""
+    names = [f"{view}.{suffix}.json" for suffix in FORMATS.values()]
+    return names + [f"{name}.gz" for name in names]
+
+
+def write_atomic(path, data):
+    """Write bytes via a temporary file and rename so readers never see partial data"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file 0600; the web server has to read it
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def plot_response(fmt, plot):
+    """The plot.php response for one rendered plot (None when there is no data)"""
+    if plot is None or plot == (None, None):
+        return dict(NO_DATA)
+    if fmt == 'components':
+        script, div = plot
+        return {'success': True, 'script': script, 'div': div}
+    return {'success': True, 'data': plot}
+
+
+class PlotSnapshotPublisher:
+    """Render the standard plot views to static files when their data changes"""
+
+    def __init__(self, output_dir=DEFAULT_OUTPUT_DIR, plotter=None, days=DEFAULT_DAYS, max_age=DEFAULT_MAX_AGE,
+                 ftp=None, remote_dir=DEFAULT_REMOTE_DIR, html=False, workers=0):
+        """Initialize the publisher
+
+        Args:
+            output_dir: Local directory the snapshots are written to
+            plotter: PlotGenerator to render with (defaults to create_plot_generator())
+            days: Windows to publish, in days
+            max_age: Seconds after which a view is re-rendered even without new readings
+            ftp: FTPConnect to upload snapshots through (None = local files only)
+            remote_dir: Directory on the FTP server holding the snapshots
+            html: Also write a standalone HTML page per view
+            workers: Processes rendering per-plant components (see generate_plots)
+        """
+        if plotter is None:
+            from python.ProducePlot import create_plot_generator
+            plotter = create_plot_generator()
+        self.plotter = plotter
+        self.output_dir = output_dir
+        self.days = tuple(days)
+        self.max_age = max_age
+        self.ftp = ftp
+        self.remote_dir = remote_dir.rstrip('/')
+        self.html = html
+        self.workers = workers
+
+    def _path(self, name):
+        return os.path.join(self.output_dir, name)
+
+    def get_watermarks(self):
+        """Highest reading id of each active plant's sensors
+
+        Read per sensor from idx_sensor_id as in
+        PlotGenerator.get_data_watermark, for every plant in one query. Ids
+        rather than timestamps, so backfilled readings also count as new.
+
+        Returns:
+            dict of plant_id -> highest reading id (None for plants without readings)
+        """
+        rows = self.plotter.db.execute_query(
+            """
+            SELECT p.id, MAX((SELECT r.id FROM readings r WHERE r.sensor_id = ps.sensor_id
+                              ORDER BY r.id DESC LIMIT 1))
+            FROM plants p
+            JOIN plant_sensors ps ON ps.plant_id = p.id
+            WHERE p.status = 'active'
+            GROUP BY p.id
+            """
+        )
+        return {int(plant_id): latest for plant_id, latest in rows or []}
+
+    def load_manifest(self):
+        """The manifest of the last run, or an empty one"""
+        try:
+            with open(self._path(MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {'views': {}}
+        return manifest if isinstance(manifest.get('views'), dict) else {'views': {}}
+
+    def needs_render(self, view, watermark, entry, now):
+        """Whether a view's data moved, its snapshot aged out or its files are missing"""
+        if entry is None or entry.get('watermark') != watermark:
+            return True
+        if now - entry.get('rendered', 0) >= self.max_age:
+            return True
+        return not all(os.path.exists(self._path(name)) for name in snapshot_files(view))
+
+    def render(self, days, plant_ids, include_all=False):
+        """Render one window for the given plants (and for all plants)
+
+        Returns:
+            dict of view name -> {format: response}
+        """
+        responses = {}
+        if include_all:
+            responses[view_name(days)] = {
+                'components': plot_response('components', self.plotter.generate_plot(days=days, return_components=True)),
+                'json': plot_response('json', self.plotter.generate_plot_data(days=days)),
+            }
+        if plant_ids:
+            for fmt in FORMATS:
+                plots = self.plotter.generate_plots(plant_ids, days=days, fmt=fmt, workers=self.workers)
+                for plant_id in plant_ids:
+                    responses.setdefault(view_name(days, plant_id), {})[fmt] = plot_response(fmt, plots.get(plant_id))
+        return responses
+
+    def write_view(self, view, responses, title):
+        """Write a view's snapshot files
+
+        Returns:
+            Names of the files written
+        """
+        written = []
+        for fmt, suffix in FORMATS.items():
+            body = json.dumps(responses[fmt], separators=(',', ':')).encode('utf-8')
+            name = f"{view}.{suffix}.json"
+            write_atomic(self._path(name), body)
+            # mtime=0 so an unchanged body gives identical bytes
+            write_atomic(self._path(f"{name}.gz"), gzip.compress(body, compresslevel=9, mtime=0))
+            written += [name, f"{name}.gz"]
+
+        components = responses['components']
+        if self.html and components['success']:
+            from bokeh.resources import CDN
+
+            page = HTML_PAGE.format(title=title, resources=CDN.render(),
+                                    div=components['div'], script=components['script'])
+            write_atomic(self._path(f"{view}.html"), page.encode('utf-8'))
+            written.append(f"{view}.html")
+        return written
+
+    def prune(self, views):
+        """Delete snapshots of views no longer published (inactive plants, dropped windows)
+
+        Returns:
+            Names of the files removed
+        """
+        removed = []
+        for name in sorted(os.listdir(self.output_dir)):
+            match = VIEW_PATTERN.match(name)
+            if match and name[:match.end() - 1] not in views:
+                os.unlink(self._path(name))
+                removed.append(name)
+        return removed
+
+    def publish(self):
+        """Bring every snapshot up to date
+
+        Returns:
+            dict with rendered (view names), skipped (count), written and
+            removed (file names) and uploaded (count)
+        """
+        now = time.time()
+        os.makedirs(self.output_dir, exist_ok=True)
+        previous = self.load_manifest()['views']
+        watermarks = self.get_watermarks()
+        latest = max((latest for latest in watermarks.values() if latest is not None), default=None)
+
+        views, rendered, written = {}, [], []
+        for days in self.days:
+            wanted = {view_name(days): (None, latest)}
+            wanted.update({view_name(days, plant_id): (plant_id, watermark)
+                           for plant_id, watermark in sorted(watermarks.items())})
+            stamps = {view: None if watermark is None else str(watermark) for view, (_, watermark) in wanted.items()}
+            changed = [view for view in wanted if self.needs_render(view, stamps[view], previous.get(view), now)]
+
+            plant_ids = [wanted[view][0] for view in changed if wanted[view][0] is not None]
+            responses = self.render(days, plant_ids, include_all=view_name(days) in changed)
+            for view in wanted:
+                if view in responses:
+                    written += self.write_view(view, responses[view], f"Sensor Readings, last {days} days")
+                    views[view] = {'watermark': stamps[view], 'rendered': now}
+                    rendered.append(view)
+                else:
+                    views[view] = previous[view]
+
+        removed = self.prune(views)
+        # Rewritten on every run: its mtime tells plot.php the publisher is alive
+        manifest = {'generated': now, 'days': list(self.days), 'views': views}
+        write_atomic(self._path(MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+
+        uploaded = 0
+        if self.ftp is not None:
+            # Manifest last, once the files it describes are in place
+            uploaded = self.upload(written + [MANIFEST], removed)
+        return {'rendered': rendered, 'skipped': len(views) - len(rendered), 'written': written,
+                'removed': removed, 'uploaded': uploaded}
+
+    def ensure_remote_dir(self):
+        """Create the remote snapshot directory (and parents) if needed"""
+        self.ftp.connect()
+        path = '/' if self.remote_dir.startswith('/') else ''
+        for part in filter(None, self.remote_dir.split('/')):
+            path = f"{path}{part}"
+            try:
+                self.ftp.ftp.mkd(path)
+            except ftplib.error_perm:
+                # Already exists; a real problem shows up on upload
+                pass
+            path += '/'
+
+    def upload(self, names, removed=()):
+        """Upload files under a temporary name and rename them into place, then delete removed ones
+
+        Returns:
+            Number of files uploaded
+        """
+        self.ensure_remote_dir()
+        for name in names:
+            remote = f"{self.remote_dir}/{name}"
+            self.ftp.upload_file(self._path(name), f"{remote}.tmp")
+            self.ftp.rename_file(f"{remote}.tmp", remote)
+        for name in removed:
+            try:
+                self.ftp.ftp.delete(f"{self.remote_dir}/{name}")
+            except ftplib.error_perm:
+                # Never uploaded
+                pass
+        return len(names)
+
+    def cleanup(self):
+        """Clean up resources"""
+        if self.ftp is not None:
+            self.ftp.disconnect()
+        if self.plotter:
+            self.plotter.cleanup()
+
+def parse_days(value):
+    """Parse a comma separated list of windows such as 7,30,90"""
+    try:
+        days = tuple(int(part) for part in value.split(',') if part.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid days list: {value}")
+    if not days or min(days) < 1:
+        raise argparse.ArgumentTypeError(f"invalid days list: {value}")
+    return days
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish static plot snapshots for the standard views')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help=f'Directory the snapshots are written to (default: {DEFAULT_OUTPUT_DIR})')
+    parser.add_argument('--days', type=parse_days, default=DEFAULT_DAYS,
+                        help='Comma separated windows to publish (default: %(default)s)')
+    parser.add_argument('--max-age', type=int, default=DEFAULT_MAX_AGE,
+                        help='Seconds before a view is re-rendered without new readings (default: %(default)s)')
+    parser.add_argument('--force', action='store_true', help='Re-render every view')
+    parser.add_argument('--html', action='store_true', help='Also write a standalone HTML page per view')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Processes rendering per-plant plots (default: render in this process)')
+    parser.add_argument('--upload', action='store_true', help='Upload the snapshots to FTP_HOST')
+    parser.add_argument('--remote-dir', default=DEFAULT_REMOTE_DIR,
+                        help=f'Remote directory for --upload (default: {DEFAULT_REMOTE_DIR})')
+    args = parser.parse_args()
+
+    publisher = None
+    try:
+        ftp = None
+        if args.upload:
+            from python.FTPConnectMod import FTPConnect
+            ftp = FTPConnect()
+        publisher = PlotSnapshotPublisher(output_dir=args.output_dir, days=args.days,
+                                          max_age=0 if args.force else args.max_age, ftp=ftp,
+                                          remote_dir=args.remote_dir, html=args.html, workers=args.workers)
+        result = publisher.publish()
+        print(f"Rendered {len(result['rendered'])} views, {result['skipped']} unchanged"
+              f"{': ' + ', '.join(result['rendered']) if result['rendered'] else ''}")
+        if result['removed']:
+            print(f"Removed {', '.join(result['removed'])}")
+        if args.upload:
+            print(f"Uploaded {result['uploaded']} files to {args.remote_dir}")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        if publisher:
+            publisher.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -3,20 +3,16 @@
 
 import os
 import sys
+import math
+import time
+import hashlib
+import tempfile
+import importlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
-from bokeh.plotting import figure, output_file, save
-from bokeh.embed import components
-from bokeh.layouts import column, row
-from bokeh.models import (
-    ColumnDataSource,
-    HoverTool,
-    DatetimeTickFormatter,
-    Range1d,
-    LinearAxis,
-    Legend
-)
 import json
 from tenacity import retry, stop_after_attempt, wait_exponential
 from dotenv import load_dotenv
@@ -24,66 +20,603 @@ from dotenv import load_dotenv
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from python.DBConnect import DBConnect
+from python.RollupReadings import rollup_bucket, rollup_source
+from python.ReadingSeries import ReadingSeries
 
 load_dotenv()
 
+# Plot width in pixels; also the default number of time bins per series
+PLOT_WIDTH = 1000
+
+# Bokeh is most of this module's import time and only generate_plot uses it,
+# so these names are imported on first use rather than at startup (JSON
+# output never loads Bokeh). They are still module attributes for patching.
+BOKEH_NAMES = {
+    'figure': 'bokeh.plotting',
+    'output_file': 'bokeh.plotting',
+    'save': 'bokeh.plotting',
+    'components': 'bokeh.embed',
+    'ColumnDataSource': 'bokeh.models',
+    'DatetimeTickFormatter': 'bokeh.models',
+}
+
+def load_bokeh():
+    """Import the Bokeh names into this module, keeping any already set"""
+    namespace = globals()
+    for name, module in BOKEH_NAMES.items():
+        if name not in namespace:
+            namespace[name] = getattr(importlib.import_module(module), name)
+
+def __getattr__(name):
+    if name in BOKEH_NAMES:
+        load_bokeh()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class PlotCache:
+    """LRU cache of rendered plots with an optional on-disk backend
+
+    Keys are tuples of request parameters plus a data watermark, so an entry
+    is only reused while no new readings have arrived. Entries also expire
+    after ttl seconds because the plotted window slides with the clock.
+    The disk backend lets separate processes (generate_plot_api.py runs)
+    share renders.
+    """
+
+    def __init__(self, max_entries=64, ttl=300, cache_dir=None, max_disk_entries=512):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache configured by PLOT_CACHE_SIZE, PLOT_CACHE_TTL and PLOT_CACHE_DIR"""
+        return cls(
+            max_entries=int(os.getenv('PLOT_CACHE_SIZE', '64')),
+            ttl=float(os.getenv('PLOT_CACHE_TTL', '300')),
+            cache_dir=os.getenv('PLOT_CACHE_DIR') or None
+        )
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha256(json.dumps(key, default=str).encode('utf-8')).hexdigest()
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        digest = self._digest(key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self._entries.move_to_end(digest)
+                    return value
+                del self._entries[digest]
+
+        if not self.cache_dir:
+            return None
+        path = self._path(digest)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - entry['created'] > self.ttl:
+            return None
+        # Touch the file so disk pruning evicts least recently used entries
+        os.utime(path, None)
+        self._remember(digest, entry['created'], entry['value'])
+        return entry['value']
+
+    def set(self, key, value):
+        """Store a JSON-serialisable value under key"""
+        digest = self._digest(key)
+        created = time.time()
+        self._remember(digest, created, value)
+        if not self.cache_dir:
+            return
+        # Write atomically so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'created': created, 'value': value}, f)
+            os.replace(tmp_path, self._path(digest))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        self._prune_disk()
+
+    def _remember(self, digest, created, value):
+        with self._lock:
+            self._entries[digest] = (created, value)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune_disk(self):
+        """Remove least recently used files beyond max_disk_entries"""
+        try:
+            paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                     if name.endswith('.json')]
+            if len(paths) <= self.max_disk_entries:
+                return
+            paths.sort(key=os.path.getmtime)
+            for path in paths[:len(paths) - self.max_disk_entries]:
+                os.unlink(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    os.unlink(os.path.join(self.cache_dir, name))
+
+def build_plot_data(df):
+    """Convert sensor data to the columnar plot format
+
+    Names are dictionary-encoded once in ``names`` and each series (one per
+    plant and sensor) carries parallel arrays of epoch-millisecond times
+    ``t`` and values ``v`` (plus ``min``/``max`` for downsampled data)::
+
+        {"names": ["Basil", "Soil 1", "moisture"],
+         "series": [{"plant_id": 1, "plant": 0, "sensor": 1, "type": 2,
+                     "t": [1714550400000], "v": [41.5]}]}
+    """
+    names = {}
+
+    def name_index(value):
+        return names.setdefault(value, len(names))
+
+    timestamps = pd.to_datetime(df['reading_timestamp']).to_numpy().astype('datetime64[ms]').astype(np.int64)
+    columns = {'v': df['reading_value'].to_numpy(dtype=np.float64)}
+    if 'reading_min' in df.columns:
+        columns['min'] = df['reading_min'].to_numpy(dtype=np.float64)
+        columns['max'] = df['reading_max'].to_numpy(dtype=np.float64)
+    
+    series = []
+    groups = df.groupby(['plant_id', 'plant_name', 'sensor_name', 'sensor_type'], sort=True).indices
+    for (plant_id, plant_name, sensor_name, sensor_type), index in groups.items():
+        index = index[np.argsort(timestamps[index], kind='stable')]
+        entry = {
+            'plant_id': int(plant_id),
+            'plant': name_index(plant_name),
+            'sensor': name_index(sensor_name),
+            'type': name_index(sensor_type),
+            't': timestamps[index].tolist()
+        }
+        for key, values in columns.items():
+            # Readings are stored to 2 decimal places; bin means need little more
+            entry[key] = np.round(values[index], 3).tolist()
+        series.append(entry)
+    return {'names': list(names), 'series': series}
+
+def build_figure(df, title):
+    """Build the Bokeh figure for sensor data in get_sensor_data's format
+
+    One line plus points per sensor, coloured by sensor type and shaded and
+    dashed per plant.
+    """
+    load_bokeh()
+
+    # Create figure with larger size for better visibility
+    p = figure(
+        width=PLOT_WIDTH,
+        height=500,
+        x_axis_type="datetime",
+        title=title,
+        tools="pan,box_zoom,wheel_zoom,reset,save,hover"
+    )
+    
+    # Series names are carried by each renderer's name rather than
+    # repeated on every row of the data source
+    tooltips = [
+        ('Series', '$name'),
+        ('Value', '@reading_value'),
+        ('Time', '@reading_timestamp{%Y-%m-%d %H:%M:%S}')
+    ]
+    downsampled = 'reading_min' in df.columns
+    if downsampled:
+        # Downsampled data: show the spread hidden inside each bin
+        tooltips.insert(2, ('Range', '@reading_min - @reading_max'))
+    p.hover.tooltips = tooltips
+    p.hover.formatters = {'@reading_timestamp': 'datetime'}
+    
+    # Configure axes
+    p.xaxis.formatter = DatetimeTickFormatter(
+        hours="%Y-%m-%d %H:%M",
+        days="%Y-%m-%d",
+        months="%Y-%m",
+        years="%Y"
+    )
+    p.xaxis.axis_label = 'Time'
+    p.yaxis.axis_label = 'Reading Value'
+    
+    # Color-blind friendly palette - base colors per sensor type
+    # Each sensor type has a distinct base color, with more variations for different plants
+    # Using Okabe-Ito inspired palette with more distinct shades
+    sensor_type_base_colors = {
+        'temperature': ['#0072B2', '#56B4E9', '#005F8C', '#0099CC', '#33B5E5'],      # Blues (5 shades)
+        'humidity': ['#009E73', '#66C2A5', '#007A5E', '#00C896', '#4DD4B0'],          # Greens (5 shades)
+        'moisture': ['#E69F00', '#F0A830', '#CC8F00', '#FFB84D', '#FFCC66'],          # Oranges (5 shades)
+        'light': ['#CC79A7', '#E78AC3', '#B36893', '#F5A9D0', '#DE9FC4'],             # Pinks (5 shades)
+        'ph': ['#56B4E9', '#7FC8E8', '#3DA5CC', '#99D9F5', '#B3E5F7'],                # Light blues (5 shades)
+        'conductivity': ['#D55E00', '#F0803D', '#B84D00', '#FF9933', '#FFB366'],      # Red-oranges (5 shades)
+        'pressure': ['#F0E442', '#F5EA6B', '#D4CC1A', '#FFF966', '#FFFD99'],          # Yellows (5 shades)
+        'co2': ['#000000', '#333333', '#666666', '#999999', '#CCCCCC']                 # Grays (5 shades)
+    }
+    
+    # Line dash patterns for additional distinction (colorblind-friendly)
+    # More patterns for better distinction - using Bokeh-compatible formats
+    line_dash_patterns = ['solid', 'dashed', 'dotted', 'dotdash', 'dashdot']
+    
+    # Fallback colors for unknown sensor types (ColorBrewer Set2)
+    fallback_colors = ['#66c2a5', '#fc8d62', '#8da0cb', '#e78ac3', '#a6d854', '#ffd92f', '#e5c494', '#b3b3b3']
+    fallback_index = 0
+    
+    # Track plant-sensor combinations for unique styling
+    plant_sensor_combinations = {}  # (plant_name, sensor_type) -> (color, dash_pattern)
+    sensor_type_plant_counts = {}  # sensor_type -> {plant_name: index}
+    
+    # Extract the numeric columns once; each series takes a slice of these
+    # arrays by index instead of copying a DataFrame group
+    timestamps = pd.to_datetime(df['reading_timestamp']).to_numpy().astype('datetime64[ms]').astype(np.float64)
+    columns = {'reading_value': df['reading_value'].to_numpy(dtype=np.float32)}
+    if downsampled:
+        columns['reading_min'] = df['reading_min'].to_numpy(dtype=np.float32)
+        columns['reading_max'] = df['reading_max'].to_numpy(dtype=np.float32)
+    
+    renderers = []
+    
+    # One series per sensor, styled by plant and sensor type
+    series_indices = df.groupby(['plant_name', 'sensor_type', 'sensor_name'], sort=True).indices
+    for (plant_name, sensor_type, sensor_name), index in series_indices.items():
+        sensor_type_lower = sensor_type.lower() if sensor_type else 'unknown'
+        
+        # Get or assign color and line style for this plant-sensor combination
+        if (plant_name, sensor_type_lower) in plant_sensor_combinations:
+            color, dash_pattern = plant_sensor_combinations[(plant_name, sensor_type_lower)]
+        else:
+            # Determine color based on sensor type and plant
+            if sensor_type_lower in sensor_type_base_colors:
+                # Track which plant index this is for this sensor type
+                if sensor_type_lower not in sensor_type_plant_counts:
+                    sensor_type_plant_counts[sensor_type_lower] = {}
+                
+                if plant_name not in sensor_type_plant_counts[sensor_type_lower]:
+                    plant_index = len(sensor_type_plant_counts[sensor_type_lower])
+                    sensor_type_plant_counts[sensor_type_lower][plant_name] = plant_index
+                else:
+                    plant_index = sensor_type_plant_counts[sensor_type_lower][plant_name]
+                
+                # Get color from the palette for this sensor type
+                color_palette = sensor_type_base_colors[sensor_type_lower]
+                color = color_palette[plant_index % len(color_palette)]
+                
+                # Get line dash pattern for additional distinction
+                dash_pattern = line_dash_patterns[plant_index % len(line_dash_patterns)]
+            else:
+                # Unknown sensor type - use fallback
+                color = fallback_colors[fallback_index % len(fallback_colors)]
+                dash_pattern = 'solid'
+                fallback_index += 1
+            
+            # Store this combination
+            plant_sensor_combinations[(plant_name, sensor_type_lower)] = (color, dash_pattern)
+        
+        # Numeric arrays only; Bokeh ships these as binary buffers
+        index = index[np.argsort(timestamps[index], kind='stable')]
+        data = {'reading_timestamp': timestamps[index]}
+        for name, values in columns.items():
+            data[name] = values[index]
+        source = ColumnDataSource(data=data)
+        
+        # Create legend label: "Plant - Sensor Type" (sensors of one type share an entry)
+        legend_label = f"{plant_name} - {sensor_type.title()}"
+        series_name = f"{plant_name} - {sensor_name} ({sensor_type})"
+        
+        # Line and scatter points for this sensor share one source
+        line_glyph = p.line(
+            'reading_timestamp',
+            'reading_value',
+            line_color=color,
+            line_dash=dash_pattern,
+            legend_label=legend_label,
+            source=source,
+            line_width=2,
+            line_alpha=0.8,
+            name=series_name
+        )
+        
+        circle_glyph = p.scatter(
+            'reading_timestamp',
+            'reading_value',
+            color=color,
+            legend_label=legend_label,
+            source=source,
+            size=4,
+            alpha=0.6,
+            name=series_name
+        )
+        renderers.append(circle_glyph)
+    
+    # Hover on the points only, so each reading is reported once
+    p.hover.renderers = renderers
+    
+    # Configure legend - position it outside the plot area to avoid overlap
+    p.legend.click_policy = "hide"
+    p.legend.location = "bottom_left"  # Move to bottom left where data is less dense
+    p.legend.label_text_font_size = "9pt"  # Smaller font for compact legend
+    p.legend.background_fill_alpha = 0.9  # Slightly transparent so data shows through if needed
+    p.legend.border_line_color = "gray"
+    p.legend.border_line_width = 1
+    p.legend.spacing = 3  # Tighter spacing for compact legend
+    p.legend.padding = 8  # Less padding for compact legend
+    p.legend.glyph_width = 20  # Smaller glyph width
+    p.legend.glyph_height = 15  # Smaller glyph height
+    
+    # If we have many items, reduce font size even more
+    if len(plant_sensor_combinations) > 8:
+        p.legend.label_text_font_size = "8pt"
+        p.legend.spacing = 2
+        p.legend.padding = 6
+    
+    return p
+
+def render_components(df, title):
+    """Build the figure for df and return its (script, div) embed components
+
+    Module-level so a process pool can run it on one plant's frame.
+    """
+    p = build_figure(df, title)
+    return components(p)
+
+def plant_filter(plant_id):
+    """SQL condition and params limiting p.id to one plant id or a list of them
+
+    Returns ("", None) when plant_id is None (all active plants).
+    """
+    if not plant_id:
+        return "", None
+    if isinstance(plant_id, (list, tuple)):
+        return f"  AND p.id IN ({', '.join(['%s'] * len(plant_id))})\n", tuple(plant_id)
+    return "  AND p.id = %s\n", (plant_id,)
+
+def create_plot_generator():
+    """Build a PlotGenerator with the cache and reading store configured in the environment"""
+    store = None
+    if os.getenv('READING_STORE_DIR'):
+        # pyarrow is only needed when the store is enabled
+        from python.ReadingStore import ReadingStore
+        store = ReadingStore.from_env()
+    return PlotGenerator(cache=PlotCache.from_env(), store=store)
+
 class PlotGenerator:
     """Class to generate plots from sensor data"""
     
-    def __init__(self):
-        """Initialize plot generator with database connection"""
-        self.db = DBConnect()
-        self.db.connect()
+    def __init__(self, use_rollups=True, cache=None, store=None, db=None):
+        """Initialize plot generator with database connection
+
+        Args:
+            use_rollups: Read downsampled data from the hourly/daily rollup
+                tables (see RollupReadings.py) when the bins are coarse enough
+            cache: Optional PlotCache for rendered components and JSON
+            store: Optional ReadingStore; readings it already holds are read
+                from its Arrow files and only newer ones from the database
+            db: DBConnect to use (defaults to a new pooled connection)
+        """
+        self.use_rollups = use_rollups
+        self.cache = cache
+        self.store = store
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
         
-    def get_sensor_data(self, days=7, plant_id=None):
-        """Fetch sensor data for the specified number of days, optionally filtered by plant"""
+    def get_sensor_data(self, days=7, plant_id=None, max_points=None):
+        """Fetch sensor data for the specified number of days, optionally filtered by plant
+
+        If max_points is given, readings are bucketed per sensor in SQL into at
+        most max_points time bins across the window. reading_value is then the
+        bin mean and reading_min/reading_max hold its extremes, so the row count
+        stays bounded however many days are requested. Longer windows are
+        built from the coarsest rollup table that fits (see rollup_bucket),
+        with bins rounded up to whole rollup buckets.
+
+        The active sensors are looked up first and the readings query then
+        drives from their ids, one range scan per sensor on the covering
+        (sensor_id, created_at, value) index; plant and sensor names are
+        joined on afterwards.
+        """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        if plant_id:
-            # Filter by specific plant
-            query = """
-            SELECT 
+        sensors = self.get_plot_sensors(plant_id)
+        if sensors.empty:
+            return pd.DataFrame()
+        sensor_ids = [int(sensor_id) for sensor_id in sensors['sensor_id'].unique()]
+        
+        if self.store is not None:
+            return self._get_store_data(sensors, sensor_ids, start_date, end_date, max_points)
+        
+        query, params, columns = self.readings_query(sensor_ids, start_date, end_date, max_points)
+        readings = self.db.query_to_dataframe(query, params=params)
+        if readings.empty:
+            return pd.DataFrame()
+        return self._attach_sensors(sensors, readings, columns)
+    
+    def get_plot_sensors(self, plant_id=None):
+        """Sensors of active plants (optionally one plant, or a list of plants) with their names
+        
+        Returns:
+            DataFrame of plant_name, plant_id, sensor_id, sensor_name, sensor_type
+        """
+        query = """
+            SELECT
                 p.name as plant_name,
                 p.id as plant_id,
+                s.id as sensor_id,
                 s.name as sensor_name,
-                s.type as sensor_type,
-                r.value as reading_value,
-                r.created_at as reading_timestamp
+                s.type as sensor_type
             FROM plants p
             JOIN plant_sensors ps ON p.id = ps.plant_id
             JOIN sensors s ON ps.sensor_id = s.id
-            JOIN readings r ON s.id = r.sensor_id
-            WHERE r.created_at BETWEEN %s AND %s
-              AND p.id = %s
-              AND p.status = 'active'
-            ORDER BY p.name, r.created_at
+            WHERE p.status = 'active'
             """
-            params = (start_date, end_date, plant_id)
+        condition, params = plant_filter(plant_id)
+        return self.db.query_to_dataframe(query + condition, params=params)
+    
+    def readings_query(self, sensor_ids, start_date, end_date, max_points=None):
+        """Build the readings query of get_sensor_data for the given sensors
+        
+        Returns:
+            (query, params, value columns other than sensor_id)
+        """
+        placeholders = ", ".join(["%s"] * len(sensor_ids))
+        source = "readings"
+        where = f"""WHERE r.sensor_id IN ({placeholders})
+              AND r.created_at BETWEEN %s AND %s"""
+        params = (*sensor_ids, start_date, end_date)
+        
+        if max_points:
+            # Integer literal (never user input) so MySQL can match the GROUP BY expression
+            window_seconds = (end_date - start_date).total_seconds()
+            if self.use_rollups:
+                rollup_table, bucket_seconds = rollup_bucket(window_seconds, max_points)
+            else:
+                rollup_table, bucket_seconds = None, max(1, math.ceil(window_seconds / max_points))
+            bucket = f"FLOOR(UNIX_TIMESTAMP(r.created_at) / {bucket_seconds})"
+            if rollup_table:
+                # The rollup source applies the sensor and time filters itself
+                source, params = rollup_source(rollup_table, start_date, end_date, sensor_ids)
+                where = ""
+                aggregates = """
+                SUM(r.sum_value) / SUM(r.reading_count) as reading_value,
+                FROM_UNIXTIME({bucket} * {bucket_seconds}) as reading_timestamp,
+                MIN(r.min_value) as reading_min,
+                MAX(r.max_value) as reading_max"""
+            else:
+                aggregates = """
+                AVG(r.value) as reading_value,
+                FROM_UNIXTIME({bucket} * {bucket_seconds}) as reading_timestamp,
+                MIN(r.value) as reading_min,
+                MAX(r.value) as reading_max"""
+            values = aggregates.format(bucket=bucket, bucket_seconds=bucket_seconds)
+            # Rows are put in plot order after the names are joined on, so skip MySQL 5.7's implicit GROUP BY sort
+            order = f"GROUP BY r.sensor_id, {bucket}\n            ORDER BY NULL"
+            columns = ['reading_value', 'reading_timestamp', 'reading_min', 'reading_max']
         else:
-            # Get data for all plants
-            query = """
-            SELECT 
-                p.name as plant_name,
-                p.id as plant_id,
-                s.name as sensor_name,
-                s.type as sensor_type,
+            values = """
                 r.value as reading_value,
-                r.created_at as reading_timestamp
-            FROM plants p
-            JOIN plant_sensors ps ON p.id = ps.plant_id
-            JOIN sensors s ON ps.sensor_id = s.id
-            JOIN readings r ON s.id = r.sensor_id
-            WHERE r.created_at BETWEEN %s AND %s
-              AND p.status = 'active'
-            ORDER BY p.name, r.created_at
+                r.created_at as reading_timestamp"""
+            # Index order, so no filesort
+            order = "ORDER BY r.sensor_id, r.created_at"
+            columns = ['reading_value', 'reading_timestamp']
+        
+        query = f"""
+            SELECT
+                r.sensor_id as sensor_id,{values}
+            FROM {source} r
+            {where}
+            {order}
             """
-            params = (start_date, end_date)
+        return query, params, columns
+    
+    def _attach_sensors(self, sensors, readings, columns):
+        """Join plant and sensor names onto per-sensor readings, in plot order"""
+        df = sensors.merge(readings, on='sensor_id')
+        df = df.sort_values(['plant_name', 'reading_timestamp'], kind='stable', ignore_index=True)
+        return df[['plant_name', 'plant_id', 'sensor_name', 'sensor_type', *columns]]
+    
+    def _get_store_data(self, sensors, sensor_ids, start_date, end_date, max_points=None):
+        """get_sensor_data backed by the local ReadingStore
+
+        Readings newer than the store watermark come from the database;
+        everything else is memory-mapped from the store. The readings are
+        held as a ReadingSeries and binned in NumPy, matching the SQL path's
+        columns.
+        """
+        watermark = self.store.get_watermark()
+        # A sync may write past the watermark while the files are read
+        history = self.store.read_series(sensor_ids, start_date, end_date, max_id=watermark)
+        placeholders = ", ".join(["%s"] * len(sensor_ids))
+        tail = self.db.query_to_dataframe(
+            f"""
+            SELECT sensor_id, created_at, value
+            FROM readings
+            WHERE id > %s
+              AND sensor_id IN ({placeholders})
+              AND created_at BETWEEN %s AND %s
+            """,
+            params=(watermark, *sensor_ids, start_date, end_date)
+        )
+        if not tail.empty:
+            history = ReadingSeries.concat([history, ReadingSeries.from_frame(tail)])
+        if not len(history):
+            return pd.DataFrame()
         
-        return self.db.query_to_dataframe(query, params=params)
+        if max_points:
+            bucket_seconds = max(1, math.ceil((end_date - start_date).total_seconds() / max_points))
+            bins = history.bin(bucket_seconds * 1000)
+            readings = pd.DataFrame({
+                'sensor_id': bins['sensor_id'],
+                'reading_value': bins['mean'],
+                'reading_timestamp': pd.to_datetime(bins['bucket'] * bucket_seconds, unit='s'),
+                'reading_min': bins['min'],
+                'reading_max': bins['max'],
+            })
+            columns = ['reading_value', 'reading_timestamp', 'reading_min', 'reading_max']
+        else:
+            readings = pd.DataFrame({
+                'sensor_id': history.sensor_ids,
+                'reading_value': history.values,
+                'reading_timestamp': history.timestamps.view('datetime64[ms]'),
+            })
+            columns = ['reading_value', 'reading_timestamp']
+        
+        return self._attach_sensors(sensors, readings, columns)
     
+    def get_data_watermark(self, plant_id=None):
+        """Return the highest reading id across the sensors a plot would include
+
+        Keyed on id rather than created_at so backfilled or late-ingested
+        readings with older timestamps also invalidate cached plots. Each
+        sensor's latest id is one backward dive into idx_sensor_id
+        (sensor_id, id) per partition, whatever the sensor's history.
+        """
+        query = """
+            SELECT MAX((SELECT r.id FROM readings r WHERE r.sensor_id = ps.sensor_id
+                        ORDER BY r.id DESC LIMIT 1))
+            FROM plant_sensors ps
+            JOIN plants p ON p.id = ps.plant_id
+            WHERE p.status = 'active'
+            """
+        condition, params = plant_filter(plant_id)
+        rows = self.db.execute_query(query + condition, params)
+        return str(rows[0][0]) if rows else None
+
+    def _cache_key(self, fmt, days, plant_id, max_points):
+        """Build the cache key for a render, or None when caching is disabled"""
+        if self.cache is None:
+            return None
+        return (fmt, plant_id, days, max_points, self.use_rollups, self.get_data_watermark(plant_id))
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def generate_plot(self, output_path='plots/sensor_readings.html', days=7, plant_id=None, return_components=False):
+    def generate_plot(self, output_path='plots/sensor_readings.html', days=7, plant_id=None, return_components=False,
+                      max_points=PLOT_WIDTH):
         """Generate an interactive plot of sensor readings by plant
         
         Args:
@@ -91,164 +624,34 @@ class PlotGenerator:
             days: Number of days of data to include
             plant_id: Optional plant ID to filter by (None = all plants)
             return_components: If True, return (script, div) tuple for embedding
+            max_points: Maximum time bins per series (None = raw readings)
         
         Returns:
             If return_components: (script, div) tuple
             Otherwise: True on success, False on failure
         """
+        cache_key = None
+        if return_components:
+            cache_key = self._cache_key('components', days, plant_id, max_points)
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return tuple(cached)
+        
         # Fetch data
-        df = self.get_sensor_data(days, plant_id)
+        df = self.get_sensor_data(days, plant_id, max_points=max_points)
         if df.empty:
             if return_components:
                 return None, None
             print("No data available for plotting")
             return False
         
-        # Create figure with larger size for better visibility
-        plot_title = f"Sensor Readings for {'Selected Plant' if plant_id else 'All Plants'}"
-        p = figure(
-            width=1000,
-            height=500,
-            x_axis_type="datetime",
-            title=plot_title,
-            tools="pan,box_zoom,wheel_zoom,reset,save,hover"
-        )
-        
-        # Add hover tool with plant information
-        hover = HoverTool(
-            tooltips=[
-                ('Plant', '@plant_name'),
-                ('Sensor', '@sensor_name'),
-                ('Type', '@sensor_type'),
-                ('Value', '@reading_value'),
-                ('Time', '@reading_timestamp{%Y-%m-%d %H:%M:%S}')
-            ],
-            formatters={
-                '@reading_timestamp': 'datetime'
-            }
-        )
-        p.add_tools(hover)
-        
-        # Configure axes
-        p.xaxis.formatter = DatetimeTickFormatter(
-            hours="%Y-%m-%d %H:%M",
-            days="%Y-%m-%d",
-            months="%Y-%m",
-            years="%Y"
-        )
-        p.xaxis.axis_label = 'Time'
-        p.yaxis.axis_label = 'Reading Value'
-        
-        # Color-blind friendly palette - base colors per sensor type
-        # Each sensor type has a distinct base color, with more variations for different plants
-        # Using Okabe-Ito inspired palette with more distinct shades
-        sensor_type_base_colors = {
-            'temperature': ['#0072B2', '#56B4E9', '#005F8C', '#0099CC', '#33B5E5'],      # Blues (5 shades)
-            'humidity': ['#009E73', '#66C2A5', '#007A5E', '#00C896', '#4DD4B0'],          # Greens (5 shades)
-            'moisture': ['#E69F00', '#F0A830', '#CC8F00', '#FFB84D', '#FFCC66'],          # Oranges (5 shades)
-            'light': ['#CC79A7', '#E78AC3', '#B36893', '#F5A9D0', '#DE9FC4'],             # Pinks (5 shades)
-            'ph': ['#56B4E9', '#7FC8E8', '#3DA5CC', '#99D9F5', '#B3E5F7'],                # Light blues (5 shades)
-            'conductivity': ['#D55E00', '#F0803D', '#B84D00', '#FF9933', '#FFB366'],      # Red-oranges (5 shades)
-            'pressure': ['#F0E442', '#F5EA6B', '#D4CC1A', '#FFF966', '#FFFD99'],          # Yellows (5 shades)
-            'co2': ['#000000', '#333333', '#666666', '#999999', '#CCCCCC']                 # Grays (5 shades)
-        }
-        
-        # Line dash patterns for additional distinction (colorblind-friendly)
-        # More patterns for better distinction - using Bokeh-compatible formats
-        line_dash_patterns = ['solid', 'dashed', 'dotted', 'dotdash', 'dashdot']
-        
-        # Fallback colors for unknown sensor types (ColorBrewer Set2)
-        fallback_colors = ['#66c2a5', '#fc8d62', '#8da0cb', '#e78ac3', '#a6d854', '#ffd92f', '#e5c494', '#b3b3b3']
-        fallback_index = 0
-        
-        # Track plant-sensor combinations for unique styling
-        plant_sensor_combinations = {}  # (plant_name, sensor_type) -> (color, dash_pattern)
-        sensor_type_plant_counts = {}  # sensor_type -> {plant_name: index}
-        
-        # Group by plant and sensor type, then plot
-        for (plant_name, sensor_type), group in df.groupby(['plant_name', 'sensor_type']):
-            sensor_type_lower = sensor_type.lower() if sensor_type else 'unknown'
-            
-            # Get or assign color and line style for this plant-sensor combination
-            if (plant_name, sensor_type_lower) in plant_sensor_combinations:
-                color, dash_pattern = plant_sensor_combinations[(plant_name, sensor_type_lower)]
-            else:
-                # Determine color based on sensor type and plant
-                if sensor_type_lower in sensor_type_base_colors:
-                    # Track which plant index this is for this sensor type
-                    if sensor_type_lower not in sensor_type_plant_counts:
-                        sensor_type_plant_counts[sensor_type_lower] = {}
-                    
-                    if plant_name not in sensor_type_plant_counts[sensor_type_lower]:
-                        plant_index = len(sensor_type_plant_counts[sensor_type_lower])
-                        sensor_type_plant_counts[sensor_type_lower][plant_name] = plant_index
-                    else:
-                        plant_index = sensor_type_plant_counts[sensor_type_lower][plant_name]
-                    
-                    # Get color from the palette for this sensor type
-                    color_palette = sensor_type_base_colors[sensor_type_lower]
-                    color = color_palette[plant_index % len(color_palette)]
-                    
-                    # Get line dash pattern for additional distinction
-                    dash_pattern = line_dash_patterns[plant_index % len(line_dash_patterns)]
-                else:
-                    # Unknown sensor type - use fallback
-                    color = fallback_colors[fallback_index % len(fallback_colors)]
-                    dash_pattern = 'solid'
-                    fallback_index += 1
-                
-                # Store this combination
-                plant_sensor_combinations[(plant_name, sensor_type_lower)] = (color, dash_pattern)
-            
-            source = ColumnDataSource(group)
-            
-            # Create legend label: "Plant - Sensor Type"
-            legend_label = f"{plant_name} - {sensor_type.title()}"
-            
-            # Plot line for this plant-sensor combination
-            line_glyph = p.line(
-                'reading_timestamp',
-                'reading_value',
-                line_color=color,
-                line_dash=dash_pattern,
-                legend_label=legend_label,
-                source=source,
-                line_width=2,
-                line_alpha=0.8
-            )
-            
-            # Add scatter points for better visibility
-            circle_glyph = p.circle(
-                'reading_timestamp',
-                'reading_value',
-                color=color,
-                legend_label=legend_label,
-                source=source,
-                size=4,
-                alpha=0.6
-            )
-        
-        # Configure legend - position it outside the plot area to avoid overlap
-        p.legend.click_policy = "hide"
-        p.legend.location = "bottom_left"  # Move to bottom left where data is less dense
-        p.legend.label_text_font_size = "9pt"  # Smaller font for compact legend
-        p.legend.background_fill_alpha = 0.9  # Slightly transparent so data shows through if needed
-        p.legend.border_line_color = "gray"
-        p.legend.border_line_width = 1
-        p.legend.spacing = 3  # Tighter spacing for compact legend
-        p.legend.padding = 8  # Less padding for compact legend
-        p.legend.glyph_width = 20  # Smaller glyph width
-        p.legend.glyph_height = 15  # Smaller glyph height
-        
-        # If we have many items, reduce font size even more
-        if len(plant_sensor_combinations) > 8:
-            p.legend.label_text_font_size = "8pt"
-            p.legend.spacing = 2
-            p.legend.padding = 6
+        p = build_figure(df, f"Sensor Readings for {'Selected Plant' if plant_id else 'All Plants'}")
         
         if return_components:
             # Return components for embedding in web page
             script, div = components(p)
+            if cache_key:
+                self.cache.set(cache_key, [script, div])
             return script, div
         else:
             # Save plot to file
@@ -256,15 +659,81 @@ class PlotGenerator:
             save(p)
             return True
     
-    def generate_plot_json(self, days=7, plant_id=None):
-        """Generate plot data as JSON for client-side rendering"""
-        df = self.get_sensor_data(days, plant_id)
+    def generate_plot_data(self, days=7, plant_id=None, max_points=PLOT_WIDTH):
+        """Generate columnar plot data (see build_plot_data) for client-side rendering"""
+        cache_key = self._cache_key('data', days, plant_id, max_points)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            return cached
+        
+        df = self.get_sensor_data(days, plant_id, max_points=max_points)
         if df.empty:
             return None
         
-        # Convert DataFrame to JSON format
-        df['reading_timestamp'] = df['reading_timestamp'].astype(str)
-        return df.to_json(orient='records', date_format='iso')
+        data = build_plot_data(df)
+        if cache_key:
+            self.cache.set(cache_key, data)
+        return data
+    
+    def generate_plot_json(self, days=7, plant_id=None, max_points=PLOT_WIDTH):
+        """Generate plot data as compact JSON for client-side rendering"""
+        data = self.generate_plot_data(days, plant_id, max_points=max_points)
+        if data is None:
+            return None
+        return json.dumps(data, separators=(',', ':'))
+    
+    def generate_plots(self, plant_ids='all', days=7, fmt='components', max_points=PLOT_WIDTH, workers=0):
+        """Render one plot per plant from a single sensor lookup and readings query
+        
+        The combined frame is split per plant with groupby indices, so each
+        plant costs a row selection rather than its own database round trip.
+        
+        Args:
+            plant_ids: List of plant IDs, or 'all' for every active plant
+            days: Number of days of data to include
+            fmt: 'components' for a (script, div) tuple per plant, 'json' for plot data
+            max_points: Maximum time bins per series (None = raw readings)
+            workers: Render components in a pool of this many processes
+                (0 or 1 = render in this process)
+        
+        Returns:
+            dict of plant_id -> components or plot data in plant ID order;
+            plants without readings are left out
+        """
+        if fmt not in ('components', 'json'):
+            raise ValueError("fmt must be 'components' or 'json'")
+        plant_id = None if plant_ids == 'all' else [int(p) for p in plant_ids]
+        if plant_id == []:
+            return {}
+        
+        cache_key = self._cache_key(f'{fmt}-batch', days, tuple(plant_id) if plant_id else None, max_points)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            # Stored as [plant_id, value] pairs so the disk backend keeps integer IDs
+            return {pid: tuple(value) if fmt == 'components' else value for pid, value in cached}
+        
+        df = self.get_sensor_data(days, plant_id, max_points=max_points)
+        if df.empty:
+            return {}
+        frames = {int(pid): df.take(index) for pid, index in df.groupby('plant_id', sort=True).indices.items()}
+        
+        if fmt == 'json':
+            plots = {pid: build_plot_data(frame) for pid, frame in frames.items()}
+        else:
+            titles = [f"Sensor Readings for {frame['plant_name'].iat[0]}" for frame in frames.values()]
+            if workers > 1 and len(frames) > 1:
+                from concurrent.futures import ProcessPoolExecutor
+                
+                with ProcessPoolExecutor(max_workers=min(workers, len(frames))) as pool:
+                    rendered = list(pool.map(render_components, frames.values(), titles))
+            else:
+                rendered = [render_components(frame, title) for frame, title in zip(frames.values(), titles)]
+            plots = dict(zip(frames, rendered))
+        
+        if cache_key:
+            self.cache.set(cache_key, [[pid, list(value) if fmt == 'components' else value]
+                                       for pid, value in plots.items()])
+        return plots
     
     def cleanup(self):
         """Clean up resources"""
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+EXPLAIN checks for the plot and summary queries.
+
+The plot queries are built by PlotGenerator.readings_query for the active
+plants' sensors, so the check follows any change to how they are written;
+the summary query is read from database/queries/summary.sql, the same file
+public/api/summary.php runs. Each one is run through EXPLAIN and fails if
+MySQL would read readings or a rollup table in full (access type ALL, or
+index for a scan of a whole index). Reads answered from the index alone are
+reported as covering. --check exits with status 1 on any failure, so CI can
+run it against a seeded schema.
+"""
+
+import os
+import re
+import sys
+import argparse
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+
+load_dotenv()
+
+# name: (use_rollups, bucket seconds) of each plot query variant; None is raw readings
+PLOT_QUERIES = {
+    'plot_raw': (False, None),
+    'plot_binned': (False, 300),
+    'plot_rollup': (True, 3600),
+    'plot_daily': (True, 86400),
+}
+
+# Tables too large to scan; r is the plot query's alias for readings
+LARGE_TABLES = {'readings', 'readings_hourly', 'readings_daily', 'r'}
+
+FULL_SCANS = {
+    'ALL': 'full table scan',
+    'index': 'full index scan',
+}
+
+# Same file as public/api/summary.php reads
+SUMMARY_SQL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'database', 'queries', 'summary.sql')
+
+
+def load_summary_query(days, path=SUMMARY_SQL_PATH):
+    """The summary query for all plants, with its :name placeholders as pyformat
+
+    Returns:
+        (query, params) where params is a dict keyed by placeholder name
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    names = re.findall(r':([a-z_]\w*)', sql)
+    query = re.sub(r':([a-z_]\w*)', r'%(\1)s', sql.replace('%', '%%')) + "GROUP BY s.type\n"
+    return query, {name: days for name in names}
+
+
+def _plan_rows(plan):
+    """EXPLAIN rows as dicts, skipping rows without a table (e.g. Impossible WHERE)"""
+    if plan is None or plan.empty or 'table' not in plan:
+        return []
+    rows = plan.astype(object).where(plan.notna(), None).to_dict('records')
+    return [row for row in rows if row.get('table')]
+
+
+def plan_problems(plan):
+    """Full scans of large tables in an EXPLAIN result
+
+    Args:
+        plan: DataFrame of EXPLAIN output
+
+    Returns:
+        List of problem descriptions; empty if the plan is acceptable
+    """
+    problems = []
+    for row in _plan_rows(plan):
+        table = row['table']
+        if table in LARGE_TABLES and row.get('type') in FULL_SCANS:
+            problems.append(f"{table}: {FULL_SCANS[row['type']]}")
+    return problems
+
+
+def describe_access(plan):
+    """One 'table type key [covering] [filesort]' entry per large table in the plan"""
+    accesses = []
+    for row in _plan_rows(plan):
+        if row['table'] not in LARGE_TABLES:
+            continue
+        extra = [part.strip() for part in (row.get('Extra') or '').split(';')]
+        notes = [row.get('type') or '?', row.get('key') or 'no index']
+        if 'Using index' in extra or 'Using index for group-by' in extra:
+            notes.append('covering')
+        if 'Using filesort' in extra:
+            notes.append('filesort')
+        accesses.append(f"{row['table']} {' '.join(notes)}")
+    return accesses
+
+
+class QueryPlanChecker:
+    """Explain the plot and summary queries and flag full scans"""
+
+    def __init__(self, db=None):
+        """Initialize the checker
+
+        Args:
+            db: DBConnect to use (defaults to a pooled connection)
+        """
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+
+    def _plot_generator(self, use_rollups):
+        """A PlotGenerator on this checker's connection, without cache or store"""
+        from python.ProducePlot import PlotGenerator
+
+        return PlotGenerator(use_rollups=use_rollups, db=self.db)
+
+    def plan_queries(self, days=30):
+        """The plot and summary queries over the last days, as (name, query, params, start, end)"""
+        sensors = self._plot_generator(False).get_plot_sensors()
+        sensor_ids = [int(sensor_id) for sensor_id in sensors['sensor_id'].unique()] if not sensors.empty else []
+        # With no sensors yet, explain with an id that matches nothing
+        sensor_ids = sensor_ids or [0]
+
+        end = datetime.now()
+        start = end - timedelta(days=days)
+        checks = []
+        for name, (use_rollups, bucket_seconds) in PLOT_QUERIES.items():
+            max_points = days * 86400 // bucket_seconds if bucket_seconds else None
+            query, params, _ = self._plot_generator(use_rollups).readings_query(sensor_ids, start, end, max_points)
+            checks.append((name, query, params, start, end))
+        summary_query, summary_params = load_summary_query(days)
+        checks.append(('summary', summary_query, summary_params, start, end))
+        return checks
+
+    def explain(self, query, params=None):
+        """EXPLAIN output of query as a DataFrame"""
+        return self.db.query_to_dataframe("EXPLAIN " + query, params=params)
+
+    def check(self, days=30):
+        """Explain every plot and summary query
+
+        Returns:
+            List of (name, problems, accesses) where problems is empty for a
+            good plan and accesses describes how each large table is read
+        """
+        results = []
+        for name, query, params, _, _ in self.plan_queries(days):
+            plan = self.explain(query, params)
+            results.append((name, plan_problems(plan), describe_access(plan)))
+        return results
+
+    def cleanup(self):
+        """Clean up resources"""
+        if self.db:
+            self.db.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN the plot and summary queries and report full scans')
+    parser.add_argument('--days', type=int, default=30, help='Window of the queries to explain (default: 30)')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with status 1 if any query falls back to a full scan')
+    args = parser.parse_args()
+
+    checker = None
+    failed = []
+    try:
+        checker = QueryPlanChecker()
+        for name, problems, accesses in checker.check(args.days):
+            print(f"{'FAIL' if problems else 'OK  '} {name}: {'; '.join(accesses) or 'no table access'}")
+            for problem in problems:
+                print(f"       {problem}")
+            if problems:
+                failed.append(name)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        if checker:
+            checker.cleanup()
+    if args.check and failed:
+        print(f"Error: full scans in {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
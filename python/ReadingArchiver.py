@@ -0,0 +1,440 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Cold storage for expired readings.
+
+A month (or any date range, or a readings_archive_YYYYMM table left by
+ReadingPartitions.py --archive) is streamed out of MySQL chunk by chunk
+into a zstd-compressed Parquet file, one row group per chunk, so memory
+stays constant whatever the range holds. The file and a JSON manifest
+(range, row count, size, SHA-256) are uploaded through FTPConnect, and
+the source rows are only removed once the remote size and checksum match
+the local file and the row count still matches the database. The loader
+finds archives overlapping a date range from their manifests and streams
+them back as DataFrames, or re-inserts them into a table.
+"""
+
+import os
+import sys
+import json
+import ftplib
+import hashlib
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+from python.FTPConnectMod import FTPConnect
+from python.ReadingPartitions import (
+    TABLE, add_months, month_start, partition_name, ReadingPartitionManager
+)
+
+load_dotenv()
+
+DEFAULT_REMOTE_DIR = os.getenv('FTP_ARCHIVE_DIR') or 'readings_archive'
+
+ARCHIVE_SCHEMA = pa.schema([
+    ('id', pa.uint32()),
+    ('sensor_id', pa.uint32()),
+    ('value', pa.decimal128(10, 2)),
+    ('unit', pa.string()),
+    ('temperature', pa.decimal128(4, 1)),
+    ('humidity', pa.decimal128(4, 1)),
+    ('created_at', pa.timestamp('s')),
+])
+
+COLUMNS = ", ".join(ARCHIVE_SCHEMA.names)
+
+
+class ArchiveVerificationError(Exception):
+    """Raised when an uploaded archive does not match what was written"""
+
+
+def file_digest(path, block_size=1 << 20):
+    """Return (size, sha256 hex digest) of a local file, read in blocks"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+def archive_name(start, end):
+    """Base name of the archive covering [start, end)"""
+    return f"readings_{start:%Y%m%d%H%M%S}_{end:%Y%m%d%H%M%S}"
+
+
+class ReadingArchiver:
+    """Move readings to Parquet files on the FTP server and bring them back"""
+
+    def __init__(self, db=None, ftp=None, remote_dir=DEFAULT_REMOTE_DIR, work_dir=None,
+                 chunk_size=None, compression='zstd'):
+        """Initialize the archiver
+
+        Args:
+            db: DBConnect to use (defaults to a pooled connection)
+            ftp: FTPConnect to upload through (defaults to FTP_HOST from the environment)
+            remote_dir: Directory on the FTP server holding the archives
+            work_dir: Local directory for files in transit (defaults to a temp directory)
+            chunk_size: Rows streamed per chunk / Parquet row group (default DB_CHUNK_SIZE)
+            compression: Parquet compression codec
+        """
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+        self.ftp = ftp or FTPConnect()
+        self.remote_dir = remote_dir.rstrip('/')
+        self.work_dir = work_dir or tempfile.gettempdir()
+        self.chunk_size = chunk_size
+        self.compression = compression
+
+    def _remote(self, name):
+        return f"{self.remote_dir}/{name}"
+
+    def ensure_remote_dir(self):
+        """Create the remote archive directory (and parents) if needed"""
+        self.ftp.connect()
+        path = '/' if self.remote_dir.startswith('/') else ''
+        for part in filter(None, self.remote_dir.split('/')):
+            path = f"{path}{part}"
+            try:
+                self.ftp.ftp.mkd(path)
+            except ftplib.error_perm:
+                # Already exists; a real problem shows up on upload
+                pass
+            path += '/'
+
+    def write_parquet(self, query, params, path):
+        """Stream a query into a Parquet file, one row group per chunk
+
+        Returns:
+            (rows, min id, max id)
+        """
+        rows, min_id, max_id = 0, None, None
+        with pq.ParquetWriter(path, ARCHIVE_SCHEMA, compression=self.compression) as writer:
+            for chunk in self.db.iter_dataframes(query, params, chunk_size=self.chunk_size, compact=False):
+                table = pa.Table.from_pandas(chunk[ARCHIVE_SCHEMA.names], schema=ARCHIVE_SCHEMA,
+                                             preserve_index=False, safe=False)
+                writer.write_table(table)
+                rows += table.num_rows
+                ids = chunk['id']
+                min_id = int(ids.min()) if min_id is None else min(min_id, int(ids.min()))
+                max_id = int(ids.max()) if max_id is None else max(max_id, int(ids.max()))
+        return rows, min_id, max_id
+
+    def upload(self, path, manifest):
+        """Upload an archive and its manifest, then check the remote copy
+
+        Raises:
+            ArchiveVerificationError: if the remote size or checksum differs
+        """
+        remote = self._remote(manifest['file'])
+        self.ensure_remote_dir()
+        self.ftp.upload_file(path, remote)
+        remote_size = self.ftp.file_size(remote)
+        if remote_size != manifest['bytes']:
+            raise ArchiveVerificationError(
+                f"{remote}: uploaded {remote_size} bytes, expected {manifest['bytes']}")
+        remote_sha = self.ftp.file_checksum(remote)
+        if remote_sha != manifest['sha256']:
+            raise ArchiveVerificationError(f"{remote}: checksum mismatch after upload")
+
+        manifest_path = path + '.json'
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            self.ftp.upload_file(manifest_path, remote + '.json')
+        finally:
+            os.remove(manifest_path)
+        return remote
+
+    def archive(self, query, params, start, end, source):
+        """Write, upload and verify one archive
+
+        Returns:
+            The manifest, or None if the source holds no readings
+        """
+        name = archive_name(start, end)
+        path = os.path.join(self.work_dir, name + '.parquet')
+        try:
+            rows, min_id, max_id = self.write_parquet(query, params, path)
+            if not rows:
+                return None
+            size, sha256 = file_digest(path)
+            manifest = {
+                'file': name + '.parquet',
+                'source': source,
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'rows': rows,
+                'min_id': min_id,
+                'max_id': max_id,
+                'bytes': size,
+                'sha256': sha256,
+                'archived_at': datetime.now().isoformat(),
+            }
+            self.upload(path, manifest)
+            return manifest
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _count(self, query, params):
+        rows = self.db.execute_query(query, params)
+        return int(rows[0][0]) if rows else 0
+
+    def _delete_range(self, start, end, max_id, batch_size=10000):
+        """Delete archived readings in short batches so no long lock is held"""
+        deleted = 0
+        while True:
+            with self.db.transaction() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {TABLE} WHERE created_at >= %s AND created_at < %s AND id <= %s LIMIT %s",
+                    (start, end, max_id, batch_size)
+                )
+                count = cursor.rowcount
+            deleted += count
+            if count < batch_size:
+                return deleted
+
+    def archive_range(self, start, end, delete=True):
+        """Archive readings with start <= created_at < end
+
+        Whole months of a partitioned table are removed by dropping their
+        partition; other ranges are deleted in batches.
+
+        Returns:
+            The manifest, or None if there was nothing to archive
+        """
+        query = f"SELECT {COLUMNS} FROM {TABLE} WHERE created_at >= %s AND created_at < %s ORDER BY id"
+        manifest = self.archive(query, (start, end), start, end, TABLE)
+        if manifest is None or not delete:
+            return manifest
+
+        count_sql = f"SELECT COUNT(*) FROM {TABLE} WHERE created_at >= %s AND created_at < %s"
+        if self._count(count_sql + " AND id <= %s", (start, end, manifest['max_id'])) != manifest['rows']:
+            raise ArchiveVerificationError(
+                f"{manifest['file']}: readings changed while archiving; nothing deleted")
+
+        partitions = ReadingPartitionManager(db=self.db)
+        month = month_start(start)
+        whole_month = (datetime.combine(month, datetime.min.time()) == start
+                       and datetime.combine(add_months(month, 1), datetime.min.time()) == end)
+        if (whole_month and month in partitions.monthly_partitions()
+                and self._count(count_sql, (start, end)) == manifest['rows']):
+            self.db.execute_query(f"ALTER TABLE {TABLE} DROP PARTITION {partition_name(month)}")
+        else:
+            self._delete_range(start, end, manifest['max_id'])
+        return manifest
+
+    def archive_month(self, month, delete=True):
+        """Archive the calendar month starting at month (a date)"""
+        month = month_start(month)
+        start = datetime.combine(month, datetime.min.time())
+        end = datetime.combine(add_months(month, 1), datetime.min.time())
+        return self.archive_range(start, end, delete)
+
+    def archive_table(self, table, delete=True):
+        """Archive a readings_archive_YYYYMM table and drop it once verified"""
+        bounds = self.db.execute_query(f"SELECT MIN(created_at), MAX(created_at) FROM {table}")
+        if not bounds or bounds[0][0] is None:
+            if delete:
+                self.db.execute_query(f"DROP TABLE {table}")
+            return None
+        month = month_start(bounds[0][0])
+        start = datetime.combine(month, datetime.min.time())
+        end = datetime.combine(add_months(month, 1), datetime.min.time())
+        if bounds[0][1] >= end:
+            end = bounds[0][1] + timedelta(seconds=1)
+        manifest = self.archive(f"SELECT {COLUMNS} FROM {table} ORDER BY id", None, start, end, table)
+        if delete:
+            if self._count(f"SELECT COUNT(*) FROM {table}", None) != manifest['rows']:
+                raise ArchiveVerificationError(f"{table} changed while archiving; not dropped")
+            self.db.execute_query(f"DROP TABLE {table}")
+        return manifest
+
+    def archive_tables(self, delete=True):
+        """Archive every readings_archive_* table
+
+        Returns:
+            List of manifests
+        """
+        tables = self.db.execute_query(
+            """
+            SELECT TABLE_NAME FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME LIKE 'readings\\_archive\\_%'
+            ORDER BY TABLE_NAME
+            """
+        )
+        return [manifest for (table,) in tables
+                if (manifest := self.archive_table(table, delete)) is not None]
+
+    def verified_month(self, month):
+        """Whether every reading of a calendar month is held by a verified archive
+
+        True for an empty month, or when an archive of exactly that month is
+        on the server at its manifest's size and the table holds no reading
+        the archive lacks. ReadingPartitions.py only drops a month then.
+        """
+        month = month_start(month)
+        start = datetime.combine(month, datetime.min.time())
+        end = datetime.combine(add_months(month, 1), datetime.min.time())
+        count, max_id = self.db.execute_query(
+            f"SELECT COUNT(*), MAX(id) FROM {TABLE} WHERE created_at >= %s AND created_at < %s", (start, end)
+        )[0]
+        if not count:
+            return True
+        # Before the first archive the directory may not exist yet
+        self.ensure_remote_dir()
+        for manifest in self.list_archives():
+            if (manifest['source'] == TABLE and manifest['start'] == start.isoformat()
+                    and manifest['end'] == end.isoformat() and manifest['rows'] == count
+                    and max_id <= manifest['max_id']
+                    and self.ftp.file_size(self._remote(manifest['file'])) == manifest['bytes']):
+                return True
+        return False
+
+    def list_archives(self):
+        """Manifests of the archives on the FTP server, oldest first"""
+        manifests = []
+        for entry in self.ftp.list_directory(self.remote_dir):
+            name = entry.rsplit('/', 1)[-1]
+            if not name.endswith('.parquet.json'):
+                continue
+            manifests.append(json.load(self.ftp.retrieve_file(self._remote(name))))
+        return sorted(manifests, key=lambda manifest: manifest['start'])
+
+    def iter_range(self, start, end, sensor_ids=None, batch_size=65536):
+        """Stream archived readings with start <= created_at < end as DataFrames
+
+        Each overlapping archive is downloaded to the work directory, checked
+        against its manifest and read one batch at a time.
+        """
+        for manifest in self.list_archives():
+            if (datetime.fromisoformat(manifest['end']) <= start
+                    or datetime.fromisoformat(manifest['start']) >= end):
+                continue
+            path = os.path.join(self.work_dir, manifest['file'])
+            try:
+                self.ftp.download_file(self._remote(manifest['file']), path)
+                if file_digest(path) != (manifest['bytes'], manifest['sha256']):
+                    raise ArchiveVerificationError(f"{manifest['file']}: download does not match its manifest")
+                for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+                    df = batch.to_pandas()
+                    mask = (df['created_at'] >= start) & (df['created_at'] < end)
+                    if sensor_ids is not None:
+                        mask &= df['sensor_id'].isin(sensor_ids)
+                    if mask.any():
+                        yield df[mask].reset_index(drop=True)
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def load_range(self, start, end, sensor_ids=None):
+        """Archived readings with start <= created_at < end as one DataFrame"""
+        frames = list(self.iter_range(start, end, sensor_ids))
+        if not frames:
+            return ARCHIVE_SCHEMA.empty_table().to_pandas()
+        return pd.concat(frames, ignore_index=True)
+
+    def restore_range(self, start, end, table=TABLE):
+        """Re-insert archived readings into table, skipping rows already present
+
+        A partitioned readings table needs partitions covering the range
+        first; restoring into a separate table avoids that.
+
+        Returns:
+            Number of rows sent
+        """
+        query = f"INSERT IGNORE INTO {table} ({COLUMNS}) VALUES ({', '.join(['%s'] * len(ARCHIVE_SCHEMA))})"
+        restored = 0
+        for df in self.iter_range(start, end):
+            created = df.pop('created_at').dt.to_pydatetime()
+            df = df.astype(object).where(df.notna(), None)
+            rows = [row + (stamp,) for row, stamp in zip(df.itertuples(index=False, name=None), created)]
+            self.db.execute_many(query, rows)
+            restored += len(rows)
+        return restored
+
+    def cleanup(self):
+        """Clean up resources"""
+        self.ftp.disconnect()
+        if self.db:
+            self.db.disconnect()
+
+def parse_month(value):
+    """Parse YYYY-MM into the first day of that month"""
+    return datetime.strptime(value, '%Y-%m').date()
+
+def main():
+    retention = os.getenv('READINGS_RETENTION_MONTHS')
+    parser = argparse.ArgumentParser(description='Archive readings to FTP cold storage and load them back')
+    parser.add_argument('--month', type=parse_month, action='append', default=[],
+                        help='Archive a calendar month (YYYY-MM); repeatable')
+    parser.add_argument('--start', type=datetime.fromisoformat, help='Start of a range (inclusive)')
+    parser.add_argument('--end', type=datetime.fromisoformat, help='End of a range (exclusive)')
+    parser.add_argument('--retention-months', type=int, default=int(retention) if retention else 0,
+                        help='Archive every monthly partition older than this (default: READINGS_RETENTION_MONTHS or 0, off)')
+    parser.add_argument('--tables', action='store_true',
+                        help='Archive readings_archive_* tables left by ReadingPartitions.py --archive')
+    parser.add_argument('--keep', action='store_true',
+                        help='Upload and verify, but do not delete the source readings')
+    parser.add_argument('--load', action='store_true',
+                        help='Load --start..--end back from the archives instead of archiving')
+    parser.add_argument('--output', help='With --load, write the readings to this CSV file')
+    parser.add_argument('--restore-table',
+                        help='With --load, insert the readings into this table')
+    args = parser.parse_args()
+
+    archiver = ReadingArchiver()
+    try:
+        if args.load:
+            if not (args.start and args.end):
+                parser.error('--load needs --start and --end')
+            if args.restore_table:
+                restored = archiver.restore_range(args.start, args.end, args.restore_table)
+                print(f"Restored {restored} readings into {args.restore_table}")
+            else:
+                df = archiver.load_range(args.start, args.end)
+                if args.output:
+                    df.to_csv(args.output, index=False)
+                    print(f"Wrote {len(df)} readings to {args.output}")
+                else:
+                    print(df.to_string(index=False))
+            return
+
+        manifests = []
+        months = list(args.month)
+        if args.retention_months > 0:
+            manager = ReadingPartitionManager(db=archiver.db)
+            cutoff = add_months(month_start(date.today()), -args.retention_months)
+            months += [month for month in manager.monthly_partitions() if month < cutoff]
+        for month in months:
+            manifests.append(archiver.archive_month(month, delete=not args.keep))
+        if args.start and args.end:
+            manifests.append(archiver.archive_range(args.start, args.end, delete=not args.keep))
+        if args.tables:
+            manifests.extend(archiver.archive_tables(delete=not args.keep))
+        for manifest in filter(None, manifests):
+            print(f"{datetime.now().isoformat()} Archived {manifest['rows']} readings "
+                  f"({manifest['bytes']} bytes) to {archiver.remote_dir}/{manifest['file']}")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        archiver.cleanup()
+
+if __name__ == '__main__':
+    main()
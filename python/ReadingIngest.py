@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+High-throughput ingestion of sensor readings.
+
+Readings are buffered and written in micro-batches: each batch is a single
+transaction made of chunked multi-row INSERTs plus one set-based UPDATE of
+sensors.last_reading/last_reading_time. Large CSV backfills go through
+LOAD DATA LOCAL INFILE instead, and CSVs streamed from the FTP host are
+inserted chunk by chunk as they download.
+"""
+
+import io
+import os
+import csv
+import sys
+import argparse
+import threading
+from time import monotonic
+from datetime import datetime
+from collections import namedtuple
+import mysql.connector
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+from python.FTPConnectMod import FTPConnect
+
+load_dotenv()
+
+Reading = namedtuple('Reading', ['sensor_id', 'value', 'unit', 'created_at', 'temperature', 'humidity'])
+
+READING_COLUMNS = "(sensor_id, value, unit, created_at, temperature, humidity)"
+
+UPDATE_LAST_READING_SQL = """
+UPDATE sensors s
+JOIN ({latest}) latest ON latest.sensor_id = s.id
+SET s.last_reading = latest.value,
+    s.last_reading_time = latest.reading_time
+WHERE s.last_reading_time IS NULL OR s.last_reading_time <= latest.reading_time
+"""
+
+UPDATE_LAST_READING_SINCE_SQL = """
+UPDATE sensors s
+JOIN (
+    SELECT r.sensor_id, r.value, r.created_at AS reading_time
+    FROM readings r
+    JOIN (
+        SELECT sensor_id, MAX(id) AS max_id FROM readings
+        WHERE id > %s
+        GROUP BY sensor_id
+    ) newest ON newest.max_id = r.id
+) latest ON latest.sensor_id = s.id
+SET s.last_reading = latest.value,
+    s.last_reading_time = latest.reading_time
+WHERE s.last_reading_time IS NULL OR s.last_reading_time <= latest.reading_time
+"""
+
+
+def build_insert(readings):
+    """Build one multi-row INSERT for a chunk of readings
+
+    Returns (query, params).
+    """
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(readings))
+    query = f"INSERT INTO readings {READING_COLUMNS} VALUES {placeholders}"
+    params = []
+    for reading in readings:
+        params.extend(reading)
+    return query, params
+
+
+def build_last_reading_update(readings):
+    """Build the set-based sensors.last_reading update for a batch
+
+    Only the newest reading of each sensor in the batch is used. Returns
+    (query, params).
+    """
+    latest = {}
+    for reading in readings:
+        current = latest.get(reading.sensor_id)
+        if current is None or reading.created_at >= current.created_at:
+            latest[reading.sensor_id] = reading
+
+    rows = " UNION ALL ".join(
+        ["SELECT %s AS sensor_id, %s AS value, %s AS reading_time"]
+        + ["SELECT %s, %s, %s"] * (len(latest) - 1)
+    )
+    params = []
+    for reading in latest.values():
+        params.extend((reading.sensor_id, reading.value, reading.created_at))
+    return UPDATE_LAST_READING_SQL.format(latest=rows), params
+
+
+class ReadingIngestor:
+    """Buffer sensor readings and write them to the database in batches"""
+
+    def __init__(self, db=None, batch_size=500, flush_interval=5.0, chunk_size=1000, auto_flush=True):
+        """Initialize the ingestor
+
+        Args:
+            db: DBConnect to write through (defaults to a pooled connection)
+            batch_size: Flush once this many readings are buffered
+            flush_interval: Flush once the oldest buffered reading is this many seconds old
+            chunk_size: Maximum rows per multi-row INSERT statement
+            auto_flush: Start a background thread on the first buffered reading
+                that flushes once flush_interval has passed, so a partial batch
+                is written even if no more readings arrive. Callers that poll
+                flush_if_due themselves (SensorGateway) can turn it off.
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.chunk_size = chunk_size
+        self.auto_flush = auto_flush
+        self._stop = threading.Event()
+        self._timer = None
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Number of buffered readings not yet written"""
+        return len(self._buffer)
+
+    def append(self, sensor_id, value, unit='percentage', created_at=None, temperature=None, humidity=None):
+        """Buffer one reading without writing it
+
+        Returns:
+            True when the buffer has reached batch_size or flush_interval
+        """
+        reading = Reading(int(sensor_id), value, unit, created_at or datetime.now(), temperature, humidity)
+        with self._lock:
+            if not self._buffer:
+                self._oldest = monotonic()
+            self._buffer.append(reading)
+            if self.auto_flush and self._timer is None and not self._stop.is_set():
+                self._timer = threading.Thread(target=self._flush_loop, name='reading-flush', daemon=True)
+                self._timer.start()
+            return self._due()
+
+    def _flush_loop(self):
+        """Background thread: flush each batch once its oldest reading is flush_interval old"""
+        while True:
+            with self._lock:
+                wait = (self._oldest + self.flush_interval - monotonic()) if self._buffer else self.flush_interval
+            if self._stop.wait(max(wait, 0)):
+                return
+            try:
+                self.flush_if_due()
+            except Exception as e:
+                # The readings stay buffered; try again after another interval
+                print(f"Background flush error: {e}")
+                if self._stop.wait(self.flush_interval):
+                    return
+
+    def add(self, sensor_id, value, unit='percentage', created_at=None, temperature=None, humidity=None):
+        """Buffer one reading, flushing if the size or time limit is reached
+
+        Returns:
+            Number of readings written by this call (0 if only buffered)
+        """
+        if self.append(sensor_id, value, unit, created_at, temperature, humidity):
+            return self.flush()
+        return 0
+
+    def _due(self):
+        """Whether the buffer should be flushed (lock held)"""
+        if not self._buffer:
+            return False
+        return (len(self._buffer) >= self.batch_size
+                or monotonic() - self._oldest >= self.flush_interval)
+
+    def flush_if_due(self):
+        """Flush when the batch is full or the oldest reading has waited flush_interval seconds"""
+        with self._lock:
+            due = self._due()
+        return self.flush() if due else 0
+
+    def flush(self):
+        """Write all buffered readings as one transaction
+
+        On failure the readings are put back in the buffer and the error is raised.
+
+        Returns:
+            Number of readings written
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            oldest, self._oldest = self._oldest, None
+        if not batch:
+            return 0
+        try:
+            self.insert_batch(batch)
+        except Exception:
+            with self._lock:
+                self._buffer = batch + self._buffer
+                self._oldest = oldest
+            raise
+        return len(batch)
+
+    def insert_batch(self, readings):
+        """Insert readings and update sensors.last_reading in a single transaction"""
+        readings = list(readings)
+        if not readings:
+            return 0
+        with self.db.transaction() as cursor:
+            for start in range(0, len(readings), self.chunk_size):
+                query, params = build_insert(readings[start:start + self.chunk_size])
+                cursor.execute(query, params)
+            query, params = build_last_reading_update(readings)
+            cursor.execute(query, params)
+        return len(readings)
+
+    def load_file(self, path):
+        """Backfill readings from a CSV file with LOAD DATA LOCAL INFILE
+
+        The file must have a header row and the columns
+        sensor_id,value,unit,created_at,temperature,humidity (empty strings
+        are stored as NULL, and an empty created_at as the load time).
+
+        Returns:
+            Number of rows loaded
+        """
+        path = os.path.abspath(path)
+        conn = mysql.connector.connect(
+            host=self.db.host,
+            user=self.db.user,
+            password=self.db.password,
+            database=self.db.database,
+            allow_local_infile=True,
+            allow_local_infile_in_path=os.path.dirname(path)
+        )
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM readings")
+            before_id = cursor.fetchone()[0]
+            cursor.execute(
+                """
+                LOAD DATA LOCAL INFILE %s INTO TABLE readings
+                FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+                LINES TERMINATED BY '\\n'
+                IGNORE 1 LINES
+                (sensor_id, value, unit, @created_at, @temperature, @humidity)
+                SET created_at = COALESCE(NULLIF(@created_at, ''), NOW()),
+                    temperature = NULLIF(@temperature, ''),
+                    humidity = NULLIF(@humidity, '')
+                """,
+                (path,)
+            )
+            loaded = cursor.rowcount
+            cursor.execute(UPDATE_LAST_READING_SINCE_SQL, (before_id,))
+            conn.commit()
+            return loaded
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def ingest_csv(self, stream):
+        """Insert readings from a CSV file object as it is read
+
+        Takes the same columns as load_file and writes one transaction per
+        batch_size rows, so a CSV streamed from FTP (FTPConnect.stream_file)
+        is loaded with memory bounded by the batch size whatever its length.
+
+        Args:
+            stream: Binary or text file object
+
+        Returns:
+            Number of rows inserted
+        """
+        if not isinstance(stream, io.TextIOBase):
+            stream = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        loaded = 0
+        batch = []
+        for row in csv.DictReader(stream):
+            batch.append(Reading(
+                int(row['sensor_id']), row['value'], row.get('unit') or 'percentage',
+                datetime.fromisoformat(row['created_at']) if row.get('created_at') else datetime.now(),
+                row.get('temperature') or None, row.get('humidity') or None
+            ))
+            if len(batch) >= self.batch_size:
+                loaded += self.insert_batch(batch)
+                batch = []
+        return loaded + self.insert_batch(batch)
+
+    def close(self):
+        """Stop the flush thread, flush any buffered readings and release the connection"""
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+        try:
+            self.flush()
+        finally:
+            self.db.disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load sensor readings')
+    parser.add_argument('csv_file', help='CSV with sensor_id,value,unit,created_at,temperature,humidity')
+    parser.add_argument('--ftp', action='store_true',
+                        help='csv_file is on the FTP server; stream it (.gz/.bz2/.xz are decompressed)')
+    args = parser.parse_args()
+
+    ingestor = ReadingIngestor()
+    try:
+        if args.ftp:
+            with FTPConnect() as ftp, ftp.stream_file(args.csv_file, decompress='auto') as stream:
+                loaded = ingestor.ingest_csv(stream)
+        else:
+            loaded = ingestor.load_file(args.csv_file)
+        print(f"Loaded {loaded} readings from {args.csv_file}")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        ingestor.close()
+
+if __name__ == '__main__':
+    main()
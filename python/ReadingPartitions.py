@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Monthly RANGE partitioning for the readings table.
+
+readings is partitioned on UNIX_TIMESTAMP(created_at), one partition per
+month named pYYYYMM plus a catch-all p_future. This tool converts the table
+(--migrate), keeps empty partitions created a few months ahead, and expires
+old months by exchanging their partition into a standalone
+readings_archive_YYYYMM table (--archive) or, without it, by dropping only
+months that already have a verified cold-storage copy. Both are
+metadata operations that take the same time whatever the month holds,
+unlike DELETE. --verify runs EXPLAIN on the plot and summary queries and
+checks they only touch the partitions of their time window.
+
+MySQL requires the partitioning column in every unique key and does not
+allow foreign keys on partitioned tables, so the migration makes the primary
+key (id, created_at) and drops readings' foreign key to sensors.
+"""
+
+import os
+import re
+import sys
+import argparse
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+
+load_dotenv()
+
+TABLE = 'readings'
+FUTURE_PARTITION = 'p_future'
+PARTITION_PATTERN = re.compile(r'^p(\d{4})(\d{2})$')
+
+PARTITIONS_SQL = """
+SELECT PARTITION_NAME, TABLE_ROWS
+FROM information_schema.PARTITIONS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+ORDER BY PARTITION_ORDINAL_POSITION
+"""
+
+def month_start(value):
+    """First day of value's month"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    """Shift a first-of-month date by count months"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Partition holding the month starting at month"""
+    return f"p{month.year:04d}{month.month:02d}"
+
+
+def partition_month(name):
+    """Month a pYYYYMM partition holds, or None for other partitions"""
+    match = PARTITION_PATTERN.match(name or '')
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def partition_clause(month):
+    """PARTITION definition for the month starting at month
+
+    Boundaries are evaluated by MySQL in the session time zone, the same way
+    created_at literals in queries are.
+    """
+    return (f"PARTITION {partition_name(month)} VALUES LESS THAN "
+            f"(UNIX_TIMESTAMP('{add_months(month, 1).isoformat()} 00:00:00'))")
+
+
+def expected_partitions(start, end):
+    """Names of the monthly partitions covering start..end"""
+    names = []
+    month = month_start(start)
+    while month <= month_start(end):
+        names.append(partition_name(month))
+        month = add_months(month, 1)
+    return names
+
+
+class ReadingPartitionManager:
+    """Create, expire and verify monthly partitions of readings"""
+
+    def __init__(self, db=None):
+        """Initialize the manager
+
+        Args:
+            db: DBConnect to use (defaults to a pooled connection)
+        """
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+
+    def list_partitions(self):
+        """(name, approximate rows) of readings' partitions, oldest first
+
+        Returns an empty list if the table is not partitioned.
+        """
+        rows = self.db.execute_query(PARTITIONS_SQL, (TABLE,))
+        return [(name, int(table_rows or 0)) for name, table_rows in rows if name]
+
+    def monthly_partitions(self):
+        """Months with their own partition, oldest first"""
+        months = (partition_month(name) for name, _ in self.list_partitions())
+        return [month for month in months if month]
+
+    def migrate(self, months_ahead=3, today=None):
+        """Convert an unpartitioned readings table to monthly partitions
+
+        Rewrites the table once, with one partition per month from the oldest
+        reading up to months_ahead months from today.
+
+        Returns:
+            Number of monthly partitions created
+        """
+        if self.list_partitions():
+            return 0
+        today = today or date.today()
+        rows = self.db.execute_query(f"SELECT MIN(created_at) FROM {TABLE}")
+        oldest = rows[0][0] if rows and rows[0][0] else today
+        months = []
+        month = month_start(oldest)
+        while month <= add_months(month_start(today), months_ahead):
+            months.append(month)
+            month = add_months(month, 1)
+
+        foreign_keys = self.db.execute_query(
+            """
+            SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+            """,
+            (TABLE,)
+        )
+        for (constraint,) in foreign_keys:
+            self.db.execute_query(f"ALTER TABLE {TABLE} DROP FOREIGN KEY {constraint}")
+        self.db.execute_query(
+            f"""
+            ALTER TABLE {TABLE}
+                MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                DROP PRIMARY KEY,
+                ADD PRIMARY KEY (id, created_at)
+            """
+        )
+        definitions = [partition_clause(month) for month in months]
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+        self.db.execute_query(
+            f"ALTER TABLE {TABLE} PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (\n    "
+            + ",\n    ".join(definitions) + "\n)"
+        )
+        return len(months)
+
+    def ensure_future(self, months_ahead=3, today=None):
+        """Split empty monthly partitions off p_future up to months_ahead ahead
+
+        Returns:
+            Names of the partitions created
+        """
+        if not self.list_partitions():
+            raise RuntimeError(f"{TABLE} is not partitioned; run with --migrate first")
+        today = today or date.today()
+        months = self.monthly_partitions()
+        if months:
+            month = add_months(months[-1], 1)
+        else:
+            # Only p_future so far (fresh schema): start from the oldest row it holds
+            rows = self.db.execute_query(f"SELECT MIN(created_at) FROM {TABLE}")
+            month = month_start(rows[0][0] if rows and rows[0][0] else today)
+        new = []
+        while month <= add_months(month_start(today), months_ahead):
+            new.append(month)
+            month = add_months(month, 1)
+        if not new:
+            return []
+        definitions = [partition_clause(month) for month in new]
+        definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+        self.db.execute_query(
+            f"ALTER TABLE {TABLE} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n    "
+            + ",\n    ".join(definitions) + "\n)"
+        )
+        return [partition_name(month) for month in new]
+
+    def expired_partitions(self, retention_months, today=None):
+        """Monthly partitions entirely older than retention_months months"""
+        today = today or date.today()
+        cutoff = add_months(month_start(today), -retention_months)
+        return [partition_name(month) for month in self.monthly_partitions() if month < cutoff]
+
+    def archive_partition(self, name):
+        """Move a partition's rows into readings_archive_YYYYMM without copying
+
+        EXCHANGE swaps contents both ways, so it only runs into an empty
+        archive table. An archive that already holds the month (a run that
+        stopped between the exchange and the drop) is left alone when the
+        partition is empty.
+
+        Returns:
+            Name of the archive table
+
+        Raises:
+            RuntimeError: if both the archive table and the partition hold rows
+        """
+        archive = f"{TABLE}_archive_{name[1:]}"
+        exists = self.db.execute_query(
+            "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (archive,)
+        )[0][0]
+        if not exists:
+            self.db.execute_query(f"CREATE TABLE {archive} LIKE {TABLE}")
+            self.db.execute_query(f"ALTER TABLE {archive} REMOVE PARTITIONING")
+        elif self.db.execute_query(f"SELECT COUNT(*) FROM {archive}")[0][0]:
+            if self.db.execute_query(f"SELECT COUNT(*) FROM {TABLE} PARTITION ({name})")[0][0]:
+                raise RuntimeError(f"{archive} and partition {name} both hold readings; merge them by hand")
+            return archive
+        self.db.execute_query(f"ALTER TABLE {TABLE} EXCHANGE PARTITION {name} WITH TABLE {archive}")
+        return archive
+
+    def expire(self, retention_months, archive=False, archived=None, today=None):
+        """Remove partitions older than retention_months whose rows are kept elsewhere
+
+        With archive each month is exchanged into readings_archive_YYYYMM
+        before its partition is dropped. Otherwise a month is only dropped
+        when archived(month) confirms a verified copy in cold storage; the
+        others are kept, so expiry never deletes readings on its own.
+
+        Returns:
+            Names of the partitions removed
+        """
+        expired = self.expired_partitions(retention_months, today)
+        if archive:
+            for name in expired:
+                self.archive_partition(name)
+        else:
+            expired = [name for name in expired
+                       if archived is not None and archived(partition_month(name))]
+        if not expired:
+            return []
+        self.db.execute_query(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(expired)}")
+        return expired
+
+    def pruning_queries(self, days=30):
+        """The plot and summary queries over the last days, as (name, query, params, start, end)
+
+        These are the queries QueryPlanChecker explains, so the check
+        follows any change to how PlotGenerator builds them.
+        """
+        from python.QueryPlans import QueryPlanChecker
+
+        return QueryPlanChecker(db=self.db).plan_queries(days)
+
+    def explain_partitions(self, query, params=None):
+        """Partitions of readings that EXPLAIN says the query reads"""
+        plan = self.db.query_to_dataframe("EXPLAIN " + query, params=params)
+        scanned = set()
+        for value in plan.get('partitions', []):
+            if isinstance(value, str) and value:
+                scanned.update(value.split(','))
+        return scanned
+
+    def verify_pruning(self, days=30):
+        """Check that the plot and summary queries only read their window's partitions
+
+        Returns:
+            List of (name, ok, scanned partitions, expected partitions)
+        """
+        results = []
+        for name, query, params, start, end in self.pruning_queries(days):
+            scanned = self.explain_partitions(query, params)
+            expected = set(expected_partitions(start, end))
+            # p_future may appear when the window runs past the last monthly partition
+            ok = bool(scanned) and scanned <= expected | {FUTURE_PARTITION}
+            results.append((name, ok, sorted(scanned), sorted(expected)))
+        return results
+
+    def cleanup(self):
+        """Clean up resources"""
+        if self.db:
+            self.db.disconnect()
+
+def main():
+    retention = os.getenv('READINGS_RETENTION_MONTHS')
+    parser = argparse.ArgumentParser(description='Manage monthly partitions of the readings table')
+    parser.add_argument('--migrate', action='store_true',
+                        help='Convert an unpartitioned readings table to monthly partitions')
+    parser.add_argument('--months-ahead', type=int, default=3,
+                        help='Months of empty partitions to keep ahead (default: 3)')
+    parser.add_argument('--retention-months', type=int, default=int(retention) if retention else 0,
+                        help='Expire months older than this; 0 keeps everything (default: READINGS_RETENTION_MONTHS or 0)')
+    parser.add_argument('--archive', action='store_true',
+                        help='Move expired months into readings_archive_YYYYMM tables instead of dropping them')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check that plot and summary queries get partition pruning')
+    parser.add_argument('--days', type=int, default=30,
+                        help='Window of the queries checked by --verify (default: 30)')
+    args = parser.parse_args()
+
+    manager = ReadingPartitionManager()
+    try:
+        if args.migrate:
+            created = manager.migrate(args.months_ahead)
+            print(f"Partitioned {TABLE} into {created} monthly partitions" if created
+                  else f"{TABLE} is already partitioned")
+        if args.verify:
+            failed = False
+            for name, ok, scanned, expected in manager.verify_pruning(args.days):
+                print(f"{'OK  ' if ok else 'FAIL'} {name}: reads {','.join(scanned) or 'no partitions'}"
+                      f" (window {','.join(expected)})")
+                failed = failed or not ok
+            if failed:
+                sys.exit(1)
+            return
+        created = manager.ensure_future(args.months_ahead)
+        print(f"{datetime.now().isoformat()} Created partitions: {', '.join(created) or 'none'}")
+        if args.retention_months > 0:
+            expired = manager.expired_partitions(args.retention_months)
+            if args.archive:
+                removed = manager.expire(args.retention_months, archive=True)
+            else:
+                from python.ReadingArchiver import ReadingArchiver
+
+                archiver = ReadingArchiver(db=manager.db)
+                try:
+                    removed = manager.expire(args.retention_months, archived=archiver.verified_month)
+                finally:
+                    archiver.ftp.disconnect()
+            action = 'Archived' if args.archive else 'Dropped'
+            print(f"{datetime.now().isoformat()} {action} partitions: {', '.join(removed) or 'none'}")
+            kept = [name for name in expired if name not in removed]
+            if kept:
+                print(f"{datetime.now().isoformat()} Kept expired partitions with no verified archive: "
+                      f"{', '.join(kept)}")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        manager.cleanup()
+
+if __name__ == '__main__':
+    main()
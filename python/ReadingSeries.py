@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Compact, array-backed series of sensor readings.
+
+A DataFrame straight from the database holds every reading as a Python
+Decimal, a Timestamp and an int64 id (well over 100 bytes a reading).
+ReadingSeries keeps parallel NumPy arrays instead: int64 epoch
+milliseconds, float32 values and interned sensor/plant ids (small integer
+codes into one table of distinct ids), about 16 bytes a reading. Readings
+are kept in time order, so slicing by time is a binary search that returns
+views of the same arrays. Conversions to and from NumPy, Arrow and pandas
+are column-wise.
+
+Readings are stored to 2 decimal places; float32 represents them to well
+under that precision, and compares consistently with thresholds rounded
+the same way.
+"""
+
+import numpy as np
+
+def epoch_ms(values):
+    """Convert datetimes, datetime64 or epoch-millisecond integers to an int64 array"""
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy()
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[ms]').view(np.int64)
+    if values.dtype.kind in 'iu':
+        return values.astype(np.int64, copy=False)
+    return np.asarray(values, dtype='datetime64[ms]').view(np.int64)
+
+
+def intern(ids):
+    """Dictionary-encode ids
+
+    Returns:
+        (table, codes): distinct ids as int64 and, for each input, its
+        position in table as the smallest unsigned type that fits
+    """
+    if hasattr(ids, 'to_numpy'):
+        ids = ids.to_numpy()
+    table, codes = np.unique(np.asarray(ids, dtype=np.int64), return_inverse=True)
+    return table, codes.astype(np.uint16 if len(table) <= 0xFFFF else np.uint32)
+
+
+class ReadingSeries:
+    """Time-ordered readings as int64 epoch-ms, float32 values and interned ids"""
+
+    __slots__ = ('timestamps', 'values', 'sensor_codes', 'sensors', 'plant_codes', 'plants', 'ids')
+
+    def __init__(self, timestamps, values, sensor_codes, sensors, plant_codes=None, plants=None, ids=None):
+        """Wrap arrays that are already encoded and sorted by time (not copied)
+
+        Use from_arrays() and the other constructors to build a series from
+        raw columns.
+
+        Args:
+            timestamps: int64 epoch milliseconds, ascending
+            values: float32 readings
+            sensor_codes: Positions in sensors for each reading
+            sensors: Distinct sensor ids
+            plant_codes, plants: Same for plant ids (optional)
+            ids: int64 readings.id for each reading (optional)
+        """
+        self.timestamps = timestamps
+        self.values = values
+        self.sensor_codes = sensor_codes
+        self.sensors = sensors
+        self.plant_codes = plant_codes
+        self.plants = plants
+        self.ids = ids
+        if not len(timestamps) == len(values) == len(sensor_codes):
+            raise ValueError("timestamps, values and sensor_codes must be the same length")
+
+    @classmethod
+    def from_arrays(cls, timestamps, values, sensor_ids, plant_ids=None, ids=None):
+        """Build a series from parallel columns, sorting by time if needed
+
+        Args:
+            timestamps: datetimes, datetime64 or epoch milliseconds
+            values: Numbers or Decimals
+            sensor_ids: Sensor id of each reading
+            plant_ids: Plant id of each reading (optional)
+            ids: readings.id of each reading (optional)
+        """
+        timestamps = epoch_ms(timestamps)
+        values = np.asarray(values.to_numpy() if hasattr(values, 'to_numpy') else values, dtype=np.float32)
+        sensors, sensor_codes = intern(sensor_ids)
+        plants = plant_codes = None
+        if plant_ids is not None:
+            plants, plant_codes = intern(plant_ids)
+        if ids is not None:
+            ids = np.asarray(ids.to_numpy() if hasattr(ids, 'to_numpy') else ids, dtype=np.int64)
+        series = cls(timestamps, values, sensor_codes, sensors, plant_codes, plants, ids)
+        if len(timestamps) > 1 and (np.diff(timestamps) < 0).any():
+            series = series.take(np.argsort(timestamps, kind='stable'))
+        return series
+
+    @classmethod
+    def from_frame(cls, df, time='created_at', value='value', sensor='sensor_id', plant=None, id=None):
+        """Build a series from DataFrame columns (Decimal values are converted once)"""
+        return cls.from_arrays(df[time], df[value], df[sensor],
+                               df[plant] if plant else None, df[id] if id else None)
+
+    @classmethod
+    def from_rows(cls, rows, columns):
+        """Build a series from database row tuples
+
+        Args:
+            rows: Sequence of tuples as returned by DBConnect.execute_query
+            columns: Name of each tuple position; created_at, value and
+                sensor_id are required, plant_id and id are used if present
+        """
+        fields = list(zip(*rows)) if rows else [()] * len(columns)
+        data = dict(zip(columns, fields))
+        return cls.from_arrays(
+            np.array(data['created_at'], dtype='datetime64[ms]'),
+            np.array(data['value'], dtype=np.float32),
+            data['sensor_id'],
+            data.get('plant_id'),
+            data.get('id')
+        )
+
+    @classmethod
+    def from_numpy(cls, records, time='created_at', value='value', sensor='sensor_id', plant=None, id=None):
+        """Build a series from a NumPy record array (DBConnect.iter_dataframes(as_records=True))"""
+        return cls.from_arrays(records[time], records[value], records[sensor],
+                               records[plant] if plant else None, records[id] if id else None)
+
+    @classmethod
+    def from_arrow(cls, table, time='created_at', value='value', sensor='sensor_id', plant=None, id=None):
+        """Build a series from an Arrow table
+
+        Timestamp and numeric columns convert without copying when they are
+        a single chunk already in the target type; dictionary-encoded id
+        columns keep their dictionary as the intern table.
+        """
+        import pyarrow as pa
+
+        def single(name):
+            chunked = table.column(name)
+            return chunked.chunk(0) if chunked.num_chunks == 1 else chunked.combine_chunks()
+
+        def column(name, target):
+            array = single(name)
+            if array.type != target:
+                array = array.cast(target)
+            return array.to_numpy(zero_copy_only=False)
+
+        def interned(name):
+            array = single(name)
+            if pa.types.is_dictionary(array.type):
+                dictionary = array.dictionary.to_numpy(zero_copy_only=False).astype(np.int64)
+                # Unused dictionary entries are dropped so groups() only sees present ids
+                used, codes = np.unique(array.indices.to_numpy(zero_copy_only=False), return_inverse=True)
+                table_ids = dictionary[used]
+                if (np.diff(table_ids) <= 0).any():
+                    # Intern tables are kept sorted for for_sensor()
+                    return intern(table_ids[codes])
+                return table_ids, codes.astype(np.uint16 if len(used) <= 0xFFFF else np.uint32)
+            return intern(array.to_numpy(zero_copy_only=False))
+
+        timestamps = column(time, pa.timestamp('ms')).view(np.int64)
+        sensors, sensor_codes = interned(sensor)
+        plants = plant_codes = None
+        if plant:
+            plants, plant_codes = interned(plant)
+        ids = column(id, pa.int64()) if id else None
+        series = cls(timestamps, column(value, pa.float32()), sensor_codes, sensors, plant_codes, plants, ids)
+        if len(timestamps) > 1 and (np.diff(timestamps) < 0).any():
+            series = series.take(np.argsort(timestamps, kind='stable'))
+        return series
+
+    @classmethod
+    def empty(cls):
+        """A series with no readings"""
+        return cls(np.empty(0, np.int64), np.empty(0, np.float32), np.empty(0, np.uint16), np.empty(0, np.int64))
+
+    @classmethod
+    def concat(cls, series):
+        """Join series (for example database chunks) into one, re-interning ids"""
+        series = [s for s in series if len(s)]
+        if not series:
+            return cls.empty()
+        with_plants = all(s.plants is not None for s in series)
+        with_ids = all(s.ids is not None for s in series)
+        return cls.from_arrays(
+            np.concatenate([s.timestamps for s in series]),
+            np.concatenate([s.values for s in series]),
+            np.concatenate([s.sensor_ids for s in series]),
+            np.concatenate([s.plant_ids for s in series]) if with_plants else None,
+            np.concatenate([s.ids for s in series]) if with_ids else None
+        )
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __repr__(self):
+        return f"<ReadingSeries {len(self)} readings, {len(self.sensors)} sensors, {self.nbytes} bytes>"
+
+    @property
+    def sensor_ids(self):
+        """Sensor id of each reading (materialised from the codes)"""
+        return self.sensors[self.sensor_codes]
+
+    @property
+    def plant_ids(self):
+        """Plant id of each reading, or None"""
+        return None if self.plants is None else self.plants[self.plant_codes]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the per-reading arrays and intern tables"""
+        return sum(getattr(self, name).nbytes for name in self.__slots__ if getattr(self, name) is not None)
+
+    def _map(self, index):
+        """Apply index to every per-reading array, sharing the intern tables"""
+        return ReadingSeries(
+            self.timestamps[index], self.values[index], self.sensor_codes[index], self.sensors,
+            None if self.plant_codes is None else self.plant_codes[index], self.plants,
+            None if self.ids is None else self.ids[index]
+        )
+
+    def __getitem__(self, index):
+        """Slice positionally; a slice returns views, an index array or mask copies"""
+        if isinstance(index, (int, np.integer)):
+            raise TypeError("index a ReadingSeries with a slice, mask or index array")
+        return self._map(index)
+
+    def take(self, index):
+        """Readings at the given positions (copies)"""
+        return self._map(np.asarray(index))
+
+    def between(self, start, end):
+        """Readings with start <= time < end, as views of this series (no copy)
+
+        Args:
+            start, end: datetimes, datetime64 or epoch milliseconds; None is unbounded
+        """
+        lo = 0 if start is None else np.searchsorted(self.timestamps, epoch_ms([start])[0], side='left')
+        hi = len(self) if end is None else np.searchsorted(self.timestamps, epoch_ms([end])[0], side='left')
+        return self._map(slice(lo, hi))
+
+    def for_sensor(self, sensor_id):
+        """Readings of one sensor, in time order"""
+        position = np.searchsorted(self.sensors, sensor_id)
+        if position == len(self.sensors) or self.sensors[position] != sensor_id:
+            return self._map(slice(0, 0))
+        return self._map(self.sensor_codes == position)
+
+    def groups(self, by='sensor'):
+        """Yield (id, series) per sensor (or plant with by='plant'), each in time order
+
+        One stable sort for all groups, instead of a boolean scan per group.
+        """
+        codes, table = self._keys(by)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for index in np.split(order, bounds) if len(order) else []:
+            yield int(table[codes[index[0]]]), self._map(index)
+
+    def _keys(self, by):
+        if by == 'sensor':
+            return self.sensor_codes, self.sensors
+        if by == 'plant':
+            if self.plants is None:
+                raise ValueError("series has no plant ids")
+            return self.plant_codes, self.plants
+        raise ValueError("by must be 'sensor' or 'plant'")
+
+    def aggregate(self, by='sensor'):
+        """Count, sum, min and max of values per sensor (or plant)
+
+        Returns:
+            dict of arrays: id, count, sum, min, max (only ids with readings)
+        """
+        codes, table = self._keys(by)
+        size = len(table)
+        count = np.bincount(codes, minlength=size)
+        total = np.bincount(codes, weights=self.values.astype(np.float64), minlength=size)
+        low = np.full(size, np.inf)
+        high = np.full(size, -np.inf)
+        np.minimum.at(low, codes, self.values)
+        np.maximum.at(high, codes, self.values)
+        present = count > 0
+        return {'id': table[present], 'count': count[present], 'sum': total[present],
+                'min': low[present], 'max': high[present]}
+
+    def bin(self, bucket_ms):
+        """Downsample to fixed time buckets per sensor
+
+        Returns:
+            dict of arrays: sensor_id, bucket (index of the bucket_ms window
+            since the epoch), mean, min, max; ordered by sensor then bucket
+        """
+        if not len(self):
+            empty = np.empty(0)
+            return {'sensor_id': np.empty(0, np.int64), 'bucket': np.empty(0, np.int64),
+                    'mean': empty, 'min': empty, 'max': empty}
+        bucket = self.timestamps // bucket_ms
+        order = np.lexsort((bucket, self.sensor_codes))
+        codes = self.sensor_codes[order]
+        bucket = bucket[order]
+        values = self.values[order].astype(np.float64)
+        starts = np.flatnonzero(np.concatenate(([True], (np.diff(codes) != 0) | (np.diff(bucket) != 0))))
+        counts = np.diff(np.append(starts, len(order)))
+        return {
+            'sensor_id': self.sensors[codes[starts]],
+            'bucket': bucket[starts],
+            'mean': np.add.reduceat(values, starts) / counts,
+            'min': np.minimum.reduceat(values, starts),
+            'max': np.maximum.reduceat(values, starts),
+        }
+
+    def to_numpy(self):
+        """Structured array with created_at (datetime64[ms]), value, sensor_id and any plant_id/id"""
+        fields = [('created_at', 'datetime64[ms]'), ('value', np.float32), ('sensor_id', np.int64)]
+        if self.plants is not None:
+            fields.append(('plant_id', np.int64))
+        if self.ids is not None:
+            fields.insert(0, ('id', np.int64))
+        records = np.empty(len(self), dtype=fields)
+        records['created_at'] = self.timestamps.view('datetime64[ms]')
+        records['value'] = self.values
+        records['sensor_id'] = self.sensor_ids
+        if self.plants is not None:
+            records['plant_id'] = self.plant_ids
+        if self.ids is not None:
+            records['id'] = self.ids
+        return records
+
+    def to_arrow(self):
+        """Arrow table; numeric columns share memory with the series, ids stay dictionary-encoded"""
+        import pyarrow as pa
+        columns = {}
+        if self.ids is not None:
+            columns['id'] = pa.array(self.ids)
+        columns['created_at'] = pa.array(self.timestamps.view('datetime64[ms]'))
+        columns['value'] = pa.array(self.values)
+        columns['sensor_id'] = pa.DictionaryArray.from_arrays(pa.array(self.sensor_codes), pa.array(self.sensors))
+        if self.plants is not None:
+            columns['plant_id'] = pa.DictionaryArray.from_arrays(pa.array(self.plant_codes), pa.array(self.plants))
+        return pa.table(columns)
+
+    def to_frame(self):
+        """pandas DataFrame with the same columns as to_numpy()"""
+        import pandas as pd
+        columns = {}
+        if self.ids is not None:
+            columns['id'] = self.ids
+        columns['created_at'] = self.timestamps.view('datetime64[ms]')
+        columns['value'] = self.values
+        columns['sensor_id'] = self.sensor_ids
+        if self.plants is not None:
+            columns['plant_id'] = self.plant_ids
+        return pd.DataFrame(columns)
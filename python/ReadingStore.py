@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Local columnar cache of reading history.
+
+Readings are mirrored from MySQL into one Arrow IPC file per sensor per day
+(<root>/sensor_<id>/<YYYY-MM-DD>.arrow). Arrow IPC files are uncompressed
+and memory-mapped on read, so historical windows load without copying or
+going through Python objects, and only the requested columns are touched.
+An incremental sync keeps the store up to date from a high-water mark on
+readings.id; readers fetch anything newer than that mark from the database.
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.ReadingSeries import ReadingSeries
+
+load_dotenv()
+
+SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('created_at', pa.timestamp('ms')),
+    ('value', pa.float64()),
+])
+
+STATE_FILE = '_state.json'
+
+
+class ReadingStore:
+    """Per-sensor, per-day Arrow files of readings"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Return a store at READING_STORE_DIR, or None when it is not configured"""
+        root = os.getenv('READING_STORE_DIR')
+        return cls(root) if root else None
+
+    def _partition_path(self, sensor_id, day):
+        return os.path.join(self.root, f"sensor_{int(sensor_id)}", f"{day.isoformat()}.arrow")
+
+    def get_watermark(self):
+        """Return the last readings.id mirrored into the store"""
+        try:
+            with open(os.path.join(self.root, STATE_FILE), 'r', encoding='utf-8') as f:
+                return int(json.load(f)['last_reading_id'])
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def _set_watermark(self, reading_id):
+        self._write_atomic(
+            os.path.join(self.root, STATE_FILE),
+            lambda f: f.write(json.dumps({'last_reading_id': int(reading_id)}).encode('utf-8'))
+        )
+
+    @staticmethod
+    def _write_atomic(path, write):
+        """Write a file via a temporary file and rename so readers never see partial data"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _read_partition(self, path, columns=None):
+        """Memory-map one partition, reading only the requested columns"""
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        return table.select(columns) if columns else table
+
+    def append(self, sensor_id, day, table):
+        """Merge new rows into one sensor/day partition"""
+        path = self._partition_path(sensor_id, day)
+        if os.path.exists(path):
+            table = pa.concat_tables([self._read_partition(path), table])
+            # Keep ids unique and ordered in case a sync batch is replayed
+            table = table.sort_by('id')
+            ids = table.column('id').to_numpy()
+            if len(ids) > 1 and (ids[1:] == ids[:-1]).any():
+                table = table.filter(pa.array(np.concatenate(([True], ids[1:] != ids[:-1]))))
+
+        def write(f):
+            with pa.ipc.new_file(f, SCHEMA) as writer:
+                writer.write_table(table.cast(SCHEMA))
+
+        self._write_atomic(path, write)
+
+    def write_frame(self, df):
+        """Store a DataFrame with id, sensor_id, created_at and value columns
+
+        Returns:
+            Number of partitions written
+        """
+        if df.empty:
+            return 0
+        df = df.assign(day=pd.to_datetime(df['created_at']).dt.date)
+        partitions = 0
+        for (sensor_id, day), group in df.groupby(['sensor_id', 'day'], sort=False):
+            table = pa.table({
+                'id': pa.array(group['id'].to_numpy(dtype='int64')),
+                'created_at': pa.array(pd.to_datetime(group['created_at']).to_numpy(dtype='datetime64[ms]')),
+                'value': pa.array(group['value'].to_numpy(dtype='float64')),
+            }, schema=SCHEMA)
+            self.append(sensor_id, day, table)
+            partitions += 1
+        return partitions
+
+    def sync(self, db, batch_size=100000, settle_seconds=60):
+        """Mirror readings above the watermark from the database
+
+        Only readings up to the highest id older than settle_seconds are
+        copied, as in RollupReadings: a still-open insert transaction can
+        commit rows with lower ids than rows already visible, and the
+        watermark must not step over them. Readers fetch the unsettled tail
+        from the database.
+
+        Returns:
+            Number of readings copied
+        """
+        watermark = self.get_watermark()
+        rows = db.execute_query(
+            """
+            SELECT COALESCE(MAX(id), 0) FROM readings
+            WHERE id > %s AND created_at <= NOW() - INTERVAL %s SECOND
+            """,
+            (watermark, settle_seconds)
+        )
+        target = int(rows[0][0]) if rows and rows[0][0] else watermark
+        copied = 0
+        while watermark < target:
+            df = db.query_to_dataframe(
+                """
+                SELECT id, sensor_id, created_at, value
+                FROM readings
+                WHERE id > %s AND id <= %s
+                ORDER BY id
+                LIMIT %s
+                """,
+                params=(watermark, target, batch_size)
+            )
+            if df.empty:
+                break
+            self.write_frame(df)
+            watermark = int(df['id'].max())
+            # Advance the mark only after the partitions are safely on disk
+            self._set_watermark(watermark)
+            copied += len(df)
+            if len(df) < batch_size:
+                break
+        return copied
+
+    def _read_tables(self, sensor_ids, start, end, columns, max_id=None):
+        """Yield (sensor_id, table) of each sensor's readings between start and end
+
+        With max_id, only readings with id <= max_id are kept.
+        """
+        read_columns = list(columns)
+        for column in ('created_at', 'id' if max_id is not None else None):
+            if column and column not in read_columns:
+                read_columns.append(column)
+        for sensor_id in sensor_ids:
+            day = start.date()
+            tables = []
+            while day <= end.date():
+                path = self._partition_path(sensor_id, day)
+                if os.path.exists(path):
+                    tables.append(self._read_partition(path, read_columns))
+                day += timedelta(days=1)
+            if not tables:
+                continue
+            table = pa.concat_tables(tables)
+            times = table.column('created_at')
+            mask = pc.and_(
+                pc.greater_equal(times, pa.scalar(start, pa.timestamp('ms'))),
+                pc.less_equal(times, pa.scalar(end, pa.timestamp('ms')))
+            )
+            if max_id is not None:
+                mask = pc.and_(mask, pc.less_equal(table.column('id'), pa.scalar(int(max_id), pa.int64())))
+            yield sensor_id, table.filter(mask).select(list(columns))
+
+    def read(self, sensor_ids, start, end, columns=('created_at', 'value'), max_id=None):
+        """Read readings for sensors between start and end
+
+        Args:
+            max_id: Only return readings with id <= max_id, e.g. the watermark
+                a caller fetched newer readings from the database against
+
+        Returns:
+            DataFrame with sensor_id plus the requested columns
+        """
+        frames = []
+        for sensor_id, table in self._read_tables(sensor_ids, start, end, columns, max_id):
+            frame = table.to_pandas()
+            frame.insert(0, 'sensor_id', int(sensor_id))
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=['sensor_id', *columns])
+        return pd.concat(frames, ignore_index=True)
+
+    def read_series(self, sensor_ids, start, end, max_id=None):
+        """Read readings for sensors between start and end as a ReadingSeries
+
+        Goes from the memory-mapped Arrow columns to NumPy without building
+        a DataFrame. Pass the watermark read before the database tail as
+        max_id, so rows a concurrent sync writes past it are not counted
+        twice.
+        """
+        times, values, sensors = [], [], []
+        for sensor_id, table in self._read_tables(sensor_ids, start, end, ('created_at', 'value'), max_id):
+            times.append(table.column('created_at').to_numpy().view(np.int64))
+            values.append(table.column('value').to_numpy().astype(np.float32))
+            sensors.append(np.full(table.num_rows, int(sensor_id), dtype=np.int64))
+        if not times:
+            return ReadingSeries.empty()
+        return ReadingSeries.from_arrays(np.concatenate(times), np.concatenate(values), np.concatenate(sensors))
+
+    def prune(self, before):
+        """Delete partitions for days before the given date
+
+        Returns:
+            Number of partitions removed
+        """
+        removed = 0
+        for entry in os.listdir(self.root):
+            directory = os.path.join(self.root, entry)
+            if not entry.startswith('sensor_') or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith('.arrow') and name[:-len('.arrow')] < before.isoformat():
+                    os.unlink(os.path.join(directory, name))
+                    removed += 1
+        return removed
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the local columnar reading store')
+    parser.add_argument('--root', default=os.getenv('READING_STORE_DIR'),
+                        help='Store directory (default: READING_STORE_DIR)')
+    parser.add_argument('--batch-size', type=int, default=100000,
+                        help='Readings fetched per query (default: 100000)')
+    parser.add_argument('--settle-seconds', type=int, default=60,
+                        help='Leave readings younger than this for the next run (default: 60)')
+    parser.add_argument('--prune-days', type=int, default=None,
+                        help='Also delete partitions older than this many days')
+    args = parser.parse_args()
+
+    if not args.root:
+        print("Error: set READING_STORE_DIR or pass --root")
+        sys.exit(1)
+
+    from python.DBConnect import DBConnect
+
+    store = ReadingStore(args.root)
+    db = DBConnect(pooled=True)
+    try:
+        copied = store.sync(db, batch_size=args.batch_size, settle_seconds=args.settle_seconds)
+        print(f"{datetime.now().isoformat()} Synced {copied} readings")
+        if args.prune_days:
+            removed = store.prune((datetime.now() - timedelta(days=args.prune_days)).date())
+            print(f"Removed {removed} partitions")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        db.disconnect()
+
+if __name__ == '__main__':
+    main()
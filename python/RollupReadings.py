@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Maintain hourly and daily per-sensor rollups of the readings table.
+
+Each run folds only the readings above the stored high-water mark
+(rollup_state.last_reading_id) into readings_hourly and readings_daily, so the
+cost is proportional to new data. Readings are treated as append-only:
+deleting old rows (see cron/cleanup.php) does not remove them from the rollups.
+"""
+
+import os
+import sys
+import math
+import argparse
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python.DBConnect import DBConnect
+
+load_dotenv()
+
+STATE_NAME = 'readings'
+
+# Rollup tables from coarsest to finest, with their bucket size in seconds
+ROLLUP_TABLES = (
+    ('readings_daily', 86400),
+    ('readings_hourly', 3600),
+)
+
+BUCKET_EXPRESSIONS = {
+    'readings_hourly': "TIMESTAMP(DATE(created_at), MAKETIME(HOUR(created_at), 0, 0))",
+    'readings_daily': "DATE(created_at)",
+}
+
+MERGE_SQL = """
+INSERT INTO {table} (sensor_id, bucket_start, min_value, max_value, sum_value, reading_count)
+SELECT sensor_id, {bucket} AS bucket, MIN(value), MAX(value), SUM(value), COUNT(*)
+FROM readings
+WHERE id > %s AND id <= %s
+GROUP BY sensor_id, bucket
+ON DUPLICATE KEY UPDATE
+    min_value = LEAST(min_value, VALUES(min_value)),
+    max_value = GREATEST(max_value, VALUES(max_value)),
+    sum_value = sum_value + VALUES(sum_value),
+    reading_count = reading_count + VALUES(reading_count)
+"""
+
+
+# A rollup is used while the window still spans at least this fraction of
+# the requested points in its buckets
+MIN_ROLLUP_FILL = 0.25
+
+
+def rollup_bucket(window_seconds, max_points):
+    """Pick the rollup table and bin width for max_points bins over a window
+
+    The coarsest rollup whose buckets still give at least MIN_ROLLUP_FILL *
+    max_points bins is used, with the bin width rounded up to a whole number
+    of its buckets; a 30-day plot of 1000 points reads hourly rollups in
+    720 bins rather than every raw reading.
+
+    Returns:
+        (table, bucket_seconds); table is None when only raw readings fit
+    """
+    bucket_seconds = max(1, math.ceil(window_seconds / max_points))
+    for table, granularity in ROLLUP_TABLES:
+        if window_seconds / granularity >= max_points * MIN_ROLLUP_FILL:
+            return table, math.ceil(bucket_seconds / granularity) * granularity
+    return None, bucket_seconds
+
+
+def bucket_ceil(table, value):
+    """First bucket boundary of table at or after value"""
+    if table == 'readings_daily':
+        floor = datetime.combine(value.date(), datetime.min.time())
+        step = timedelta(days=1)
+    else:
+        floor = value.replace(minute=0, second=0, microsecond=0)
+        step = timedelta(hours=1)
+    return floor if floor == value else floor + step
+
+
+def rollup_source(table, start_date, end_date, sensor_ids=None):
+    """Build a derived table of rollup rows plus raw readings at either end
+
+    Returns (sql, params). The derived table exposes sensor_id, created_at,
+    min_value, max_value, sum_value and reading_count. Rollup buckets are
+    clipped to those starting at or after start_date; the partial bucket
+    before them and the readings above the high-water mark appear as
+    single-reading rows, so results are exact even between maintenance
+    runs. With sensor_ids, every part only reads those sensors' index
+    ranges.
+    """
+    rollup_start = bucket_ceil(table, start_date)
+    if table == 'readings_daily':
+        rollup_start = rollup_start.date()
+    sensor_filter = ""
+    sensor_params = ()
+    if sensor_ids:
+        sensor_filter = f"sensor_id IN ({', '.join(['%s'] * len(sensor_ids))})\n                  AND "
+        sensor_params = tuple(sensor_ids)
+    watermark = f"(SELECT COALESCE(MAX(last_reading_id), 0) FROM rollup_state WHERE name = '{STATE_NAME}')"
+    sql = f"""(
+                SELECT sensor_id, bucket_start AS created_at,
+                       min_value, max_value, sum_value, reading_count
+                FROM {table}
+                WHERE {sensor_filter}bucket_start BETWEEN %s AND %s
+                UNION ALL
+                SELECT sensor_id, created_at, value, value, value, 1
+                FROM readings
+                WHERE {sensor_filter}created_at >= %s AND created_at < %s
+                  AND id <= {watermark}
+                UNION ALL
+                SELECT sensor_id, created_at, value, value, value, 1
+                FROM readings
+                WHERE {sensor_filter}id > {watermark}
+                  AND created_at BETWEEN %s AND %s
+            )"""
+    return sql, (*sensor_params, rollup_start, end_date,
+                 *sensor_params, start_date, rollup_start,
+                 *sensor_params, start_date, end_date)
+
+
+class ReadingRollup:
+    """Incrementally maintain the reading rollup tables"""
+
+    def __init__(self, batch_size=50000, settle_seconds=60):
+        """Initialize with a pooled database connection
+
+        Args:
+            batch_size: Maximum readings folded in per transaction
+            settle_seconds: Skip readings younger than this, so rows from
+                still-open insert transactions are not stepped over
+        """
+        self.batch_size = batch_size
+        self.settle_seconds = settle_seconds
+        self.db = DBConnect(pooled=True)
+        self.db.connect()
+
+    def get_watermark(self):
+        """Return the last readings.id folded into the rollups"""
+        rows = self.db.execute_query(
+            "SELECT last_reading_id FROM rollup_state WHERE name = %s",
+            (STATE_NAME,)
+        )
+        return int(rows[0][0]) if rows else 0
+
+    def get_target_id(self, watermark):
+        """Return the highest settled readings.id above the watermark"""
+        rows = self.db.execute_query(
+            """
+            SELECT COALESCE(MAX(id), 0) FROM readings
+            WHERE id > %s AND created_at <= NOW() - INTERVAL %s SECOND
+            """,
+            (watermark, self.settle_seconds)
+        )
+        return int(rows[0][0]) if rows and rows[0][0] else watermark
+
+    def update(self):
+        """Fold new readings into the rollups
+
+        Returns:
+            Number of readings.id values advanced past
+        """
+        watermark = self.get_watermark()
+        target = self.get_target_id(watermark)
+        start = watermark
+
+        while watermark < target:
+            upper = min(watermark + self.batch_size, target)
+            with self.db.transaction() as cursor:
+                # Lock the state row so two concurrent runs cannot double count
+                cursor.execute(
+                    "SELECT last_reading_id FROM rollup_state WHERE name = %s FOR UPDATE",
+                    (STATE_NAME,)
+                )
+                row = cursor.fetchone()
+                current = int(row[0]) if row else 0
+                if current != watermark:
+                    # Another run advanced the watermark; continue from there
+                    watermark = current
+                    continue
+
+                for table, _ in ROLLUP_TABLES:
+                    query = MERGE_SQL.format(table=table, bucket=BUCKET_EXPRESSIONS[table])
+                    cursor.execute(query, (watermark, upper))
+
+                cursor.execute(
+                    """
+                    INSERT INTO rollup_state (name, last_reading_id) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE last_reading_id = VALUES(last_reading_id)
+                    """,
+                    (STATE_NAME, upper)
+                )
+            watermark = upper
+
+        return max(0, watermark - start)
+
+    def rebuild(self):
+        """Discard all rollups and rebuild them from the readings table"""
+        with self.db.transaction() as cursor:
+            for table, _ in ROLLUP_TABLES:
+                cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                """
+                INSERT INTO rollup_state (name, last_reading_id) VALUES (%s, 0)
+                ON DUPLICATE KEY UPDATE last_reading_id = 0
+                """,
+                (STATE_NAME,)
+            )
+        return self.update()
+
+    def cleanup(self):
+        """Clean up resources"""
+        if self.db:
+            self.db.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain hourly/daily reading rollups')
+    parser.add_argument('--batch-size', type=int, default=50000,
+                        help='Readings folded in per transaction (default: 50000)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Discard existing rollups and rebuild from scratch')
+    args = parser.parse_args()
+
+    rollup = ReadingRollup(batch_size=args.batch_size)
+    try:
+        processed = rollup.rebuild() if args.rebuild else rollup.update()
+        print(f"{datetime.now().isoformat()} Rolled up {processed} reading ids")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        rollup.cleanup()
+
+if __name__ == '__main__':
+    main()
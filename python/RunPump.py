@@ -5,15 +5,27 @@ import os
 import sys
 import time
 import argparse
+import tempfile
+import threading
+from collections import deque
 from datetime import datetime, UTC
 from dotenv import load_dotenv
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from python.DBConnect import DBConnect
+from python.ActionLog import ActionLogWriter
 
 load_dotenv()
 
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows development machines): limits apply per process only
+    fcntl = None
+
+DEFAULT_LOCK_DIR = os.getenv('PUMP_LOCK_DIR') or os.path.join(tempfile.gettempdir(), 'garden-sensors-pumps')
+
 # Try to import RPi.GPIO, use mock if not available
 try:
     import RPi.GPIO as GPIO
@@ -43,12 +55,30 @@ except ImportError:
 
 class PumpController:
     """Class to control the water pump"""
+
+    lock_poll = 0.5
     
-    def __init__(self, pin=18):
-        """Initialize pump controller with GPIO pin"""
+    def __init__(self, pin=18, action_log=None, max_concurrent=None, lock_dir=DEFAULT_LOCK_DIR):
+        """Initialize pump controller with GPIO pin
+
+        Args:
+            pin: GPIO pin of the pump
+            action_log: ActionLogWriter for start/stop logs (defaults to a
+                new background writer)
+            max_concurrent: Maximum pumps on at once across all controllers
+                (default PUMP_MAX_CONCURRENT or 2)
+            lock_dir: Directory of the pin and slot lock files shared with
+                MultiPumpController processes (default PUMP_LOCK_DIR); None
+                skips the shared limit
+        """
+        if max_concurrent is None:
+            max_concurrent = int(os.getenv('PUMP_MAX_CONCURRENT', '2'))
+        self.locks = PumpLocks(lock_dir, max_concurrent) if lock_dir and fcntl is not None else None
         self.pin = pin
-        self.db = DBConnect()
+        self.db = DBConnect(pooled=True)
         self.db.connect()
+        self._owns_action_log = action_log is None
+        self.action_log = action_log or ActionLogWriter(db=self.db)
         
         # Set up GPIO
         GPIO.setmode(GPIO.BCM)
@@ -65,38 +95,402 @@ class PumpController:
         GPIO.output(self.pin, GPIO.LOW)
         self.log_action("stop")
         
+    def acquire_locks(self):
+        """Wait for this pin and a free pump slot shared with other controllers
+
+        Returns:
+            PumpLocks token, or () when the limit is not shared
+        """
+        if self.locks is None:
+            return ()
+        token = self.locks.acquire(self.pin)
+        if token is None:
+            print("Waiting for a free pump slot...")
+        while token is None:
+            time.sleep(self.lock_poll)
+            token = self.locks.acquire(self.pin)
+        return token
+
     def run_pump(self, duration):
-        """Run the pump for a specified duration in seconds"""
+        """Run the pump for a specified duration in seconds
+
+        Waits first until the pin and a pump slot are free, so this pump
+        counts towards the limit MultiPumpController processes observe.
+        """
+        token = None
         try:
+            token = self.acquire_locks()
             print(f"Starting pump for {duration} seconds...")
             self.start_pump()
             time.sleep(duration)
         except KeyboardInterrupt:
             print("\nPump operation cancelled by user")
         finally:
-            self.stop_pump()
-            print("Pump stopped")
+            if token is not None:
+                self.stop_pump()
+                print("Pump stopped")
+                if token:
+                    self.locks.release(token)
             
     def log_action(self, action):
-        """Log pump action to database"""
-        query = """
-        INSERT INTO system_logs (component, action, timestamp)
-        VALUES (%s, %s, %s)
-        """
-        self.db.execute_query(query, ["pump", action, datetime.now(UTC)])
+        """Queue a pump action log; the database write happens in the background"""
+        self.action_log.log("pump", action, datetime.now(UTC))
         
     def cleanup(self):
         """Clean up resources"""
+        if self._owns_action_log:
+            self.action_log.close()
         if self.db:
             self.db.disconnect()
         GPIO.cleanup()
 
+class PumpRun:
+    """Handle for one pump run scheduled on a MultiPumpController"""
+
+    def __init__(self, controller, pin, duration, callback=None, on_start=None):
+        self.controller = controller
+        self.pin = pin
+        self.duration = duration
+        self.callback = callback
+        self.on_start = on_start
+        self.started_at = None
+        self.finished_at = None
+        # Wall-clock times the pin was switched, used for the action log
+        self.on_at = None
+        self.off_at = None
+        self.cancelled = False
+        # PumpLocks token while the pin is on
+        self._locks = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the run has finished or been cancelled"""
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """Stop the run now, or drop it if it has not started"""
+        self.controller.cancel(self)
+
+class PumpLocks:
+    """Pump slots and pins shared by every controller process on the host
+
+    The irrigation scheduler and moisture control each run their own
+    MultiPumpController, and single runs go through PumpController, so the
+    limits are also held as non-blocking flock
+    locks on files in lock_dir: one per pin, so a pin is never switched on
+    twice, and max_concurrent slot files, so all controllers together keep
+    at most max_concurrent pumps on. The kernel drops the locks of a process
+    that dies, so a crash never leaves a slot taken.
+    """
+
+    def __init__(self, lock_dir=DEFAULT_LOCK_DIR, max_concurrent=2):
+        self.lock_dir = lock_dir
+        self.max_concurrent = max_concurrent
+        os.makedirs(lock_dir, exist_ok=True)
+
+    def _try_lock(self, name):
+        """Open and lock a file without waiting; the fd, or None if another holder has it"""
+        fd = os.open(os.path.join(self.lock_dir, name), os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            os.close(fd)
+            return None
+
+    def acquire(self, pin):
+        """Take a pin and a free slot
+
+        Returns:
+            Token for release, or None if the pin is on elsewhere or every slot is taken
+        """
+        pin_fd = self._try_lock(f"pin-{pin}.lock")
+        if pin_fd is None:
+            return None
+        for slot in range(self.max_concurrent):
+            slot_fd = self._try_lock(f"slot-{slot}.lock")
+            if slot_fd is not None:
+                return (pin_fd, slot_fd)
+        os.close(pin_fd)
+        return None
+
+    def release(self, token):
+        """Give back a pin and slot; closing the files drops their locks"""
+        for fd in token:
+            os.close(fd)
+
+class MultiPumpController:
+    """Non-blocking control of several pump zones
+
+    Each run gets its own timer that switches the pin off when its duration
+    elapses, so zones water in parallel without sleeping the caller. At most
+    max_concurrent pumps are on at once (power and water pressure); further
+    runs wait in a FIFO queue, and a pin only ever has one run active. Both
+    limits also hold across processes through PumpLocks; a run blocked by
+    another process is retried every lock_poll seconds.
+    """
+
+    lock_poll = 0.5
+
+    def __init__(self, pins=(18,), max_concurrent=None, db=None, action_log=None, lock_dir=DEFAULT_LOCK_DIR):
+        """Initialize the controller
+
+        Args:
+            pins: GPIO pins of the pump zones
+            max_concurrent: Maximum pumps on at once (default PUMP_MAX_CONCURRENT or 2)
+            db: DBConnect for action logs (defaults to a pooled connection)
+            action_log: ActionLogWriter for zone logs (defaults to a new
+                background writer on db)
+            lock_dir: Directory of the pin and slot lock files shared with
+                other controller processes (default PUMP_LOCK_DIR); None
+                limits this controller only
+        """
+        if max_concurrent is None:
+            max_concurrent = int(os.getenv('PUMP_MAX_CONCURRENT', '2'))
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.locks = PumpLocks(lock_dir, max_concurrent) if lock_dir and fcntl is not None else None
+        self._poll_timer = None
+        if db is None:
+            db = DBConnect(pooled=True)
+            db.connect()
+        self.db = db
+        self._owns_action_log = action_log is None
+        self.action_log = action_log or ActionLogWriter(db=db)
+        self.pins = []
+        self._running = {}  # pin -> (PumpRun, Timer)
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+        GPIO.setmode(GPIO.BCM)
+        for pin in pins:
+            self.add_zone(pin)
+
+    def add_zone(self, pin):
+        """Set up a pump pin, switched off"""
+        if pin in self.pins:
+            return
+        GPIO.setup(pin, GPIO.OUT)
+        GPIO.output(pin, GPIO.LOW)
+        self.pins.append(pin)
+
+    def run_zone(self, pin, duration, callback=None, on_start=None):
+        """Run a zone for duration seconds without blocking
+
+        Args:
+            pin: Zone pin (set up on first use)
+            duration: Seconds to run
+            callback: Optional callable(PumpRun) invoked when the run ends
+            on_start: Optional callable(PumpRun) invoked once the pin is on,
+                which for a queued run is later than this call
+
+        Returns:
+            PumpRun handle
+        """
+        run = PumpRun(self, pin, duration, callback, on_start)
+        started = False
+        with self._lock:
+            if pin not in self.pins:
+                self.add_zone(pin)
+            if pin not in self._running and len(self._running) < self.max_concurrent and self._start(run):
+                started = True
+            else:
+                self._queue.append(run)
+                self._arm_poll()
+        if started:
+            self._started(run)
+        return run
+
+    def _start(self, run):
+        """Switch a pin on and arm its timer (lock held)
+
+        Returns:
+            False if another process holds the pin or every slot
+        """
+        if self.locks is not None:
+            run._locks = self.locks.acquire(run.pin)
+            if run._locks is None:
+                return False
+        GPIO.output(run.pin, GPIO.HIGH)
+        run.on_at = datetime.now(UTC)
+        run.started_at = time.monotonic()
+        timer = threading.Timer(run.duration, self._finish, args=(run,))
+        timer.daemon = True
+        self._running[run.pin] = (run, timer)
+        timer.start()
+        return True
+
+    def _start_queued(self):
+        """Start queued runs whose pins are free while slots remain (lock held)"""
+        started = []
+        for run in list(self._queue):
+            if len(self._running) >= self.max_concurrent:
+                break
+            if run.pin in self._running or not self._start(run):
+                continue
+            self._queue.remove(run)
+            started.append(run)
+        self._arm_poll()
+        return started
+
+    def _arm_poll(self):
+        """Retry queued runs later when a free local slot is blocked by another process (lock held)"""
+        if (self.locks is None or self._poll_timer is not None or not self._queue
+                or len(self._running) >= self.max_concurrent):
+            return
+        self._poll_timer = threading.Timer(self.lock_poll, self._poll)
+        self._poll_timer.daemon = True
+        self._poll_timer.start()
+
+    def _poll(self):
+        """Start queued runs whose pin and slot other processes have released"""
+        with self._lock:
+            self._poll_timer = None
+            started = self._start_queued()
+        for queued in started:
+            self._started(queued)
+
+    def _finish(self, run, cancelled=False):
+        """Switch a running pin off and start whatever is waiting"""
+        with self._lock:
+            current = self._running.get(run.pin)
+            if current is None or current[0] is not run:
+                return
+            GPIO.output(run.pin, GPIO.LOW)
+            run.off_at = datetime.now(UTC)
+            del self._running[run.pin]
+            if run._locks is not None:
+                self.locks.release(run._locks)
+                run._locks = None
+            run.finished_at = time.monotonic()
+            run.cancelled = cancelled
+            started = self._start_queued()
+            self._idle.notify_all()
+        # Logging and callbacks happen after the pins are switched
+        self.log_action(run.pin, "cancel" if cancelled else "stop", run.off_at)
+        for queued in started:
+            self._started(queued)
+        self._complete(run)
+
+    def _started(self, run):
+        """Log a run that has just switched its pin on and notify its caller"""
+        self.log_action(run.pin, "start", run.on_at)
+        if run.on_start is not None:
+            try:
+                run.on_start(run)
+            except Exception as e:
+                print(f"Pump start callback error on pin {run.pin}: {e}")
+
+    def _complete(self, run):
+        run._done.set()
+        if run.callback is not None:
+            try:
+                run.callback(run)
+            except Exception as e:
+                print(f"Pump callback error on pin {run.pin}: {e}")
+
+    def cancel(self, run_or_pin):
+        """Cancel a run (or whatever is running on a pin) and any queued runs for it"""
+        pin = run_or_pin.pin if isinstance(run_or_pin, PumpRun) else run_or_pin
+        with self._lock:
+            if isinstance(run_or_pin, PumpRun):
+                dropped = [run_or_pin] if run_or_pin in self._queue else []
+            else:
+                dropped = [run for run in self._queue if run.pin == pin]
+            for run in dropped:
+                self._queue.remove(run)
+                run.cancelled = True
+            running = self._running.get(pin)
+            if running is not None and isinstance(run_or_pin, PumpRun) and running[0] is not run_or_pin:
+                running = None
+            if dropped:
+                self._idle.notify_all()
+        for run in dropped:
+            self._complete(run)
+        if running is not None:
+            running[1].cancel()
+            self._finish(running[0], cancelled=True)
+
+    def cancel_all(self):
+        """Cancel every queued and running zone"""
+        with self._lock:
+            pins = set(self._running) | {run.pin for run in self._queue}
+        for pin in pins:
+            self.cancel(pin)
+
+    def state(self):
+        """Live state per pin: whether it is running, seconds remaining and runs queued"""
+        now = time.monotonic()
+        with self._lock:
+            state = {}
+            for pin in self.pins:
+                running = self._running.get(pin)
+                state[pin] = {
+                    'running': running is not None,
+                    'remaining': max(0.0, running[0].started_at + running[0].duration - now) if running else None,
+                    'queued': sum(1 for run in self._queue if run.pin == pin)
+                }
+            return state
+
+    def wait_all(self, timeout=None):
+        """Block until no zone is running or queued
+
+        Returns:
+            True if idle, False on timeout
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._running and not self._queue, timeout)
+
+    def log_action(self, pin, action, timestamp=None):
+        """Queue a zone action log; the database write happens in the background"""
+        self.action_log.log("pump", f"{action} pin {pin}", timestamp or datetime.now(UTC))
+
+    def cleanup(self):
+        """Stop all zones and release resources"""
+        try:
+            self.cancel_all()
+        finally:
+            with self._lock:
+                if self._poll_timer is not None:
+                    self._poll_timer.cancel()
+                    self._poll_timer = None
+            if self._owns_action_log:
+                self.action_log.close()
+            if self.db:
+                self.db.disconnect()
+            GPIO.cleanup()
+
 def main():
     parser = argparse.ArgumentParser(description='Control water pump')
     parser.add_argument('--duration', type=int, default=5,
                       help='Duration to run pump in seconds (default: 5)')
+    parser.add_argument('--pins', default=None,
+                      help='Comma-separated zone pins to water in parallel (default: single pump on pin 18)')
+    parser.add_argument('--max-concurrent', type=int, default=None,
+                      help='Maximum zones on at once (default: PUMP_MAX_CONCURRENT or 2)')
     args = parser.parse_args()
     
+    if args.pins:
+        pins = [int(pin) for pin in args.pins.split(',') if pin.strip()]
+        controller = MultiPumpController(pins, max_concurrent=args.max_concurrent)
+        try:
+            for pin in pins:
+                controller.run_zone(pin, args.duration)
+            controller.wait_all()
+        except KeyboardInterrupt:
+            print("\nPump operation cancelled by user")
+        except Exception as e:
+            print(f"Error: {e}")
+        finally:
+            controller.cleanup()
+        return
+    
     pump = PumpController()
     try:
         pump.run_pump(args.duration)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Asyncio gateway that receives readings from many ESP8266 sensor nodes.
+
+Nodes send readings over HTTP (POST /readings with a JSON object or list)
+or UDP (one JSON object per datagram) instead of holding their own MySQL
+sessions. Readings are validated against the sensors table, buffered in
+memory and written in batches by a single pooled ReadingIngestor running
+on one worker thread, so database writes never block the event loop.
+
+Reading payload: {"sensor_id": 3, "value": 41.5, "unit": "percentage",
+"temperature": 21.0, "humidity": 55.0}; only sensor_id and value are required.
+"""
+
+import os
+import sys
+import json
+import math
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+HTTP_STATUS = {
+    200: 'OK',
+    202: 'Accepted',
+    400: 'Bad Request',
+    404: 'Not Found',
+    413: 'Payload Too Large',
+    503: 'Service Unavailable',
+}
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class SensorGateway:
+    """Receive, validate and batch sensor readings"""
+
+    def __init__(self, ingestor, sensor_loader, max_pending=10000, flush_interval=2.0,
+                 refresh_interval=60.0, reject_out_of_range=False):
+        """Initialize the gateway
+
+        Args:
+            ingestor: ReadingIngestor (or compatible) that writes batches
+            sensor_loader: Callable returning {sensor_id: (min_threshold, max_threshold)}
+                for active sensors; called on a worker thread
+            max_pending: Buffered readings above which new readings are refused
+            flush_interval: Seconds between background flush checks
+            refresh_interval: Seconds between sensor metadata reloads
+            reject_out_of_range: Refuse readings outside the sensor thresholds
+                instead of storing and counting them
+        """
+        self.ingestor = ingestor
+        self.sensor_loader = sensor_loader
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.reject_out_of_range = reject_out_of_range
+        self.sensors = {}
+        self.stats = {'accepted': 0, 'rejected': 0, 'out_of_range': 0, 'dropped': 0,
+                      'written': 0, 'flush_errors': 0}
+        # One worker thread: all database access goes through a single writer
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._flush_task = None
+        self._tasks = []
+        self._servers = []
+        self._transport = None
+
+    async def _run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def refresh_sensors(self):
+        """Reload sensor thresholds from the database"""
+        self.sensors = await self._run_blocking(self.sensor_loader)
+
+    def validate(self, payload):
+        """Validate one reading payload
+
+        Returns:
+            (reading_kwargs, None) on success or (None, error message)
+        """
+        if not isinstance(payload, dict):
+            return None, 'reading must be an object'
+        try:
+            sensor_id = int(payload['sensor_id'])
+            value = float(payload['value'])
+        except (KeyError, TypeError, ValueError):
+            return None, 'sensor_id and numeric value are required'
+        if not math.isfinite(value):
+            return None, 'value must be finite'
+        if sensor_id not in self.sensors:
+            return None, f'unknown or inactive sensor {sensor_id}'
+
+        min_threshold, max_threshold = self.sensors[sensor_id]
+        if ((min_threshold is not None and value < min_threshold)
+                or (max_threshold is not None and value > max_threshold)):
+            if self.reject_out_of_range:
+                return None, f'value {value} outside thresholds for sensor {sensor_id}'
+            self.stats['out_of_range'] += 1
+
+        return {
+            'sensor_id': sensor_id,
+            'value': value,
+            'unit': payload.get('unit', 'percentage'),
+            'temperature': payload.get('temperature'),
+            'humidity': payload.get('humidity'),
+        }, None
+
+    def submit(self, payloads):
+        """Validate and buffer a list of payloads
+
+        Returns:
+            (accepted count, list of error messages)
+        """
+        accepted = 0
+        errors = []
+        for payload in payloads:
+            if self.ingestor.pending >= self.max_pending:
+                self.stats['dropped'] += 1
+                errors.append('gateway buffer full')
+                continue
+            reading, error = self.validate(payload)
+            if error:
+                self.stats['rejected'] += 1
+                errors.append(error)
+                continue
+            if self.ingestor.append(**reading):
+                self._schedule_flush()
+            accepted += 1
+        self.stats['accepted'] += accepted
+        return accepted, errors
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self, force=False):
+        """Write buffered readings on the writer thread"""
+        try:
+            if force:
+                written = await self._run_blocking(self.ingestor.flush)
+            else:
+                written = await self._run_blocking(self.ingestor.flush_if_due)
+            self.stats['written'] += written
+            return written
+        except Exception as e:
+            # Readings stay buffered and are retried on the next flush
+            self.stats['flush_errors'] += 1
+            print(f"Flush error: {e}")
+            return 0
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh_sensors()
+            except Exception as e:
+                print(f"Sensor refresh error: {e}")
+
+    async def handle_http(self, reader, writer):
+        """Handle one HTTP/1.0-style request"""
+        status, body = 400, {'success': False, 'error': 'bad request'}
+        try:
+            request_line = await reader.readline()
+            parts = request_line.decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            method, path = (parts + ['', ''])[:2]
+            if method == 'GET' and path == '/health':
+                status, body = 200, {'success': True, 'pending': self.ingestor.pending, 'stats': self.stats}
+            elif method == 'POST' and path == '/readings':
+                length = int(headers.get('content-length', '0'))
+                if length > MAX_BODY_BYTES:
+                    status, body = 413, {'success': False, 'error': 'payload too large'}
+                else:
+                    payload = json.loads(await reader.readexactly(length))
+                    payloads = payload if isinstance(payload, list) else [payload]
+                    accepted, errors = self.submit(payloads)
+                    if accepted:
+                        status = 202
+                    elif self.ingestor.pending >= self.max_pending:
+                        # Backpressure: the node should retry later
+                        status = 503
+                    else:
+                        status = 400
+                    body = {'success': accepted > 0, 'accepted': accepted, 'errors': errors}
+            else:
+                status, body = 404, {'success': False, 'error': 'not found'}
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, body = 400, {'success': False, 'error': str(e)}
+
+        data = json.dumps(body).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    def handle_datagram(self, data):
+        """Handle one UDP datagram containing a JSON reading"""
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            self.stats['rejected'] += 1
+            return
+        self.submit(payload if isinstance(payload, list) else [payload])
+
+    async def start(self, host='0.0.0.0', http_port=8080, udp_port=None):
+        """Load sensors and start listening
+
+        Returns:
+            (http_port, udp_port) actually bound (useful with port 0)
+        """
+        await self.refresh_sensors()
+        server = await asyncio.start_server(self.handle_http, host, http_port)
+        self._servers.append(server)
+        bound_http = server.sockets[0].getsockname()[1]
+
+        bound_udp = None
+        if udp_port is not None:
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _GatewayDatagramProtocol(self), local_addr=(host, udp_port)
+            )
+            self._transport = transport
+            bound_udp = transport.get_extra_info('sockname')[1]
+
+        self._tasks = [asyncio.ensure_future(self._flush_loop()),
+                       asyncio.ensure_future(self._refresh_loop())]
+        return bound_http, bound_udp
+
+    async def stop(self):
+        """Stop listening and write everything still buffered"""
+        for task in self._tasks:
+            task.cancel()
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        if self._transport:
+            self._transport.close()
+        if self._flush_task:
+            await self._flush_task
+        await self.flush(force=True)
+        self._executor.shutdown(wait=True)
+
+
+class _GatewayDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        self.gateway.handle_datagram(data)
+
+
+def load_sensor_thresholds(db):
+    """Return {sensor_id: (min_threshold, max_threshold)} for active sensors"""
+    rows = db.execute_query(
+        "SELECT id, min_threshold, max_threshold FROM sensors WHERE status = 'active'"
+    )
+    return {
+        int(sensor_id): (
+            float(min_threshold) if min_threshold is not None else None,
+            float(max_threshold) if max_threshold is not None else None
+        )
+        for sensor_id, min_threshold, max_threshold in rows
+    }
+
+
+async def simulate_nodes(host, port, nodes=100, readings_per_node=10, sensor_ids=(1,), protocol='http'):
+    """Send readings from many simulated nodes concurrently
+
+    Returns:
+        Number of readings the gateway accepted (HTTP) or sent (UDP)
+    """
+    async def http_node(node):
+        accepted = 0
+        for i in range(readings_per_node):
+            reading = {'sensor_id': sensor_ids[(node + i) % len(sensor_ids)],
+                       'value': 30 + (node + i) % 50}
+            body = json.dumps(reading).encode('utf-8')
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(
+                f"POST /readings HTTP/1.1\r\nHost: {host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1')
+                + body
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            payload = json.loads(response.split(b'\r\n\r\n', 1)[1])
+            accepted += payload.get('accepted', 0)
+        return accepted
+
+    async def udp_node(node):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=(host, port)
+        )
+        for i in range(readings_per_node):
+            reading = {'sensor_id': sensor_ids[(node + i) % len(sensor_ids)],
+                       'value': 30 + (node + i) % 50}
+            transport.sendto(json.dumps(reading).encode('utf-8'))
+            await asyncio.sleep(0)
+        transport.close()
+        return readings_per_node
+
+    node = http_node if protocol == 'http' else udp_node
+    results = await asyncio.gather(*(node(n) for n in range(nodes)))
+    return sum(results)
+
+
+async def _serve(args):
+    from python.DBConnect import DBConnect
+    from python.ReadingIngest import ReadingIngestor
+
+    db = DBConnect(pooled=True)
+    db.connect()
+    # The gateway's own loop polls flush_if_due on its executor
+    ingestor = ReadingIngestor(db=db, batch_size=args.batch_size, flush_interval=args.flush_interval,
+                               auto_flush=False)
+    gateway = SensorGateway(ingestor, lambda: load_sensor_thresholds(db),
+                            flush_interval=args.flush_interval,
+                            reject_out_of_range=args.reject_out_of_range)
+    http_port, udp_port = await gateway.start(args.host, args.http_port, args.udp_port)
+    print(f"Sensor gateway listening on {args.host} (http {http_port}, udp {udp_port})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await gateway.stop()
+        db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Receive readings from sensor nodes')
+    parser.add_argument('--host', default=os.getenv('GATEWAY_HOST', '0.0.0.0'))
+    parser.add_argument('--http-port', type=int, default=int(os.getenv('GATEWAY_HTTP_PORT', '8080')))
+    parser.add_argument('--udp-port', type=int, default=int(os.getenv('GATEWAY_UDP_PORT', '8081')))
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help='Readings per database batch (default: 500)')
+    parser.add_argument('--flush-interval', type=float, default=2.0,
+                        help='Maximum seconds a reading waits before being written (default: 2)')
+    parser.add_argument('--reject-out-of-range', action='store_true',
+                        help='Refuse readings outside the sensor min/max thresholds')
+    parser.add_argument('--simulate', type=int, metavar='NODES',
+                        help='Instead of serving, send readings from NODES simulated nodes to a running gateway')
+    parser.add_argument('--sensor-ids', default='1',
+                        help='Comma-separated sensor ids used by --simulate (default: 1)')
+    args = parser.parse_args()
+
+    try:
+        if args.simulate:
+            host = '127.0.0.1' if args.host == '0.0.0.0' else args.host
+            sensor_ids = tuple(int(s) for s in args.sensor_ids.split(','))
+            accepted = asyncio.run(simulate_nodes(host, args.http_port, args.simulate,
+                                                  sensor_ids=sensor_ids))
+            print(f"Gateway accepted {accepted} readings")
+        else:
+            asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        print("\nSensor gateway stopped")
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,12 @@
 """
 API script for generating plots - can be called from PHP
 Returns JSON with plot components or data
+
+Requests are forwarded to the long-lived plot server (plot_server.py) when it
+is running; otherwise the plot is rendered in-process.
+
+--plant-ids renders one plot per plant (a comma-separated list, or "all")
+from a single query and prints them as one JSON map of plant ID to plot.
 """
 
 import os
@@ -12,65 +18,70 @@ import argparse
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from python.ProducePlot import PlotGenerator
+from python.plot_server import render, request_plot_raw, encode_response, decode_response, ENCODINGS, DEFAULT_SOCKET_PATH
+
+def render_in_process(plant_id, days, fmt, plant_ids=None, workers=0):
+    """Render with a fresh PlotGenerator when no plot server is available"""
+    from python.ProducePlot import create_plot_generator
+
+    # Only the on-disk cache backend (PLOT_CACHE_DIR) outlives this process
+    plotter = create_plot_generator()
+    try:
+        return render(plotter, plant_id, days, fmt, plant_ids, workers)
+    finally:
+        plotter.cleanup()
+
+def parse_plant_ids(value):
+    """Parse --plant-ids: 'all' or a comma-separated list of plant IDs"""
+    if value.strip().lower() == 'all':
+        return 'all'
+    try:
+        return [int(plant_id) for plant_id in value.split(',') if plant_id.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'all' or comma-separated plant IDs, got {value!r}")
 
 def main():
     parser = argparse.ArgumentParser(description='Generate plant-based sensor plots')
     parser.add_argument('--plant-id', type=int, default=None, help='Plant ID to filter by (optional)')
+    parser.add_argument('--plant-ids', type=parse_plant_ids, default=None,
+                       help='Render one plot per plant: comma-separated plant IDs or "all"')
+    parser.add_argument('--workers', type=int, default=0,
+                       help='Processes for rendering --plant-ids components in-process (default: 0, no pool)')
     parser.add_argument('--days', type=int, default=7, help='Number of days of data to include')
     parser.add_argument('--format', choices=['components', 'json'], default='components',
                        help='Output format: components (Bokeh embed) or json (raw data)')
-    
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH,
+                       help='Plot server socket path')
+    parser.add_argument('--no-server', action='store_true',
+                       help='Always render in-process instead of using the plot server')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='json',
+                       help='Response encoding written to stdout (default: json)')
+
     args = parser.parse_args()
-    
+
     try:
-        plotter = PlotGenerator()
-        
-        if args.format == 'components':
-            # Generate plot components for embedding
-            script, div = plotter.generate_plot(
-                days=args.days,
-                plant_id=args.plant_id,
-                return_components=True
-            )
-            
-            if script is None or div is None:
-                print(json.dumps({
-                    'success': False,
-                    'error': 'No data available for plotting'
-                }))
-                sys.exit(1)
-            
-            # Return components as JSON
-            result = {
-                'success': True,
-                'script': script,
-                'div': div
-            }
-            print(json.dumps(result))
-            
+        body = None
+        if not args.no_server:
+            try:
+                # Pass the server's bytes straight through without re-serialising
+                body = request_plot_raw(args.plant_id, args.days, args.format, args.encoding,
+                                        socket_path=args.socket, plant_ids=args.plant_ids)
+            except OSError:
+                # Server not running (or unreachable) - fall back to in-process rendering
+                body = None
+
+        if body is None:
+            result = render_in_process(args.plant_id, args.days, args.format, args.plant_ids, args.workers)
+            body = encode_response(result, args.encoding)
         else:
-            # Generate JSON data
-            data = plotter.generate_plot_json(
-                days=args.days,
-                plant_id=args.plant_id
-            )
-            
-            if data is None:
-                print(json.dumps({
-                    'success': False,
-                    'error': 'No data available for plotting'
-                }))
-                sys.exit(1)
-            
-            result = {
-                'success': True,
-                'data': json.loads(data)
-            }
-            print(json.dumps(result))
-        
-        plotter.cleanup()
-        
+            # Decoded only for the exit status; the original bytes are written out
+            result = decode_response(body, args.encoding)
+
+        sys.stdout.buffer.write(body.rstrip(b'\n') + b'\n' if args.encoding == 'json' else body)
+        sys.stdout.flush()
+        if not result.get('success'):
+            sys.exit(1)
+
     except Exception as e:
         print(json.dumps({
             'success': False,
@@ -80,4 +91,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Long-lived plot rendering service.
+
+Keeps pandas/numpy/bokeh imported and a PlotGenerator (with its database
+connection) alive between requests, so dashboard plots no longer pay the
+interpreter start-up and import cost on every call.
+
+Protocol: the client connects to a Unix socket, writes one JSON object
+terminated by a newline (``{"plant_id": 1, "days": 7, "format": "components"}``)
+and reads the response, in the same shape generate_plot_api.py prints, until
+the server closes the connection. ``"plant_ids"`` (a list of IDs or ``"all"``)
+instead of ``plant_id`` renders one plot per plant from a single query and
+returns them under ``"plots"``, keyed by plant ID. An optional ``"encoding"`` of ``gzip``
+(gzipped JSON) or ``msgpack`` (MessagePack, needs the msgpack package)
+selects a binary response; the default is one line of JSON.
+"""
+
+import os
+import sys
+import gzip
+import json
+import socket
+import argparse
+import socketserver
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+DEFAULT_SOCKET_PATH = os.getenv('PLOT_SERVER_SOCKET', '/tmp/garden-sensors-plot.sock')
+DEFAULT_TIMEOUT = float(os.getenv('PLOT_SERVER_TIMEOUT', '30'))
+FORMATS = ('components', 'json')
+ENCODINGS = ('json', 'gzip', 'msgpack')
+
+
+def render(plotter, plant_id=None, days=7, fmt='components', plant_ids=None, workers=0):
+    """Render a plot request with an existing PlotGenerator
+
+    With plant_ids (a list or 'all'), renders every plant in one batch; see
+    PlotGenerator.generate_plots.
+
+    Returns the response dictionary printed by generate_plot_api.py.
+    """
+    if plant_ids is not None:
+        plots = plotter.generate_plots(plant_ids, days=days, fmt=fmt, workers=workers)
+        if not plots:
+            return {'success': False, 'error': 'No data available for plotting'}
+        if fmt == 'components':
+            plots = {pid: {'script': script, 'div': div} for pid, (script, div) in plots.items()}
+        # String keys so JSON and MessagePack responses match
+        return {'success': True, 'plots': {str(pid): plot for pid, plot in plots.items()}}
+
+    if fmt == 'components':
+        script, div = plotter.generate_plot(
+            days=days,
+            plant_id=plant_id,
+            return_components=True
+        )
+        if script is None or div is None:
+            return {'success': False, 'error': 'No data available for plotting'}
+        return {'success': True, 'script': script, 'div': div}
+
+    data = plotter.generate_plot_data(days=days, plant_id=plant_id)
+    if data is None:
+        return {'success': False, 'error': 'No data available for plotting'}
+    return {'success': True, 'data': data}
+
+
+def encode_response(response, encoding='json'):
+    """Serialize a response in a single pass to bytes in the given encoding"""
+    if encoding == 'msgpack':
+        import msgpack
+        return msgpack.packb(response, use_single_float=True)
+    body = json.dumps(response, separators=(',', ':')).encode('utf-8')
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def decode_response(body, encoding='json'):
+    """Inverse of encode_response"""
+    if encoding == 'msgpack':
+        import msgpack
+        return msgpack.unpackb(body)
+    if encoding == 'gzip':
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+def parse_encoding(payload):
+    """Return the response encoding requested by a decoded request"""
+    encoding = payload.get('encoding', 'json') if isinstance(payload, dict) else 'json'
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+    return encoding
+
+
+def parse_request(payload):
+    """Validate a decoded request and return (plant_id, days, format)"""
+    if not isinstance(payload, dict):
+        raise ValueError('Request must be a JSON object')
+
+    plant_id = payload.get('plant_id')
+    if plant_id is not None:
+        plant_id = int(plant_id)
+        if plant_id <= 0:
+            plant_id = None
+
+    days = int(payload.get('days', 7))
+    if days < 1 or days > 365:
+        raise ValueError('days must be between 1 and 365')
+
+    fmt = payload.get('format', 'components')
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+    return plant_id, days, fmt
+
+
+def parse_plant_ids(payload):
+    """Return the batch plant_ids of a decoded request: a list of IDs, 'all', or None"""
+    plant_ids = payload.get('plant_ids') if isinstance(payload, dict) else None
+    if plant_ids is None or plant_ids == 'all':
+        return plant_ids
+    if not isinstance(plant_ids, list):
+        raise ValueError("plant_ids must be a list of plant IDs or 'all'")
+    return [int(plant_id) for plant_id in plant_ids]
+
+
+def request_plot_raw(plant_id=None, days=7, fmt='components', encoding='json',
+                     socket_path=DEFAULT_SOCKET_PATH, timeout=DEFAULT_TIMEOUT, plant_ids=None):
+    """Send a request to a running plot server and return the encoded response bytes
+
+    Raises OSError if no server is listening on socket_path.
+    """
+    request = {'plant_id': plant_id, 'days': days, 'format': fmt, 'encoding': encoding}
+    if plant_ids is not None:
+        request['plant_ids'] = plant_ids
+    request = json.dumps(request)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(request.encode('utf-8') + b'\n')
+        with sock.makefile('rb') as stream:
+            body = stream.read()
+    if not body:
+        raise ConnectionError('Plot server closed the connection without a response')
+    return body
+
+
+def request_plot(plant_id=None, days=7, fmt='components', encoding='json',
+                 socket_path=DEFAULT_SOCKET_PATH, timeout=DEFAULT_TIMEOUT, plant_ids=None):
+    """Send a request to a running plot server and return its decoded response
+
+    Raises OSError if no server is listening on socket_path.
+    """
+    body = request_plot_raw(plant_id, days, fmt, encoding, socket_path=socket_path, timeout=timeout,
+                            plant_ids=plant_ids)
+    return decode_response(body, encoding)
+
+
+class PlotRequestHandler(socketserver.StreamRequestHandler):
+    """Handle one newline-delimited JSON request per connection"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        encoding = 'json'
+        try:
+            payload = json.loads(line)
+            encoding = parse_encoding(payload)
+            plant_id, days, fmt = parse_request(payload)
+            response = self.server.render(plant_id, days, fmt, parse_plant_ids(payload))
+        except Exception as e:
+            response = {'success': False, 'error': str(e)}
+        try:
+            body = encode_response(response, encoding)
+        except ImportError as e:
+            # msgpack not installed: report it as plain JSON
+            body = encode_response({'success': False, 'error': str(e)})
+            encoding = 'json'
+        if encoding == 'json':
+            body += b'\n'
+        self.wfile.write(body)
+
+
+class PlotServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server that shares one warm PlotGenerator between requests"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, plotter):
+        self.socket_path = socket_path
+        # Requests render concurrently on the shared plotter. Its state is
+        # safe to share: queries check a connection out of the DBConnect pool
+        # per call, PlotCache locks its entries and the ReadingStore is only
+        # read. A connection that fails a query is discarded by the pool.
+        self.plotter = plotter
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, PlotRequestHandler)
+        os.chmod(socket_path, 0o660)
+
+    def render(self, plant_id, days, fmt, plant_ids=None):
+        """Render one request on the shared plotter"""
+        return render(self.plotter, plant_id, days, fmt, plant_ids)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the plot rendering service')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH,
+                        help=f'Unix socket path (default: {DEFAULT_SOCKET_PATH})')
+    args = parser.parse_args()
+
+    from python.ProducePlot import create_plot_generator
+
+    plotter = create_plot_generator()
+    server = PlotServer(args.socket, plotter)
+    print(f"Plot server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nPlot server stopped")
+    finally:
+        server.server_close()
+        plotter.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Cold-start import benchmark for the python/ entry points.
+
+Each entry point is imported in a fresh interpreter with -X importtime. The
+report shows the total import time (median of several runs) and the
+heaviest direct imports. --check fails if an entry point loads a module it
+should not need: pump control must start without pandas, and plot JSON
+output without Bokeh.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name: (module imported, modules its startup must not load)
+ENTRY_POINTS = {
+    'pump': ('python.RunPump', ('pandas', 'numpy', 'bokeh')),
+    'action-log': ('python.ActionLog', ('pandas', 'numpy', 'bokeh')),
+    'plot-json': ('python.ProducePlot', ('bokeh',)),
+    'plot-api': ('python.generate_plot_api', ('pandas', 'numpy', 'bokeh')),
+    'plot-server': ('python.plot_server', ('pandas', 'numpy', 'bokeh')),
+    'gateway': ('python.SensorGateway', ('pandas', 'numpy', 'bokeh')),
+}
+
+
+def parse_importtime(stderr):
+    """Parse -X importtime output
+
+    Returns:
+        List of (module, self_us, cumulative_us, depth) in output order
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def measure(module):
+    """Import module in a new interpreter
+
+    Returns:
+        List of (module, self_us, cumulative_us, depth)
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(result.stderr)
+
+
+def benchmark(name, runs=5, top=5):
+    """Time one entry point
+
+    Returns:
+        dict with module, ms (median total), heaviest [(module, ms)] and
+        forbidden modules that were loaded
+    """
+    module, forbidden = ENTRY_POINTS[name]
+    totals = []
+    for _ in range(runs):
+        entries = measure(module)
+        totals.append(next(cumulative for mod, _, cumulative, depth in entries if mod == module and depth == 0))
+    # Direct imports of the entry module sit one level below it
+    direct = [(mod, cumulative) for mod, _, cumulative, depth in entries if depth == 1]
+    loaded = {mod.split('.')[0] for mod, *_ in entries}
+    return {
+        'module': module,
+        'ms': median(totals) / 1000,
+        'heaviest': [(mod, us / 1000) for mod, us in sorted(direct, key=lambda d: -d[1])[:top]],
+        'forbidden': sorted(loaded & set(forbidden)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure entry point import time with -X importtime')
+    parser.add_argument('entry_points', nargs='*',
+                        help=f"Entry points to measure: {', '.join(ENTRY_POINTS)} (default: all)")
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per entry point')
+    parser.add_argument('--top', type=int, default=5, help='Heaviest direct imports to list')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with status 1 if an entry point loads a module it should not')
+    args = parser.parse_args()
+    unknown = set(args.entry_points) - set(ENTRY_POINTS)
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(sorted(unknown))}")
+
+    failed = []
+    try:
+        for name in args.entry_points or ENTRY_POINTS:
+            result = benchmark(name, runs=args.runs, top=args.top)
+            print(f"{name:12} {result['module']:28} {result['ms']:8.1f} ms")
+            for module, ms in result['heaviest']:
+                print(f"{'':14}{module:40} {ms:8.1f} ms")
+            if result['forbidden']:
+                print(f"{'':14}loads {', '.join(result['forbidden'])}")
+                failed.append(name)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.check and failed:
+        print(f"Error: unneeded heavy imports in {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Local FTP server for tests, backed by pyftpdlib when it is installed"""
+
+import os
+import ftplib
+import socket
+import threading
+from contextlib import contextmanager
+from unittest.mock import patch
+
+try:
+    from pyftpdlib.authorizers import DummyAuthorizer
+    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.servers import ThreadedFTPServer
+    AVAILABLE = True
+except ImportError:
+    AVAILABLE = False
+
+USERNAME = 'garden'
+PASSWORD = 'garden'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def local_ftp_server(root):
+    """Serve root over FTP on localhost for the duration of the block
+
+    FTP_HOST/FTP_USERNAME/FTP_PASSWORD point at the server and ftplib's
+    default port is patched to it, so FTPConnect() connects without changes.
+    Yields the port.
+    """
+    authorizer = DummyAuthorizer()
+    authorizer.add_user(USERNAME, PASSWORD, root, perm='elradfmwMT')
+    handler = type('Handler', (FTPHandler,), {'authorizer': authorizer, 'banner': 'test'})
+    port = _free_port()
+    server = ThreadedFTPServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'timeout': 0.1}, daemon=True)
+    thread.start()
+    env = {'FTP_HOST': '127.0.0.1', 'FTP_USERNAME': USERNAME, 'FTP_PASSWORD': PASSWORD,
+           'FTP_PORT': str(port)}
+    try:
+        with patch.dict(os.environ, env), patch.object(ftplib.FTP, 'port', port):
+            yield port
+    finally:
+        server.close_all()
+        thread.join(5)
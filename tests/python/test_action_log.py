@@ -0,0 +1,98 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch, MagicMock
+from datetime import datetime, UTC
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.ActionLog import ActionLogWriter, build_log_insert
+
+class TestActionLogWriter(unittest.TestCase):
+    def setUp(self):
+        """Set up a spool in a temporary directory and a mock database."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.tmp.name, 'actions.spool')
+        self.mock_db = MagicMock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def writer(self, **kwargs):
+        kwargs.setdefault('flush_interval', 0.05)
+        return ActionLogWriter(db=self.mock_db, spool_path=self.spool, **kwargs)
+
+    def test_build_log_insert(self):
+        """Test that entries become one multi-row insert with parsed timestamps."""
+        stamp = datetime(2024, 5, 1, 6, 0, tzinfo=UTC)
+        query, params = build_log_insert([
+            {'component': 'pump', 'action': 'start', 'timestamp': stamp.isoformat()},
+            {'component': 'pump', 'action': 'stop', 'timestamp': stamp.isoformat()},
+        ])
+
+        self.assertEqual(query.count('(%s, %s, %s)'), 2)
+        self.assertEqual(params[2], stamp)
+
+    def test_actions_are_batched_with_original_timestamps(self):
+        """Test that queued actions are inserted together, keeping their timestamps."""
+        writer = self.writer(flush_interval=5)
+        stamps = [datetime(2024, 5, 1, 6, 0, second, tzinfo=UTC) for second in range(3)]
+        for stamp in stamps:
+            self.assertTrue(writer.log('pump', 'start', stamp))
+
+        writer.close()
+
+        self.mock_db.execute_query.assert_called_once()
+        query, params = self.mock_db.execute_query.call_args[0]
+        self.assertEqual(params[2::3], stamps)
+        self.assertEqual(os.path.getsize(self.spool), 0)
+
+    def test_failed_writes_are_replayed_from_spool(self):
+        """Test that actions survive a database outage and are replayed on restart."""
+        self.mock_db.execute_query.side_effect = Exception("Database unavailable")
+        writer = self.writer()
+        writer.log('pump', 'start')
+        writer.log('pump', 'stop')
+        writer.close()
+        self.assertGreater(os.path.getsize(self.spool), 0)
+
+        self.mock_db.execute_query.side_effect = None
+        self.mock_db.execute_query.reset_mock()
+        replay = self.writer(start=False)
+
+        self.assertEqual(replay.flush_spool(), 2)
+        self.assertEqual(replay.flush_spool(), 0)
+        self.mock_db.execute_query.assert_called_once()
+
+    def test_spool_works_without_flock(self):
+        """Test that the spool is still written and replayed where fcntl is missing."""
+        with patch('python.ActionLog.fcntl', None):
+            writer = self.writer(flush_interval=5)
+            writer.log('pump', 'start')
+            writer.close()
+
+        self.mock_db.execute_query.assert_called_once()
+        self.assertEqual(os.path.getsize(self.spool), 0)
+
+    def test_torn_spool_line_is_discarded(self):
+        """Test that a partially written final line does not block the spool."""
+        with open(self.spool, 'w', encoding='utf-8') as f:
+            f.write('{"component": "pump", "action": "start", "timestamp": "2024-05-01T06:00:00+00:00"}\n')
+            f.write('{"component": "pump", "act')
+        writer = self.writer(start=False)
+
+        self.assertEqual(writer.flush_spool(), 1)
+        self.assertEqual(os.path.getsize(self.spool), 0)
+
+    def test_full_queue_never_blocks(self):
+        """Test that log() drops instead of blocking when the queue is full."""
+        writer = self.writer(max_queue=1, start=False)
+
+        self.assertTrue(writer.log('pump', 'start'))
+        self.assertFalse(writer.log('pump', 'stop'))
+        self.assertEqual(writer.dropped, 1)
+        writer.close()
+        self.assertEqual(self.mock_db.execute_query.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
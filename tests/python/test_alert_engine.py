@@ -0,0 +1,178 @@
+import unittest
+import os
+import sys
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.AlertEngine import AlertEngine, classify, LOW, HIGH, OK
+
+class TestAlertEngine(unittest.TestCase):
+    def setUp(self):
+        """Set up an engine over a mock database holding two sensors."""
+        self.mock_db = MagicMock()
+        self.cursor = MagicMock()
+
+        @contextmanager
+        def transaction():
+            yield self.cursor
+
+        self.mock_db.transaction.side_effect = transaction
+        self.sensors = [
+            (1, 'Bed A', 'moisture', 7, Decimal('20.00'), Decimal('80.00'), 100, 'ok', 'ok', 0),
+            (2, 'Bed B', 'temperature', 7, Decimal('10.00'), Decimal('30.00'), 100, 'ok', 'ok', 0),
+        ]
+        self.readings = []
+        self.mock_db.execute_query.side_effect = self.query
+        self.engine = AlertEngine(db=self.mock_db, hysteresis=0.1, debounce=2)
+        self.start = datetime(2024, 5, 1, 6, 0)
+
+    def query(self, query, params=None):
+        if 'FROM sensors' in query:
+            return self.sensors
+        if 'MAX(id)' in query:
+            watermark, settle_seconds = params
+            settled = datetime.now() - timedelta(seconds=settle_seconds)
+            return [(max([r[0] for r in self.readings if r[0] > watermark and r[3] <= settled], default=0),)]
+        lower, upper = params
+        return [r for r in self.readings if lower < r[0] <= upper]
+
+    def add(self, sensor_id, *values):
+        for value in values:
+            reading_id = max([r[0] for r in self.readings], default=100) + 1
+            self.readings.append((reading_id, sensor_id, Decimal(str(value)),
+                                  self.start + timedelta(minutes=reading_id)))
+
+    def written(self, table):
+        return [c[0] for c in self.cursor.execute.call_args_list if f'INSERT INTO {table}' in c[0][0]]
+
+    def test_classify(self):
+        """Test raw states, with readings in the hysteresis margin left undecided."""
+        raw = classify([10, 21, 30, 50, 79, 90], [20] * 6, [80] * 6, 0.1)
+
+        self.assertEqual(raw[0], LOW)
+        self.assertTrue(all(v != v for v in raw[[1, 4]]))
+        self.assertEqual(list(raw[[2, 3]]), [OK, OK])
+        self.assertEqual(raw[5], HIGH)
+
+    def test_debounced_alert_fires_once(self):
+        """Test that a sustained breach creates one notification after the debounce."""
+        self.add(1, 50, 10, 12, 11, 9)
+
+        evaluated, created = self.engine.run()
+
+        self.assertEqual((evaluated, created), (5, 1))
+        (query, params), = self.written('notifications')
+        self.assertEqual(params[0], 7)
+        self.assertEqual(json.loads(params[3])['reading_id'], 103)
+        self.assertIn('low alert', params[2])
+        (query, params), = self.written('alert_state')
+        # The idle sensor's watermark moves up with the scan
+        self.assertEqual(params, [1, 105, 'low', 'low', 4, 2, 105, 'ok', 'ok', 0])
+
+    def test_readings_at_threshold_are_not_breaches(self):
+        """Test that float32 readings equal to a 2-decimal threshold stay in range."""
+        self.sensors[1] = self.sensors[1][:4] + (Decimal('10.10'), Decimal('30.10')) + self.sensors[1][6:]
+        self.add(2, 30.1, 30.1, 30.11, 30.12)
+
+        self.engine.run()
+
+        (query, params), = self.written('notifications')
+        data = json.loads(params[3])
+        self.assertEqual((data['reading_id'], data['reading']), (104, 30.12))
+        self.assertIn(': 30.12 (thresholds 10.1-30.1)', params[2])
+        self.assertIs(type(params[4]), datetime)
+
+    def test_single_spike_is_ignored(self):
+        """Test that one out-of-range reading does not alert."""
+        self.add(2, 20, 40, 20)
+
+        self.assertEqual(self.engine.run(), (3, 0))
+        self.assertEqual(self.written('notifications'), [])
+
+    def test_hysteresis_holds_alert(self):
+        """Test that an alert only clears once readings leave the margin."""
+        self.sensors[0] = self.sensors[0][:7] + ('low', 'low', 5)
+        self.add(1, 22, 21, 23, 22)
+
+        self.engine.run()
+
+        (query, params), = self.written('alert_state')
+        self.assertEqual(params[2:4], ['low', 'low'])
+
+        self.add(1, 40, 45, 12, 10)
+        self.engine.run()
+
+        self.assertEqual(len(self.written('notifications')), 1)
+
+    def test_debounce_spans_runs(self):
+        """Test that a candidate state carries over between runs."""
+        self.add(2, 35)
+        self.engine.run()
+        self.assertEqual(self.written('notifications'), [])
+        self.sensors[1] = self.sensors[1][:6] + (101, 'ok', 'high', 1)
+
+        self.add(2, 36)
+        self.engine.run()
+
+        self.assertEqual(len(self.written('notifications')), 1)
+
+    def test_only_new_readings_are_read(self):
+        """Test that readings below the watermark are never fetched."""
+        self.sensors = [sensor[:6] + (150, 'ok', 'ok', 0) for sensor in self.sensors]
+        self.readings = [(id_, 1, Decimal('50'), self.start) for id_ in range(101, 160)]
+
+        evaluated, _ = self.engine.run()
+
+        self.assertEqual(evaluated, 9)
+        fetches = [c[0][1] for c in self.mock_db.execute_query.call_args_list
+                   if len(c[0]) > 1 and 'MAX(id)' not in c[0][0]]
+        self.assertEqual(fetches, [(150, 159)])
+
+    def test_unsettled_readings_wait_for_next_run(self):
+        """Test that the watermark stops before readings inside the settle window."""
+        self.add(2, 36)
+        self.readings.append((102, 2, Decimal('36'), datetime.now()))
+
+        self.assertEqual(self.engine.run(), (1, 0))
+        (query, params), = self.written('alert_state')
+        self.assertIn(101, params)
+        self.assertNotIn(102, params)
+
+        # Once settled, the next run picks it up and confirms the breach
+        self.sensors[1] = self.sensors[1][:6] + (101, 'ok', 'high', 1)
+        self.engine.settle_seconds = -60
+        self.assertEqual(self.engine.run(), (1, 1))
+
+    def test_new_sensor_starts_at_latest_reading(self):
+        """Test that history before a sensor is first seen does not alert."""
+        self.sensors[0] = self.sensors[0][:6] + (None, None, None, None)
+        self.add(1, 1, 1, 1)
+
+        self.assertEqual(self.engine.run(), (0, 0))
+        (query, params), _ = self.written('alert_state')
+        self.assertEqual(params[:2], [1, 103])
+
+    def test_idle_sensor_does_not_hold_back_the_scan(self):
+        """Test that a sensor that stops reporting does not pin the next run's lower bound."""
+        self.sensors[1] = self.sensors[1][:6] + (40, 'ok', 'ok', 0)
+        self.add(1, 50, 50)
+
+        self.assertEqual(self.engine.run(), (2, 0))
+        (query, params), = self.written('alert_state')
+        self.assertEqual(params, [1, 102, 'ok', 'ok', 2, 2, 102, 'ok', 'ok', 0])
+
+        self.sensors = [sensor[:6] + (102, 'ok', 'ok', 0) for sensor in self.sensors]
+        self.add(1, 50)
+        self.mock_db.execute_query.reset_mock()
+        self.engine.run()
+
+        fetches = [c[0][1] for c in self.mock_db.execute_query.call_args_list
+                   if len(c[0]) > 1 and 'MAX(id)' not in c[0][0]]
+        self.assertEqual(fetches, [(102, 103)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,13 @@ import unittest
 import os
 from unittest.mock import patch, MagicMock
 import sys
+import mysql.connector
+from decimal import Decimal
+from datetime import datetime
+import numpy as np
+import pandas as pd
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from python.DBConnect import DBConnect
+from python.DBConnect import DBConnect, ConnectionPool, PoolTimeoutError, compact_frame
 
 class TestDBConnect(unittest.TestCase):
     def setUp(self):
@@ -133,6 +138,31 @@ class TestDBConnect(unittest.TestCase):
         
         mock_conn.rollback.assert_called_once()
 
+    def test_transaction_commits(self):
+        """Test that a transaction block commits once on success."""
+        self.db.conn = MagicMock()
+        self.db.cursor = MagicMock()
+
+        with self.db.transaction() as cursor:
+            cursor.execute("UPDATE sensors SET status = 'active'")
+            cursor.execute("UPDATE plants SET status = 'active'")
+
+        self.assertEqual(self.db.cursor.execute.call_count, 2)
+        self.db.conn.commit.assert_called_once()
+        self.db.conn.rollback.assert_not_called()
+
+    def test_transaction_rolls_back(self):
+        """Test that a failing transaction block rolls back."""
+        self.db.conn = MagicMock()
+        self.db.cursor = MagicMock()
+
+        with self.assertRaises(ValueError):
+            with self.db.transaction():
+                raise ValueError("Bad batch")
+
+        self.db.conn.rollback.assert_called_once()
+        self.db.conn.commit.assert_not_called()
+
     @patch('mysql.connector.connect')
     def test_context_manager(self, mock_connect):
         """Test DBConnect as a context manager."""
@@ -148,5 +178,200 @@ class TestDBConnect(unittest.TestCase):
         mock_connect.assert_called_once()
         mock_conn.close.assert_called_once()
 
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        """Set up a pool whose connections are mocks."""
+        self.connect_patcher = patch('mysql.connector.connect', side_effect=lambda **kwargs: MagicMock())
+        self.mock_connect = self.connect_patcher.start()
+        self.pool = ConnectionPool('localhost', 'user', 'pass', 'db',
+                                   min_size=1, max_size=2, idle_timeout=60, checkout_timeout=0.1)
+
+    def tearDown(self):
+        """Close the pool and stop patching."""
+        self.pool.close()
+        self.connect_patcher.stop()
+
+    def test_invalid_sizes(self):
+        """Test that inconsistent pool sizes are rejected."""
+        with self.assertRaises(ValueError):
+            ConnectionPool('localhost', 'user', 'pass', 'db', min_size=3, max_size=2)
+
+    def test_connections_are_reused(self):
+        """Test that a released connection is handed out again after a ping."""
+        first = self.pool.acquire()
+        self.pool.release(first)
+        second = self.pool.acquire()
+
+        self.assertIs(first, second)
+        self.assertEqual(self.mock_connect.call_count, 1)
+        second.connection.ping.assert_called_with(reconnect=True, attempts=1, delay=0)
+
+    def test_bounded_size(self):
+        """Test that checkout waits, then times out, once max_size is reached."""
+        self.pool.acquire()
+        self.pool.acquire()
+
+        self.assertEqual(self.pool.size, 2)
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.acquire()
+
+    def test_failed_ping_is_discarded(self):
+        """Test that a connection failing its health check is not returned."""
+        pooled = self.pool.acquire()
+        pooled.connection.ping.side_effect = Exception("Server has gone away")
+        self.pool.release(pooled)
+
+        with self.assertRaises(Exception):
+            self.pool.acquire()
+        self.assertEqual(self.pool.size, 0)
+        pooled.connection.close.assert_called_once()
+
+    def test_idle_connections_are_reaped(self):
+        """Test that connections idle past the timeout are closed down to min_size."""
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.pool.release(first)
+        self.pool.release(second)
+        first.last_used -= 120
+        second.last_used -= 120
+
+        self.pool.acquire()
+
+        self.assertEqual(self.pool.size, 1)
+
+    def test_broken_connection_discarded_on_error(self):
+        """Test that an error on a dead connection closes it instead of pooling it."""
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection() as pooled:
+                pooled.connection.is_connected.return_value = False
+                raise RuntimeError("Lost connection")
+
+        self.assertEqual(self.pool.size, 0)
+
+    def test_connection_error_discards_connection(self):
+        """Test that a connection-level error closes the connection even if it still looks connected."""
+        with self.assertRaises(mysql.connector.errors.OperationalError):
+            with self.pool.connection() as pooled:
+                pooled.connection.is_connected.return_value = True
+                raise mysql.connector.errors.OperationalError("Lost connection to MySQL server during query")
+
+        self.assertEqual(self.pool.size, 0)
+        pooled.connection.close.assert_called_once()
+
+        with self.assertRaises(ValueError):
+            with self.pool.connection() as pooled:
+                raise ValueError("Bad parameter")
+        self.assertEqual(self.pool.idle, 1)
+
+    def test_pooled_execute_query_reuses_prepared_cursor(self):
+        """Test that DBConnect in pooled mode reuses one prepared cursor per connection."""
+        db = DBConnect(pooled=True)
+        db.pool = self.pool
+
+        db.execute_query("SELECT * FROM readings WHERE sensor_id = %s", (1,))
+        db.execute_query("SELECT * FROM readings WHERE sensor_id = %s", (2,))
+
+        self.assertEqual(self.mock_connect.call_count, 1)
+        pooled = self.pool.acquire()
+        pooled.connection.cursor.assert_called_once_with(prepared=True)
+        self.assertIsNone(db.conn)
+
+    def test_alternating_statements_stay_prepared(self):
+        """Test that each statement keeps its own prepared cursor, bounded per connection."""
+        self.mock_connect.side_effect = lambda **kwargs: MagicMock(
+            cursor=MagicMock(side_effect=lambda **kw: MagicMock()))
+        db = DBConnect(pooled=True)
+        db.pool = self.pool
+        plot = "SELECT * FROM readings WHERE sensor_id = %s"
+        alert = "SELECT * FROM alert_state WHERE sensor_id = %s"
+
+        for sensor_id in range(3):
+            db.execute_query(plot, (sensor_id,))
+            db.execute_query(alert, (sensor_id,))
+
+        pooled = self.pool.acquire()
+        self.assertEqual(pooled.connection.cursor.call_count, 2)
+        self.assertEqual(list(pooled._prepared), [plot, alert])
+
+        plot_cursor, alert_cursor = pooled._prepared[plot], pooled._prepared[alert]
+        pooled.cursor(prepared=True, query=plot)
+        pooled.max_prepared = 2
+        pooled.cursor(prepared=True, query="SELECT 1 WHERE %s")
+        self.assertEqual(list(pooled._prepared), [plot, "SELECT 1 WHERE %s"])
+        self.assertIsNot(plot_cursor, alert_cursor)
+        alert_cursor.close.assert_called_once()
+        plot_cursor.close.assert_not_called()
+
+    def test_pooled_execute_many(self):
+        """Test that batch queries run on a pooled connection and commit."""
+        db = DBConnect(pooled=True)
+        db.pool = self.pool
+        params = [(1, 10.5), (2, 11.0)]
+
+        db.execute_many("INSERT INTO readings (sensor_id, value) VALUES (%s, %s)", params)
+
+        pooled = self.pool.acquire()
+        pooled.connection.cursor.return_value.executemany.assert_called_once()
+        pooled.connection.commit.assert_called_once()
+
+    def test_iter_dataframes_streams_chunks(self):
+        """Test that streamed chunks use an unbuffered cursor and compact dtypes."""
+        db = DBConnect(pooled=True)
+        db.pool = self.pool
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        cursor = pooled.connection.cursor.return_value
+        cursor.description = [('sensor_name',), ('value',), ('created_at',)]
+        cursor.fetchmany.side_effect = [
+            [('Soil', Decimal('40.50'), datetime(2024, 5, 1)), ('Soil', Decimal('41.00'), datetime(2024, 5, 1, 0, 5))],
+            [('Soil', Decimal('42.25'), datetime(2024, 5, 1, 0, 10))],
+            [],
+        ]
+
+        chunks = list(db.iter_dataframes("SELECT ...", (1,), chunk_size=2, categorical=('sensor_name',)))
+
+        pooled.connection.cursor.assert_called_with(buffered=False)
+        cursor.fetchmany.assert_called_with(2)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertEqual(chunks[0]['value'].dtype, np.float32)
+        self.assertEqual(chunks[0]['created_at'].dtype, np.int64)
+        self.assertEqual(chunks[0]['created_at'].iloc[0], int(pd.Timestamp('2024-05-01').value // 10**6))
+        self.assertIsInstance(chunks[0]['sensor_name'].dtype, pd.CategoricalDtype)
+        self.assertEqual(self.pool.idle, 1)
+
+    def test_abandoned_stream_discards_connection(self):
+        """Test that closing a stream early drops its half-read connection."""
+        db = DBConnect(pooled=True)
+        db.pool = self.pool
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        cursor = pooled.connection.cursor.return_value
+        cursor.description = [('value',)]
+        cursor.fetchmany.return_value = [(1.0,), (2.0,)]
+
+        stream = db.iter_dataframes("SELECT ...", chunk_size=2, as_records=True)
+        batch = next(stream)
+        stream.close()
+
+        self.assertEqual(batch['value'].tolist(), [1.0, 2.0])
+        self.assertEqual(self.pool.size, 0)
+
+class TestCompactFrame(unittest.TestCase):
+    def test_compact_frame(self):
+        """Test conversion to float32, epoch milliseconds and categoricals."""
+        df = pd.DataFrame({
+            'plant_name': ['Fern', 'Fern'],
+            'value': [1.5, 2.5],
+            'created_at': pd.to_datetime(['1970-01-01 00:00:01', '1970-01-01 00:00:02']),
+            'sensor_id': [1, 2],
+        })
+
+        compact_frame(df, categorical=('plant_name',))
+
+        self.assertEqual(df['value'].dtype, np.float32)
+        self.assertEqual(df['created_at'].tolist(), [1000, 2000])
+        self.assertIsInstance(df['plant_name'].dtype, pd.CategoricalDtype)
+        self.assertEqual(df['sensor_id'].dtype, np.int64)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
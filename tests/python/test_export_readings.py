@@ -0,0 +1,60 @@
+import unittest
+import os
+import io
+import sys
+import json
+import pandas as pd
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.ExportReadings import build_query, write_chunks, summarize_chunks
+
+def chunk(sensor_ids, values, minutes):
+    """Build a compact-dtype readings chunk"""
+    created = [int(pd.Timestamp(2024, 5, 1, 0, m).value // 10**6) for m in minutes]
+    return pd.DataFrame({'sensor_id': sensor_ids, 'value': values, 'created_at': created})
+
+class TestExportReadings(unittest.TestCase):
+    def test_build_query_plant_filter(self):
+        """Test the plant filter adds a parameter."""
+        query, params = build_query(datetime(2024, 1, 1), datetime(2024, 2, 1), plant_id=3)
+        self.assertIn("p.id = %s", query)
+        self.assertEqual(params[-1], 3)
+
+    def test_write_csv_writes_header_once(self):
+        """Test CSV output spans chunks with a single header."""
+        output = io.StringIO()
+        rows = write_chunks([chunk([1], [40.5], [0]), chunk([1], [41.0], [5])], output, 'csv')
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(rows, 2)
+        self.assertEqual(lines[0], 'sensor_id,value,created_at')
+        self.assertEqual(lines[2], '1,41.0,2024-05-01 00:05:00')
+        self.assertEqual(len(lines), 3)
+
+    def test_write_ndjson(self):
+        """Test NDJSON output is one object per line, with no blank lines between chunks."""
+        output = io.StringIO()
+        write_chunks([chunk([1, 2], [40.5, 20.0], [0, 1]), chunk([3], [12.5], [2])], output, 'ndjson')
+
+        self.assertTrue(output.getvalue().endswith('}\n'))
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[1]['created_at'], '2024-05-01 00:01:00')
+        self.assertEqual(records[2]['sensor_id'], 3)
+
+    def test_summarize_chunks_combines_groups(self):
+        """Test aggregates are folded across chunks."""
+        summary = summarize_chunks([
+            chunk([1, 1, 2], [10.0, 20.0, 5.0], [0, 1, 2]),
+            chunk([1, 3], [30.0, 7.0], [3, 4]),
+        ])
+
+        self.assertEqual(summary.loc[1, 'count'], 3)
+        self.assertEqual(summary.loc[1, 'min'], 10.0)
+        self.assertEqual(summary.loc[1, 'max'], 30.0)
+        self.assertAlmostEqual(summary.loc[1, 'mean'], 20.0)
+        self.assertEqual(summary.loc[3, 'count'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
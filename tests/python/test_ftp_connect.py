@@ -1,9 +1,16 @@
 import unittest
 import os
+import io
+import gzip
+import ftplib
+from time import sleep
+import tempfile
+import pandas as pd
 from unittest.mock import patch, MagicMock
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from python.FTPConnectMod import FTPConnect
+from python.FTPConnectMod import FTPConnect, FTPStream
+import local_ftp
 
 class TestFTPConnect(unittest.TestCase):
     def setUp(self):
@@ -140,6 +147,15 @@ class TestFTPConnect(unittest.TestCase):
         
         mock_ftp.delete.assert_called_once_with('file.txt')
 
+    def test_rename_file(self):
+        """Test file rename."""
+        mock_ftp = MagicMock()
+        self.ftp.ftp = mock_ftp
+
+        self.assertTrue(self.ftp.rename_file('file.txt.tmp', 'file.txt'))
+
+        mock_ftp.rename.assert_called_once_with('file.txt.tmp', 'file.txt')
+
     def test_context_manager(self):
         """Test FTPConnect as a context manager."""
         mock_ftp = MagicMock()
@@ -161,5 +177,120 @@ class TestFTPConnect(unittest.TestCase):
         mock_ftp.quit.assert_called_once()
         self.assertIsNone(self.ftp.ftp)
 
+class TestFTPStream(unittest.TestCase):
+    def setUp(self):
+        """Serve self.data through a mock retrbinary that honours REST."""
+        self.ftp = FTPConnect()
+        self.mock_ftp = MagicMock()
+        self.mock_ftp.retrbinary.side_effect = self.retrbinary
+        self.ftp.ftp = self.mock_ftp
+        self.data = b''.join(f"{i},{i % 7}.5\n".encode() for i in range(20000))
+        self.rests = []
+        self.fail_after = None
+
+    def retrbinary(self, cmd, callback, blocksize, rest=None):
+        self.rests.append(rest)
+        for offset in range(rest or 0, len(self.data), blocksize):
+            if self.fail_after is not None and offset >= self.fail_after:
+                self.fail_after = None
+                raise EOFError('connection dropped')
+            callback(self.data[offset:offset + blocksize])
+
+    def test_stream_reads_whole_file(self):
+        """Test that the stream yields the file in order through read() and lines."""
+        with self.ftp.stream_file('dump.csv', block_size=1000) as stream:
+            self.assertEqual(stream.read(10), self.data[:10])
+            self.assertEqual(stream.readline(), self.data[10:self.data.index(b'\n', 10) + 1])
+            rest = stream.read()
+        self.assertEqual(self.data[:10] + self.data[10:].split(b'\n', 1)[0] + b'\n' + rest, self.data)
+        self.assertIs(self.ftp.ftp, self.mock_ftp)
+
+    def test_bounded_buffer_applies_backpressure(self):
+        """Test that the download waits while the reader is behind."""
+        stream = self.ftp.stream_file('dump.csv', block_size=100, max_buffer=2)
+        sleep(0.2)
+
+        self.assertEqual(stream.received, 200)
+        chunks = list(stream.iter_chunks())
+        self.assertEqual(b''.join(chunks), self.data)
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        stream.close()
+
+    def test_gzip_feeds_pandas(self):
+        """Test on-the-fly decompression, including concatenated gzip members."""
+        half = self.data.index(b'\n', len(self.data) // 2) + 1
+        self.data = gzip.compress(b'sensor,value\n' + self.data[:half]) + gzip.compress(self.data[half:])
+
+        with self.ftp.stream_file('dump.csv.gz', block_size=512, decompress='auto') as stream:
+            df = pd.concat(pd.read_csv(stream, chunksize=5000))
+
+        self.assertEqual(len(df), 20000)
+        self.assertEqual(df['value'].iloc[-1], 19999 % 7 + 0.5)
+
+    def test_truncated_compressed_stream_raises(self):
+        """Test that a compressed file cut short is an error, not a short read."""
+        self.data = gzip.compress(self.data)[:-100]
+
+        with self.ftp.stream_file('dump.gz', decompress='gzip') as stream:
+            with self.assertRaises(EOFError):
+                stream.read()
+
+    @patch('python.FTPConnectMod.ftplib.FTP')
+    def test_dropped_transfer_resumes_with_rest(self, mock_ftp_class):
+        """Test that a dropped transfer reconnects and continues from the bytes received."""
+        mock_ftp_class.return_value = self.mock_ftp
+        self.fail_after = 3000
+
+        with patch('builtins.print'):
+            with self.ftp.stream_file('dump.csv', block_size=1000) as stream:
+                self.assertEqual(stream.read(), self.data)
+
+        self.assertEqual(self.rests, [None, 3000])
+        self.mock_ftp.login.assert_called_once()
+
+    def test_close_early_aborts_transfer(self):
+        """Test that closing mid-file stops the download and drops the session."""
+        stream = self.ftp.stream_file('dump.csv', block_size=100, max_buffer=1)
+        stream.read(50)
+        stream.close()
+
+        self.assertFalse(stream._thread.is_alive())
+        self.assertLess(stream.received, len(self.data))
+        self.assertIsNone(self.ftp.ftp)
+
+    def test_missing_file_raises_on_read(self):
+        """Test that server errors reach the reader."""
+        self.mock_ftp.retrbinary.side_effect = ftplib.error_perm('550 No such file')
+
+        with self.ftp.stream_file('missing.csv') as stream:
+            with self.assertRaises(ftplib.error_perm):
+                stream.read()
+
+@unittest.skipUnless(local_ftp.AVAILABLE, 'pyftpdlib is not installed')
+class TestFTPStreamServer(unittest.TestCase):
+    """Streaming from a real FTP server on localhost."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        server = local_ftp.local_ftp_server(self.tmp.name)
+        server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        self.data = b''.join(f"{i},{i % 7}.5\n".encode() for i in range(200000))
+        with open(os.path.join(self.tmp.name, 'dump.csv.gz'), 'wb') as f:
+            f.write(gzip.compress(self.data))
+        self.ftp = FTPConnect()
+        self.addCleanup(self.ftp.disconnect)
+
+    def test_stream_and_abort(self):
+        """Test a full decompressed stream, an early close, and reuse of the connection."""
+        with self.ftp.stream_file('dump.csv.gz', block_size=4096, max_buffer=4, decompress='auto') as stream:
+            self.assertEqual(stream.read(), self.data)
+
+        with self.ftp.stream_file('dump.csv.gz', block_size=4096, max_buffer=1) as stream:
+            stream.read(100)
+
+        self.assertEqual(self.ftp.list_directory('.'), ['dump.csv.gz'])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,238 @@
+import unittest
+import os
+import sys
+import ftplib
+import tempfile
+import threading
+from time import sleep
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.FTPTransferManager import FTPTransferManager, TransferStats
+import local_ftp
+
+class FakeServer:
+    """In-memory files shared by every FakeFTP session, with fault injection."""
+
+    def __init__(self):
+        self.files = {}
+        self.commands = []
+        self.rests = []
+        self.block_sizes = set()
+        self.logins = 0
+        self.fail_after = None
+        self.lock = threading.Lock()
+
+    def session(self, timeout=None):
+        return FakeFTP(self)
+
+class FakeFTP:
+    def __init__(self, server):
+        self.server = server
+
+    def connect(self, host, port):
+        self.address = (host, port)
+
+    def login(self, user, password):
+        with self.server.lock:
+            self.server.logins += 1
+
+    def voidcmd(self, cmd):
+        with self.server.lock:
+            self.server.commands.append(cmd)
+        return '200 OK'
+
+    def size(self, path):
+        if path not in self.server.files:
+            raise ftplib.error_perm('550 No such file')
+        return len(self.server.files[path])
+
+    def _interrupt(self, moved):
+        if self.server.fail_after is not None and moved >= self.server.fail_after:
+            self.server.fail_after = None
+            raise ConnectionResetError('connection reset')
+
+    def storbinary(self, cmd, fp, blocksize, rest=None):
+        path = cmd[len('STOR '):]
+        self.server.rests.append(rest)
+        self.server.block_sizes.add(blocksize)
+        data = bytearray(self.server.files.get(path, b'')[:rest] if rest else b'')
+        try:
+            while block := fp.read(blocksize):
+                data.extend(block)
+                self._interrupt(len(data))
+        finally:
+            self.server.files[path] = bytes(data)
+
+    def retrbinary(self, cmd, callback, blocksize, rest=None):
+        path = cmd[len('RETR '):]
+        self.server.rests.append(rest)
+        data = self.server.files[path]
+        for offset in range(rest or 0, len(data), blocksize):
+            callback(data[offset:offset + blocksize])
+            self._interrupt(offset + blocksize)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+class TestFTPTransferManager(unittest.TestCase):
+    def setUp(self):
+        """Set up a fake FTP server and a scratch directory."""
+        self.server = FakeServer()
+        patcher = patch('python.FTPTransferManager.ftplib.FTP', side_effect=self.server.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.data = bytes(range(256)) * 20
+
+    def local(self, name, data=None):
+        path = os.path.join(self.tmp.name, name)
+        if data is not None:
+            with open(path, 'wb') as f:
+                f.write(data)
+        return path
+
+    def manager(self, **kwargs):
+        kwargs.setdefault('sessions', 1)
+        manager = FTPTransferManager(host='ftp.test', block_size=256, retry_wait=0, **kwargs)
+        self.addCleanup(manager.close)
+        return manager
+
+    def test_uploads_share_persistent_sessions(self):
+        """Test that many uploads run over the pool without logging in again."""
+        manager = self.manager(sessions=3)
+        pairs = [(self.local(f'f{i}.bin', self.data[i:]), f'plots/f{i}.bin') for i in range(8)]
+
+        results = manager.upload_many(pairs)
+
+        self.assertEqual(self.server.logins, 3)
+        self.assertEqual(self.server.block_sizes, {256})
+        for i, stats in enumerate(results):
+            self.assertEqual(self.server.files[f'plots/f{i}.bin'], self.data[i:])
+            self.assertEqual((stats.bytes, stats.resumed_from, stats.attempts), (len(self.data) - i, 0, 1))
+        self.assertEqual(manager.summary()['transfers'], 8)
+
+    def test_interrupted_upload_resumes_with_rest(self):
+        """Test that a dropped upload reconnects and continues from the remote size."""
+        manager = self.manager()
+        self.server.fail_after = 1024
+
+        stats = manager.upload(self.local('a.bin', self.data), 'a.bin').result()
+
+        self.assertEqual(self.server.files['a.bin'], self.data)
+        self.assertEqual(self.server.rests, [None, 1024])
+        self.assertEqual((stats.bytes, stats.resumed_from, stats.attempts), (len(self.data), 0, 2))
+        self.assertEqual(self.server.logins, 2)
+
+    def test_upload_continues_partial_remote_file(self):
+        """Test that resume=True starts from an existing partial upload."""
+        manager = self.manager()
+        self.server.files['a.bin'] = self.data[:2000]
+        path = self.local('a.bin', self.data)
+
+        stats = manager.upload(path, 'a.bin', resume=True).result()
+
+        self.assertEqual(self.server.files['a.bin'], self.data)
+        self.assertEqual((stats.bytes, stats.resumed_from), (len(self.data) - 2000, 2000))
+
+    def test_existing_files_are_replaced_by_default(self):
+        """Test that stale copies, even of the same size, are overwritten rather than resumed."""
+        manager = self.manager()
+        path = self.local('a.bin', self.data)
+        self.server.files['a.bin'] = bytes(len(self.data))
+        self.server.files['b.bin'] = b'stale'
+
+        results = manager.upload_many([(path, 'a.bin'), (path, 'b.bin')])
+
+        self.assertEqual((self.server.files['a.bin'], self.server.files['b.bin']), (self.data, self.data))
+        self.assertEqual([stats.resumed_from for stats in results], [0, 0])
+        self.assertEqual(self.server.rests, [None, None])
+
+        down = self.local('down.bin', b'old')
+        manager.download('a.bin', down).result()
+        with open(down, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_download_resumes_partial_local_file(self):
+        """Test that downloads continue from the local file and survive a drop."""
+        manager = self.manager()
+        self.server.files['b.bin'] = self.data
+        path = self.local('b.bin', self.data[:512])
+        self.server.fail_after = 2048
+
+        stats = manager.download('b.bin', path, resume=True).result()
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(self.server.rests, [512, 2048])
+        self.assertEqual((stats.bytes, stats.resumed_from, stats.attempts), (len(self.data) - 512, 512, 2))
+        self.assertGreater(stats.throughput, 0)
+
+    def test_missing_file_fails_without_retry(self):
+        """Test that permanent errors are raised at once."""
+        manager = self.manager()
+
+        with self.assertRaises(ftplib.error_perm):
+            manager.download_many([('missing.bin', self.local('missing.bin'))])
+        self.assertEqual(self.server.logins, 1)
+
+    def test_idle_sessions_send_noop(self):
+        """Test that idle workers keep their sessions alive."""
+        self.manager(sessions=2, keepalive=0.02)
+
+        sleep(0.2)
+
+        self.assertGreaterEqual(self.server.commands.count('NOOP'), 2)
+
+    def test_throughput(self):
+        """Test per-transfer throughput."""
+        stats = TransferStats('upload', 'a', 'a', 2048, 0, 0.5, 1)
+        self.assertEqual(stats.throughput, 4096)
+
+@unittest.skipUnless(local_ftp.AVAILABLE, 'pyftpdlib is not installed')
+class TestFTPTransferManagerServer(unittest.TestCase):
+    """Transfers against a real FTP server on localhost."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.served = os.path.join(self.tmp.name, 'served')
+        os.makedirs(self.served)
+        server = local_ftp.local_ftp_server(self.served)
+        server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        self.manager = FTPTransferManager(sessions=2, block_size=4096, keepalive=0.5)
+        self.addCleanup(self.manager.close)
+        self.data = os.urandom(200_000)
+
+    def test_round_trip_and_resume(self):
+        """Test parallel uploads, a resumed upload and a resumed download."""
+        paths = []
+        for i in range(4):
+            paths.append(os.path.join(self.tmp.name, f'up{i}.bin'))
+            with open(paths[-1], 'wb') as f:
+                f.write(self.data)
+        with open(os.path.join(self.served, 'up0.bin'), 'wb') as f:
+            f.write(self.data[:50_000])
+
+        results = self.manager.upload_many([(path, os.path.basename(path)) for path in paths], resume=True)
+
+        self.assertEqual(results[0].resumed_from, 50_000)
+        for i in range(4):
+            with open(os.path.join(self.served, f'up{i}.bin'), 'rb') as f:
+                self.assertEqual(f.read(), self.data)
+
+        down = os.path.join(self.tmp.name, 'down.bin')
+        with open(down, 'wb') as f:
+            f.write(self.data[:1000])
+        stats, = self.manager.download_many([('up1.bin', down)], resume=True)
+        self.assertEqual((stats.resumed_from, stats.bytes), (1000, len(self.data) - 1000))
+        with open(down, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+if __name__ == '__main__':
+    unittest.main()
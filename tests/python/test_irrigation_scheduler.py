@@ -0,0 +1,104 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.IrrigationScheduler import IrrigationScheduler, build_watered_update
+from python.RunPump import MultiPumpController
+
+class TestIrrigationScheduler(unittest.TestCase):
+    def setUp(self):
+        """Set up a scheduler with a mock database and a real controller on mock GPIO."""
+        self.gpio_patcher = patch('python.RunPump.GPIO', autospec=True)
+        self.mock_gpio = self.gpio_patcher.start()
+        self.mock_db = MagicMock()
+        self.lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.lock_dir.cleanup)
+        self.controller = MultiPumpController(pins=(), max_concurrent=2, db=self.mock_db, action_log=MagicMock(),
+                                              lock_dir=self.lock_dir.name)
+        self.scheduler = IrrigationScheduler(db=self.mock_db, controller=self.controller, flow_rate=1000.0)
+        self.now = datetime.now()
+
+    def tearDown(self):
+        self.scheduler.close()
+        self.gpio_patcher.stop()
+
+    def row(self, plant_sensor_id, pin, minutes=-1, water_amount=50, frequency=24):
+        return (self.now + timedelta(minutes=minutes), plant_sensor_id, plant_sensor_id, plant_sensor_id,
+                pin, water_amount, frequency)
+
+    def test_build_watered_update(self):
+        """Test that a batch of waterings becomes one UPDATE."""
+        watered = datetime(2024, 5, 1, 6, 0)
+        query, params = build_watered_update([
+            (1, watered, watered + timedelta(hours=24)),
+            (2, watered, watered + timedelta(hours=12)),
+        ])
+
+        self.assertEqual(query.count('UNION ALL'), 1)
+        self.assertEqual(len(params), 6)
+        self.assertEqual(params[3], 2)
+
+    def test_refresh_loads_queue_once(self):
+        """Test that reloading does not queue the same watering twice."""
+        self.mock_db.execute_query.return_value = [self.row(1, 18), self.row(2, 23, minutes=3)]
+
+        self.assertEqual(self.scheduler.refresh(self.now), 2)
+        self.assertEqual(self.scheduler.refresh(self.now), 0)
+        self.assertEqual(self.scheduler.queued, 2)
+        query = self.mock_db.execute_query.call_args[0][0]
+        self.assertIn('idx_next_watering', query)
+
+    def test_dispatch_runs_due_zones_concurrently(self):
+        """Test that due zones on different pins start together and future ones wait."""
+        self.scheduler.flow_rate = 1.0
+        self.mock_db.execute_query.return_value = [self.row(1, 18), self.row(2, 23), self.row(3, 24, minutes=30)]
+        self.scheduler.refresh(self.now)
+
+        started = self.scheduler.dispatch_due(self.now)
+
+        self.assertEqual(sorted(w.pin for w in started), [18, 23])
+        self.assertEqual(self.scheduler.queued, 1)
+        state = self.controller.state()
+        self.assertTrue(state[18]['running'] and state[23]['running'])
+
+    def test_shared_pump_is_serialised(self):
+        """Test that zones on the same pin do not run at the same time."""
+        self.scheduler.flow_rate = 1.0
+        self.mock_db.execute_query.return_value = [self.row(1, 18), self.row(2, 18)]
+        self.scheduler.refresh(self.now)
+
+        self.scheduler.dispatch_due(self.now)
+
+        self.assertEqual(self.controller.state()[18], {'running': True, 'remaining': unittest.mock.ANY, 'queued': 1})
+
+    def test_run_once_writes_back_in_one_batch(self):
+        """Test that completed waterings are written back with a single query."""
+        rows = [self.row(1, 18, water_amount=30), self.row(2, 23)]
+        self.mock_db.execute_query.side_effect = lambda query, params=None: rows if 'SELECT ps.next_watering' in query else []
+
+        completed = self.scheduler.run_once()
+
+        self.assertEqual(completed, 2)
+        updates = [c for c in self.mock_db.execute_query.call_args_list if 'UPDATE plant_sensors' in c[0][0]]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(sorted(updates[0][0][1][0::3]), [1, 2])
+        self.assertEqual(self.scheduler.queued, 0)
+
+    def test_cancelled_watering_is_not_recorded(self):
+        """Test that a cancelled run is retried later rather than marked as watered."""
+        self.scheduler.flow_rate = 1.0
+        self.mock_db.execute_query.return_value = [self.row(1, 18)]
+        self.scheduler.refresh(self.now)
+        self.scheduler.dispatch_due(self.now)
+
+        self.controller.cancel(18)
+
+        self.assertEqual(self.scheduler.flush(force=True), 0)
+        self.assertEqual(self.scheduler.refresh(self.now), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.MoistureControl import MoistureController, plan_watering, build_last_watered_update
+
+class TestPlanWatering(unittest.TestCase):
+    def test_only_dry_fresh_zones_are_watered(self):
+        """Test that zones below their minimum get a runtime proportional to the deficit."""
+        water, runtime = plan_watering(
+            moisture=[20.0, 35.0, 10.0, np.nan, 20.0],
+            min_moisture=[30, 30, 30, 30, 30],
+            max_moisture=[60, 60, 60, 60, 60],
+            response=[1.0, 1.0, 1.0, 1.0, 1.0],
+            fresh=[True, True, True, True, False],
+            resting=[False, False, False, False, False]
+        )
+
+        self.assertEqual(water.tolist(), [True, False, True, False, False])
+        self.assertEqual(runtime.tolist(), [25.0, 0.0, 35.0, 0.0, 0.0])
+
+    def test_runtime_uses_response_and_limits(self):
+        """Test that a faster-responding zone runs for less time, within the limits."""
+        _, runtime = plan_watering(
+            moisture=[20.0, 20.0, 29.9],
+            min_moisture=[30, 30, 30],
+            max_moisture=[60, 60, 30],
+            response=[5.0, 0.01, 1.0],
+            fresh=[True, True, True],
+            resting=[False, False, False],
+            min_runtime=2.0,
+            max_runtime=300.0
+        )
+
+        self.assertEqual(runtime.tolist(), [5.0, 300.0, 2.0])
+
+class TestMoistureController(unittest.TestCase):
+    def setUp(self):
+        """Set up a controller with a mock database and pump controller."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.tmp.name, 'response.json')
+        self.mock_db = MagicMock()
+        self.mock_pumps = MagicMock()
+        self.now = datetime(2024, 5, 1, 6, 0)
+        self.control = MoistureController(db=self.mock_db, controller=self.mock_pumps, flow_rate=10.0,
+                                          state_path=self.state_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def zones(self, readings, pins=None, minutes_ago=5):
+        count = len(readings)
+        return pd.DataFrame({
+            'plant_sensor_id': range(1, count + 1),
+            'plant_id': range(1, count + 1),
+            'sensor_id': range(1, count + 1),
+            'pin': pins or list(range(18, 18 + count)),
+            'last_reading': readings,
+            'last_reading_time': [self.now - timedelta(minutes=minutes_ago)] * count,
+            'min_soil_moisture': [30] * count,
+            'max_soil_moisture': [60] * count,
+            'water_amount': [150] * count,
+            'last_watered': [self.now - timedelta(days=1)] * count,
+        })
+
+    def start_runs(self, at=None):
+        """Report every requested run as started, as the pump controller would."""
+        run = MagicMock(on_at=(at or self.now).astimezone())
+        for call in self.mock_pumps.run_zone.call_args_list:
+            call[1]['on_start'](run)
+
+    def test_tick_runs_dry_zones_with_one_query_each_way(self):
+        """Test that one tick reads all zones once and writes last_watered once the pumps start."""
+        self.mock_db.query_to_dataframe.return_value = self.zones([20.0, 50.0, 10.0])
+
+        runs = self.control.tick(self.now)
+
+        self.mock_db.query_to_dataframe.assert_called_once()
+        self.assertEqual(runs['pin'].tolist(), [18, 20])
+        # Initial response: 150 ml at 10 ml/s lifts min (30) to the band middle (45)
+        self.assertEqual([c[0][:2] for c in self.mock_pumps.run_zone.call_args_list],
+                         [(18, 25.0), (20, 35.0)])
+        self.mock_db.execute_query.assert_not_called()
+
+        self.start_runs()
+
+        self.assertEqual([c[0][1][0::2] for c in self.mock_db.execute_query.call_args_list], [[1], [3]])
+        self.assertEqual(self.mock_db.execute_query.call_args[0][1][1], self.now)
+
+    def test_queued_run_is_not_learned_before_it_starts(self):
+        """Test that a run still waiting for a pump slot neither sets last_watered nor ends its soak."""
+        self.mock_db.query_to_dataframe.return_value = self.zones([20.0])
+        self.control.tick(self.now)
+
+        later = self.now + timedelta(hours=1)
+        self.mock_db.query_to_dataframe.return_value = self.zones([20.0], minutes_ago=1)
+        self.control.tick(later)
+
+        self.mock_db.execute_query.assert_not_called()
+        self.assertIn(1, self.control.pending)
+        self.assertNotIn(1, self.control.responses)
+
+    def test_shared_pump_runs_once_for_driest_zone(self):
+        """Test that zones on the same pin get a single run sized for the driest."""
+        self.mock_db.query_to_dataframe.return_value = self.zones([20.0, 10.0], pins=[18, 18])
+
+        runs = self.control.tick(self.now)
+
+        self.assertEqual(len(runs), 1)
+        self.mock_pumps.run_zone.assert_called_once()
+        self.assertEqual(self.mock_pumps.run_zone.call_args[0][:2], (18, 35.0))
+
+    def test_response_is_learned_after_soak(self):
+        """Test that the observed rise after watering updates the zone's response."""
+        self.mock_db.query_to_dataframe.return_value = self.zones([20.0])
+        self.control.tick(self.now)
+        self.start_runs()
+
+        later = self.now + timedelta(hours=1)
+        self.now = later
+        self.mock_db.query_to_dataframe.return_value = self.zones([45.0], minutes_ago=1)
+        self.control.tick(later)
+
+        # Rose 25 points in 25 s -> observed 1.0, blended with itself
+        self.assertAlmostEqual(self.control.responses[1], 1.0)
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {'1': 1.0})
+        self.assertEqual(self.control.pending, {})
+
+    def test_sensor_on_two_pins_is_learned_once(self):
+        """Test that a sensor listed once per pump pin still yields a single update."""
+        self.mock_db.query_to_dataframe.return_value = self.zones([20.0])
+        self.control.tick(self.now)
+        self.start_runs()
+
+        later = self.now + timedelta(hours=1)
+        self.now = later
+        zones = self.zones([45.0, 45.0], pins=[18, 23], minutes_ago=1)
+        zones['plant_sensor_id'] = [1, 1]
+        self.mock_db.query_to_dataframe.return_value = zones
+
+        self.assertEqual(self.control.learn(zones, later), 1)
+        self.assertAlmostEqual(self.control.responses[1], 1.0)
+
+    def test_resting_zone_is_not_rewatered(self):
+        """Test that a zone still soaking is skipped even if below its minimum."""
+        zones = self.zones([20.0])
+        zones['last_watered'] = [self.now - timedelta(minutes=5)]
+        self.mock_db.query_to_dataframe.return_value = zones
+
+        runs = self.control.tick(self.now)
+
+        self.assertTrue(runs.empty)
+        self.mock_pumps.run_zone.assert_not_called()
+
+    def test_build_last_watered_update(self):
+        """Test that a batch of zones becomes one UPDATE."""
+        query, params = build_last_watered_update([1, 2, 3], self.now)
+
+        self.assertEqual(query.count('UNION ALL'), 2)
+        self.assertEqual(params, [1, self.now, 2, self.now, 3, self.now])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.plot_server import (PlotServer, render, parse_request, parse_plant_ids, request_plot,
+                                request_plot_raw, encode_response, decode_response)
+
+class TestPlotServer(unittest.TestCase):
+    def setUp(self):
+        """Set up a plot server on a temporary socket."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmpdir.name, 'plot.sock')
+        self.plotter = MagicMock()
+        self.server = PlotServer(self.socket_path, self.plotter)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        """Stop the server and remove the socket."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_render_components(self):
+        """Test rendering Bokeh components."""
+        self.plotter.generate_plot.return_value = ('<script>', '<div>')
+
+        result = render(self.plotter, plant_id=1, days=7, fmt='components')
+
+        self.assertEqual(result, {'success': True, 'script': '<script>', 'div': '<div>'})
+        self.plotter.generate_plot.assert_called_once_with(days=7, plant_id=1, return_components=True)
+
+    def test_render_json_no_data(self):
+        """Test rendering JSON when no data is available."""
+        self.plotter.generate_plot_data.return_value = None
+
+        result = render(self.plotter, days=7, fmt='json')
+
+        self.assertFalse(result['success'])
+
+    def test_render_json_embeds_data(self):
+        """Test that JSON data is embedded as an object, not a nested string."""
+        data = {'names': ['Basil'], 'series': []}
+        self.plotter.generate_plot_data.return_value = data
+
+        result = render(self.plotter, days=7, fmt='json')
+
+        self.assertEqual(result, {'success': True, 'data': data})
+
+    def test_encode_response_round_trip(self):
+        """Test JSON and gzip encodings decode to the original response."""
+        response = {'success': True, 'data': {'names': ['Basil'], 'series': [{'t': [1, 2], 'v': [1.5, 2.5]}]}}
+        body = encode_response(response)
+
+        self.assertTrue(body.startswith(b'{"success":true'))
+        self.assertEqual(decode_response(body), response)
+        compressed = encode_response(response, 'gzip')
+        self.assertEqual(compressed[:2], b'\x1f\x8b')
+        self.assertEqual(decode_response(compressed, 'gzip'), response)
+
+    def test_gzip_round_trip_through_server(self):
+        """Test that the server honours the requested encoding."""
+        self.plotter.generate_plot.return_value = ('<script>', '<div>')
+
+        body = request_plot_raw(plant_id=1, days=7, encoding='gzip', socket_path=self.socket_path)
+
+        self.assertEqual(decode_response(body, 'gzip')['script'], '<script>')
+
+    def test_parse_request(self):
+        """Test request validation."""
+        self.assertEqual(parse_request({'plant_id': '3', 'days': 30, 'format': 'json'}), (3, 30, 'json'))
+        self.assertEqual(parse_request({'plant_id': 0}), (None, 7, 'components'))
+        with self.assertRaises(ValueError):
+            parse_request({'days': 400})
+        with self.assertRaises(ValueError):
+            parse_request({'format': 'png'})
+
+    def test_batch_round_trip(self):
+        """Test that plant_ids renders every plant in one call, keyed by plant ID."""
+        self.plotter.generate_plots.return_value = {1: ('<script 1>', '<div 1>'), 4: ('<script 4>', '<div 4>')}
+
+        result = request_plot(days=30, socket_path=self.socket_path, plant_ids='all')
+
+        self.assertEqual(result, {'success': True, 'plots': {
+            '1': {'script': '<script 1>', 'div': '<div 1>'},
+            '4': {'script': '<script 4>', 'div': '<div 4>'},
+        }})
+        self.plotter.generate_plots.assert_called_once_with('all', days=30, fmt='components', workers=0)
+        self.plotter.generate_plot.assert_not_called()
+
+        self.plotter.generate_plots.return_value = {}
+        self.assertFalse(render(self.plotter, days=7, fmt='json', plant_ids=[9])['success'])
+
+    def test_parse_plant_ids(self):
+        """Test batch plant_ids validation."""
+        self.assertIsNone(parse_plant_ids({'plant_id': 3}))
+        self.assertEqual(parse_plant_ids({'plant_ids': 'all'}), 'all')
+        self.assertEqual(parse_plant_ids({'plant_ids': ['2', 5]}), [2, 5])
+        with self.assertRaises(ValueError):
+            parse_plant_ids({'plant_ids': '2,5'})
+
+    def test_round_trip_reuses_plotter(self):
+        """Test that consecutive requests share the same warm PlotGenerator."""
+        self.plotter.generate_plot.return_value = ('<script>', '<div>')
+
+        first = request_plot(plant_id=2, days=14, socket_path=self.socket_path)
+        second = request_plot(plant_id=2, days=14, socket_path=self.socket_path)
+
+        self.assertTrue(first['success'])
+        self.assertEqual(first, second)
+        self.assertEqual(self.plotter.generate_plot.call_count, 2)
+
+    def test_render_error_is_reported(self):
+        """Test that a failed render returns the error to the client."""
+        self.plotter.generate_plot.side_effect = Exception("Lost connection")
+
+        result = request_plot(days=7, socket_path=self.socket_path)
+
+        self.assertFalse(result['success'])
+        self.assertIn('Lost connection', result['error'])
+
+    def test_requests_render_concurrently(self):
+        """Test that requests are not serialised behind one another."""
+        barrier = threading.Barrier(2, timeout=5)
+        # Each render only finishes once the other one has started
+        self.plotter.generate_plot.side_effect = lambda **kwargs: (barrier.wait(), '<div>')
+        results = []
+        clients = [threading.Thread(target=lambda: results.append(request_plot(days=7, socket_path=self.socket_path)))
+                   for _ in range(2)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+        self.assertEqual([result['success'] for result in results], [True, True])
+
+    def test_api_client_decodes_server_status(self):
+        """Test that generate_plot_api.py reads success from the decoded body, not its formatting."""
+        from python import generate_plot_api
+
+        for body, code in ((b'{"div": "<div>", "success": true}\n', 0), (b'{"success": false, "error": "x"}', 1)):
+            with patch('python.generate_plot_api.request_plot_raw', return_value=body), \
+                    patch.object(sys, 'argv', ['generate_plot_api.py', '--days', '7']), \
+                    patch('python.generate_plot_api.render_in_process') as in_process, \
+                    patch.object(sys, 'stdout', MagicMock()):
+                with self.assertRaises(SystemExit) if code else nullcontext():
+                    generate_plot_api.main()
+                in_process.assert_not_called()
+
+    def test_request_plot_without_server(self):
+        """Test that the client raises OSError when no server is listening."""
+        with self.assertRaises(OSError):
+            request_plot(socket_path=os.path.join(self.tmpdir.name, 'missing.sock'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import os
+import sys
+import gzip
+import json
+import stat
+import tempfile
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.PlotSnapshots import PlotSnapshotPublisher, MANIFEST, snapshot_files
+from python.FTPConnectMod import FTPConnect
+import local_ftp
+
+def make_plotter(watermarks):
+    """A PlotGenerator stand-in whose plants have the given latest readings."""
+    plotter = MagicMock()
+    plotter.db.execute_query.side_effect = lambda *args, **kwargs: list(watermarks.items())
+    plotter.generate_plot.side_effect = lambda days, return_components: (f'<script>all {days}</script>',
+                                                                         f'<div>all {days}</div>')
+    plotter.generate_plot_data.side_effect = lambda days: {'names': [], 'series': [days]}
+    plotter.generate_plots.side_effect = lambda plant_ids, days, fmt, workers: {
+        pid: (f'<script>{pid} {days}</script>', f'<div>{pid}</div>') if fmt == 'components' else {'series': [pid]}
+        for pid in plant_ids if watermarks.get(pid) is not None
+    }
+    return plotter
+
+class TestPlotSnapshotPublisher(unittest.TestCase):
+    def setUp(self):
+        """Set up two plants with readings and a scratch output directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.watermarks = {1: 1200, 2: 1205}
+        self.plotter = make_plotter(self.watermarks)
+        self.publisher = PlotSnapshotPublisher(output_dir=self.tmp.name, plotter=self.plotter, days=(7, 30))
+
+    def read(self, name):
+        with open(os.path.join(self.tmp.name, name), 'rb') as f:
+            return f.read()
+
+    def test_first_run_publishes_every_view(self):
+        """Test that all windows are written for all plants and each plant."""
+        result = self.publisher.publish()
+
+        self.assertEqual(sorted(result['rendered']),
+                         ['all-30d', 'all-7d', 'plant-1-30d', 'plant-1-7d', 'plant-2-30d', 'plant-2-7d'])
+        self.assertEqual(json.loads(self.read('all-7d.components.json')),
+                         {'success': True, 'script': '<script>all 7</script>', 'div': '<div>all 7</div>'})
+        self.assertEqual(json.loads(self.read('plant-2-30d.data.json')), {'success': True, 'data': {'series': [2]}})
+        body = self.read('plant-1-7d.components.json')
+        self.assertEqual(gzip.decompress(self.read('plant-1-7d.components.json.gz')), body)
+        mode = os.stat(os.path.join(self.tmp.name, 'all-7d.data.json')).st_mode
+        self.assertEqual(stat.S_IMODE(mode), 0o644)
+        self.assertFalse([name for name in os.listdir(self.tmp.name) if name.endswith('.tmp')])
+
+        manifest = json.loads(self.read(MANIFEST))
+        self.assertEqual(manifest['views']['all-7d']['watermark'], '1205')
+        # Per-plant views of a window come from one batch render per format
+        self.assertEqual(self.plotter.generate_plots.call_count, 4)
+
+    def test_only_changed_views_rerender(self):
+        """Test that a new reading re-renders just that plant and the all-plants views."""
+        self.publisher.publish()
+        before = self.read('plant-1-7d.components.json.gz')
+        self.plotter.reset_mock()
+
+        self.assertEqual(self.publisher.publish()['rendered'], [])
+        self.plotter.generate_plot.assert_not_called()
+        self.plotter.generate_plots.assert_not_called()
+
+        self.watermarks[2] = 1210
+        result = self.publisher.publish()
+
+        self.assertEqual(result['rendered'], ['all-7d', 'plant-2-7d', 'all-30d', 'plant-2-30d'])
+        self.assertEqual(result['skipped'], 2)
+        self.assertEqual({tuple(c.args[0]) for c in self.plotter.generate_plots.call_args_list}, {(2,)})
+        self.assertEqual(self.read('plant-1-7d.components.json.gz'), before)
+
+    def test_old_and_missing_snapshots_rerender(self):
+        """Test that snapshots past max_age or deleted are rendered again."""
+        self.publisher.publish()
+        os.unlink(os.path.join(self.tmp.name, 'plant-1-30d.data.json.gz'))
+
+        self.assertEqual(self.publisher.publish()['rendered'], ['plant-1-30d'])
+
+        self.publisher.max_age = 0
+        self.assertEqual(len(self.publisher.publish()['rendered']), 6)
+
+    def test_inactive_plants_are_pruned(self):
+        """Test that views of plants no longer active are removed."""
+        self.publisher.publish()
+        del self.watermarks[2]
+
+        result = self.publisher.publish()
+
+        self.assertEqual(sorted(result['removed']),
+                         sorted(snapshot_files('plant-2-30d') + snapshot_files('plant-2-7d')))
+        self.assertNotIn('plant-2-7d', json.loads(self.read(MANIFEST))['views'])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'plant-1-7d.data.json')))
+
+    def test_plant_without_readings(self):
+        """Test that a plant with no readings gets the no-data response and an HTML page is skipped."""
+        self.watermarks[3] = None
+        self.publisher.html = True
+
+        self.publisher.publish()
+
+        self.assertEqual(json.loads(self.read('plant-3-7d.components.json')),
+                         {'success': False, 'error': 'No data available for plotting'})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'plant-3-7d.html')))
+        page = self.read('plant-1-7d.html').decode('utf-8')
+        self.assertIn('<div>1</div>', page)
+        self.assertIn('bokeh', page)
+
+@unittest.skipUnless(local_ftp.AVAILABLE, 'pyftpdlib is not installed')
+class TestPlotSnapshotUpload(unittest.TestCase):
+    """Upload to a real FTP server on localhost."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.served = os.path.join(self.tmp.name, 'served')
+        self.output = os.path.join(self.tmp.name, 'snapshots')
+        os.makedirs(self.served)
+        server = local_ftp.local_ftp_server(self.served)
+        server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        self.watermarks = {1: 100, 2: 200}
+        self.publisher = PlotSnapshotPublisher(output_dir=self.output, plotter=make_plotter(self.watermarks),
+                                               days=(7,), ftp=FTPConnect(), remote_dir='www/snapshots')
+        self.addCleanup(self.publisher.cleanup)
+
+    def test_upload_renames_into_place(self):
+        """Test that snapshots and manifest are uploaded and pruned files deleted remotely."""
+        result = self.publisher.publish()
+
+        remote = os.path.join(self.served, 'www', 'snapshots')
+        self.assertEqual(result['uploaded'], 13)
+        self.assertEqual(sorted(os.listdir(remote)), sorted(os.listdir(self.output)))
+        with open(os.path.join(remote, 'all-7d.data.json'), 'rb') as f, \
+                open(os.path.join(self.output, 'all-7d.data.json'), 'rb') as g:
+            self.assertEqual(f.read(), g.read())
+
+        del self.watermarks[2]
+        self.publisher.publish()
+        self.assertEqual(sorted(os.listdir(remote)), sorted(os.listdir(self.output)))
+        self.assertNotIn('plant-2-7d.data.json', os.listdir(remote))
+
+if __name__ == '__main__':
+    unittest.main()
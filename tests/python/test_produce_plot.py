@@ -2,11 +2,12 @@ import unittest
 import os
 from unittest.mock import patch, MagicMock
 import sys
+import tempfile
 import pandas as pd
 from datetime import datetime, timedelta
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from python.ProducePlot import PlotGenerator
+from python.ProducePlot import PlotGenerator, PlotCache, build_plot_data
 
 class TestPlotGenerator(unittest.TestCase):
     def setUp(self):
@@ -20,6 +21,23 @@ class TestPlotGenerator(unittest.TestCase):
         if hasattr(self, 'plotter'):
             self.plotter.cleanup()
 
+    def respond(self, readings, sensors=None):
+        """Answer the sensor lookup with sensors and the readings query with readings."""
+        if sensors is None:
+            sensors = pd.DataFrame({
+                'plant_name': ['Plant A'], 'plant_id': [1], 'sensor_id': [1],
+                'sensor_name': ['Sensor1'], 'sensor_type': ['temperature']
+            })
+        self.mock_db.query_to_dataframe.side_effect = (
+            lambda query, params=None: sensors if 'plant_sensors' in query else readings
+        )
+
+    def readings_call(self):
+        """Return (query, params) of the readings query."""
+        query, params = next((c[0][0], c[1]['params']) for c in self.mock_db.query_to_dataframe.call_args_list
+                             if 'plant_sensors' not in c[0][0])
+        return query, params
+
     def test_initialization(self):
         """Test that the PlotGenerator class initializes correctly."""
         self.assertIsNotNone(self.plotter)
@@ -27,19 +45,12 @@ class TestPlotGenerator(unittest.TestCase):
 
     def test_get_sensor_data(self):
         """Test getting sensor data from database."""
-        mock_data = pd.DataFrame({
-            'plant_name': ['Plant A', 'Plant A'],
-            'plant_id': [1, 1],
-            'sensor_name': ['Sensor1', 'Sensor1'],
-            'sensor_type': ['temperature', 'temperature'],
-            'reading_value': [25.5, 26.2],
-            'reading_timestamp': [
-                datetime.now() - timedelta(hours=1),
-                datetime.now()
-            ]
-        })
-        
-        self.mock_db.query_to_dataframe.return_value = mock_data
+        now = datetime.now()
+        self.respond(pd.DataFrame({
+            'sensor_id': [1, 1],
+            'reading_value': [26.2, 25.5],
+            'reading_timestamp': [now, now - timedelta(hours=1)]
+        }))
         result = self.plotter.get_sensor_data(days=1)
         
         self.assertTrue(isinstance(result, pd.DataFrame))
@@ -48,32 +59,105 @@ class TestPlotGenerator(unittest.TestCase):
             list(result.columns),
             ['plant_name', 'plant_id', 'sensor_name', 'sensor_type', 'reading_value', 'reading_timestamp']
         )
+        self.assertEqual(list(result['reading_value']), [25.5, 26.2])
+        self.assertEqual(list(result['plant_name']), ['Plant A', 'Plant A'])
 
     def test_get_sensor_data_empty(self):
         """Test getting sensor data when no data is available."""
-        self.mock_db.query_to_dataframe.return_value = pd.DataFrame()
+        self.respond(pd.DataFrame())
         result = self.plotter.get_sensor_data(days=1)
         
         self.assertTrue(result.empty)
 
+    def test_get_sensor_data_without_sensors_skips_readings(self):
+        """Test that no readings query runs when no active plant has sensors."""
+        self.mock_db.query_to_dataframe.return_value = pd.DataFrame()
+        result = self.plotter.get_sensor_data(days=1, plant_id=9)
+
+        self.assertTrue(result.empty)
+        self.assertEqual(self.mock_db.query_to_dataframe.call_count, 1)
+        query = self.mock_db.query_to_dataframe.call_args[0][0]
+        self.assertIn('AND p.id = %s', query)
+
+    def test_get_sensor_data_raw_query(self):
+        """Test that without max_points every reading is selected by sensor id range scans."""
+        sensors = pd.DataFrame({
+            'plant_name': ['Plant C', 'Plant C'], 'plant_id': [3, 3], 'sensor_id': [7, 8],
+            'sensor_name': ['Soil', 'Air'], 'sensor_type': ['moisture', 'temperature']
+        })
+        self.respond(pd.DataFrame(), sensors)
+        self.plotter.get_sensor_data(days=7, plant_id=3)
+
+        query, params = self.readings_call()
+        self.assertNotIn('GROUP BY', query)
+        self.assertNotIn('JOIN', query)
+        self.assertIn('WHERE r.sensor_id IN (%s, %s)', query)
+        self.assertIn('ORDER BY r.sensor_id, r.created_at', query)
+        self.assertEqual(params[:2], (7, 8))
+        self.assertEqual(len(params), 4)
+
+    def test_get_sensor_data_downsampled(self):
+        """Test that max_points buckets raw readings per sensor in SQL."""
+        self.respond(pd.DataFrame())
+        self.plotter.use_rollups = False
+        self.plotter.get_sensor_data(days=365, max_points=1000)
+
+        query, params = self.readings_call()
+        # 365 days over 1000 bins -> 31536 second buckets
+        self.assertIn('FLOOR(UNIX_TIMESTAMP(r.created_at) / 31536)', query)
+        self.assertIn('GROUP BY r.sensor_id', query)
+        self.assertIn('MIN(r.value) as reading_min', query)
+        self.assertIn('MAX(r.value) as reading_max', query)
+        self.assertEqual(len(params), 3)
+
+    def test_get_sensor_data_uses_rollups(self):
+        """Test that coarse bins are read from the rollup tables plus raw readings at the ends."""
+        self.respond(pd.DataFrame())
+        self.plotter.get_sensor_data(days=365, plant_id=2, max_points=1000)
+
+        query, params = self.readings_call()
+        self.assertIn('FROM readings_daily', query)
+        self.assertIn('FLOOR(UNIX_TIMESTAMP(r.created_at) / 86400)', query)
+        self.assertIn('rollup_state', query)
+        self.assertIn('SUM(r.sum_value) / SUM(r.reading_count)', query)
+        # The sensor filter is inside every part of the rollup source
+        self.assertEqual(query.count('sensor_id IN (%s)'), 3)
+        self.assertEqual(len(params), 9)
+        self.assertEqual((params[0], params[3], params[6]), (1, 1, 1))
+
+    def test_get_sensor_data_month_uses_hourly_rollups(self):
+        """Test that a 30-day plot rounds its bins up to whole hours of rollups."""
+        self.respond(pd.DataFrame())
+        self.plotter.get_sensor_data(days=30, max_points=1000)
+
+        query, _ = self.readings_call()
+        self.assertIn('FROM readings_hourly', query)
+        self.assertIn('FLOOR(UNIX_TIMESTAMP(r.created_at) / 3600)', query)
+
+    def test_get_sensor_data_fine_bins_skip_rollups(self):
+        """Test that bins finer than an hour still read raw readings."""
+        self.respond(pd.DataFrame())
+        self.plotter.get_sensor_data(days=7, max_points=1000)
+
+        query, _ = self.readings_call()
+        self.assertNotIn('readings_hourly', query)
+        self.assertIn('AVG(r.value)', query)
+
     @patch('python.ProducePlot.figure')
     @patch('python.ProducePlot.output_file')
     @patch('python.ProducePlot.save')
     def test_generate_plot(self, mock_save, mock_output_file, mock_figure):
         """Test generating a plot."""
-        mock_data = pd.DataFrame({
-            'plant_name': ['Plant A', 'Plant A'],
-            'plant_id': [1, 1],
-            'sensor_name': ['Sensor1', 'Sensor1'],
-            'sensor_type': ['temperature', 'temperature'],
+        self.respond(pd.DataFrame({
+            'sensor_id': [1, 1],
             'reading_value': [25.5, 26.2],
             'reading_timestamp': [
                 datetime.now() - timedelta(hours=1),
                 datetime.now()
-            ]
-        })
-        
-        self.mock_db.query_to_dataframe.return_value = mock_data
+            ],
+            'reading_min': [25.0, 26.0],
+            'reading_max': [26.0, 26.5]
+        }))
         result = self.plotter.generate_plot('test_plot.html', days=1)
         
         self.assertTrue(result)
@@ -86,7 +170,7 @@ class TestPlotGenerator(unittest.TestCase):
     @patch('python.ProducePlot.save')
     def test_generate_plot_empty_data(self, mock_save, mock_output_file, mock_figure):
         """Test generating a plot with no data."""
-        self.mock_db.query_to_dataframe.return_value = pd.DataFrame()
+        self.respond(pd.DataFrame())
         result = self.plotter.generate_plot('test_plot.html', days=1)
         
         self.assertFalse(result)
@@ -99,5 +183,197 @@ class TestPlotGenerator(unittest.TestCase):
         self.plotter.cleanup()
         self.mock_db.disconnect.assert_called_once()
 
+    @patch('python.ProducePlot.components', return_value=('<script>', '<div>'))
+    def test_generate_plot_uses_cache(self, mock_components):
+        """Test that unchanged data is served from the cache without re-rendering."""
+        self.plotter.cache = PlotCache()
+        self.mock_db.execute_query.return_value = [(1200,)]
+        self.respond(pd.DataFrame({
+            'sensor_id': [1],
+            'reading_value': [40.0],
+            'reading_timestamp': [datetime.now()],
+            'reading_min': [39.5],
+            'reading_max': [40.5]
+        }))
+
+        first = self.plotter.generate_plot(days=7, plant_id=1, return_components=True)
+        second = self.plotter.generate_plot(days=7, plant_id=1, return_components=True)
+
+        self.assertEqual(first, second)
+        # One sensor lookup and one readings query per render
+        self.assertEqual(self.mock_db.query_to_dataframe.call_count, 2)
+        mock_components.assert_called_once()
+
+        # A new reading, even one backfilled with an old timestamp, raises the id watermark
+        self.mock_db.execute_query.return_value = [(1201,)]
+        self.plotter.generate_plot(days=7, plant_id=1, return_components=True)
+        self.assertEqual(self.mock_db.query_to_dataframe.call_count, 4)
+
+    @patch('python.ProducePlot.components', return_value=('<script>', '<div>'))
+    def test_generate_plot_series_sources_are_numeric(self, mock_components):
+        """Test that each sensor gets one numeric source shared by its line and points."""
+        now = datetime.now()
+        self.respond(pd.DataFrame({
+            'sensor_id': [1, 1, 2, 3],
+            'reading_value': [40.0, 41.0, 35.0, 50.0],
+            'reading_timestamp': [now - timedelta(hours=1), now, now, now],
+            'reading_min': [39.0, 40.5, 34.0, 49.0],
+            'reading_max': [41.0, 41.5, 36.0, 51.0]
+        }), pd.DataFrame({
+            'plant_name': ['Plant A', 'Plant A', 'Plant B'],
+            'plant_id': [1, 1, 2],
+            'sensor_id': [1, 2, 3],
+            'sensor_name': ['Soil1', 'Soil2', 'Soil3'],
+            'sensor_type': ['moisture'] * 3
+        }))
+
+        self.plotter.generate_plot(days=1, return_components=True)
+
+        plot = mock_components.call_args[0][0]
+        sources = {id(r.data_source): r.data_source for r in plot.renderers}
+        self.assertEqual(len(plot.renderers), 6)
+        self.assertEqual(len(sources), 3)
+        for source in sources.values():
+            self.assertEqual(set(source.data), {'reading_timestamp', 'reading_value', 'reading_min', 'reading_max'})
+        names = sorted({r.name for r in plot.renderers})
+        self.assertEqual(names[0], 'Plant A - Soil1 (moisture)')
+        # Two sensors of one type on one plant share a legend entry
+        self.assertEqual(len(plot.legend[0].items), 2)
+
+    def batch_data(self):
+        """Answer with two plants' sensors and readings for three of them."""
+        now = datetime.now()
+        self.respond(pd.DataFrame({
+            'sensor_id': [1, 2, 3, 1],
+            'reading_value': [40.0, 21.5, 55.0, 41.0],
+            'reading_timestamp': [now - timedelta(hours=1), now, now, now],
+            'reading_min': [39.0, 21.0, 54.0, 40.5],
+            'reading_max': [41.0, 22.0, 56.0, 41.5]
+        }), pd.DataFrame({
+            'plant_name': ['Basil', 'Basil', 'Tomato', 'Lettuce'],
+            'plant_id': [1, 1, 2, 3],
+            'sensor_id': [1, 2, 3, 4],
+            'sensor_name': ['Soil', 'Air', 'Soil', 'Soil'],
+            'sensor_type': ['moisture', 'temperature', 'moisture', 'moisture']
+        }))
+
+    @patch('python.ProducePlot.components', side_effect=lambda p: (f'<script {p.title.text}>', '<div>'))
+    def test_generate_plots_uses_one_query(self, mock_components):
+        """Test that a batch renders each plant from a single sensor lookup and readings query."""
+        self.batch_data()
+
+        plots = self.plotter.generate_plots([1, 2, 3], days=7)
+
+        self.assertEqual(plots, {
+            1: ('<script Sensor Readings for Basil>', '<div>'),
+            2: ('<script Sensor Readings for Tomato>', '<div>'),
+        })
+        self.assertEqual(self.mock_db.query_to_dataframe.call_count, 2)
+        lookup = self.mock_db.query_to_dataframe.call_args_list[0]
+        self.assertIn('AND p.id IN (%s, %s, %s)', lookup[0][0])
+        self.assertEqual(lookup[1]['params'], (1, 2, 3))
+        basil = mock_components.call_args_list[0][0][0]
+        self.assertEqual(len(basil.renderers), 4)
+
+    def test_generate_plots_json_for_all_plants(self):
+        """Test that 'all' returns plot data per plant and an empty list renders nothing."""
+        self.batch_data()
+
+        plots = self.plotter.generate_plots('all', fmt='json')
+
+        self.assertEqual(list(plots), [1, 2])
+        self.assertEqual(plots[1]['names'], ['Basil', 'Air', 'temperature', 'Soil', 'moisture'])
+        self.assertEqual(plots[1]['series'][1]['v'], [40.0, 41.0])
+        self.assertNotIn('AND p.id', self.mock_db.query_to_dataframe.call_args_list[0][0][0])
+        self.assertEqual(self.plotter.generate_plots([]), {})
+
+    def test_generate_plots_process_pool(self):
+        """Test that components rendered in worker processes match in-process rendering."""
+        self.batch_data()
+
+        pooled = self.plotter.generate_plots('all', workers=2)
+
+        self.assertEqual(list(pooled), [1, 2])
+        self.assertIn('Sensor Readings for Basil', pooled[1][0])
+        self.assertIn('Sensor Readings for Tomato', pooled[2][0])
+        self.assertIn('<div', pooled[2][1])
+
+    def test_generate_plots_cached(self):
+        """Test that a cached batch keeps integer plant IDs and component tuples."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.plotter.cache = PlotCache(cache_dir=cache_dir)
+            self.mock_db.execute_query.return_value = [(1200,)]
+            self.batch_data()
+            with patch('python.ProducePlot.components', return_value=('<script>', '<div>')):
+                first = self.plotter.generate_plots('all')
+            # A new process sees only the disk entry
+            self.plotter.cache = PlotCache(cache_dir=cache_dir)
+
+            second = self.plotter.generate_plots('all')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.mock_db.query_to_dataframe.call_count, 2)
+
+    def test_build_plot_data_is_columnar(self):
+        """Test that plot data is grouped per series with dictionary-encoded names."""
+        df = pd.DataFrame({
+            'plant_name': ['Basil', 'Basil', 'Basil'],
+            'plant_id': [1, 1, 1],
+            'sensor_name': ['Soil 1', 'Soil 1', 'Air'],
+            'sensor_type': ['moisture', 'moisture', 'temperature'],
+            'reading_value': [41.5, 40.25, 21.0],
+            'reading_timestamp': pd.to_datetime(['2024-05-01 00:05:00', '2024-05-01 00:00:00', '2024-05-01 00:00:00'])
+        })
+
+        data = build_plot_data(df)
+
+        self.assertEqual(len(data['series']), 2)
+        soil = next(s for s in data['series'] if data['names'][s['sensor']] == 'Soil 1')
+        self.assertEqual(data['names'][soil['plant']], 'Basil')
+        self.assertEqual(data['names'][soil['type']], 'moisture')
+        self.assertEqual(soil['t'], [1714521600000, 1714521900000])
+        self.assertEqual(soil['v'], [40.25, 41.5])
+        self.assertEqual(data['names'].count('Basil'), 1)
+
+class TestPlotCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = PlotCache(max_entries=2)
+        cache.set(('a',), 1)
+        cache.set(('b',), 2)
+        cache.get(('a',))
+        cache.set(('c',), 3)
+
+        self.assertEqual(cache.get(('a',)), 1)
+        self.assertIsNone(cache.get(('b',)))
+        self.assertEqual(cache.get(('c',)), 3)
+
+    def test_ttl_expiry(self):
+        """Test that entries older than the TTL are ignored."""
+        cache = PlotCache(ttl=0)
+        cache.set(('a',), 1)
+        with patch('python.ProducePlot.time.time', return_value=datetime.now().timestamp() + 1):
+            self.assertIsNone(cache.get(('a',)))
+
+    def test_disk_backend_shared_between_instances(self):
+        """Test that a second cache instance reads entries written by the first."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            PlotCache(cache_dir=cache_dir).set(('components', 1, 7), ['<script>', '<div>'])
+
+            other = PlotCache(cache_dir=cache_dir)
+            self.assertEqual(other.get(('components', 1, 7)), ['<script>', '<div>'])
+
+            other.clear()
+            self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_disk_pruning(self):
+        """Test that the disk backend keeps at most max_disk_entries files."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = PlotCache(cache_dir=cache_dir, max_disk_entries=2)
+            for i in range(4):
+                cache.set(('key', i), i)
+
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,123 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.QueryPlans import QueryPlanChecker, plan_problems, describe_access, load_summary_query, SUMMARY_SQL_PATH
+
+def explain_frame(*rows):
+    """EXPLAIN output with one (table, type, key, Extra) tuple per row"""
+    return pd.DataFrame(rows, columns=['table', 'type', 'key', 'Extra'])
+
+class TestPlanAnalysis(unittest.TestCase):
+    def test_full_scans_of_large_tables_fail(self):
+        """Test that ALL and full index scans of reading tables are problems, small tables are not."""
+        plan = explain_frame(
+            ('<derived2>', 'ALL', None, None),
+            ('plants', 'ALL', None, 'Using where'),
+            ('readings_hourly', 'ALL', None, 'Using where'),
+            ('r', 'index', 'idx_sensor_time_value', 'Using index'),
+        )
+
+        self.assertEqual(plan_problems(plan), ['readings_hourly: full table scan', 'r: full index scan'])
+
+    def test_range_scan_on_covering_index_passes(self):
+        """Test that a per-sensor range scan answered from the index is accepted and reported as covering."""
+        plan = explain_frame(
+            ('r', 'range', 'idx_sensor_time_value', 'Using where; Using index'),
+            ('readings', 'range', 'PRIMARY', 'Using index condition; Using filesort'),
+            (None, None, None, 'Impossible WHERE'),
+        )
+
+        self.assertEqual(plan_problems(plan), [])
+        self.assertEqual(describe_access(plan), [
+            'r range idx_sensor_time_value covering',
+            'readings range PRIMARY filesort',
+        ])
+        self.assertEqual(plan_problems(pd.DataFrame()), [])
+
+class TestQueryPlanChecker(unittest.TestCase):
+    def setUp(self):
+        """Set up a checker over a mock database with two active sensors."""
+        self.mock_db = MagicMock()
+        self.sensors = pd.DataFrame({
+            'plant_name': ['Basil', 'Basil'], 'plant_id': [1, 1], 'sensor_id': [4, 9],
+            'sensor_name': ['Soil', 'Air'], 'sensor_type': ['moisture', 'temperature']
+        })
+        self.plan = explain_frame(('r', 'range', 'idx_sensor_time_value', 'Using where; Using index'))
+        self.mock_db.query_to_dataframe.side_effect = (
+            lambda query, params=None: self.plan if query.startswith('EXPLAIN ') else self.sensors
+        )
+        self.checker = QueryPlanChecker(db=self.mock_db)
+
+    def test_plan_queries_drive_from_sensor_ids(self):
+        """Test that the plot queries are built for the active sensors."""
+        queries = {name: (query, params) for name, query, params, _, _ in self.checker.plan_queries(days=30)}
+
+        self.assertEqual(list(queries), ['plot_raw', 'plot_binned', 'plot_rollup', 'plot_daily', 'summary'])
+        raw_query, raw_params = queries['plot_raw']
+        self.assertIn('r.sensor_id IN (%s, %s)', raw_query)
+        self.assertEqual(raw_params[:2], (4, 9))
+        self.assertIn('FROM readings_hourly', queries['plot_rollup'][0])
+        self.assertIn('FROM readings_daily', queries['plot_daily'][0])
+        self.assertNotIn('rollup_state', queries['plot_binned'][0])
+        self.assertIn('FROM readings_daily', queries['summary'][0])
+        self.assertEqual(queries['summary'][1],
+                         {'daily_days': 30, 'days': 30, 'hourly_days': 30, 'tail_days': 30})
+        self.assertIn("'%%Y-%%m-%%d %%H:00:00'", queries['summary'][0])
+        self.assertIn('INTERVAL %(tail_days)s DAY', queries['summary'][0])
+        self.mock_db.query_to_dataframe.assert_called_once()
+
+    def test_summary_query_is_shared_with_php(self):
+        """Test that the summary query comes from the file summary.php runs, with every placeholder bound."""
+        query, params = load_summary_query(7)
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with open(os.path.join(root, 'public', 'api', 'summary.php'), 'r', encoding='utf-8') as f:
+            php = f.read()
+
+        self.assertIn("'/database/queries/" + os.path.basename(SUMMARY_SQL_PATH) + "'", php)
+        for name in params:
+            self.assertIn(f"':{name}' => $days", php)
+        self.assertNotRegex(query, r':[a-z_]')
+        self.assertTrue(query.rstrip().endswith('GROUP BY s.type'))
+
+    def test_plan_queries_without_sensors(self):
+        """Test that an empty database still yields explainable queries."""
+        self.sensors = pd.DataFrame()
+
+        _, _, params, _, _ = self.checker.plan_queries()[0]
+
+        self.assertEqual(params[0], 0)
+
+    def test_check_reports_each_query(self):
+        """Test that every query is explained and full scans are reported."""
+        results = self.checker.check(days=7)
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(not problems for _, problems, _ in results))
+        self.assertEqual(results[0][2], ['r range idx_sensor_time_value covering'])
+
+        self.plan = explain_frame(('r', 'ALL', None, 'Using where; Using filesort'))
+        failed = [name for name, problems, _ in self.checker.check(days=7) if problems]
+        self.assertEqual(failed, ['plot_raw', 'plot_binned', 'plot_rollup', 'plot_daily', 'summary'])
+
+    @patch('python.QueryPlans.QueryPlanChecker')
+    def test_main_check_fails_on_full_scan(self, mock_checker):
+        """Test that --check exits with status 1 when a query scans a table in full."""
+        from python.QueryPlans import main
+        mock_checker.return_value.check.return_value = [
+            ('plot_raw', [], ['r range idx_sensor_time_value covering']),
+            ('summary', ['readings: full table scan'], ['readings ALL no index']),
+        ]
+
+        with patch.object(sys, 'argv', ['QueryPlans.py', '--check']), patch('builtins.print'):
+            with self.assertRaises(SystemExit) as raised:
+                main()
+
+        self.assertEqual(raised.exception.code, 1)
+        mock_checker.return_value.cleanup.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+import unittest
+import os
+import io
+import sys
+import shutil
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.ReadingArchiver import ReadingArchiver, ArchiveVerificationError, file_digest
+from python.FTPConnectMod import FTPConnect
+import local_ftp
+
+class LocalFTP:
+    """FTPConnect stand-in backed by a local directory."""
+
+    def __init__(self, root):
+        self.root = root
+        self.ftp = MagicMock()
+        self.ftp.mkd.side_effect = lambda path: os.makedirs(self._path(path), exist_ok=True)
+        self.corrupt = False
+
+    def _path(self, remote):
+        return os.path.join(self.root, remote.lstrip('/'))
+
+    def connect(self):
+        return True
+
+    def disconnect(self):
+        pass
+
+    def upload_file(self, local_path, remote_path):
+        shutil.copyfile(local_path, self._path(remote_path))
+        if self.corrupt and remote_path.endswith('.parquet'):
+            with open(self._path(remote_path), 'ab') as f:
+                f.write(b'x')
+        return True
+
+    def download_file(self, remote_path, local_path):
+        shutil.copyfile(self._path(remote_path), local_path)
+        return True
+
+    def retrieve_file(self, filename):
+        with open(self._path(filename), 'rb') as f:
+            return io.BytesIO(f.read())
+
+    def list_directory(self, path='.'):
+        return [f"{path}/{name}" for name in sorted(os.listdir(self._path(path)))]
+
+    def file_size(self, path):
+        return os.path.getsize(self._path(path))
+
+    def file_checksum(self, path, algorithm='sha256'):
+        with open(self._path(path), 'rb') as f:
+            return hashlib.new(algorithm, f.read()).hexdigest()
+
+def reading_rows(start, count, sensor_id=1):
+    return [(start_id, sensor_id, Decimal(f"{start_id % 100}.25"), '%', None, Decimal('55.0'),
+             start + timedelta(minutes=start_id))
+            for start_id in range(1, count + 1)]
+
+class TestReadingArchiver(unittest.TestCase):
+    def setUp(self):
+        """Set up an archiver over a mock database and a local FTP stand-in."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.remote_root = os.path.join(self.tmp.name, 'remote')
+        self.work_dir = os.path.join(self.tmp.name, 'work')
+        os.makedirs(self.remote_root)
+        os.makedirs(self.work_dir)
+        self.ftp = LocalFTP(self.remote_root)
+        self.mock_db = MagicMock()
+        self.cursor = MagicMock()
+        self.cursor.rowcount = 0
+
+        @contextmanager
+        def transaction():
+            yield self.cursor
+
+        self.mock_db.transaction.side_effect = transaction
+        self.start = datetime(2024, 1, 1)
+        self.rows = reading_rows(self.start, 25)
+        self.count = len(self.rows)
+        self.partitions = [('p202401', 25), ('p202402', 0), ('p_future', 0)]
+        self.mock_db.iter_dataframes.side_effect = self.stream
+        self.mock_db.execute_query.side_effect = self.query
+        self.archiver = ReadingArchiver(db=self.mock_db, ftp=self.ftp, remote_dir='cold/readings',
+                                        work_dir=self.work_dir, chunk_size=10)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stream(self, query, params=None, chunk_size=None, compact=True):
+        columns = ['id', 'sensor_id', 'value', 'unit', 'temperature', 'humidity', 'created_at']
+        for offset in range(0, len(self.rows), chunk_size):
+            yield pd.DataFrame.from_records(self.rows[offset:offset + chunk_size], columns=columns)
+
+    def query(self, query, params=None):
+        if 'MAX(id)' in query:
+            return [(self.count, self.count or None)]
+        if 'COUNT(*)' in query:
+            return [(self.count,)]
+        if 'information_schema.PARTITIONS' in query:
+            return self.partitions
+        return []
+
+    def test_month_is_archived_then_partition_dropped(self):
+        """Test that a verified month is uploaded with a manifest and its partition dropped."""
+        manifest = self.archiver.archive_month(datetime(2024, 1, 15))
+
+        self.assertEqual(manifest['rows'], 25)
+        self.assertEqual((manifest['min_id'], manifest['max_id']), (1, 25))
+        remote = os.path.join(self.remote_root, 'cold', 'readings', manifest['file'])
+        self.assertEqual(file_digest(remote), (manifest['bytes'], manifest['sha256']))
+        self.assertTrue(os.path.exists(remote + '.json'))
+        self.assertEqual(os.listdir(self.work_dir), [])
+        statements = [c[0][0] for c in self.mock_db.execute_query.call_args_list]
+        self.assertIn('ALTER TABLE readings DROP PARTITION p202401', statements)
+
+    def test_archive_is_columnar_with_row_group_per_chunk(self):
+        """Test that chunks become row groups of a compressed Parquet file."""
+        import pyarrow.parquet as pq
+        path = os.path.join(self.work_dir, 'out.parquet')
+
+        rows, _, _ = self.archiver.write_parquet('SELECT', None, path)
+
+        parquet = pq.ParquetFile(path)
+        self.assertEqual(rows, 25)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(parquet.metadata.row_group(0).column(2).compression, 'ZSTD')
+        self.assertEqual(parquet.read().column('value')[0].as_py(), Decimal('1.25'))
+
+    def test_failed_verification_deletes_nothing(self):
+        """Test that a corrupted upload stops the archive before any delete."""
+        self.ftp.corrupt = True
+
+        with self.assertRaises(ArchiveVerificationError):
+            self.archiver.archive_month(datetime(2024, 1, 1))
+
+        statements = [c[0][0] for c in self.mock_db.execute_query.call_args_list]
+        self.assertFalse(any('DROP' in s or 'DELETE' in s for s in statements))
+        self.mock_db.transaction.assert_not_called()
+
+    def test_changed_source_deletes_nothing(self):
+        """Test that rows appearing during the archive block the delete."""
+        self.count = 26
+
+        with self.assertRaises(ArchiveVerificationError):
+            self.archiver.archive_range(self.start, self.start + timedelta(days=10))
+
+        self.mock_db.transaction.assert_not_called()
+
+    def test_partial_range_is_deleted_in_batches(self):
+        """Test that a range that is not a whole partition is deleted in bounded batches."""
+        self.partitions = [('p202401', 30), ('p_future', 0)]
+        self.cursor.rowcount = 0
+
+        self.archiver.archive_range(self.start, self.start + timedelta(days=10))
+
+        (query, params), = [c[0] for c in self.cursor.execute.call_args_list]
+        self.assertIn('LIMIT', query)
+        self.assertEqual(params[2], 25)
+
+    def test_verified_month_needs_matching_archive(self):
+        """Test that a month only counts as archived when its archive holds every reading."""
+        self.assertFalse(self.archiver.verified_month(datetime(2024, 1, 1)))
+
+        self.archiver.archive_month(datetime(2024, 1, 1), delete=False)
+
+        self.assertTrue(self.archiver.verified_month(datetime(2024, 1, 1)))
+        self.count = 26
+        self.assertFalse(self.archiver.verified_month(datetime(2024, 1, 1)))
+        self.count = 0
+        self.assertTrue(self.archiver.verified_month(datetime(2024, 2, 1)))
+
+    def test_load_range_rehydrates_readings(self):
+        """Test that the loader finds overlapping archives and filters to the range."""
+        self.archiver.archive_month(datetime(2024, 1, 1), delete=False)
+
+        df = self.archiver.load_range(self.start + timedelta(minutes=5), self.start + timedelta(minutes=10))
+
+        self.assertEqual(df['id'].tolist(), [5, 6, 7, 8, 9])
+        self.assertEqual(df['value'].iloc[0], Decimal('5.25'))
+        self.assertTrue(self.archiver.load_range(datetime(2023, 1, 1), datetime(2023, 2, 1)).empty)
+
+    def test_restore_range_inserts_rows(self):
+        """Test that restored rows are inserted with plain Python values."""
+        self.archiver.archive_month(datetime(2024, 1, 1), delete=False)
+
+        restored = self.archiver.restore_range(self.start, self.start + timedelta(days=1), table='readings_restored')
+
+        self.assertEqual(restored, 25)
+        query, rows = self.mock_db.execute_many.call_args[0]
+        self.assertIn('INSERT IGNORE INTO readings_restored', query)
+        self.assertEqual(rows[0][:4], (1, 1, Decimal('1.25'), '%'))
+        self.assertIsNone(rows[0][4])
+        self.assertIs(type(rows[0][6]), datetime)
+
+@unittest.skipUnless(local_ftp.AVAILABLE, 'pyftpdlib is not installed')
+class TestReadingArchiverFTPServer(unittest.TestCase):
+    """Round trip through a real FTP server on localhost."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.served = os.path.join(self.tmp.name, 'served')
+        os.makedirs(self.served)
+        self.server = local_ftp.local_ftp_server(self.served)
+        self.server.__enter__()
+        self.mock_db = MagicMock()
+        self.rows = reading_rows(datetime(2024, 1, 1), 100)
+        columns = ['id', 'sensor_id', 'value', 'unit', 'temperature', 'humidity', 'created_at']
+        self.mock_db.iter_dataframes.side_effect = lambda *args, **kwargs: iter(
+            [pd.DataFrame.from_records(self.rows, columns=columns)])
+        self.archiver = ReadingArchiver(db=self.mock_db, ftp=FTPConnect(), remote_dir='archive/readings',
+                                        work_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.archiver.ftp.disconnect()
+        self.server.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """Test upload, verification and rehydration against the server."""
+        manifest = self.archiver.archive_month(datetime(2024, 1, 1), delete=False)
+
+        served = os.path.join(self.served, 'archive', 'readings', manifest['file'])
+        self.assertEqual(os.path.getsize(served), manifest['bytes'])
+        df = self.archiver.load_range(datetime(2024, 1, 1), datetime(2024, 2, 1))
+        self.assertEqual(len(df), 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import io
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from time import monotonic, sleep
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.ReadingIngest import ReadingIngestor, Reading, build_insert, build_last_reading_update
+
+class TestReadingIngestor(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.mock_db = MagicMock()
+        self.cursor = MagicMock()
+        self.transactions = 0
+
+        @contextmanager
+        def transaction():
+            self.transactions += 1
+            yield self.cursor
+
+        self.mock_db.transaction.side_effect = transaction
+        self.ingestor = ReadingIngestor(db=self.mock_db, batch_size=3, flush_interval=60, chunk_size=2,
+                                        auto_flush=False)
+
+    def test_build_insert(self):
+        """Test that a chunk becomes one multi-row INSERT."""
+        now = datetime.now()
+        query, params = build_insert([
+            Reading(1, 40.5, 'percentage', now, None, None),
+            Reading(2, 21.0, 'celsius', now, None, None)
+        ])
+
+        self.assertEqual(query.count('(%s, %s, %s, %s, %s, %s)'), 2)
+        self.assertEqual(params, [1, 40.5, 'percentage', now, None, None, 2, 21.0, 'celsius', now, None, None])
+
+    def test_build_last_reading_update_uses_newest(self):
+        """Test that only the newest reading per sensor updates sensors."""
+        now = datetime.now()
+        query, params = build_last_reading_update([
+            Reading(1, 40.0, 'percentage', now - timedelta(minutes=5), None, None),
+            Reading(1, 42.0, 'percentage', now, None, None),
+            Reading(2, 21.0, 'celsius', now, None, None)
+        ])
+
+        self.assertIn('UPDATE sensors s', query)
+        self.assertEqual(query.count('UNION ALL'), 1)
+        self.assertEqual(params, [1, 42.0, now, 2, 21.0, now])
+
+    def test_add_buffers_until_batch_size(self):
+        """Test that readings are buffered and flushed as one transaction at batch_size."""
+        self.assertEqual(self.ingestor.add(1, 40.0), 0)
+        self.assertEqual(self.ingestor.add(2, 41.0), 0)
+        self.assertEqual(self.ingestor.pending, 2)
+        self.cursor.execute.assert_not_called()
+
+        self.assertEqual(self.ingestor.add(3, 42.0), 3)
+
+        self.assertEqual(self.transactions, 1)
+        self.assertEqual(self.ingestor.pending, 0)
+        # Two INSERT chunks (2 + 1 rows) and one sensors update
+        self.assertEqual(self.cursor.execute.call_count, 3)
+        self.assertIn('UPDATE sensors', self.cursor.execute.call_args_list[-1][0][0])
+
+    def test_flush_if_due(self):
+        """Test time-based flushing of a partial batch."""
+        self.ingestor.add(1, 40.0)
+        self.assertEqual(self.ingestor.flush_if_due(), 0)
+
+        self.ingestor.flush_interval = 0
+        self.assertEqual(self.ingestor.flush_if_due(), 1)
+        self.assertEqual(self.transactions, 1)
+
+    def test_background_flush_writes_partial_batch(self):
+        """Test that a partial batch is written after flush_interval with no further readings."""
+        ingestor = ReadingIngestor(db=self.mock_db, batch_size=100, flush_interval=0.05)
+        self.addCleanup(ingestor.close)
+
+        ingestor.add(1, 40.0)
+        ingestor.add(2, 41.0)
+        self.assertEqual(self.transactions, 0)
+        deadline = monotonic() + 5
+        while ingestor.pending and monotonic() < deadline:
+            sleep(0.01)
+
+        self.assertEqual(ingestor.pending, 0)
+        self.assertEqual(self.transactions, 1)
+        ingestor.close()
+        self.assertFalse(ingestor._timer.is_alive())
+
+    def test_failed_flush_keeps_readings(self):
+        """Test that readings survive a failed batch for the next attempt."""
+        self.cursor.execute.side_effect = Exception("Deadlock found")
+        self.ingestor.add(1, 40.0)
+
+        with self.assertRaises(Exception):
+            self.ingestor.flush()
+        self.assertEqual(self.ingestor.pending, 1)
+
+    @patch('python.ReadingIngest.mysql.connector.connect')
+    def test_load_file(self, mock_connect):
+        """Test CSV backfill through LOAD DATA LOCAL INFILE."""
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = (120,)
+        mock_cursor.rowcount = 5000
+        mock_conn.cursor.return_value = mock_cursor
+        mock_connect.return_value = mock_conn
+
+        loaded = self.ingestor.load_file('/tmp/backfill.csv')
+
+        self.assertEqual(loaded, 5000)
+        self.assertTrue(mock_connect.call_args[1]['allow_local_infile'])
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        self.assertIn('LOAD DATA LOCAL INFILE', queries[1])
+        self.assertEqual(mock_cursor.execute.call_args_list[2][0][1], (120,))
+        mock_conn.commit.assert_called_once()
+        mock_conn.close.assert_called_once()
+
+    def test_close_flushes(self):
+        """Test that closing writes pending readings."""
+        self.ingestor.add(1, 40.0)
+        self.ingestor.close()
+
+        self.assertEqual(self.transactions, 1)
+        self.mock_db.disconnect.assert_called_once()
+
+    def test_ingest_csv_inserts_in_batches(self):
+        """Test that a streamed CSV is inserted one batch_size transaction at a time."""
+        stream = io.BytesIO(
+            b"sensor_id,value,unit,created_at,temperature,humidity\n"
+            + b"".join(f"{i},{i}.5,percentage,2024-01-01T00:0{i}:00,,55.0\n".encode() for i in range(1, 6))
+        )
+
+        loaded = self.ingestor.ingest_csv(stream)
+
+        self.assertEqual(loaded, 5)
+        self.assertEqual(self.transactions, 2)
+        query, params = self.cursor.execute.call_args_list[0][0]
+        self.assertEqual(params[:6], [1, '1.5', 'percentage', datetime(2024, 1, 1, 0, 1), None, '55.0'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import unittest
+import os
+import sys
+from datetime import date, datetime, timedelta
+from unittest.mock import patch, MagicMock
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.ReadingPartitions import (
+    ReadingPartitionManager, add_months, partition_clause, partition_month, expected_partitions
+)
+
+class TestReadingPartitionManager(unittest.TestCase):
+    def setUp(self):
+        """Set up a manager over a mock database."""
+        self.mock_db = MagicMock()
+        self.partitions = []
+        self.archive_rows = None
+        self.partition_rows = 0
+        self.mock_db.execute_query.side_effect = self.query
+        self.manager = ReadingPartitionManager(db=self.mock_db)
+        self.today = date(2024, 5, 17)
+
+    def query(self, query, params=None):
+        if 'information_schema.PARTITIONS' in query:
+            return [(name, 0) for name in self.partitions] or [(None, 0)]
+        if 'MIN(created_at)' in query:
+            return [(datetime(2024, 2, 10, 8, 0),)]
+        if 'TABLE_CONSTRAINTS' in query:
+            return [('fk_sensor',)]
+        if 'information_schema.TABLES' in query:
+            return [(int(self.archive_rows is not None),)]
+        if 'COUNT(*) FROM readings_archive_' in query:
+            return [(self.archive_rows,)]
+        if 'COUNT(*) FROM readings PARTITION' in query:
+            return [(self.partition_rows,)]
+        return []
+
+    def statements(self):
+        return [c[0][0] for c in self.mock_db.execute_query.call_args_list
+                if c[0][0].lstrip().startswith(('ALTER', 'CREATE'))]
+
+    def test_month_helpers(self):
+        """Test month arithmetic and partition naming."""
+        self.assertEqual(add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(partition_month('p202405'), date(2024, 5, 1))
+        self.assertIsNone(partition_month('p_future'))
+        self.assertIn("p202412 VALUES LESS THAN (UNIX_TIMESTAMP('2025-01-01 00:00:00'))",
+                      partition_clause(date(2024, 12, 1)))
+        self.assertEqual(expected_partitions(datetime(2024, 4, 20), datetime(2024, 5, 20)),
+                         ['p202404', 'p202405'])
+
+    def test_migrate_builds_monthly_partitions(self):
+        """Test that migration partitions from the oldest reading to months ahead."""
+        created = self.manager.migrate(months_ahead=2, today=self.today)
+
+        self.assertEqual(created, 6)
+        drop_fk, primary_key, partition = self.statements()
+        self.assertIn('DROP FOREIGN KEY fk_sensor', drop_fk)
+        self.assertIn('ADD PRIMARY KEY (id, created_at)', primary_key)
+        self.assertIn('PARTITION BY RANGE (UNIX_TIMESTAMP(created_at))', partition)
+        self.assertIn('PARTITION p202402 ', partition)
+        self.assertIn('PARTITION p202407 ', partition)
+        self.assertIn('PARTITION p_future VALUES LESS THAN MAXVALUE', partition)
+
+    def test_migrate_skips_partitioned_table(self):
+        """Test that an already partitioned table is left alone."""
+        self.partitions = ['p202405', 'p_future']
+
+        self.assertEqual(self.manager.migrate(today=self.today), 0)
+        self.assertEqual(self.statements(), [])
+
+    def test_ensure_future_splits_p_future(self):
+        """Test that missing future months are reorganised out of p_future."""
+        self.partitions = ['p202404', 'p202405', 'p202406', 'p_future']
+
+        created = self.manager.ensure_future(months_ahead=3, today=self.today)
+
+        self.assertEqual(created, ['p202407', 'p202408'])
+        statement, = self.statements()
+        self.assertIn('REORGANIZE PARTITION p_future INTO', statement)
+        self.assertTrue(statement.rstrip().endswith('PARTITION p_future VALUES LESS THAN MAXVALUE\n)'))
+
+        self.partitions = ['p202404', 'p202405', 'p202406', 'p202407', 'p202408', 'p_future']
+        self.assertEqual(self.manager.ensure_future(months_ahead=3, today=self.today), [])
+
+    def test_ensure_future_requires_partitioned_table(self):
+        """Test that an unpartitioned table is reported rather than altered."""
+        with self.assertRaises(RuntimeError):
+            self.manager.ensure_future(today=self.today)
+
+    def test_expire_drops_whole_months(self):
+        """Test that only archived months entirely outside retention are dropped, in one statement."""
+        self.partitions = ['p202401', 'p202402', 'p202403', 'p202404', 'p202405', 'p_future']
+        archived = MagicMock(return_value=True)
+
+        removed = self.manager.expire(retention_months=2, archived=archived, today=self.today)
+
+        self.assertEqual(removed, ['p202401', 'p202402'])
+        self.assertEqual(self.statements(), ['ALTER TABLE readings DROP PARTITION p202401, p202402'])
+        self.assertEqual([c.args[0] for c in archived.call_args_list], [date(2024, 1, 1), date(2024, 2, 1)])
+
+    def test_expire_keeps_months_without_archive(self):
+        """Test that expired months with no verified archive are never dropped."""
+        self.partitions = ['p202401', 'p202402', 'p202405', 'p_future']
+
+        self.assertEqual(self.manager.expire(retention_months=2, today=self.today), [])
+        removed = self.manager.expire(retention_months=2, archived=lambda month: month.month == 2,
+                                      today=self.today)
+
+        self.assertEqual(removed, ['p202402'])
+        self.assertEqual(self.statements(), ['ALTER TABLE readings DROP PARTITION p202402'])
+
+    def test_expire_with_archive_exchanges_first(self):
+        """Test that archiving swaps the partition into its own table before dropping it."""
+        self.partitions = ['p202401', 'p202405', 'p_future']
+
+        self.manager.expire(retention_months=2, archive=True, today=self.today)
+
+        self.assertEqual(self.statements(), [
+            'CREATE TABLE readings_archive_202401 LIKE readings',
+            'ALTER TABLE readings_archive_202401 REMOVE PARTITIONING',
+            'ALTER TABLE readings EXCHANGE PARTITION p202401 WITH TABLE readings_archive_202401',
+            'ALTER TABLE readings DROP PARTITION p202401',
+        ])
+
+    def test_archive_rerun_does_not_exchange_back(self):
+        """Test that a re-run after a stop between exchange and drop keeps the archived rows."""
+        self.partitions = ['p202401', 'p202405', 'p_future']
+        self.archive_rows = 120
+
+        self.assertEqual(self.manager.expire(retention_months=2, archive=True, today=self.today), ['p202401'])
+        self.assertEqual(self.statements(), ['ALTER TABLE readings DROP PARTITION p202401'])
+
+        self.mock_db.reset_mock()
+        self.partition_rows = 5
+        with self.assertRaises(RuntimeError):
+            self.manager.expire(retention_months=2, archive=True, today=self.today)
+        self.assertEqual(self.statements(), [])
+
+    def test_archive_exchanges_into_empty_existing_table(self):
+        """Test that an existing but empty archive table is reused for the exchange."""
+        self.partitions = ['p202401', 'p202405', 'p_future']
+        self.archive_rows = 0
+
+        self.manager.expire(retention_months=2, archive=True, today=self.today)
+
+        self.assertEqual(self.statements(), [
+            'ALTER TABLE readings EXCHANGE PARTITION p202401 WITH TABLE readings_archive_202401',
+            'ALTER TABLE readings DROP PARTITION p202401',
+        ])
+
+    def test_verify_pruning(self):
+        """Test that plans reading only the window's partitions pass and full scans fail."""
+        month = date.today().strftime('p%Y%m')
+        sensors = pd.DataFrame({'plant_name': ['Basil'], 'plant_id': [1], 'sensor_id': [4],
+                                'sensor_name': ['Soil'], 'sensor_type': ['moisture']})
+        plan = pd.DataFrame({'table': ['<derived2>', 'r'], 'partitions': [None, month]})
+        self.mock_db.query_to_dataframe.side_effect = (
+            lambda query, params=None: plan if query.startswith('EXPLAIN ') else sensors
+        )
+
+        results = self.manager.verify_pruning(days=1)
+
+        self.assertEqual([name for name, *_ in results],
+                         ['plot_raw', 'plot_binned', 'plot_rollup', 'plot_daily', 'summary'])
+        self.assertTrue(all(ok for _, ok, _, _ in results))
+        explained = [c[0][0] for c in self.mock_db.query_to_dataframe.call_args_list
+                     if 'plant_sensors ps ON p.id' not in c[0][0]]
+        self.assertEqual(len(explained), 5)
+        self.assertTrue(all(query.startswith('EXPLAIN ') for query in explained))
+
+        plan = pd.DataFrame({'table': ['r'], 'partitions': ['p201901,p201902,' + month]})
+        self.assertFalse(any(ok for _, ok, _, _ in self.manager.verify_pruning(days=1)))
+
+@unittest.skipUnless(os.getenv('TEST_MYSQL_DATABASE'),
+                     'set TEST_MYSQL_DATABASE to a scratch MySQL database to run')
+class TestReadingPartitionsMySQL(unittest.TestCase):
+    """Runs against a local MySQL; the readings table in TEST_MYSQL_DATABASE is recreated."""
+
+    def setUp(self):
+        from python.DBConnect import DBConnect
+        with patch.dict(os.environ, {'DB_NAME': os.environ['TEST_MYSQL_DATABASE']}):
+            self.db = DBConnect(pooled=True)
+        self.db.execute_query("DROP TABLE IF EXISTS readings")
+        self.db.execute_query("DROP TABLE IF EXISTS readings_archive_" + self.old_month().strftime('%Y%m'))
+        self.db.execute_query(
+            """
+            CREATE TABLE readings (
+                id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+                sensor_id INT UNSIGNED NOT NULL,
+                value DECIMAL(10,2) NOT NULL,
+                unit VARCHAR(20) NOT NULL DEFAULT '',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_sensor_time (sensor_id, created_at)
+            ) ENGINE=InnoDB
+            """
+        )
+        for months_ago in (3, 2, 1):
+            self.db.execute_query(
+                "INSERT INTO readings (sensor_id, value, created_at) VALUES (1, %s, %s)",
+                (months_ago, datetime.combine(add_months(date.today().replace(day=1), -months_ago), datetime.min.time())
+                 + timedelta(days=1))
+            )
+        self.db.execute_query("INSERT INTO readings (sensor_id, value) VALUES (1, 0)")
+        self.manager = ReadingPartitionManager(db=self.db)
+
+    def old_month(self):
+        return add_months(date.today().replace(day=1), -3)
+
+    def tearDown(self):
+        self.db.execute_query("DROP TABLE IF EXISTS readings")
+        self.db.execute_query("DROP TABLE IF EXISTS readings_archive_" + self.old_month().strftime('%Y%m'))
+
+    def test_partition_lifecycle(self):
+        """Test migrate, future partitions, archive-expiry and pruning on a real server."""
+        self.assertGreaterEqual(self.manager.migrate(months_ahead=1), 5)
+        self.assertEqual(self.manager.ensure_future(months_ahead=2), [
+            add_months(date.today().replace(day=1), 2).strftime('p%Y%m')
+        ])
+
+        removed = self.manager.expire(retention_months=2, archive=True)
+
+        self.assertIn(self.old_month().strftime('p%Y%m'), removed)
+        archived = self.db.execute_query(
+            "SELECT COUNT(*) FROM readings_archive_" + self.old_month().strftime('%Y%m'))[0][0]
+        self.assertEqual(archived, 1)
+        scanned = self.manager.explain_partitions(
+            "SELECT * FROM readings WHERE created_at >= %s", (datetime.now() - timedelta(days=1),))
+        self.assertLessEqual(len(scanned), 2)
+
+if __name__ == '__main__':
+    unittest.main()
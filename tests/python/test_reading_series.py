@@ -0,0 +1,131 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.ReadingSeries import ReadingSeries, epoch_ms
+
+class TestReadingSeries(unittest.TestCase):
+    def setUp(self):
+        """Build readings from three sensors on two plants, out of time order."""
+        self.start = datetime(2024, 5, 1)
+        self.rows = [
+            (3, 12, Decimal('40.25'), self.start + timedelta(minutes=2)),
+            (1, 10, Decimal('21.10'), self.start),
+            (2, 11, Decimal('55.00'), self.start + timedelta(minutes=1)),
+            (4, 10, Decimal('21.30'), self.start + timedelta(minutes=3)),
+            (5, 12, Decimal('39.75'), self.start + timedelta(minutes=4)),
+        ]
+        self.series = ReadingSeries.from_rows(self.rows, ('id', 'sensor_id', 'value', 'created_at'))
+
+    def test_from_rows_encodes_compactly(self):
+        """Test dtypes, time ordering and interned sensor ids."""
+        s = self.series
+
+        self.assertEqual(s.ids.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(s.timestamps.dtype, np.int64)
+        self.assertEqual(s.timestamps[0], epoch_ms([self.start])[0])
+        self.assertEqual(s.values.dtype, np.float32)
+        self.assertEqual(s.sensors.tolist(), [10, 11, 12])
+        self.assertEqual(s.sensor_codes.dtype, np.uint16)
+        self.assertEqual(s.sensor_ids.tolist(), [10, 11, 12, 10, 12])
+        self.assertFalse(hasattr(s, '__dict__'))
+
+    def test_memory_is_an_order_of_magnitude_smaller(self):
+        """Test footprint against a DataFrame of Decimal values."""
+        n = 20000
+        rows = [(i % 16, Decimal(f"{i % 100}.25"), 'percentage', self.start + timedelta(seconds=i))
+                for i in range(n)]
+        df = pd.DataFrame(rows, columns=['sensor_id', 'value', 'unit', 'created_at'])
+
+        series = ReadingSeries.from_frame(df)
+
+        self.assertLessEqual(series.nbytes * 10, df.memory_usage(deep=True).sum())
+        self.assertLess(series.nbytes / n, 16)
+
+    def test_between_is_a_view(self):
+        """Test half-open time slicing without copying."""
+        window = self.series.between(self.start + timedelta(minutes=1), self.start + timedelta(minutes=3))
+
+        self.assertEqual(window.ids.tolist(), [2, 3])
+        self.assertTrue(np.shares_memory(window.values, self.series.values))
+        self.assertTrue(np.shares_memory(window.timestamps, self.series.timestamps))
+        self.assertIs(window.sensors, self.series.sensors)
+        self.assertEqual(len(self.series.between(None, self.start)), 0)
+        self.assertEqual(len(self.series.between(self.start, None)), 5)
+
+    def test_groups_and_for_sensor(self):
+        """Test per-sensor access in time order."""
+        groups = {sensor_id: s.ids.tolist() for sensor_id, s in self.series.groups()}
+
+        self.assertEqual(groups, {10: [1, 4], 11: [2], 12: [3, 5]})
+        self.assertEqual(self.series.for_sensor(12).values.tolist(), [40.25, 39.75])
+        self.assertEqual(len(self.series.for_sensor(99)), 0)
+
+    def test_aggregate_and_bin(self):
+        """Test per-sensor statistics and time buckets."""
+        stats = self.series.aggregate()
+
+        self.assertEqual(stats['id'].tolist(), [10, 11, 12])
+        self.assertEqual(stats['count'].tolist(), [2, 1, 2])
+        self.assertAlmostEqual(stats['sum'][2], 80.0, places=4)
+        self.assertAlmostEqual(stats['min'][0], 21.1, places=4)
+
+        bins = self.series.bin(2 * 60 * 1000)
+        self.assertEqual(bins['sensor_id'].tolist(), [10, 10, 11, 12, 12])
+        first = epoch_ms([self.start])[0] // 120000
+        self.assertEqual((bins['bucket'] - first).tolist(), [0, 1, 0, 1, 2])
+
+    def test_plants_are_interned(self):
+        """Test that plant ids are encoded and grouped like sensors."""
+        df = pd.DataFrame({
+            'sensor_id': [1, 2, 3], 'plant_id': [7, 7, 9], 'value': [1.0, 2.0, 3.0],
+            'created_at': pd.date_range(self.start, periods=3, freq='min'),
+        })
+
+        series = ReadingSeries.from_frame(df, plant='plant_id')
+
+        self.assertEqual(series.plants.tolist(), [7, 9])
+        self.assertEqual(series.aggregate('plant')['count'].tolist(), [2, 1])
+        with self.assertRaises(ValueError):
+            self.series.aggregate('plant')
+
+    def test_arrow_round_trip_shares_memory(self):
+        """Test conversion to Arrow and back without copying the columns."""
+        table = self.series.to_arrow()
+
+        self.assertEqual(table.column('created_at').type, pa.timestamp('ms'))
+        self.assertTrue(pa.types.is_dictionary(table.column('sensor_id').type))
+        back = ReadingSeries.from_arrow(table, id='id')
+        self.assertTrue(np.shares_memory(back.timestamps, self.series.timestamps))
+        self.assertTrue(np.shares_memory(back.values, self.series.values))
+        self.assertEqual(back.sensor_ids.tolist(), self.series.sensor_ids.tolist())
+
+        plain = pa.table({'created_at': pa.array([3, 1], pa.timestamp('ms')),
+                          'value': pa.array([Decimal('1.50'), Decimal('2.25')], pa.decimal128(10, 2)),
+                          'sensor_id': pa.array([5, 4], pa.uint32())})
+        self.assertEqual(ReadingSeries.from_arrow(plain).values.tolist(), [2.25, 1.5])
+
+    def test_numpy_frame_and_concat(self):
+        """Test record array and DataFrame conversions and re-interning on concat."""
+        records = self.series.to_numpy()
+        self.assertEqual(records.dtype.names, ('id', 'created_at', 'value', 'sensor_id'))
+        back = ReadingSeries.from_numpy(records, id='id')
+        self.assertEqual(back.ids.tolist(), self.series.ids.tolist())
+
+        frame = self.series.to_frame()
+        self.assertEqual(list(frame.columns), ['id', 'created_at', 'value', 'sensor_id'])
+        self.assertEqual(frame['created_at'].iloc[0], pd.Timestamp(self.start))
+
+        more = ReadingSeries.from_arrays([self.start + timedelta(minutes=10)], [1.0], [99], ids=[6])
+        joined = ReadingSeries.concat([self.series, ReadingSeries.empty(), more])
+        self.assertEqual(joined.sensors.tolist(), [10, 11, 12, 99])
+        self.assertEqual(joined.ids.tolist(), [1, 2, 3, 4, 5, 6])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.ReadingStore import ReadingStore
+from python.ProducePlot import PlotGenerator
+
+def readings_frame(rows):
+    """Build a readings DataFrame from (id, sensor_id, created_at, value) tuples"""
+    return pd.DataFrame(rows, columns=['id', 'sensor_id', 'created_at', 'value'])
+
+class TestReadingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ReadingStore(self.tmp.name)
+        self.day = datetime(2024, 5, 1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_and_read_round_trip(self):
+        """Readings are partitioned per sensor/day and filtered on read"""
+        written = self.store.write_frame(readings_frame([
+            (1, 1, self.day + timedelta(hours=1), 40.5),
+            (2, 2, self.day + timedelta(hours=1), 21.0),
+            (3, 1, self.day + timedelta(days=1, hours=2), 41.0),
+        ]))
+        self.assertEqual(written, 3)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'sensor_1', '2024-05-01.arrow')))
+
+        df = self.store.read([1], self.day, self.day + timedelta(days=2))
+        self.assertEqual(list(df.columns), ['sensor_id', 'created_at', 'value'])
+        self.assertEqual(df['value'].tolist(), [40.5, 41.0])
+        self.assertTrue((df['sensor_id'] == 1).all())
+
+        df = self.store.read([1, 2], self.day, self.day + timedelta(hours=12))
+        self.assertEqual(sorted(df['value'].tolist()), [21.0, 40.5])
+
+    def test_read_selects_columns(self):
+        """Only the requested columns are returned"""
+        self.store.write_frame(readings_frame([(1, 1, self.day, 40.5)]))
+        df = self.store.read([1], self.day, self.day + timedelta(hours=1), columns=('value',))
+        self.assertEqual(list(df.columns), ['sensor_id', 'value'])
+
+    def test_read_series_stops_at_max_id(self):
+        """Readings past max_id are left to the database tail"""
+        self.store.write_frame(readings_frame([
+            (1, 1, self.day + timedelta(hours=1), 40.5),
+            (5, 1, self.day + timedelta(hours=2), 41.0),
+        ]))
+        end = self.day + timedelta(hours=3)
+
+        self.assertEqual(len(self.store.read_series([1], self.day, end)), 2)
+        series = self.store.read_series([1], self.day, end, max_id=4)
+        self.assertEqual(series.values.tolist(), [40.5])
+        self.assertEqual(self.store.read([1], self.day, end, max_id=4)['value'].tolist(), [40.5])
+
+    def test_append_deduplicates_replayed_rows(self):
+        """Replaying a batch does not duplicate readings"""
+        frame = readings_frame([(1, 1, self.day, 40.5), (2, 1, self.day + timedelta(minutes=5), 40.7)])
+        self.store.write_frame(frame)
+        self.store.write_frame(frame)
+        df = self.store.read([1], self.day, self.day + timedelta(hours=1))
+        self.assertEqual(len(df), 2)
+
+    def test_sync_advances_watermark(self):
+        """sync copies readings in id order and records the high-water mark"""
+        mock_db = MagicMock()
+        mock_db.execute_query.return_value = [(3,)]
+        mock_db.query_to_dataframe.side_effect = [
+            readings_frame([(1, 1, self.day, 40.5), (2, 1, self.day, 40.6)]),
+            readings_frame([(3, 1, self.day, 40.7)]),
+        ]
+        copied = self.store.sync(mock_db, batch_size=2)
+        self.assertEqual(copied, 3)
+        self.assertEqual(self.store.get_watermark(), 3)
+        self.assertEqual(mock_db.query_to_dataframe.call_args_list[1][1]['params'], (2, 3, 2))
+
+    def test_sync_stops_at_settled_id(self):
+        """sync leaves readings newer than the settle window for the next run"""
+        mock_db = MagicMock()
+        mock_db.execute_query.return_value = [(0,)]
+        self.assertEqual(self.store.sync(mock_db, settle_seconds=30), 0)
+        self.assertIn('INTERVAL %s SECOND', mock_db.execute_query.call_args[0][0])
+        self.assertEqual(mock_db.execute_query.call_args[0][1], (0, 30))
+        mock_db.query_to_dataframe.assert_not_called()
+
+        mock_db.execute_query.return_value = [(1,)]
+        mock_db.query_to_dataframe.side_effect = [readings_frame([(1, 1, self.day, 40.5)])]
+        self.assertEqual(self.store.sync(mock_db, batch_size=1), 1)
+        self.assertEqual(mock_db.query_to_dataframe.call_args[1]['params'], (0, 1, 1))
+        # Reaching the settled id ends the run without another query
+        self.assertEqual(mock_db.query_to_dataframe.call_count, 1)
+
+    def test_prune_removes_old_partitions(self):
+        """prune deletes day files before the cutoff only"""
+        self.store.write_frame(readings_frame([
+            (1, 1, self.day, 40.5),
+            (2, 1, self.day + timedelta(days=3), 40.6),
+        ]))
+        removed = self.store.prune((self.day + timedelta(days=1)).date())
+        self.assertEqual(removed, 1)
+        df = self.store.read([1], self.day, self.day + timedelta(days=5))
+        self.assertEqual(df['value'].tolist(), [40.6])
+
+class TestPlotGeneratorStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ReadingStore(self.tmp.name)
+        self.mock_db = MagicMock()
+        with patch('python.ProducePlot.DBConnect', return_value=self.mock_db):
+            self.plotter = PlotGenerator(store=self.store)
+
+    def tearDown(self):
+        self.plotter.cleanup()
+        self.tmp.cleanup()
+
+    def test_get_sensor_data_merges_store_and_tail(self):
+        """History comes from the store and newer readings from the database"""
+        now = datetime.now()
+        self.store.write_frame(readings_frame([(1, 1, now - timedelta(hours=2), 40.0)]))
+        self.store._set_watermark(1)
+        self.mock_db.query_to_dataframe.side_effect = [
+            pd.DataFrame({
+                'plant_name': ['Plant A'], 'plant_id': [1], 'sensor_id': [1],
+                'sensor_name': ['Moisture'], 'sensor_type': ['moisture'],
+            }),
+            pd.DataFrame({'sensor_id': [1], 'created_at': [now - timedelta(minutes=5)], 'value': [42.0]}),
+        ]
+
+        df = self.plotter.get_sensor_data(days=1, plant_id=1)
+
+        self.assertEqual(df['reading_value'].tolist(), [40.0, 42.0])
+        self.assertEqual(list(df.columns), ['plant_name', 'plant_id', 'sensor_name', 'sensor_type',
+                                            'reading_value', 'reading_timestamp'])
+        tail_query, = self.mock_db.query_to_dataframe.call_args_list[1][0]
+        self.assertIn('id > %s', tail_query)
+        self.assertEqual(self.mock_db.query_to_dataframe.call_args_list[1][1]['params'][0], 1)
+
+    def test_get_sensor_data_ignores_rows_synced_past_watermark(self):
+        """Rows a sync writes after the watermark was read come only from the tail"""
+        now = datetime.now()
+        self.store.write_frame(readings_frame([(1, 1, now - timedelta(hours=2), 40.0),
+                                               (2, 1, now - timedelta(minutes=5), 42.0)]))
+        self.store._set_watermark(1)
+        self.mock_db.query_to_dataframe.side_effect = [
+            pd.DataFrame({
+                'plant_name': ['Plant A'], 'plant_id': [1], 'sensor_id': [1],
+                'sensor_name': ['Moisture'], 'sensor_type': ['moisture'],
+            }),
+            pd.DataFrame({'sensor_id': [1], 'created_at': [now - timedelta(minutes=5)], 'value': [42.0]}),
+        ]
+
+        df = self.plotter.get_sensor_data(days=1, plant_id=1)
+
+        self.assertEqual(df['reading_value'].tolist(), [40.0, 42.0])
+
+    def test_get_sensor_data_downsamples_series(self):
+        """max_points bins store readings with mean/min/max per bin"""
+        now = datetime.now()
+        self.store.write_frame(readings_frame([
+            (i + 1, 1, now - timedelta(hours=6) + timedelta(seconds=i), 40.0 + i) for i in range(10)
+        ]))
+        self.store._set_watermark(10)
+        self.mock_db.query_to_dataframe.side_effect = [
+            pd.DataFrame({
+                'plant_name': ['Plant A'], 'plant_id': [1], 'sensor_id': [1],
+                'sensor_name': ['Moisture'], 'sensor_type': ['moisture'],
+            }),
+            pd.DataFrame(columns=['sensor_id', 'created_at', 'value']),
+        ]
+
+        df = self.plotter.get_sensor_data(days=1, max_points=24)
+
+        self.assertLessEqual(len(df), 2)
+        self.assertEqual(df['reading_min'].min(), 40.0)
+        self.assertEqual(df['reading_max'].max(), 49.0)
+        self.assertIn('reading_timestamp', df.columns)
+
+if __name__ == '__main__':
+    unittest.main()
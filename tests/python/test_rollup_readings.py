@@ -0,0 +1,93 @@
+import unittest
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, date
+from unittest.mock import patch, MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.RollupReadings import ReadingRollup, rollup_bucket, rollup_source
+
+class TestReadingRollup(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.mock_db = MagicMock()
+        self.cursor = MagicMock()
+
+        @contextmanager
+        def transaction():
+            yield self.cursor
+
+        self.mock_db.transaction.side_effect = transaction
+        with patch('python.RollupReadings.DBConnect', return_value=self.mock_db):
+            self.rollup = ReadingRollup(batch_size=100)
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.rollup.cleanup()
+
+    def test_rollup_bucket(self):
+        """Test choosing the coarsest rollup that fits the window, with bins of whole buckets."""
+        day = 86400
+        self.assertEqual(rollup_bucket(7 * day, 1000), (None, 605))
+        self.assertEqual(rollup_bucket(30 * day, 1000), ('readings_hourly', 3600))
+        self.assertEqual(rollup_bucket(90 * day, 1000), ('readings_hourly', 10800))
+        self.assertEqual(rollup_bucket(365 * day, 1000), ('readings_daily', day))
+        self.assertEqual(rollup_bucket(30 * day, 30), ('readings_daily', day))
+
+    def test_rollup_source_clips_to_start(self):
+        """Test that rollup buckets start at the window and the partial bucket comes from raw readings."""
+        start = datetime(2024, 5, 1, 10, 42, 7)
+        end = datetime(2024, 6, 1, 10, 42, 7)
+
+        sql, params = rollup_source('readings_hourly', start, end)
+        self.assertIn('FROM readings_hourly', sql)
+        self.assertEqual(sql.count('UNION ALL'), 2)
+        self.assertEqual(params, (datetime(2024, 5, 1, 11, 0, 0), end,
+                                  start, datetime(2024, 5, 1, 11, 0, 0), start, end))
+
+        _, params = rollup_source('readings_daily', start, end)
+        self.assertEqual(params[:4], (date(2024, 5, 2), end, start, date(2024, 5, 2)))
+
+        _, params = rollup_source('readings_daily', datetime(2024, 5, 1), end)
+        self.assertEqual(params[0], date(2024, 5, 1))
+
+    def test_update_processes_in_batches(self):
+        """Test that new readings are folded in per batch and the watermark advances."""
+        self.mock_db.execute_query.side_effect = [[(0,)], [(250,)]]
+        self.cursor.fetchone.side_effect = [(0,), (100,), (200,)]
+
+        processed = self.rollup.update()
+
+        self.assertEqual(processed, 250)
+        self.assertEqual(self.mock_db.transaction.call_count, 3)
+        merges = [c for c in self.cursor.execute.call_args_list if 'INSERT INTO readings_' in c[0][0]]
+        self.assertEqual(len(merges), 6)
+        self.assertEqual(merges[0][0][1], (0, 100))
+        self.assertEqual(merges[-1][0][1], (200, 250))
+        self.assertEqual(self.cursor.execute.call_args_list[-1][0][1], ('readings', 250))
+
+    def test_update_nothing_new(self):
+        """Test that an up-to-date watermark does no work."""
+        self.mock_db.execute_query.side_effect = [[(500,)], [(0,)]]
+
+        self.assertEqual(self.rollup.update(), 0)
+        self.mock_db.transaction.assert_not_called()
+
+    def test_update_skips_batch_claimed_by_concurrent_run(self):
+        """Test that a watermark moved by another run is not double counted."""
+        self.mock_db.execute_query.side_effect = [[(0,)], [(100,)]]
+        self.cursor.fetchone.side_effect = [(100,)]
+
+        self.rollup.update()
+
+        merges = [c for c in self.cursor.execute.call_args_list if 'INSERT INTO readings_' in c[0][0]]
+        self.assertEqual(merges, [])
+
+    def test_cleanup(self):
+        """Test cleanup of resources."""
+        self.rollup.cleanup()
+        self.mock_db.disconnect.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,28 +1,34 @@
 import unittest
 import os
 import sys
+import tempfile
+import threading
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from python.RunPump import PumpController
+import time
+from python.RunPump import PumpController, MultiPumpController
 
 class TestPumpController(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures before each test method."""
         self.mock_db = MagicMock()
+        self.mock_log = MagicMock()
+        self.lock_dir = tempfile.TemporaryDirectory()
         with patch('python.RunPump.DBConnect', return_value=self.mock_db):
-            self.pump = PumpController()
+            self.pump = PumpController(action_log=self.mock_log, lock_dir=self.lock_dir.name)
         
     def tearDown(self):
         """Clean up after each test method."""
         self.pump.cleanup()
+        self.lock_dir.cleanup()
 
     @patch('python.RunPump.GPIO', autospec=True)
     def test_initialization(self, mock_gpio):
         """Test that the PumpController initializes correctly."""
         with patch('python.RunPump.DBConnect', return_value=self.mock_db):
-            pump = PumpController()
+            pump = PumpController(action_log=self.mock_log, lock_dir=self.lock_dir.name)
         
         mock_gpio.setmode.assert_called_once_with(mock_gpio.BCM)
         mock_gpio.setup.assert_called_once_with(pump.pin, mock_gpio.OUT)
@@ -34,13 +40,8 @@ class TestPumpController(unittest.TestCase):
         self.pump.start_pump()
         
         mock_gpio.output.assert_called_with(self.pump.pin, mock_gpio.HIGH)
-        self.mock_db.execute_query.assert_called_with(
-            """
-        INSERT INTO system_logs (component, action, timestamp)
-        VALUES (%s, %s, %s)
-        """,
-            ["pump", "start", unittest.mock.ANY]
-        )
+        self.mock_log.log.assert_called_with("pump", "start", unittest.mock.ANY)
+        self.mock_db.execute_query.assert_not_called()
 
     @patch('python.RunPump.GPIO', autospec=True)
     def test_stop_pump(self, mock_gpio):
@@ -48,13 +49,8 @@ class TestPumpController(unittest.TestCase):
         self.pump.stop_pump()
         
         mock_gpio.output.assert_called_with(self.pump.pin, mock_gpio.LOW)
-        self.mock_db.execute_query.assert_called_with(
-            """
-        INSERT INTO system_logs (component, action, timestamp)
-        VALUES (%s, %s, %s)
-        """,
-            ["pump", "stop", unittest.mock.ANY]
-        )
+        self.mock_log.log.assert_called_with("pump", "stop", unittest.mock.ANY)
+        self.mock_db.execute_query.assert_not_called()
 
     @patch('python.RunPump.GPIO', autospec=True)
     def test_cleanup(self, mock_gpio):
@@ -87,5 +83,143 @@ class TestPumpController(unittest.TestCase):
         mock_gpio.output.assert_any_call(self.pump.pin, mock_gpio.HIGH)
         mock_gpio.output.assert_called_with(self.pump.pin, mock_gpio.LOW)
 
+class TestMultiPumpController(unittest.TestCase):
+    def setUp(self):
+        """Set up a two-pump controller on mock GPIO."""
+        self.gpio_patcher = patch('python.RunPump.GPIO', autospec=True)
+        self.mock_gpio = self.gpio_patcher.start()
+        self.mock_db = MagicMock()
+        self.mock_log = MagicMock()
+        self.lock_dir = tempfile.TemporaryDirectory()
+        self.controller = MultiPumpController(pins=(18, 23, 24), max_concurrent=2, db=self.mock_db,
+                                              action_log=self.mock_log, lock_dir=self.lock_dir.name)
+
+    def tearDown(self):
+        self.controller.cleanup()
+        self.gpio_patcher.stop()
+        self.lock_dir.cleanup()
+
+    def test_initialization(self):
+        """Test that every zone pin is set up and switched off."""
+        for pin in (18, 23, 24):
+            self.mock_gpio.setup.assert_any_call(pin, self.mock_gpio.OUT)
+            self.mock_gpio.output.assert_any_call(pin, self.mock_gpio.LOW)
+        with self.assertRaises(ValueError):
+            MultiPumpController(pins=(18,), max_concurrent=0, db=self.mock_db, action_log=self.mock_log)
+
+    def test_zones_run_in_parallel(self):
+        """Test that zones water concurrently instead of one after another."""
+        started = time.monotonic()
+        runs = [self.controller.run_zone(pin, 0.2) for pin in (18, 23)]
+
+        self.assertTrue(self.controller.wait_all(timeout=2))
+        self.assertLess(time.monotonic() - started, 0.35)
+        self.assertTrue(all(run.done and not run.cancelled for run in runs))
+        self.mock_gpio.output.assert_any_call(18, self.mock_gpio.HIGH)
+        self.mock_gpio.output.assert_called_with(unittest.mock.ANY, self.mock_gpio.LOW)
+
+    def test_concurrency_limit_queues_runs(self):
+        """Test that runs beyond max_concurrent wait for a free slot."""
+        self.controller.run_zone(18, 0.1)
+        self.controller.run_zone(23, 0.1)
+        third = self.controller.run_zone(24, 0.1)
+
+        state = self.controller.state()
+        self.assertFalse(state[24]['running'])
+        self.assertEqual(state[24]['queued'], 1)
+        self.assertTrue(third.wait(timeout=2))
+        self.assertFalse(third.cancelled)
+
+    def test_on_start_waits_for_queued_run(self):
+        """Test that on_start fires when a queued run switches its pin on, not when it is requested."""
+        starts = []
+        self.controller.run_zone(18, 0.1)
+        self.controller.run_zone(23, 0.1)
+        third = self.controller.run_zone(24, 0.1, on_start=starts.append)
+
+        self.assertEqual(starts, [])
+        self.assertTrue(third.wait(timeout=2))
+        self.assertEqual(starts, [third])
+        self.assertIsNotNone(third.on_at)
+
+    def test_limits_are_shared_between_controllers(self):
+        """Test that a second controller (another process) waits for the shared slots and pins."""
+        other = MultiPumpController(pins=(), max_concurrent=2, db=self.mock_db, action_log=self.mock_log,
+                                    lock_dir=self.lock_dir.name)
+        other.lock_poll = 0.02
+        self.addCleanup(other.cleanup)
+        first = self.controller.run_zone(18, 0.2)
+        self.controller.run_zone(23, 0.2)
+
+        blocked = other.run_zone(24, 0.05)
+        same_pin = other.run_zone(18, 0.05)
+
+        self.assertEqual(other.state()[24], {'running': False, 'remaining': None, 'queued': 1})
+        self.assertTrue(blocked.wait(timeout=2))
+        self.assertTrue(same_pin.wait(timeout=2))
+        self.assertGreaterEqual(blocked.started_at, first.finished_at)
+        self.assertGreaterEqual(same_pin.started_at, first.finished_at)
+
+    def test_single_pump_shares_limits_with_multi_controller(self):
+        """Test that PumpController waits for the shared slots and holds its pin against other controllers."""
+        with patch('python.RunPump.DBConnect', return_value=self.mock_db):
+            pump = PumpController(pin=18, action_log=self.mock_log, max_concurrent=2,
+                                  lock_dir=self.lock_dir.name)
+        self.addCleanup(pump.cleanup)
+        pump.lock_poll = 0.02
+        other = MultiPumpController(pins=(), max_concurrent=2, db=self.mock_db, action_log=self.mock_log,
+                                    lock_dir=self.lock_dir.name)
+        other.lock_poll = 0.02
+        self.addCleanup(other.cleanup)
+        first = self.controller.run_zone(23, 0.2)
+        self.controller.run_zone(24, 0.2)
+        started = []
+        pump.start_pump = lambda: started.append(time.monotonic())
+
+        worker = threading.Thread(target=pump.run_pump, args=(0.2,))
+        with patch('builtins.print'):
+            worker.start()
+            self.assertTrue(first.wait(timeout=2))
+            while not started:
+                time.sleep(0.01)
+            same_pin = other.run_zone(18, 0.05)
+            worker.join(timeout=2)
+
+        self.assertGreaterEqual(started[0], first.finished_at)
+        self.assertTrue(same_pin.wait(timeout=2))
+        self.assertGreaterEqual(same_pin.started_at, started[0] + 0.2)
+
+    def test_same_pin_runs_back_to_back(self):
+        """Test that a second run on a busy pin waits for the first."""
+        first = self.controller.run_zone(18, 0.1)
+        second = self.controller.run_zone(18, 0.1)
+
+        self.assertEqual(self.controller.state()[18]['queued'], 1)
+        self.assertTrue(second.wait(timeout=2))
+        self.assertGreaterEqual(second.started_at, first.finished_at)
+
+    def test_cancel_stops_pump_immediately(self):
+        """Test that cancelling switches the pin off and runs the callback."""
+        finished = []
+        run = self.controller.run_zone(18, 30, callback=finished.append)
+        queued = self.controller.run_zone(18, 30)
+
+        self.controller.cancel(18)
+
+        self.assertTrue(run.done and run.cancelled)
+        self.assertTrue(queued.done and queued.cancelled)
+        self.assertEqual(finished, [run])
+        self.mock_gpio.output.assert_called_with(18, self.mock_gpio.LOW)
+        self.mock_log.log.assert_called_with("pump", "cancel pin 18", run.off_at)
+        self.assertFalse(self.controller.state()[18]['running'])
+
+    def test_state_reports_remaining_time(self):
+        """Test that live state shows the time left on a running zone."""
+        self.controller.run_zone(23, 30)
+
+        remaining = self.controller.state()[23]['remaining']
+        self.assertGreater(remaining, 29)
+        self.assertLessEqual(remaining, 30)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
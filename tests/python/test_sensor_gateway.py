@@ -0,0 +1,149 @@
+import unittest
+import os
+import sys
+import json
+import asyncio
+import sqlite3
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.SensorGateway import SensorGateway, load_sensor_thresholds, simulate_nodes
+from python.ReadingIngest import ReadingIngestor
+
+class SQLiteIngestor(ReadingIngestor):
+    """ReadingIngestor writing to an in-memory SQLite stand-in for MySQL"""
+
+    def __init__(self, **kwargs):
+        super().__init__(db=MagicMock(), **kwargs)
+        self.sqlite = sqlite3.connect(':memory:', check_same_thread=False)
+        self.sqlite.execute(
+            "CREATE TABLE readings (id INTEGER PRIMARY KEY, sensor_id INTEGER, value REAL, "
+            "unit TEXT, created_at TEXT, temperature REAL, humidity REAL)"
+        )
+        self.batches = 0
+
+    def insert_batch(self, readings):
+        with self.sqlite:
+            self.sqlite.executemany(
+                "INSERT INTO readings (sensor_id, value, unit, created_at, temperature, humidity) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(r.sensor_id, r.value, r.unit, str(r.created_at), r.temperature, r.humidity)
+                 for r in readings]
+            )
+        self.batches += 1
+        return len(readings)
+
+    def count(self):
+        return self.sqlite.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+
+class TestSensorGateway(unittest.TestCase):
+    def setUp(self):
+        """Set up a gateway backed by SQLite."""
+        self.ingestor = SQLiteIngestor(batch_size=50, flush_interval=0.05)
+        self.gateway = SensorGateway(
+            self.ingestor,
+            lambda: {1: (20.0, 80.0), 2: (None, None)},
+            flush_interval=0.05
+        )
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_validate(self):
+        """Test payload validation against known sensors and thresholds."""
+        self.gateway.sensors = {1: (20.0, 80.0)}
+
+        reading, error = self.gateway.validate({'sensor_id': '1', 'value': '45.5'})
+        self.assertIsNone(error)
+        self.assertEqual(reading['value'], 45.5)
+
+        self.assertIsNotNone(self.gateway.validate({'sensor_id': 9, 'value': 1})[1])
+        self.assertIsNotNone(self.gateway.validate({'sensor_id': 1})[1])
+        self.assertIsNotNone(self.gateway.validate({'sensor_id': 1, 'value': 'nan'})[1])
+
+        # Out-of-range readings are stored but counted, unless rejection is enabled
+        self.assertIsNone(self.gateway.validate({'sensor_id': 1, 'value': 95})[1])
+        self.assertEqual(self.gateway.stats['out_of_range'], 1)
+        self.gateway.reject_out_of_range = True
+        self.assertIsNotNone(self.gateway.validate({'sensor_id': 1, 'value': 95})[1])
+
+    def test_buffer_limit(self):
+        """Test that readings beyond max_pending are refused."""
+        self.gateway.sensors = {1: (None, None)}
+        self.gateway.max_pending = 2
+        self.ingestor.batch_size = 100
+        self.ingestor.flush_interval = 60
+
+        accepted, errors = self.gateway.submit([{'sensor_id': 1, 'value': v} for v in range(3)])
+
+        self.assertEqual(accepted, 2)
+        self.assertEqual(errors, ['gateway buffer full'])
+        self.assertEqual(self.gateway.stats['dropped'], 1)
+
+    def test_simulated_http_nodes(self):
+        """Test many concurrent HTTP nodes end up batched into the database."""
+        async def scenario():
+            http_port, _ = await self.gateway.start('127.0.0.1', 0)
+            accepted = await simulate_nodes('127.0.0.1', http_port, nodes=40,
+                                            readings_per_node=5, sensor_ids=(1, 2))
+            await self.gateway.stop()
+            return accepted
+
+        accepted = self.run_async(scenario())
+
+        self.assertEqual(accepted, 200)
+        self.assertEqual(self.ingestor.count(), 200)
+        self.assertLess(self.ingestor.batches, 200)
+        self.assertEqual(self.gateway.stats['written'], 200)
+
+    def test_simulated_udp_nodes(self):
+        """Test readings received over UDP are written."""
+        async def scenario():
+            _, udp_port = await self.gateway.start('127.0.0.1', 0, udp_port=0)
+            await simulate_nodes('127.0.0.1', udp_port, nodes=10, readings_per_node=3,
+                                 sensor_ids=(1,), protocol='udp')
+            await asyncio.sleep(0.1)
+            await self.gateway.stop()
+
+        self.run_async(scenario())
+
+        self.assertEqual(self.ingestor.count(), 30)
+
+    def test_http_errors(self):
+        """Test HTTP responses for invalid requests and the health endpoint."""
+        async def request(port, raw):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(raw)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            head, body = response.split(b'\r\n\r\n', 1)
+            return int(head.split()[1]), json.loads(body)
+
+        async def scenario():
+            port, _ = await self.gateway.start('127.0.0.1', 0)
+            body = b'{"sensor_id": 7, "value": 1}'
+            bad = await request(port, b'POST /readings HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s'
+                                % (len(body), body))
+            missing = await request(port, b'GET /nope HTTP/1.1\r\n\r\n')
+            health = await request(port, b'GET /health HTTP/1.1\r\n\r\n')
+            await self.gateway.stop()
+            return bad, missing, health
+
+        bad, missing, health = self.run_async(scenario())
+
+        self.assertEqual(bad[0], 400)
+        self.assertIn('unknown or inactive sensor 7', bad[1]['errors'][0])
+        self.assertEqual(missing[0], 404)
+        self.assertEqual(health[0], 200)
+        self.assertEqual(health[1]['stats']['rejected'], 1)
+
+    def test_load_sensor_thresholds(self):
+        """Test converting sensor rows to a threshold map."""
+        db = MagicMock()
+        db.execute_query.return_value = [(1, 20, 80), (2, None, None)]
+
+        self.assertEqual(load_sensor_thresholds(db), {1: (20.0, 80.0), 2: (None, None)})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from python.startup_benchmark import parse_importtime, benchmark, ENTRY_POINTS
+
+class TestStartupBenchmark(unittest.TestCase):
+    def test_parse_importtime(self):
+        """Test parsing of -X importtime lines into module, times and depth."""
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   _io\n"
+            "import time:      1500 |       1500 |     numpy.core\n"
+            "import time:       300 |       1800 |   numpy\n"
+            "import time:       200 |       2000 | python.RunPump\n"
+        )
+
+        self.assertEqual(parse_importtime(stderr), [
+            ('_io', 120, 120, 1),
+            ('numpy.core', 1500, 1500, 2),
+            ('numpy', 300, 1800, 1),
+            ('python.RunPump', 200, 2000, 0),
+        ])
+
+    def test_entry_points_skip_unneeded_imports(self):
+        """Test in fresh interpreters that no entry point loads what it does not need."""
+        for name in ENTRY_POINTS:
+            with self.subTest(name):
+                result = benchmark(name, runs=1)
+                self.assertEqual(result['forbidden'], [])
+                self.assertGreater(result['ms'], 0)
+
+if __name__ == '__main__':
+    unittest.main()